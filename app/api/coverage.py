@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.database.database import get_db
+from app.models.system_config import SystemConfiguration
+from app.schemas.coverage import CoverageGap, CoverageResponse, DayCoverage, GapListResponse, SilentSystem
+from app.services.coverage import MINUTES_PER_DAY, find_gaps, range_bitmap, slot_coverage, systems_with_data
+from app.services.ingest import load_latest_measurements
+
+router = APIRouter(prefix="/coverage", tags=["Coverage"])
+
+# 单次查询的最大时间跨度（天）
+MAX_RANGE_DAYS = 366
+
+
+def _validate_range(start_time: datetime, end_time: datetime) -> None:
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be later than start_time")
+    if end_time - start_time > timedelta(days=MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"Time range must not exceed {MAX_RANGE_DAYS} days")
+
+
+def _percent(present: int, expected: int) -> float:
+    return round(present / expected * 100, 2) if expected else 0.0
+
+
+@router.get("/silent", response_model=List[SilentSystem])
+def get_silent_systems(
+    start_time: datetime = Query(..., description="时间范围开始（本地时间 Asia/Shanghai）"),
+    end_time: datetime = Query(..., description="时间范围结束（本地时间 Asia/Shanghai，不含）"),
+    include_inactive: bool = Query(False, description="是否包含停用的系统"),
+    db: Session = Depends(get_db),
+):
+    """
+    获取时间范围内没有任何测量数据的系统（静默系统），附最新一条测量的时间。
+
+    完整覆盖的日期只读取每天的有数据分钟数，首尾不完整的日期解码分钟位图，不访问 measurements 表。
+    """
+    _validate_range(start_time, end_time)
+    query = db.query(SystemConfiguration)
+    if not include_inactive:
+        query = query.filter(SystemConfiguration.is_active == True)
+    configs = query.order_by(SystemConfiguration.system_id).all()
+
+    system_ids = [config.system_id for config in configs]
+    reporting = systems_with_data(db, system_ids, start_time, end_time)
+    silent = [config for config in configs if config.system_id not in reporting]
+    latest = load_latest_measurements(db, [config.system_id for config in silent])
+    return [
+        SilentSystem(
+            system_id=config.system_id,
+            name=config.name,
+            is_active=config.is_active,
+            last_seen=latest[config.system_id].timestamp if config.system_id in latest else None,
+        )
+        for config in silent
+    ]
+
+
+@router.get("/{system_id}", response_model=CoverageResponse)
+def get_system_coverage(
+    system_id: str,
+    start_time: datetime = Query(..., description="时间范围开始（本地时间 Asia/Shanghai）"),
+    end_time: datetime = Query(..., description="时间范围结束（本地时间 Asia/Shanghai，不含）"),
+    interval_minutes: int = Query(1, ge=1, le=MINUTES_PER_DAY, description="期望采样间隔（分钟，需整除 1440），时段内任一分钟有数据即视为完整"),
+    db: Session = Depends(get_db),
+):
+    """
+    获取系统在时间范围内的数据覆盖率（总体与逐日）。
+
+    按期望采样间隔把范围划分为时段（按当日零点对齐），统计有数据的时段比例。
+    """
+    _validate_range(start_time, end_time)
+    if MINUTES_PER_DAY % interval_minutes:
+        raise HTTPException(status_code=400, detail="interval_minutes must divide 1440")
+
+    first, bits = range_bitmap(db, system_id, start_time, end_time)
+    days = slot_coverage(first, bits, interval_minutes)
+    expected = sum(day["expected_slots"] for day in days)
+    present = sum(day["present_slots"] for day in days)
+    return CoverageResponse(
+        system_id=system_id,
+        start_time=start_time,
+        end_time=end_time,
+        interval_minutes=interval_minutes,
+        expected_slots=expected,
+        present_slots=present,
+        coverage=_percent(present, expected),
+        days=[
+            DayCoverage(**day, coverage=_percent(day["present_slots"], day["expected_slots"]))
+            for day in days
+        ],
+    )
+
+
+@router.get("/{system_id}/gaps", response_model=GapListResponse)
+def get_system_gaps(
+    system_id: str,
+    start_time: datetime = Query(..., description="时间范围开始（本地时间 Asia/Shanghai）"),
+    end_time: datetime = Query(..., description="时间范围结束（本地时间 Asia/Shanghai，不含）"),
+    min_gap_minutes: int = Query(10, ge=1, description="只返回不短于该分钟数的缺测区间（应大于采样间隔）"),
+    db: Session = Depends(get_db),
+):
+    """
+    获取系统在时间范围内的缺测区间（按时间升序）。
+    """
+    _validate_range(start_time, end_time)
+    first, bits = range_bitmap(db, system_id, start_time, end_time)
+    gaps = find_gaps(first, bits, min_gap_minutes)
+    return GapListResponse(
+        system_id=system_id,
+        start_time=start_time,
+        end_time=end_time,
+        min_gap_minutes=min_gap_minutes,
+        total_gap_minutes=sum(gap["minutes"] for gap in gaps),
+        gaps=[CoverageGap(**gap) for gap in gaps],
+    )
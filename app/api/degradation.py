@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database.database import get_db
+from app.models.degradation import DegradationResult
+from app.schemas.degradation import DegradationResultResponse
+from app.services.degradation import METHODS
+
+router = APIRouter(prefix="/degradation", tags=["Degradation"])
+
+
+@router.get("/", response_model=List[DegradationResultResponse])
+def list_degradation_results(
+    method: Optional[str] = Query(None, description="按分析方法过滤：yoy 或 rolling"),
+    status: Optional[str] = Query(None, description="按状态过滤，如 ok"),
+    db: Session = Depends(get_db),
+):
+    """
+    获取全站各系统的衰减率分析结果（按年衰减率升序，衰减最快的系统在前）。
+
+    结果由衰减分析任务缓存，接口不做计算。
+    """
+    if method is not None and method not in METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {list(METHODS)}")
+    query = db.query(DegradationResult)
+    if method:
+        query = query.filter(DegradationResult.method == method)
+    if status:
+        query = query.filter(DegradationResult.status == status)
+    return query.order_by(
+        DegradationResult.rate_percent_per_year.is_(None),
+        DegradationResult.rate_percent_per_year,
+        DegradationResult.system_id,
+        DegradationResult.method,
+    ).all()
+
+
+@router.get("/{system_id}", response_model=List[DegradationResultResponse])
+def get_system_degradation(system_id: str, db: Session = Depends(get_db)):
+    """
+    获取指定系统各方法的衰减率分析结果。
+    """
+    results = (
+        db.query(DegradationResult)
+        .filter(DegradationResult.system_id == system_id)
+        .order_by(DegradationResult.method)
+        .all()
+    )
+    if not results:
+        raise HTTPException(status_code=404, detail="Degradation results not found")
+    return results
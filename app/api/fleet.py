@@ -0,0 +1,87 @@
+import os
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.database.database import get_db
+from app.models.system_config import SystemConfiguration
+from app.models.weather import WeatherCurrent
+from app.schemas.fleet import FleetSystemStatus, LatestMeasurement, LatestWeather
+from app.services.ingest import load_latest_measurements
+from app.utils.time_utils import get_local_now
+
+router = APIRouter(prefix="/fleet", tags=["Fleet"])
+
+# 最新测量距当前超过该秒数视为数据过期
+FLEET_FRESHNESS_SECONDS = float(os.getenv("FLEET_FRESHNESS_SECONDS", "600"))
+
+
+def _latest_weather(record: WeatherCurrent) -> LatestWeather:
+    current_data = (record.data or {}).get("current", {})
+    return LatestWeather(
+        fetched_at=record.fetched_at,
+        shortwave_radiation=current_data.get("shortwave_radiation"),
+        cloud_cover=current_data.get("cloud_cover"),
+        temperature_2m=current_data.get("temperature_2m"),
+        wind_speed_10m=current_data.get("wind_speed_10m"),
+    )
+
+
+@router.get("/status", response_model=List[FleetSystemStatus])
+def get_fleet_status(
+    include_inactive: bool = Query(False, description="是否包含停用的系统"),
+    db: Session = Depends(get_db),
+):
+    """
+    获取所有系统的总览状态（最新测量值、最新实时气象与数据新鲜度）。
+
+    最新测量值批量读取写入时维护的末值表（配置了分片时各分片并行），最新气象为每个系统一次索引查找，
+    整个总览只需少量批量查询，替代逐个系统请求。
+    """
+    latest_weather_id = (
+        select(WeatherCurrent.id)
+        .where(WeatherCurrent.system_id == SystemConfiguration.system_id)
+        .order_by(WeatherCurrent.fetched_at.desc())
+        .limit(1)
+        .correlate(SystemConfiguration)
+        .scalar_subquery()
+    )
+    query = (
+        db.query(SystemConfiguration, latest_weather_id.label("weather_id"))
+    )
+    if not include_inactive:
+        query = query.filter(SystemConfiguration.is_active == True)
+    rows = query.order_by(SystemConfiguration.system_id).all()
+    latest_by_system = load_latest_measurements(db, [config.system_id for config, _ in rows])
+
+    weather_ids = [row.weather_id for row in rows if row.weather_id is not None]
+    weather_by_id = {
+        record.id: record
+        for record in db.query(WeatherCurrent).filter(WeatherCurrent.id.in_(weather_ids)).all()
+    } if weather_ids else {}
+
+    now = get_local_now()
+    result = []
+    for config, weather_id in rows:
+        latest = latest_by_system.get(config.system_id)
+        age = (now - latest.timestamp).total_seconds() if latest else None
+        if latest is None:
+            status = "no_data"
+        elif age <= FLEET_FRESHNESS_SECONDS:
+            status = "online"
+        else:
+            status = "stale"
+        weather = weather_by_id.get(weather_id)
+        result.append(FleetSystemStatus(
+            system_id=config.system_id,
+            name=config.name,
+            capacity=config.capacity,
+            timezone=config.timezone,
+            is_active=config.is_active,
+            latest_measurement=LatestMeasurement.from_orm(latest) if latest else None,
+            latest_weather=_latest_weather(weather) if weather else None,
+            data_age_seconds=round(age, 1) if age is not None else None,
+            status=status,
+        ))
+    return result
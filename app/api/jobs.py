@@ -0,0 +1,109 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+
+import app.services.job_handlers  # noqa: F401  导入即注册任务类型
+from app.database.database import get_db
+from app.models.job import Job
+from app.schemas.job import JobCreate, JobResponse, JobSubmitResponse
+from app.services.jobs import (
+    STATUS_SUCCEEDED,
+    STATUSES,
+    cancel_job,
+    enqueue_job,
+    job_kinds,
+    result_file_path,
+)
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def _get_job_or_404(db: Session, job_id: int) -> Job:
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/", response_model=JobSubmitResponse, status_code=202)
+def submit_job(payload: JobCreate, response: Response, db: Session = Depends(get_db)):
+    """
+    提交后台任务，由任务进程（scripts/job_worker.py）执行。
+
+    已有参数相同的待执行任务时不重复提交，返回该任务（状态码 200）。
+    """
+    try:
+        job, created = enqueue_job(db, payload.kind, payload.params, payload.priority, payload.max_attempts)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not created:
+        response.status_code = 200
+    return {"created": created, "job": job}
+
+
+@router.get("/", response_model=List[JobResponse])
+def list_jobs(
+    status: Optional[str] = Query(None, description="按状态过滤"),
+    kind: Optional[str] = Query(None, description="按任务类型过滤"),
+    limit: int = Query(100, ge=1, le=500, description="返回的任务数"),
+    db: Session = Depends(get_db),
+):
+    """
+    查询后台任务（按提交时间倒序）。
+    """
+    if status is not None and status not in STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown status '{status}'")
+    query = db.query(Job)
+    if status:
+        query = query.filter(Job.status == status)
+    if kind:
+        query = query.filter(Job.kind == kind)
+    return query.order_by(Job.id.desc()).limit(limit).all()
+
+
+@router.get("/kinds", response_model=Dict[str, str])
+def list_job_kinds():
+    """
+    可提交的任务类型及参数说明。
+    """
+    return job_kinds()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    查询任务状态与进度。
+    """
+    return _get_job_or_404(db, job_id)
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: int, db: Session = Depends(get_db)):
+    """
+    获取已成功任务的结果：导出类任务返回结果文件，其余返回 JSON。
+    """
+    job = _get_job_or_404(db, job_id)
+    if job.status != STATUS_SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    path = result_file_path(job)
+    if path is None:
+        return job.result or {}
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Result file not found")
+    return FileResponse(path, media_type=job.result.get("media_type"), filename=os.path.basename(path))
+
+
+@router.delete("/{job_id}", response_model=JobResponse)
+def delete_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    取消待执行的任务（已开始执行或已结束的任务不能取消）。
+    """
+    try:
+        job = cancel_job(db, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,98 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+
+from app.database.database import get_db
+from app.models.kpi import DailyKPI
+from app.schemas.kpi import DailyKPIResponse, KPISummaryItem, KPISummaryResponse
+
+router = APIRouter(prefix="/kpi", tags=["KPI"])
+
+
+def _validate_range(start_date: date, end_date: date) -> None:
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be earlier than start_date")
+
+
+def _summary_columns():
+    return (
+        func.count().label("days"),
+        func.coalesce(func.sum(DailyKPI.peak_sun_hours), 0.0).label("peak_sun_hours"),
+        func.avg(DailyKPI.peak_sun_hours).label("mean_peak_sun_hours"),
+        func.sum(DailyKPI.expected_energy_kwh).label("expected_energy_kwh"),
+        func.avg(DailyKPI.performance_ratio).label("performance_ratio"),
+        func.avg(DailyKPI.coverage).label("coverage"),
+    )
+
+
+def _summary_item(row, **keys) -> KPISummaryItem:
+    def rounded(value, digits):
+        return round(float(value), digits) if value is not None else None
+
+    return KPISummaryItem(
+        **keys,
+        days=row.days,
+        peak_sun_hours=round(float(row.peak_sun_hours), 3),
+        mean_peak_sun_hours=rounded(row.mean_peak_sun_hours, 3),
+        expected_energy_kwh=rounded(row.expected_energy_kwh, 2),
+        performance_ratio=rounded(row.performance_ratio, 4),
+        coverage=rounded(row.coverage, 4),
+    )
+
+
+@router.get("/daily", response_model=List[DailyKPIResponse])
+def get_daily_kpis(
+    start_date: date = Query(..., description="开始日期（系统本地日期，含）"),
+    end_date: date = Query(..., description="结束日期（系统本地日期，含）"),
+    system_id: Optional[str] = Query(None, description="按系统 ID 过滤，不指定时返回全部系统"),
+    db: Session = Depends(get_db),
+):
+    """
+    获取每个系统每天的 KPI（峰值日照时数、预期发电量、性能比等）。
+
+    数据来自 KPI 任务物化的 daily_kpis 表，按日期、系统排序。
+    """
+    _validate_range(start_date, end_date)
+    query = db.query(DailyKPI).filter(DailyKPI.day >= start_date, DailyKPI.day <= end_date)
+    if system_id:
+        query = query.filter(DailyKPI.system_id == system_id)
+    return query.order_by(DailyKPI.day, DailyKPI.system_id).all()
+
+
+@router.get("/summary", response_model=KPISummaryResponse)
+def get_kpi_summary(
+    start_date: date = Query(..., description="开始日期（系统本地日期，含）"),
+    end_date: date = Query(..., description="结束日期（系统本地日期，含）"),
+    group_by: Literal["system", "day"] = Query("system", description="按系统或按日期分组"),
+    system_id: Optional[str] = Query(None, description="只汇总指定系统"),
+    db: Session = Depends(get_db),
+):
+    """
+    汇总日期范围内的 KPI：按系统（各系统的日照与预期发电量合计）或按日期（全站每日合计），并返回全站合计。
+
+    直接在物化表上聚合，不读取测量数据。
+    """
+    _validate_range(start_date, end_date)
+    filters = [DailyKPI.day >= start_date, DailyKPI.day <= end_date]
+    if system_id:
+        filters.append(DailyKPI.system_id == system_id)
+
+    key = DailyKPI.system_id if group_by == "system" else DailyKPI.day
+    rows = (
+        db.query(key.label("key"), *_summary_columns())
+        .filter(*filters)
+        .group_by(key)
+        .order_by(key)
+        .all()
+    )
+    totals = db.query(*_summary_columns()).filter(*filters).one()
+
+    return KPISummaryResponse(
+        start_date=start_date,
+        end_date=end_date,
+        group_by=group_by,
+        totals=_summary_item(totals),
+        items=[_summary_item(row, **{"system_id" if group_by == "system" else "day": row.key}) for row in rows],
+    )
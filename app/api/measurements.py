@@ -1,24 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
-from zoneinfo import ZoneInfo
+from datetime import datetime, time
+
+import numpy as np
 
+from app.calculations.downsampling import DownsampleMode, downsample_indices
+from app.calculations.resampling import FillMethod, ResampleAggregation
 from app.database.database import get_db
+from app.database.sharding import fan_out, shard_count, shard_scope, system_shard, use_shard
 from app.models.measurement import Measurement
 from app.schemas.measurement import (
     MeasurementCreate,
     MeasurementResponse,
-    MeasurementBatch
+    MeasurementBatch,
+    ResampledSeries,
+    ResampleResponse,
+)
+from app.services.coverage import COVERAGE_TRACKING_ENABLED, unmark_measurement
+from app.services.day_cache import DAY_CACHE_ENABLED, day_cache
+from app.services.hot_window import HOT_WINDOW_ENABLED, hot_window
+from app.services.ingest import (
+    SOURCE_BATCH,
+    SOURCE_SINGLE,
+    ConflictMode,
+    get_existing_measurement,
+    ingest_stats,
+    refresh_latest_measurement,
+    write_measurements,
+)
+from app.services.live_stream import HEARTBEAT_INTERVAL, broadcaster
+from app.services.metrics import observe_calculation
+from app.services.packed_storage import (
+    PACKED_STORAGE_ENABLED,
+    delete_packed_by_id,
+    find_packed_by_id,
+    merge_tiers,
+    query_packed,
 )
+from app.services.resampling import RESAMPLE_INTERVALS, grid_size, resample_systems
+from app.utils.time_utils import get_local_now
 
 router = APIRouter(prefix="/measurements", tags=["Measurements"])
 
-SYSTEM_TIMEZONE = "Asia/Shanghai"
+# 降采样输出点数上限，以及参与降采样的原始记录上限（约一年的分钟级数据）
+MAX_DOWNSAMPLE_POINTS = 5000
+MAX_DOWNSAMPLE_SOURCE_ROWS = 600_000
+# 重采样单次请求的系统数与输出格点数（系统数 × 时段数）上限
+MAX_RESAMPLE_SYSTEMS = 100
+MAX_RESAMPLE_POINTS = 500_000
 
-
-def _get_local_now() -> datetime:
-    return datetime.now(ZoneInfo(SYSTEM_TIMEZONE)).replace(tzinfo=None)
+# 配置了分片时记录 ID 只在分片内唯一，多个分片命中时需指定 system_id
+AMBIGUOUS_ID_DETAIL = "Measurement ID exists on multiple shards, specify system_id"
 
 
 def _serialize_measurement(measurement: Measurement) -> dict:
@@ -27,63 +64,131 @@ def _serialize_measurement(measurement: Measurement) -> dict:
     return data
 
 
+def _day_cache_key(
+    system_id: Optional[str],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    limit: int,
+    offset: int,
+    max_points: Optional[int],
+    downsample: str,
+):
+    """
+    若请求是某系统某个已结束日期的整天查询（00:00:00 至 23:59:59），返回日缓存键，否则返回 None。
+
+    分辨率区分原始数据（含 limit）与降采样结果（含算法与点数）。
+    """
+    if not system_id or not start_time or not end_time or offset:
+        return None
+    if start_time.tzinfo or end_time.tzinfo:
+        return None
+    day = start_time.date()
+    if start_time.time() != time.min or end_time != datetime.combine(day, time(23, 59, 59)):
+        return None
+    if day >= get_local_now().date():
+        return None
+    resolution = f"{downsample}:{max_points}" if max_points is not None else f"raw:{limit}"
+    return system_id, day, resolution
+
+
+def _get_downsampled_measurements(
+    db: Session,
+    system_id: str,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    max_points: int,
+    mode: str,
+) -> List[dict]:
+    """查询时间范围内的全部记录（仅取所需列）并降采样到 max_points 个点，按时间降序返回。"""
+    with shard_scope(db, system_id):
+        query = db.query(Measurement).with_entities(*Measurement.__table__.columns).filter(
+            Measurement.system_id == system_id
+        )
+        if start_time:
+            query = query.filter(Measurement.timestamp >= start_time)
+        if end_time:
+            query = query.filter(Measurement.timestamp <= end_time)
+        rows = query.order_by(Measurement.timestamp.desc()).limit(MAX_DOWNSAMPLE_SOURCE_ROWS).all()
+        if PACKED_STORAGE_ENABLED:
+            packed = query_packed(db, system_id, start_time, end_time, MAX_DOWNSAMPLE_SOURCE_ROWS)
+            rows = merge_tiers(rows, packed)[:MAX_DOWNSAMPLE_SOURCE_ROWS]
+    rows.reverse()
+    if not rows:
+        return []
+
+    x = np.array([r.timestamp for r in rows], dtype="datetime64[us]").astype(np.int64)
+    y = np.array([np.nan if r.irradiance is None else r.irradiance for r in rows], dtype=np.float64)
+    with observe_calculation("downsample"):
+        selected = downsample_indices(x, y, max_points, mode)
+    return [_serialize_measurement(rows[i]) for i in selected[::-1]]
+
+
 @router.post("/", response_model=MeasurementResponse, status_code=201)
 def create_measurement(
     measurement: MeasurementCreate,
+    response: Response,
+    on_conflict: Optional[ConflictMode] = Query(None, description="重复 (system_id, timestamp) 的处理策略：ignore 或 update"),
     db: Session = Depends(get_db)
 ):
     """
     创建新的测量记录。
     接收来自光伏系统的单条传感器数据点。
+
+    以 (system_id, timestamp) 幂等写入：重复提交返回 200 与已存储的记录。
     """
     # 如果未提供时间戳，则使用本地时间（Asia/Shanghai）
     if measurement.timestamp is None:
-        measurement.timestamp = _get_local_now()
+        measurement.timestamp = get_local_now()
 
     data = measurement.dict()
-    data["created_at"] = _get_local_now()
+    data["created_at"] = get_local_now()
 
-    db_measurement = Measurement(**data)
-    db.add(db_measurement)
-    db.commit()
-    db.refresh(db_measurement)
+    result = write_measurements(db, [data], SOURCE_SINGLE, on_conflict)
+    response.headers.update(result.headers())
 
-    return _serialize_measurement(db_measurement)
+    if result.duplicates:
+        response.status_code = 200
+    if result.rows:
+        return _serialize_measurement(result.rows[0])
+    return _serialize_measurement(
+        get_existing_measurement(db, data["system_id"], data["timestamp"])
+    )
 
 
 @router.post("/batch", response_model=List[MeasurementResponse], status_code=201)
 def create_measurements_batch(
     batch: MeasurementBatch,
+    response: Response,
+    on_conflict: Optional[ConflictMode] = Query(None, description="重复 (system_id, timestamp) 的处理策略：ignore 或 update"),
     db: Session = Depends(get_db)
 ):
     """
     批量创建多条测量记录。
 
     高效地一次性接收多条传感器数据点。
+    以 (system_id, timestamp) 幂等写入：仅返回实际插入（或 update 策略下被覆盖）的记录，
+    重复条数通过 X-Ingest-Duplicates 响应头返回。
     """
-    db_measurements = []
+    rows = []
+    # 整批共用同一个接收时间，避免逐行获取当前时间
+    now = get_local_now()
 
     for measurement in batch.measurements:
         # 如果未提供时间戳，则使用本地时间（Asia/Shanghai）
         if measurement.timestamp is None:
-            measurement.timestamp = _get_local_now()
+            measurement.timestamp = now
 
         data = measurement.dict()
-        data["created_at"] = _get_local_now()
-
-        db_measurement = Measurement(**data)
-        db_measurements.append(db_measurement)
+        data["created_at"] = now
+        rows.append(data)
 
-    db.add_all(db_measurements)
-    db.commit()
-
-    # 刷新所有对象以获取其 ID
-    for db_measurement in db_measurements:
-        db.refresh(db_measurement)
+    # 一条 INSERT ... RETURNING 写入并取回 ID，无需逐条 refresh
+    result = write_measurements(db, rows, SOURCE_BATCH, on_conflict)
+    response.headers.update(result.headers())
 
     return [
         _serialize_measurement(m)
-        for m in db_measurements
+        for m in result.rows
     ]
 
 
@@ -94,6 +199,8 @@ def get_measurements(
     end_time: Optional[datetime] = Query(None, description="时间范围结束（本地时间 Asia/Shanghai）"),
     limit: int = Query(100, ge=1, le=1440, description="最大返回记录数（一分钟一条数据，一天上限1440条）"),
     offset: int = Query(0, ge=0, description="分页偏移量"),
+    max_points: Optional[int] = Query(None, ge=3, le=MAX_DOWNSAMPLE_POINTS, description="图表降采样后的最大点数（需指定 system_id，设置后忽略 limit/offset）"),
+    downsample: DownsampleMode = Query("lttb", description="降采样算法：lttb（保持曲线形状）或 minmax（保留每段峰谷）"),
     db: Session = Depends(get_db)
 ):
     """
@@ -101,7 +208,71 @@ def get_measurements(
 
     支持按系统 ID 和时间范围过滤，以便高效进行时序查询。
     注意：数据库存储和查询都使用本地时间（Asia/Shanghai），无需时区转换。
+    指定系统且请求范围落在内存热窗口内时，直接从热窗口返回，不访问数据库。
+    指定 max_points 时按辐照度曲线在服务端降采样，周/月级图表的传输与渲染量保持恒定。
     """
+    if max_points is not None and not system_id:
+        raise HTTPException(status_code=400, detail="max_points requires system_id")
+
+    # 已结束日期的整天查询：优先返回预编码的日缓存
+    cache_key = _day_cache_key(system_id, start_time, end_time, limit, offset, max_points, downsample) if DAY_CACHE_ENABLED else None
+    if cache_key:
+        body = day_cache.get(cache_key)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+        generation = day_cache.generation(*cache_key[:2])
+        result = _query_measurements(db, system_id, start_time, end_time, limit, offset, max_points, downsample)
+        response = JSONResponse(content=jsonable_encoder(result))
+        day_cache.put(cache_key, response.body, generation)
+        return response
+
+    return _query_measurements(db, system_id, start_time, end_time, limit, offset, max_points, downsample)
+
+
+def _query_measurements(
+    db: Session,
+    system_id: Optional[str],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    limit: int,
+    offset: int,
+    max_points: Optional[int],
+    downsample: str,
+):
+    """执行测量记录查询：降采样、内存热窗口或数据库分页查询（含已打包的数据块）。"""
+    if max_points is not None:
+        return _get_downsampled_measurements(db, system_id, start_time, end_time, max_points, downsample)
+
+    if system_id and HOT_WINDOW_ENABLED:
+        cached = hot_window.query(db, system_id, start_time, end_time, limit, offset)
+        if cached is not None:
+            return JSONResponse(content=cached)
+
+    if system_id or not shard_count(db):
+        with use_shard(db, system_shard(db, system_id) if system_id else None):
+            measurements = _page_measurements(db, system_id, start_time, end_time, limit, offset)
+    else:
+        # 跨系统查询：各分片并行取前 offset + limit 条，合并后再分页
+        parts = fan_out(db, lambda session: _page_measurements(session, None, start_time, end_time, offset + limit, 0))
+        measurements = sorted(
+            (m for part in parts for m in part), key=lambda m: m.timestamp, reverse=True
+        )[offset:offset + limit]
+
+    return [
+        _serialize_measurement(m)
+        for m in measurements
+    ]
+
+
+def _page_measurements(
+    db: Session,
+    system_id: Optional[str],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    limit: int,
+    offset: int,
+) -> list:
+    """单个数据库上的分页查询，按时间降序返回。"""
     query = db.query(Measurement)
 
     # 应用过滤条件
@@ -115,25 +286,135 @@ def get_measurements(
     # 按时间戳降序排序（最新在前）
     query = query.order_by(Measurement.timestamp.desc())
 
-    # 应用分页
-    measurements = query.offset(offset).limit(limit).all()
+    # 应用分页（开启分块存储时两层各取前 offset + limit 条合并后再分页）
+    if PACKED_STORAGE_ENABLED:
+        rows = query.limit(offset + limit).all()
+        packed = query_packed(db, system_id, start_time, end_time, offset + limit)
+        return merge_tiers(rows, packed)[offset:offset + limit]
+    return query.offset(offset).limit(limit).all()
 
-    return [
-        _serialize_measurement(m)
-        for m in measurements
-    ]
+
+def _nullable(values: np.ndarray) -> list:
+    return np.where(np.isnan(values), None, np.round(values, 3)).tolist()
+
+
+@router.get("/resample", response_model=ResampleResponse)
+def resample_measurements(
+    system_id: List[str] = Query(..., description="系统 ID（可重复，最多 100 个）"),
+    start_time: datetime = Query(..., description="时间范围开始（本地时间 Asia/Shanghai）"),
+    end_time: datetime = Query(..., description="时间范围结束（本地时间 Asia/Shanghai，不含）"),
+    interval_minutes: int = Query(5, description="网格间隔（分钟）：1 / 5 / 15 / 60"),
+    agg: ResampleAggregation = Query("mean", description="时段内聚合方式"),
+    fill: FillMethod = Query("none", description="补缺方式：none / interpolate（线性插值）/ ffill（前向填充）"),
+    max_fill_minutes: int = Query(0, ge=0, le=1440, description="可填补的最长缺口（分钟），更长的中断保持缺失"),
+    db: Session = Depends(get_db),
+):
+    """
+    将一个或多个系统的测量重采样到规则时间网格（时段左闭右开，以起点标记，按间隔整点对齐）。
+
+    采样时间抖动、重复与缺测在服务端处理：每个时段按 agg 聚合，缺失时段可按 fill 有界补缺；
+    各系统共享同一组时间戳，可直接用于图表与按固定间隔计算的分析。
+    """
+    if interval_minutes not in RESAMPLE_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval_minutes must be one of {list(RESAMPLE_INTERVALS)}")
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be later than start_time")
+    system_ids = list(dict.fromkeys(system_id))
+    if len(system_ids) > MAX_RESAMPLE_SYSTEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RESAMPLE_SYSTEMS} systems per request")
+    if len(system_ids) * grid_size(start_time, end_time, interval_minutes) > MAX_RESAMPLE_POINTS:
+        raise HTTPException(status_code=400, detail="Too many grid points; narrow the time range or increase interval_minutes")
+
+    result = resample_systems(db, system_ids, start_time, end_time, interval_minutes, agg, fill, max_fill_minutes)
+    return ResampleResponse(
+        start_time=start_time,
+        end_time=end_time,
+        interval_minutes=interval_minutes,
+        aggregation=agg,
+        fill=fill,
+        max_fill_minutes=max_fill_minutes,
+        timestamps=result.grid.tolist(),
+        systems=[
+            ResampledSeries(
+                system_id=system,
+                irradiance=_nullable(result.irradiance[i]),
+                temperature=_nullable(result.temperature[i]),
+                samples=result.samples[i].tolist(),
+            )
+            for i, system in enumerate(result.system_ids)
+        ],
+    )
+
+
+@router.get("/stream")
+async def stream_measurements(
+    request: Request,
+    system_id: str = Query(..., description="订阅的系统 ID"),
+):
+    """
+    订阅指定系统新写入的测量记录（Server-Sent Events）。
+
+    每条新记录以 `event: measurement` 推送，数据字段与 GET /measurements/ 一致；
+    看板首次加载历史数据后订阅此流追加增量，无需轮询。
+    """
+    queue = broadcaster.subscribe(system_id)
+
+    async def event_source():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                yield event
+        finally:
+            broadcaster.unsubscribe(system_id, queue)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/ingest_stats")
+def get_ingest_stats():
+    """
+    获取当前进程的写入统计。
+
+    按写入来源（single / batch / device / line）返回接收数、写入数、重复数与重复率。
+    """
+    return ingest_stats.snapshot()
+
+
+@router.get("/cache_stats")
+def get_cache_stats():
+    """
+    获取当前进程的查询缓存统计。
+
+    包括内存热窗口与日响应缓存的条目数、内存占用与命中情况。
+    """
+    return {
+        "hot_window": hot_window.stats(),
+        "day_cache": day_cache.stats(),
+    }
 
 
 @router.get("/{measurement_id}", response_model=MeasurementResponse)
 def get_measurement(
     measurement_id: int,
+    system_id: Optional[str] = Query(None, description="记录所属系统（配置了分片时 ID 只在分片内唯一，指定后直接定位）"),
     db: Session = Depends(get_db)
 ):
     """
     根据 ID 获取指定测量记录。
     """
-    measurement = db.query(Measurement).filter(Measurement.id == measurement_id).first()
-
+    with use_shard(db, _measurement_shard(db, measurement_id, system_id)):
+        measurement = _find_by_id(db, measurement_id, system_id)
     if not measurement:
         raise HTTPException(status_code=404, detail="Measurement not found")
 
@@ -143,17 +424,50 @@ def get_measurement(
 @router.delete("/{measurement_id}", status_code=204)
 def delete_measurement(
     measurement_id: int,
+    system_id: Optional[str] = Query(None, description="记录所属系统（配置了分片时 ID 只在分片内唯一，指定后直接定位）"),
     db: Session = Depends(get_db)
 ):
     """
     根据 ID 删除指定测量记录。
     """
-    measurement = db.query(Measurement).filter(Measurement.id == measurement_id).first()
+    with use_shard(db, _measurement_shard(db, measurement_id, system_id)):
+        measurement = _find_by_id(db, measurement_id, system_id)
+        if isinstance(measurement, Measurement):
+            db.delete(measurement)
+        elif measurement:
+            measurement = delete_packed_by_id(db, measurement_id)
+
+        if not measurement:
+            raise HTTPException(status_code=404, detail="Measurement not found")
+
+        refresh_latest_measurement(db, measurement.system_id)
+        if COVERAGE_TRACKING_ENABLED:
+            unmark_measurement(db, measurement.system_id, measurement.timestamp)
+    db.commit()
+    hot_window.discard(measurement.system_id, measurement.timestamp)
+    day_cache.invalidate(measurement.system_id, measurement.timestamp.date())
 
-    if not measurement:
+    return None
+
+
+def _measurement_shard(db: Session, measurement_id: int, system_id: Optional[str]) -> Optional[int]:
+    """记录所在的分片（未分片时为 None）：指定 system_id 时直接定位，否则在全部分片上查找。"""
+    if system_id or not shard_count(db):
+        return system_shard(db, system_id) if system_id else None
+    hits = fan_out(db, lambda session: _find_by_id(session, measurement_id) is not None)
+    shards = [index for index, hit in enumerate(hits) if hit]
+    if len(shards) > 1:
+        raise HTTPException(status_code=409, detail=AMBIGUOUS_ID_DETAIL)
+    if not shards:
         raise HTTPException(status_code=404, detail="Measurement not found")
+    return shards[0]
 
-    db.delete(measurement)
-    db.commit()
 
-    return None
+def _find_by_id(db: Session, measurement_id: int, system_id: Optional[str] = None):
+    """按 ID 查找记录（含已打包的数据块），指定 system_id 时只返回该系统的记录。"""
+    measurement = db.query(Measurement).filter(Measurement.id == measurement_id).first()
+    if not measurement and PACKED_STORAGE_ENABLED:
+        measurement = find_packed_by_id(db, measurement_id)
+    if measurement and system_id and measurement.system_id != system_id:
+        return None
+    return measurement
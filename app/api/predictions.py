@@ -0,0 +1,53 @@
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database.database import get_db
+from app.models.prediction import DailyProductionPrediction, ProductionPrediction
+from app.schemas.prediction import DailyPredictionResponse, HourlyPredictionResponse
+
+router = APIRouter(prefix="/predictions", tags=["Predictions"])
+
+
+@router.get("/hourly", response_model=List[HourlyPredictionResponse])
+def get_hourly_predictions(
+    system_id: str = Query(..., description="系统 ID"),
+    start_time: Optional[datetime] = Query(None, description="开始时间（本地时间，含）"),
+    end_time: Optional[datetime] = Query(None, description="结束时间（本地时间，不含）"),
+    db: Session = Depends(get_db),
+):
+    """
+    获取系统的逐小时发电预测（交流功率、倾斜面辐照度、组件温度）。
+
+    数据由拉取预报后的预测任务物化，接口不做计算。
+    """
+    if start_time and end_time and end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be later than start_time")
+    query = db.query(ProductionPrediction).filter(ProductionPrediction.system_id == system_id)
+    if start_time:
+        query = query.filter(ProductionPrediction.timestamp >= start_time)
+    if end_time:
+        query = query.filter(ProductionPrediction.timestamp < end_time)
+    return query.order_by(ProductionPrediction.timestamp).all()
+
+
+@router.get("/daily", response_model=List[DailyPredictionResponse])
+def get_daily_predictions(
+    start_date: date = Query(..., description="开始日期（系统本地日期，含）"),
+    end_date: date = Query(..., description="结束日期（系统本地日期，含）"),
+    system_id: Optional[str] = Query(None, description="按系统 ID 过滤，不指定时返回全部系统"),
+    db: Session = Depends(get_db),
+):
+    """
+    获取每个系统每天的预测发电量，按日期、系统排序。
+    """
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be earlier than start_date")
+    query = db.query(DailyProductionPrediction).filter(
+        DailyProductionPrediction.day >= start_date,
+        DailyProductionPrediction.day <= end_date,
+    )
+    if system_id:
+        query = query.filter(DailyProductionPrediction.system_id == system_id)
+    return query.order_by(DailyProductionPrediction.day, DailyProductionPrediction.system_id).all()
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Dict, List, Optional
+
+from app.services.profiling import PROFILING_ENABLED, profiler
+
+router = APIRouter(prefix="/admin/profiling", tags=["Admin"])
+
+
+def _require_enabled() -> None:
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=503, detail="Profiling disabled (set PROFILING_ENABLED=1)")
+
+
+@router.get("/")
+def get_profiling_config() -> Dict[str, Any]:
+    """获取剖析开关与慢查询阈值（当前进程）。"""
+    return profiler.config()
+
+
+@router.put("/")
+def update_profiling_config(
+    sample_rate: Optional[float] = Query(None, ge=0, le=1, description="随机剖析的请求比例，0 表示仅按请求头剖析"),
+    slow_query_ms: Optional[float] = Query(None, gt=0, description="慢查询阈值（毫秒）"),
+    sample_interval_ms: Optional[float] = Query(None, ge=1, le=1000, description="栈采样间隔（毫秒）"),
+) -> Dict[str, Any]:
+    """调整当前进程的剖析参数（重启后恢复为环境变量配置）。"""
+    _require_enabled()
+    if sample_rate is not None:
+        profiler.sample_rate = sample_rate
+    if slow_query_ms is not None:
+        profiler.slow_query_ms = slow_query_ms
+    if sample_interval_ms is not None:
+        profiler.sample_interval_ms = sample_interval_ms
+    return profiler.config()
+
+
+@router.get("/profiles")
+def list_profiles() -> List[Dict[str, Any]]:
+    """列出最近的请求剖析记录（新的在前）。"""
+    _require_enabled()
+    return profiler.list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: int) -> Dict[str, Any]:
+    """获取单个请求的剖析详情：热点函数、折叠栈与 SQL 时间线。"""
+    _require_enabled()
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@router.get("/slow_queries")
+def list_slow_queries() -> List[Dict[str, Any]]:
+    """获取慢查询日志（含 EXPLAIN 执行计划，新的在前）。"""
+    _require_enabled()
+    return profiler.slow_queries()
+
+
+@router.delete("/slow_queries", status_code=204)
+def clear_slow_queries():
+    """清空慢查询日志。"""
+    _require_enabled()
+    profiler.clear_slow_queries()
@@ -0,0 +1,93 @@
+from dataclasses import asdict
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database.database import get_db
+from app.models.system_config import SystemConfiguration
+from app.models.validation import NeighborDivergence, NeighborValidation
+from app.schemas.spatial import NeighborDivergenceResponse, NeighborResponse, NeighborValidationResponse
+from app.services.spatial_index import get_spatial_index
+
+router = APIRouter(prefix="/spatial", tags=["Spatial"])
+
+MAX_NEIGHBORS = 100
+
+
+@router.get("/nearest", response_model=List[NeighborResponse])
+def get_nearest_systems(
+    latitude: float = Query(..., ge=-90, le=90, description="纬度"),
+    longitude: float = Query(..., ge=-180, le=180, description="经度"),
+    k: int = Query(5, ge=1, le=MAX_NEIGHBORS, description="返回的系统数"),
+    max_distance_km: Optional[float] = Query(None, gt=0, description="最大距离（公里）"),
+    include_inactive: bool = Query(False, description="是否包含停用系统"),
+    db: Session = Depends(get_db),
+):
+    """
+    查询距离指定坐标最近的系统（按大圆距离升序）。
+    """
+    index = get_spatial_index(db)
+    neighbors = index.nearest(
+        latitude, longitude, k, max_distance_km=max_distance_km, include_inactive=include_inactive
+    )
+    return [asdict(neighbor) for neighbor in neighbors]
+
+
+@router.get("/systems/{system_id}/neighbors", response_model=List[NeighborResponse])
+def get_system_neighbors(
+    system_id: str,
+    k: int = Query(5, ge=1, le=MAX_NEIGHBORS, description="返回的系统数"),
+    max_distance_km: Optional[float] = Query(None, gt=0, description="最大距离（公里）"),
+    include_inactive: bool = Query(False, description="是否包含停用系统"),
+    db: Session = Depends(get_db),
+):
+    """
+    查询指定系统的近邻系统（不含自身）。
+    """
+    index = get_spatial_index(db)
+    if system_id not in index.positions:
+        exists = db.query(SystemConfiguration.id).filter(SystemConfiguration.system_id == system_id).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail="System configuration not found")
+        raise HTTPException(status_code=400, detail="System has no latitude/longitude")
+    neighbors = index.neighbors_of(
+        system_id, k, max_distance_km=max_distance_km, include_inactive=include_inactive
+    )
+    return [asdict(neighbor) for neighbor in neighbors]
+
+
+@router.get("/validation", response_model=List[NeighborValidationResponse])
+def list_neighbor_validations(
+    status: Optional[str] = Query(None, description="按状态过滤，如 divergent"),
+    db: Session = Depends(get_db),
+):
+    """
+    获取各系统最近一次近邻交叉校验的结果（偏离小时数多的系统在前）。
+
+    结果由 scripts/validate_neighbors.py 写入，接口不做计算。
+    """
+    query = db.query(NeighborValidation)
+    if status:
+        query = query.filter(NeighborValidation.status == status)
+    return query.order_by(NeighborValidation.divergent_hours.desc(), NeighborValidation.system_id).all()
+
+
+@router.get("/validation/{system_id}/divergences", response_model=List[NeighborDivergenceResponse])
+def get_neighbor_divergences(
+    system_id: str,
+    start_time: Optional[datetime] = Query(None, description="开始时间（本地时间，含）"),
+    end_time: Optional[datetime] = Query(None, description="结束时间（本地时间，不含）"),
+    db: Session = Depends(get_db),
+):
+    """
+    获取指定系统偏离近邻的小时（按时间升序）。
+    """
+    if start_time and end_time and end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be later than start_time")
+    query = db.query(NeighborDivergence).filter(NeighborDivergence.system_id == system_id)
+    if start_time:
+        query = query.filter(NeighborDivergence.hour >= start_time)
+    if end_time:
+        query = query.filter(NeighborDivergence.hour < end_time)
+    return query.order_by(NeighborDivergence.hour).all()
@@ -21,6 +21,8 @@ from app.schemas.system_config import (
     SystemConfigurationUpdate,
     SystemConfigurationResponse,
 )
+from app.services.spatial_index import invalidate_spatial_index
+from app.utils.time_utils import get_local_now
 
 router = APIRouter(prefix="/systems", tags=["System Configuration"])
 
@@ -52,12 +54,15 @@ def create_system_configuration(
             config_data.get("latitude"), config_data.get("longitude")
         )
 
-
+    now = get_local_now()
+    config_data["created_at"] = now
+    config_data["updated_at"] = now
 
     db_config = SystemConfiguration(**config_data)
     db.add(db_config)
     db.commit()
     db.refresh(db_config)
+    invalidate_spatial_index()
     return db_config
 
 
@@ -96,13 +101,14 @@ def update_system_configuration(system_id: str, config_update: SystemConfigurati
         if inferred:
             update_data["timezone"] = inferred
 
-
+    update_data["updated_at"] = get_local_now()
 
     for field, value in update_data.items():
         setattr(config, field, value)
 
     db.commit()
     db.refresh(config)
+    invalidate_spatial_index()
     return config
 
 
@@ -113,4 +119,5 @@ def delete_system_configuration(system_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="System configuration not found")
     db.delete(config)
     db.commit()
+    invalidate_spatial_index()
     return None
@@ -1,14 +1,20 @@
 from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 from typing import Optional, Any, Dict, List
 
+from app.calculations.downsampling import DownsampleMode, downsample_indices
 from app.database.database import get_db
+from app.database.sharding import shard_scope
 from app.models.weather import WeatherCurrent, WeatherForecast
 from app.models.system_config import SystemConfiguration
+from app.services.metrics import observe_calculation, observe_weather_fetch
 from app.models.measurement import Measurement
+from app.services.packed_storage import PACKED_STORAGE_ENABLED, merge_tiers, query_packed
+from app.services.prediction import PREDICTION_ENABLED, run_predictions
+from app.utils.time_utils import get_local_now, utc_naive_to_zone
+import numpy as np
 import requests
 
 router = APIRouter(prefix="/weather", tags=["Weather"])
@@ -16,13 +22,6 @@ router = APIRouter(prefix="/weather", tags=["Weather"])
 # Open-Meteo API 基础 URL
 OPEN_METEO_API_URL = "https://api.open-meteo.com/v1/forecast"
 
-SYSTEM_TIMEZONE = "Asia/Shanghai"
-
-
-def _get_local_now() -> datetime:
-    return datetime.now(ZoneInfo(SYSTEM_TIMEZONE)).replace(tzinfo=None)
-
-
 class WeatherCurrentResponse(BaseModel):
     """实时气象数据响应（展平）"""
     system_id: str
@@ -73,9 +72,10 @@ def _flatten_forecast_data(db_record) -> WeatherForecastResponse:
 def _fetch_open_meteo(params):
     """从 Open-Meteo 获取数据"""
     try:
-        response = requests.get(OPEN_METEO_API_URL, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        with observe_weather_fetch("forecast" if "hourly" in params else "current"):
+            response = requests.get(OPEN_METEO_API_URL, params=params, timeout=10)
+            response.raise_for_status()
+            return response.json()
     except Exception as e:
         print(f"❌ Open-Meteo 请求失败: {e}")
         raise
@@ -93,14 +93,14 @@ def _get_system_location(db: Session, system_id: str):
     return config
 
 
-def fetch_and_store_forecast(db: Session, system_id: str, days: int = 1):
-    """获取并存储单个系统的预报数据"""
+def fetch_and_store_forecast(db: Session, system_id: str, days: int = 1, predict: bool = True):
+    """获取并存储单个系统的预报数据（predict 为真时随后重算该系统的发电预测）"""
     config = _get_system_location(db, system_id)
     
     params = {
         "latitude": config.latitude,
         "longitude": config.longitude,
-        "hourly": "shortwave_radiation,cloud_cover,temperature_2m,wind_speed_10m",
+        "hourly": "shortwave_radiation,diffuse_radiation,cloud_cover,temperature_2m,wind_speed_10m",
         "timezone": config.timezone or "auto",
         "forecast_days": days,
         "wind_speed_unit": "ms",
@@ -108,7 +108,7 @@ def fetch_and_store_forecast(db: Session, system_id: str, days: int = 1):
     
     data = _fetch_open_meteo(params)
     
-    now = _get_local_now()
+    now = get_local_now()
     record = WeatherForecast(
         system_id=system_id,
         days=days,
@@ -119,9 +119,20 @@ def fetch_and_store_forecast(db: Session, system_id: str, days: int = 1):
     db.add(record)
     db.commit()
     db.refresh(record)
+    if predict and PREDICTION_ENABLED:
+        _run_predictions_safely(db, [system_id])
     return record
 
 
+def _run_predictions_safely(db: Session, system_ids=None):
+    """执行发电预测，失败只记录日志，不影响已存储的预报"""
+    try:
+        stats = run_predictions(db, system_ids)
+        print(f"🔮 已更新 {stats.predicted} 个系统的发电预测（{stats.hourly_rows} 个小时）")
+    except Exception as e:
+        print(f"❌ 发电预测失败: {e}")
+
+
 def fetch_and_store_forecast_for_all_systems(db: Session, days: int = 1):
     """批量获取所有活跃系统的预报数据"""
     systems = (
@@ -132,11 +143,15 @@ def fetch_and_store_forecast_for_all_systems(db: Session, days: int = 1):
     
     for system in systems:
         try:
-            fetch_and_store_forecast(db, system.system_id, days=days)
+            fetch_and_store_forecast(db, system.system_id, days=days, predict=False)
             print(f"✅ 已更新 {system.system_id} 的预报数据")
         except Exception as e:
             print(f"❌ {system.system_id} 预报更新失败: {e}")
 
+    # 所有系统的预测整批计算一次
+    if PREDICTION_ENABLED:
+        _run_predictions_safely(db)
+
 
 @router.get("/current", response_model=WeatherCurrentResponse)
 def get_current_weather(
@@ -255,26 +270,41 @@ def get_measured_radiation(
     system_id: str = Query(..., description="系统 ID"),
     start_time: Optional[datetime] = Query(None, description="开始时间（UTC）"),
     end_time: Optional[datetime] = Query(None, description="结束时间（UTC）"),
+    max_points: Optional[int] = Query(None, ge=3, le=5000, description="图表降采样后的最大点数"),
+    downsample: DownsampleMode = Query("lttb", description="降采样算法：lttb 或 minmax"),
     db: Session = Depends(get_db),
 ):
     """
     获取指定系统和时间范围内的实际辐射测量数据。
     
     用于与气象预报数据对比，显示实测值与预测值的差异。
+    指定 max_points 时在服务端降采样，长时间跨度的图表只返回固定数量的点。
     """
-    from zoneinfo import ZoneInfo
-    from datetime import timezone as tz_module
+    with shard_scope(db, system_id):
+        query = db.query(Measurement).filter(Measurement.system_id == system_id)
     
-    query = db.query(Measurement).filter(Measurement.system_id == system_id)
+        # 应用时间过滤
+        if start_time:
+            query = query.filter(Measurement.timestamp >= start_time)
+        if end_time:
+            query = query.filter(Measurement.timestamp <= end_time)
     
-    # 应用时间过滤
-    if start_time:
-        query = query.filter(Measurement.timestamp >= start_time)
-    if end_time:
-        query = query.filter(Measurement.timestamp <= end_time)
+        # 按时间戳升序排序，只取所需的列
+        rows = (
+            query.with_entities(Measurement.system_id, Measurement.timestamp, Measurement.irradiance)
+            .order_by(Measurement.timestamp.asc())
+            .all()
+        )
+        if PACKED_STORAGE_ENABLED:
+            rows = merge_tiers(rows[::-1], query_packed(db, system_id, start_time, end_time))
+            rows.reverse()
     
-    # 按时间戳升序排序
-    measurements = query.order_by(Measurement.timestamp.asc()).all()
+    if max_points is not None and len(rows) > max_points:
+        x = np.array([row.timestamp for row in rows], dtype="datetime64[us]").astype(np.int64)
+        y = np.array([np.nan if row.irradiance is None else row.irradiance for row in rows], dtype=np.float64)
+        with observe_calculation("downsample"):
+            selected = downsample_indices(x, y, max_points, downsample)
+        rows = [rows[i] for i in selected]
     
     # 获取系统时区以计算本地时间
     system_tz = (
@@ -283,20 +313,14 @@ def get_measured_radiation(
         .scalar()
     )
     
-    result = []
-    for measurement in measurements:
-        item = MeasuredRadiationResponse(
-            timestamp=measurement.timestamp,
-            irradiance=measurement.irradiance
-        )
-        # 计算本地时间
-        if measurement.timestamp and system_tz:
-            try:
-                utc_time = measurement.timestamp.replace(tzinfo=tz_module.utc)
-                local_time = utc_time.astimezone(ZoneInfo(system_tz))
-                item.local_time = local_time
-            except Exception:
-                pass
-        result.append(item)
+    # 整批转换本地时间（时区对象缓存，每个时区偏移分桶只计算一次）
+    local_times = utc_naive_to_zone([row.timestamp for row in rows], system_tz)
     
-    return result
+    return [
+        MeasuredRadiationResponse(
+            timestamp=row.timestamp,
+            irradiance=row.irradiance,
+            local_time=local_time,
+        )
+        for row, local_time in zip(rows, local_times)
+    ]
@@ -10,10 +10,60 @@ from .pv_performance import (
     calculate_performance_ratio,
     estimate_daily_energy,
 )
+from .degradation import (
+    mad_outlier_mask,
+    quality_mask,
+    theil_sen_degradation,
+    yoy_degradation,
+)
+from .downsampling import (
+    downsample_indices,
+    lttb_indices,
+    minmax_indices,
+)
+from .production import predict_ac_power
+from .resampling import (
+    fill_gaps,
+    resample,
+)
+from .spatial import (
+    KDTree,
+    haversine_km,
+)
+from .insolation import (
+    daily_insolation,
+    weighted_daily_mean,
+)
+from .solar import (
+    clear_sky_ghi,
+    erbs_diffuse_fraction,
+    module_temperature,
+    plane_of_array_irradiance,
+    solar_position,
+)
 
 __all__ = [
     'PVCalculator',
     'calculate_efficiency',
     'calculate_performance_ratio',
     'estimate_daily_energy',
+    'mad_outlier_mask',
+    'quality_mask',
+    'theil_sen_degradation',
+    'yoy_degradation',
+    'downsample_indices',
+    'lttb_indices',
+    'minmax_indices',
+    'predict_ac_power',
+    'fill_gaps',
+    'resample',
+    'KDTree',
+    'haversine_km',
+    'daily_insolation',
+    'weighted_daily_mean',
+    'clear_sky_ghi',
+    'erbs_diffuse_fraction',
+    'module_temperature',
+    'plane_of_array_irradiance',
+    'solar_position',
 ]
@@ -0,0 +1,154 @@
+"""
+衰减率分析模块
+
+对按日的性能指数序列（数值越大表示性能越好，如实测辐照量 / 晴空模型辐照量）估计年衰减率（%/年，
+负值表示性能下降），全部计算向量化：
+- 晴空与数据质量筛选：只保留晴空指数与覆盖率在阈值范围内的日期
+- 离群值剔除：基于中位数绝对偏差（MAD）的稳健 z 分数
+- 同比法（year-over-year）：每天与一年前同日配对计算年变化率，取中位数，自助法估计置信区间
+- 滚动回归：30 天滚动中位数按周取样后做 Theil-Sen 稳健回归，Sen 方法估计斜率置信区间
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+# 68.2% 置信区间（±1σ）对应的分位数与正态分位点
+CI_LOWER_PERCENTILE = 15.9
+CI_UPPER_PERCENTILE = 84.1
+CI_Z = 1.0
+
+# MAD 与标准差的换算系数（正态分布）
+MAD_SCALE = 1.4826
+
+
+def quality_mask(
+    clear_sky_index: np.ndarray,
+    coverage: np.ndarray,
+    min_index: float = 0.8,
+    max_index: float = 1.2,
+    min_coverage: float = 0.9,
+) -> np.ndarray:
+    """晴空筛选：晴空指数在 [min_index, max_index] 且数据覆盖率不低于 min_coverage 的日期。"""
+    clear_sky_index = np.asarray(clear_sky_index, dtype=np.float64)
+    coverage = np.asarray(coverage, dtype=np.float64)
+    return (
+        np.isfinite(clear_sky_index)
+        & (clear_sky_index >= min_index)
+        & (clear_sky_index <= max_index)
+        & (coverage >= min_coverage)
+    )
+
+
+def mad_outlier_mask(values: np.ndarray, threshold: float = 3.5) -> np.ndarray:
+    """返回非离群值掩码（稳健 z 分数 |x - 中位数| / (1.4826 × MAD) 不超过阈值）。"""
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    if not finite.any():
+        return finite
+    median = np.median(values[finite])
+    mad = np.median(np.abs(values[finite] - median)) * MAD_SCALE
+    if mad == 0:
+        return finite
+    return finite & (np.abs(values - median) / mad <= threshold)
+
+
+def yoy_degradation(
+    day_numbers: np.ndarray,
+    values: np.ndarray,
+    min_pairs: int = 30,
+    bootstrap: int = 1000,
+    seed: int = 0,
+) -> Dict[str, Optional[float]]:
+    """
+    同比法估计年衰减率。
+
+    Args:
+        day_numbers: 日序号（如自 1970-01-01 起的天数），按升序、不重复
+        values: 对应的性能指数
+        min_pairs: 有效配对数下限，不足时不给出结果
+        bootstrap: 自助法重采样次数
+        seed: 随机种子（保证结果可复现）
+
+    Returns:
+        rate（%/年）、ci_low、ci_high、pairs
+    """
+    day_numbers = np.asarray(day_numbers, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    # 一年前同日的位置（闰年按 365 天处理）
+    previous = np.searchsorted(day_numbers, day_numbers - 365)
+    previous_clipped = np.minimum(previous, len(day_numbers) - 1)
+    paired = (day_numbers[previous_clipped] == day_numbers - 365) & (values[previous_clipped] > 0)
+    rates = (values[paired] / values[previous_clipped[paired]] - 1) * 100
+    rates = rates[np.isfinite(rates)]
+
+    result: Dict[str, Optional[float]] = {"rate": None, "ci_low": None, "ci_high": None, "pairs": int(len(rates))}
+    if len(rates) < min_pairs:
+        return result
+    rng = np.random.default_rng(seed)
+    samples = np.median(rng.choice(rates, size=(bootstrap, len(rates)), replace=True), axis=1)
+    result.update(
+        rate=float(np.median(rates)),
+        ci_low=float(np.percentile(samples, CI_LOWER_PERCENTILE)),
+        ci_high=float(np.percentile(samples, CI_UPPER_PERCENTILE)),
+    )
+    return result
+
+
+def rolling_median(day_numbers: np.ndarray, values: np.ndarray, window_days: int = 30, step_days: int = 7):
+    """
+    按日历窗口计算滚动中位数并按步长取样（窗口内数据少于 1/3 时跳过）。
+
+    Returns:
+        (窗口中心日序号, 滚动中位数)
+    """
+    day_numbers = np.asarray(day_numbers, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if not len(day_numbers):
+        return np.array([], dtype=np.int64), np.array([])
+    centers = np.arange(day_numbers[0] + window_days // 2, day_numbers[-1] - window_days // 2 + 1, step_days)
+    lo = np.searchsorted(day_numbers, centers - window_days // 2)
+    hi = np.searchsorted(day_numbers, centers + window_days // 2, side="right")
+    keep = (hi - lo) >= window_days / 3
+    medians = np.array([np.median(values[a:b]) for a, b in zip(lo[keep], hi[keep])])
+    return centers[keep], medians
+
+
+def theil_sen_degradation(
+    day_numbers: np.ndarray,
+    values: np.ndarray,
+    min_points: int = 20,
+) -> Dict[str, Optional[float]]:
+    """
+    Theil-Sen 稳健回归估计年衰减率（相对于拟合起点的性能水平）。
+
+    Returns:
+        rate（%/年）、ci_low、ci_high、points
+    """
+    x = np.asarray(day_numbers, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    result: Dict[str, Optional[float]] = {"rate": None, "ci_low": None, "ci_high": None, "points": n}
+    if n < min_points:
+        return result
+
+    i, j = np.triu_indices(n, k=1)
+    dx = x[j] - x[i]
+    valid = dx != 0
+    slopes = np.sort((y[j] - y[i])[valid] / dx[valid])
+    slope = float(np.median(slopes))
+    intercept = float(np.median(y - slope * (x - x[0])))
+    if intercept <= 0:
+        return result
+
+    # Sen (1968) 斜率置信区间：按秩次取排序后斜率序列中的上下界
+    pairs = len(slopes)
+    spread = CI_Z * np.sqrt(n * (n - 1) * (2 * n + 5) / 18)
+    low_rank = int(np.clip(np.floor((pairs - spread) / 2), 0, pairs - 1))
+    high_rank = int(np.clip(np.ceil((pairs + spread) / 2), 0, pairs - 1))
+
+    def to_rate(s: float) -> float:
+        return s * 365 / intercept * 100
+
+    result.update(rate=to_rate(slope), ci_low=to_rate(slopes[low_rank]), ci_high=to_rate(slopes[high_rank]))
+    return result
@@ -0,0 +1,112 @@
+"""
+时序数据降采样模块
+
+为图表查询提供服务端降采样，使任意时间跨度的曲线都只传输固定数量的点：
+- LTTB（Largest-Triangle-Three-Buckets）：保留视觉形状最显著的点
+- min/max：每个分桶保留最小值与最大值，保证峰谷不丢失
+
+所有函数返回被选中点的下标（升序），调用方据此切片原始数据的各列。
+"""
+
+from typing import Literal
+
+import numpy as np
+
+DownsampleMode = Literal["lttb", "minmax"]
+
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    """将 [1, n-1) 区间均分为 buckets 个分桶，返回各分桶边界（长度 buckets+1）。"""
+    return np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 降采样。
+
+    Args:
+        x: 横坐标（如时间戳），需升序
+        y: 纵坐标（NaN 按 0 处理）
+        max_points: 输出点数上限（至少 3）
+
+    Returns:
+        被选中点的下标（升序，始终包含首尾两点）
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+
+    buckets = max_points - 2
+    edges = _bucket_edges(n, buckets)
+    # 各分桶的平均点（作为下一分桶的第三个顶点），最后一个分桶使用末点
+    counts = np.diff(edges)
+    x_sums = np.add.reduceat(x[:n - 1], edges[:-1]) if buckets else np.empty(0)
+    y_sums = np.add.reduceat(y[:n - 1], edges[:-1]) if buckets else np.empty(0)
+    avg_x = np.append((x_sums / counts)[1:], x[n - 1])
+    avg_y = np.append((y_sums / counts)[1:], y[n - 1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(buckets):
+        lo, hi = edges[i], edges[i + 1]
+        # 三角形面积 ×2：|(xa - xc)(yb - ya) - (xa - xb)(yc - ya)|
+        area = np.abs(
+            (x[prev] - avg_x[i]) * (y[lo:hi] - y[prev])
+            - (x[prev] - x[lo:hi]) * (avg_y[i] - y[prev])
+        )
+        prev = lo + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    min/max 降采样：每个分桶保留最小值与最大值所在的点（全向量化）。
+
+    Args:
+        y: 纵坐标（NaN 不参与比较）
+        max_points: 输出点数上限（至少 2）
+
+    Returns:
+        被选中点的下标（升序、去重，始终包含首尾两点，使曲线覆盖完整的时间范围）
+    """
+    n = len(y)
+    if max_points >= n or max_points < 2:
+        return np.arange(n)
+
+    # 首尾两点单独保留，其余点数均分给中间的分桶
+    buckets = (max_points - 2) // 2
+    if not buckets:
+        return np.array([0, n - 1], dtype=np.int64)
+    y = np.asarray(y, dtype=np.float64)[1:n - 1]
+    edges = np.linspace(0, n - 2, buckets + 1).astype(np.int64)
+    bucket_of = np.repeat(np.arange(buckets), np.diff(edges))
+
+    # 按 (分桶, 值) 排序后，每个分桶的首尾元素即为最小值与最大值
+    filled_low = np.where(np.isnan(y), np.inf, y)
+    filled_high = np.where(np.isnan(y), -np.inf, y)
+    order_low = np.lexsort((filled_low, bucket_of))
+    order_high = np.lexsort((filled_high, bucket_of))
+    starts = edges[:-1]
+    ends = edges[1:] - 1
+    nonempty = ends >= starts
+    mins = order_low[starts[nonempty]] + 1
+    maxs = order_high[ends[nonempty]] + 1
+    return np.unique(np.concatenate([[0, n - 1], mins, maxs]))
+
+
+def downsample_indices(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_points: int,
+    mode: DownsampleMode = "lttb",
+) -> np.ndarray:
+    """按指定模式返回降采样后保留点的下标（升序）。"""
+    if mode == "minmax":
+        return minmax_indices(y, max_points)
+    return lttb_indices(x, y, max_points)
@@ -0,0 +1,54 @@
+"""
+发电功率预测模块
+
+由倾斜面辐照度与组件温度估算交流输出功率（全向量化，各参数可为与样本等长的数组，一次计算多个系统）：
+- 直流功率按装机容量与辐照度线性折算，并按组件温度修正（参考 25 °C）
+- 其余损耗（线损、积灰、逆变器效率等）合并为性能比
+- 配置交流额定功率时按其限幅（逆变器削峰）
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from .insolation import STC_IRRADIANCE
+from .solar import ArrayLike
+
+REFERENCE_TEMPERATURE = 25.0
+
+
+def predict_ac_power(
+    poa: ArrayLike,
+    module_temperature: ArrayLike,
+    capacity_kw: ArrayLike,
+    performance_ratio: ArrayLike = 0.85,
+    temperature_coefficient: ArrayLike = -0.004,
+    ac_limit_kw: Optional[ArrayLike] = None,
+) -> np.ndarray:
+    """
+    估算交流输出功率（kW）。
+
+    Args:
+        poa: 倾斜面辐照度（W/m²）
+        module_temperature: 组件温度（°C，缺失为 NaN 时不做温度修正）
+        capacity_kw: 装机容量（kW，STC 直流额定功率）
+        performance_ratio: 不含温度损失的性能比
+        temperature_coefficient: 功率温度系数（/°C）
+        ac_limit_kw: 交流额定功率（kW，NaN 或 None 表示不限幅）
+
+    Returns:
+        交流功率（kW），不小于 0
+    """
+    poa = np.asarray(poa, dtype=np.float64)
+    temperature = np.asarray(module_temperature, dtype=np.float64)
+    correction = np.where(
+        np.isnan(temperature),
+        1.0,
+        1 + np.asarray(temperature_coefficient, dtype=np.float64) * (temperature - REFERENCE_TEMPERATURE),
+    )
+    power = np.asarray(capacity_kw, dtype=np.float64) * poa / STC_IRRADIANCE * correction * performance_ratio
+    power = np.maximum(np.nan_to_num(power), 0.0)
+    if ac_limit_kw is not None:
+        limit = np.asarray(ac_limit_kw, dtype=np.float64)
+        power = np.where(np.isnan(limit), power, np.minimum(power, limit))
+    return power
@@ -13,6 +13,8 @@
 from typing import Dict, Optional, List
 from datetime import datetime
 
+import numpy as np
+
 
 class PVCalculator:
     """
@@ -61,20 +63,22 @@ class PVCalculator:
         return round(pr, 2)
     
     @staticmethod
-    def estimate_daily_energy(capacity_kw: float, peak_sun_hours: float, efficiency: float = 0.85) -> float:
+    def estimate_daily_energy(capacity_kw: float, peak_sun_hours, efficiency=0.85):
         """
         估算日发电量。
         
         Args:
             capacity_kw: 系统容量（kW）
-            peak_sun_hours: 日峰值日照时数
-            efficiency: 系统效率系数（默认 0.85）
+            peak_sun_hours: 日峰值日照时数（可为按日的 NumPy 数组）
+            efficiency: 系统效率系数（默认 0.85，可为与 peak_sun_hours 等长的数组）
         
         Returns:
-            估算的日发电量（kWh）
+            估算的日发电量（kWh）；输入为数组时返回数组
         """
         # 日发电量 = 容量 × 峰值日照时数 × 效率
         daily_energy = capacity_kw * peak_sun_hours * efficiency
+        if isinstance(daily_energy, np.ndarray):
+            return np.round(daily_energy, 2)
         return round(daily_energy, 2)
     
     @staticmethod
@@ -141,6 +145,6 @@ def calculate_performance_ratio(actual_energy: float, theoretical_energy: float)
     return PVCalculator.calculate_performance_ratio(actual_energy, theoretical_energy)
 
 
-def estimate_daily_energy(capacity_kw: float, peak_sun_hours: float, efficiency: float = 0.85) -> float:
-    """日发电量估算的便捷函数。"""
+def estimate_daily_energy(capacity_kw: float, peak_sun_hours, efficiency=0.85):
+    """日发电量估算的便捷函数（支持按日数组）。"""
     return PVCalculator.estimate_daily_energy(capacity_kw, peak_sun_hours, efficiency)
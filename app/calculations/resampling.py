@@ -0,0 +1,173 @@
+"""
+规则网格重采样模块
+
+把采样时间抖动、含重复与缺测的测量序列映射到固定间隔的时间网格上（全向量化，一次处理任意多个系统）：
+- 时段为左闭右开 [t, t + 间隔)，以时段起点标记，网格按间隔整点对齐（如 5 分钟网格落在 :00、:05 ...）
+- 每个时段按指定方式聚合（mean / median / min / max / first / last / sum / count），缺失值不参与聚合
+- 可选有界补缺：线性插值只填补两侧都有值、且长度不超过上限的缺口；前向填充同样只填补不超过上限的缺口
+  （含序列末尾），更长的中断保持缺失，避免伪造长时间的数据
+"""
+
+from typing import Literal, Optional, Tuple
+
+import numpy as np
+
+ResampleAggregation = Literal["mean", "median", "min", "max", "first", "last", "sum", "count"]
+FillMethod = Literal["none", "interpolate", "ffill"]
+
+_MICROS_PER_MINUTE = 60_000_000
+
+
+def grid_timestamps(start, end, interval_minutes: int) -> np.ndarray:
+    """返回覆盖 [start, end) 的网格时段起点（datetime64[us]），两端分别向下、向上对齐到间隔整数倍。"""
+    first = np.datetime64(start, "m").astype(np.int64) // interval_minutes * interval_minutes
+    step_us = interval_minutes * _MICROS_PER_MINUTE
+    last = -(-np.datetime64(end, "us").astype(np.int64) // step_us) * interval_minutes
+    return np.arange(first, max(last, first), interval_minutes).astype("datetime64[m]").astype("datetime64[us]")
+
+
+def _order_within_slots(index: np.ndarray, secondary: np.ndarray) -> Optional[np.ndarray]:
+    """按 (时段, secondary) 排序的下标；输入已有序时（按系统、时间读出的数据求 first / last）返回 None。"""
+    same = index[1:] == index[:-1]
+    if np.all((index[1:] > index[:-1]) | (same & (secondary[1:] >= secondary[:-1]))):
+        return None
+    # 次序键换算为秩后与时段合成唯一的整数键，单键排序比多键 lexsort 快数倍
+    rank = np.empty(len(secondary), dtype=np.int64)
+    rank[np.argsort(secondary)] = np.arange(len(secondary))
+    return np.argsort(index * len(secondary) + rank)
+
+
+def _aggregate(index: np.ndarray, times: np.ndarray, values: np.ndarray, size: int, how: str) -> np.ndarray:
+    """按扁平网格下标聚合（index 为每个样本所属的 系统 × 时段 下标），返回长度为 size 的数组，空时段为 NaN。"""
+    counts = np.bincount(index, minlength=size)
+    if how == "count":
+        return counts.astype(np.float64)
+    if how in ("sum", "mean"):
+        sums = np.bincount(index, weights=values, minlength=size)
+        if how == "sum":
+            return np.where(counts > 0, sums, np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+    result = np.full(size, np.nan)
+    if not len(index):
+        return result
+    # 其余方式先按时段排序（first / last 时段内按时间、median 按数值），每个时段在排序结果中是连续的一段
+    if how in ("min", "max"):
+        order = np.argsort(index, kind="stable")
+    else:
+        order = _order_within_slots(index, values if how == "median" else times)
+    if order is not None:
+        index, values = index[order], values[order]
+    starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+    ends = np.r_[starts[1:], len(index)]
+    keys = index[starts]
+    if how == "min":
+        result[keys] = np.minimum.reduceat(values, starts)
+    elif how == "max":
+        result[keys] = np.maximum.reduceat(values, starts)
+    elif how == "first":
+        result[keys] = values[starts]
+    elif how == "last":
+        result[keys] = values[ends - 1]
+    elif how == "median":
+        lower = starts + (ends - starts - 1) // 2
+        upper = starts + (ends - starts) // 2
+        result[keys] = (values[lower] + values[upper]) / 2
+    else:
+        raise ValueError(f"Unsupported aggregation '{how}'")
+    return result
+
+
+def fill_gaps(grid_values: np.ndarray, method: FillMethod = "interpolate", max_gap: int = 1) -> np.ndarray:
+    """
+    有界补缺（逐行独立处理，支持一维或 系统 × 时段 的二维数组）。
+
+    Args:
+        grid_values: 重采样结果，缺失为 NaN
+        method: interpolate（线性插值，只填补两侧都有值的缺口）或 ffill（前向填充）
+        max_gap: 可填补的最长缺口（时段数），更长的缺口整段保持缺失
+
+    Returns:
+        补缺后的新数组
+    """
+    values = np.array(grid_values, dtype=np.float64, ndmin=2, copy=True)
+    if method == "none" or max_gap <= 0 or values.size == 0:
+        return values.reshape(np.shape(grid_values))
+    rows, n = values.shape
+    columns = np.arange(n)
+    valid = ~np.isnan(values)
+    # 每个位置之前（含）最近的有效下标与之后（含）最近的有效下标，不存在时分别为 -1 与 n
+    prev = np.maximum.accumulate(np.where(valid, columns, -1), axis=1)
+    next_ = np.minimum.accumulate(np.where(valid, columns, n)[:, ::-1], axis=1)[:, ::-1]
+    gap_length = next_ - prev - 1
+    missing = ~valid & (prev >= 0)
+
+    prev_values = np.take_along_axis(values, np.clip(prev, 0, n - 1), axis=1)
+    if method == "ffill":
+        fill = missing & (gap_length <= max_gap)
+        values[fill] = prev_values[fill]
+    elif method == "interpolate":
+        fill = missing & (next_ < n) & (gap_length <= max_gap)
+        next_values = np.take_along_axis(values, np.clip(next_, 0, n - 1), axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = (columns - prev) / (next_ - prev)
+        values[fill] = (prev_values + (next_values - prev_values) * ratio)[fill]
+    else:
+        raise ValueError(f"Unsupported fill method '{method}'")
+    return values.reshape(np.shape(grid_values))
+
+
+def resample(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    start,
+    end,
+    interval_minutes: int,
+    how: ResampleAggregation = "mean",
+    fill: FillMethod = "none",
+    max_gap: int = 0,
+    groups: Optional[np.ndarray] = None,
+    n_groups: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    重采样到规则网格。
+
+    Args:
+        timestamps: 采样时间（datetime64 或可转换的 datetime 序列，无需排序、允许重复）
+        values: 采样值（缺失为 NaN）
+        start / end: 网格范围 [start, end)
+        interval_minutes: 网格间隔（分钟）
+        how: 聚合方式
+        fill: 补缺方式（none / interpolate / ffill）
+        max_gap: 可填补的最长缺口（时段数）
+        groups: 每个采样所属的系统序号（0 ~ n_groups-1）；为空时按单个序列处理
+        n_groups: 系统数（默认 groups 最大值 + 1）
+
+    Returns:
+        (网格时段起点, 结果)；结果形状为 (时段数,)，指定 groups 时为 (n_groups, 时段数)
+    """
+    grid = grid_timestamps(start, end, interval_minutes)
+    n_slots = len(grid)
+    micros = np.asarray(timestamps, dtype="datetime64[us]").astype(np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if groups is None:
+        group_index = np.zeros(len(micros), dtype=np.int64)
+        n_groups_ = 1
+    else:
+        group_index = np.asarray(groups, dtype=np.int64)
+        n_groups_ = n_groups if n_groups is not None else (int(group_index.max()) + 1 if len(group_index) else 0)
+
+    if n_slots:
+        slot = (micros - grid[0].astype(np.int64)) // (interval_minutes * _MICROS_PER_MINUTE)
+        keep = (slot >= 0) & (slot < n_slots)
+        if how != "count":
+            keep &= ~np.isnan(values)
+        index = group_index[keep] * n_slots + slot[keep]
+        result = _aggregate(index, micros[keep], values[keep], n_groups_ * n_slots, how)
+    else:
+        result = np.empty(0)
+    result = result.reshape(n_groups_, n_slots)
+    if fill != "none" and how != "count":
+        result = fill_gaps(result, fill, max_gap)
+    return grid, (result[0] if groups is None else result)
@@ -0,0 +1,163 @@
+"""
+太阳几何与辐照度模型模块
+
+提供全向量化（NumPy）的简化太阳辐照度计算，适用于批量估算与合成数据：
+- 太阳位置（NOAA 简化算法，精度约 0.5°）
+- 晴空水平总辐照度（Haurwitz 模型）
+- 散射比例分解（Erbs 模型，由水平总辐照度估计散射分量）
+- 倾斜面辐照度（各向同性天空模型）
+- 组件背板温度（Sandia 开放支架经验模型）
+
+时间参数均为 UTC 秒级时间戳；角度均为度，方位角以正北为 0°、顺时针为正（正南为 180°）。
+"""
+
+from typing import Tuple, Union
+
+import numpy as np
+
+ArrayLike = Union[float, np.ndarray]
+
+# 太阳常数相关的 Haurwitz 模型系数（W/m²）
+HAURWITZ_COEFFICIENT = 1098.0
+
+# 太阳常数（W/m²）
+SOLAR_CONSTANT = 1361.0
+
+# Sandia 组件温度模型（玻璃/背板、开放支架）系数
+SANDIA_A = -3.56
+SANDIA_B = -0.075
+
+
+def solar_position(epoch_seconds: ArrayLike, latitude: ArrayLike, longitude: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算太阳天顶角与方位角（经纬度可为与时间等长的数组，一次计算多个站点）。
+
+    Args:
+        epoch_seconds: UTC 时间戳（秒）
+        latitude: 纬度（度，北纬为正）
+        longitude: 经度（度，东经为正）
+
+    Returns:
+        (天顶角, 方位角)，单位为度
+    """
+    n = np.asarray(epoch_seconds, dtype=np.float64) / 86400.0 + 2440587.5 - 2451545.0
+    mean_longitude = np.radians((280.460 + 0.9856474 * n) % 360)
+    mean_anomaly = np.radians((357.528 + 0.9856003 * n) % 360)
+    ecliptic_longitude = (
+        mean_longitude
+        + np.radians(1.915) * np.sin(mean_anomaly)
+        + np.radians(0.020) * np.sin(2 * mean_anomaly)
+    )
+    obliquity = np.radians(23.439 - 0.0000004 * n)
+
+    right_ascension = np.arctan2(np.cos(obliquity) * np.sin(ecliptic_longitude), np.cos(ecliptic_longitude))
+    declination = np.arcsin(np.sin(obliquity) * np.sin(ecliptic_longitude))
+    sidereal_hours = (18.697374558 + 24.06570982441908 * n) % 24
+    hour_angle = np.radians(sidereal_hours * 15 + longitude) - right_ascension
+
+    lat = np.radians(latitude)
+    cos_zenith = (
+        np.sin(lat) * np.sin(declination)
+        + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    )
+    zenith = np.degrees(np.arccos(np.clip(cos_zenith, -1.0, 1.0)))
+    azimuth = (
+        np.degrees(np.arctan2(
+            np.sin(hour_angle),
+            np.cos(hour_angle) * np.sin(lat) - np.tan(declination) * np.cos(lat),
+        )) + 180.0
+    ) % 360.0
+    return zenith, azimuth
+
+
+def clear_sky_ghi(zenith: ArrayLike) -> np.ndarray:
+    """Haurwitz 晴空水平总辐照度（W/m²），太阳在地平线以下时为 0。"""
+    cos_zenith = np.cos(np.radians(np.asarray(zenith, dtype=np.float64)))
+    ghi = np.zeros_like(cos_zenith)
+    day = cos_zenith > 0
+    ghi[day] = HAURWITZ_COEFFICIENT * cos_zenith[day] * np.exp(-0.059 / cos_zenith[day])
+    return ghi
+
+
+def erbs_diffuse_fraction(ghi: ArrayLike, zenith: ArrayLike, epoch_seconds: ArrayLike) -> np.ndarray:
+    """
+    Erbs 模型：由晴朗指数（水平总辐照度 / 大气层外水平辐照度）估计散射辐照度占比（0~1）。
+
+    太阳在地平线附近或以下时按全部为散射处理。
+    """
+    ghi = np.asarray(ghi, dtype=np.float64)
+    cos_zenith = np.cos(np.radians(np.asarray(zenith, dtype=np.float64)))
+    day_of_year = (np.asarray(epoch_seconds, dtype=np.float64) / 86400.0) % 365.25
+    extraterrestrial = SOLAR_CONSTANT * (1 + 0.033 * np.cos(2 * np.pi * day_of_year / 365.25))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        kt = np.where(cos_zenith > 0.065, ghi / (extraterrestrial * cos_zenith), 0.0)
+    kt = np.clip(np.nan_to_num(kt), 0.0, 1.0)
+    fraction = np.where(
+        kt <= 0.22,
+        1 - 0.09 * kt,
+        np.where(
+            kt <= 0.8,
+            0.9511 - 0.1604 * kt + 4.388 * kt ** 2 - 16.638 * kt ** 3 + 12.336 * kt ** 4,
+            0.165,
+        ),
+    )
+    return np.where(cos_zenith > 0.065, fraction, 1.0)
+
+
+def angle_of_incidence_cos(
+    zenith: ArrayLike,
+    azimuth: ArrayLike,
+    surface_tilt: ArrayLike,
+    surface_azimuth: ArrayLike,
+) -> np.ndarray:
+    """太阳光线与组件法线夹角的余弦（背面入射时截断为 0）。"""
+    zen = np.radians(zenith)
+    tilt = np.radians(surface_tilt)
+    cos_aoi = (
+        np.cos(zen) * np.cos(tilt)
+        + np.sin(zen) * np.sin(tilt) * np.cos(np.radians(np.asarray(azimuth) - surface_azimuth))
+    )
+    return np.clip(cos_aoi, 0.0, 1.0)
+
+
+def plane_of_array_irradiance(
+    ghi: ArrayLike,
+    dhi: ArrayLike,
+    zenith: ArrayLike,
+    azimuth: ArrayLike,
+    surface_tilt: ArrayLike,
+    surface_azimuth: ArrayLike,
+    albedo: float = 0.2,
+) -> np.ndarray:
+    """
+    各向同性天空模型计算倾斜面总辐照度（W/m²）。
+
+    Args:
+        ghi: 水平总辐照度
+        dhi: 水平散射辐照度
+        zenith, azimuth: 太阳天顶角与方位角（度）
+        surface_tilt: 组件倾角（度）
+        surface_azimuth: 组件方位角（度，正南为 180）
+        albedo: 地面反照率
+    """
+    ghi = np.asarray(ghi, dtype=np.float64)
+    dhi = np.asarray(dhi, dtype=np.float64)
+    cos_zenith = np.cos(np.radians(zenith))
+    # 低太阳高度角时直射分量的投影放大不稳定，限制天顶角余弦下限
+    dni = np.where(cos_zenith > 0.05, (ghi - dhi) / np.maximum(cos_zenith, 0.05), 0.0)
+    tilt = np.radians(surface_tilt)
+    beam = dni * angle_of_incidence_cos(zenith, azimuth, surface_tilt, surface_azimuth)
+    sky_diffuse = dhi * (1 + np.cos(tilt)) / 2
+    ground_reflected = ghi * albedo * (1 - np.cos(tilt)) / 2
+    return np.maximum(beam + sky_diffuse + ground_reflected, 0.0)
+
+
+def module_temperature(
+    poa: ArrayLike,
+    ambient_temperature: ArrayLike,
+    wind_speed: ArrayLike = 1.0,
+) -> np.ndarray:
+    """Sandia 经验模型计算组件背板温度（℃），对应下位机上报的 Tbody。"""
+    poa = np.asarray(poa, dtype=np.float64)
+    wind = np.asarray(wind_speed, dtype=np.float64)
+    return poa * np.exp(SANDIA_A + SANDIA_B * wind) + ambient_temperature
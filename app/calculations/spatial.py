@@ -0,0 +1,145 @@
+"""
+空间近邻检索模块
+
+按经纬度检索最近的系统：
+- 经纬度先换算为单位球面上的三维坐标，球面上两点的弦长与大圆距离单调对应，
+  因此可直接在三维欧氏空间中建 KD 树，查询结果再换算为公里
+- KD 树以数组形式存储（节点边界框 + 叶子内点的连续切片），叶子内距离向量化计算，
+  按边界框最近距离做最优优先搜索
+"""
+
+import heapq
+from typing import List, Tuple
+
+import numpy as np
+
+from .solar import ArrayLike
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def unit_vectors(latitude: ArrayLike, longitude: ArrayLike) -> np.ndarray:
+    """经纬度（度）转换为单位球面上的三维坐标，形状 (n, 3)。"""
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    lon = np.radians(np.asarray(longitude, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1).reshape(-1, 3)
+
+
+def chord_to_km(chord: ArrayLike) -> np.ndarray:
+    """单位球面弦长换算为大圆距离（公里）。"""
+    chord = np.clip(np.asarray(chord, dtype=np.float64), 0.0, 2.0)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(chord / 2)
+
+
+def km_to_chord(distance_km: ArrayLike) -> np.ndarray:
+    """大圆距离（公里）换算为单位球面弦长（超过半周长时取直径 2）。"""
+    angle = np.minimum(np.asarray(distance_km, dtype=np.float64) / EARTH_RADIUS_KM, np.pi)
+    return 2 * np.sin(angle / 2)
+
+
+def haversine_km(lat1: ArrayLike, lon1: ArrayLike, lat2: ArrayLike, lon2: ArrayLike) -> np.ndarray:
+    """两点间大圆距离（公里）。"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class KDTree:
+    """
+    数组存储的 KD 树（欧氏距离）。
+
+    每个节点记录其点在 order 中的连续区间 [start, end) 与边界框；
+    内部节点按跨度最大的维度在中位数处二分，叶子不超过 leaf_size 个点。
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 16):
+        self.points = np.asarray(points, dtype=np.float64).reshape(len(points), -1)
+        self.leaf_size = max(1, int(leaf_size))
+        n = len(self.points)
+        self.order = np.arange(n)
+        starts: List[int] = []
+        ends: List[int] = []
+        children: List[List[int]] = []
+        mins: List[np.ndarray] = []
+        maxs: List[np.ndarray] = []
+
+        def add_node(start: int, end: int) -> int:
+            chunk = self.points[self.order[start:end]]
+            starts.append(start)
+            ends.append(end)
+            children.append([-1, -1])
+            mins.append(chunk.min(axis=0) if end > start else np.zeros(self.points.shape[1]))
+            maxs.append(chunk.max(axis=0) if end > start else np.zeros(self.points.shape[1]))
+            return len(starts) - 1
+
+        stack = [add_node(0, n)]
+        while stack:
+            node = stack.pop()
+            start, end = starts[node], ends[node]
+            if end - start <= self.leaf_size:
+                continue
+            dim = int(np.argmax(maxs[node] - mins[node]))
+            mid = (start + end) // 2
+            segment = self.order[start:end]
+            self.order[start:end] = segment[np.argpartition(self.points[segment, dim], mid - start)]
+            left, right = add_node(start, mid), add_node(mid, end)
+            children[node] = [left, right]
+            stack.extend((left, right))
+
+        self._starts = np.array(starts, dtype=np.int64)
+        self._ends = np.array(ends, dtype=np.int64)
+        self._children = np.array(children, dtype=np.int64).reshape(-1, 2)
+        self._mins = np.array(mins).reshape(len(starts), -1)
+        self._maxs = np.array(maxs).reshape(len(starts), -1)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _box_distance2(self, node: int, point: np.ndarray) -> float:
+        """点到节点边界框的最近距离平方。"""
+        gap = np.maximum(self._mins[node] - point, 0.0) + np.maximum(point - self._maxs[node], 0.0)
+        return float(gap @ gap)
+
+    def query(self, point: np.ndarray, k: int = 1, max_distance: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        最近的 k 个点（距离不超过 max_distance）。
+
+        Returns:
+            (距离, 点下标)，按距离升序，不足 k 个时返回实际数量
+        """
+        point = np.asarray(point, dtype=np.float64).ravel()
+        best_d2 = np.empty(0)
+        best_index = np.empty(0, dtype=np.int64)
+        if not len(self.points) or k <= 0:
+            return best_d2, best_index
+        bound = float(max_distance) ** 2
+        heap = [(self._box_distance2(0, point), 0)]
+        while heap:
+            d2, node = heapq.heappop(heap)
+            if d2 > bound:
+                break
+            left, right = self._children[node]
+            if left >= 0:
+                for child in (left, right):
+                    child_d2 = self._box_distance2(child, point)
+                    if child_d2 <= bound:
+                        heapq.heappush(heap, (child_d2, child))
+                continue
+            candidates = self.order[self._starts[node]:self._ends[node]]
+            diff = self.points[candidates] - point
+            d2s = np.einsum("ij,ij->i", diff, diff)
+            keep = d2s <= bound
+            best_d2 = np.concatenate([best_d2, d2s[keep]])
+            best_index = np.concatenate([best_index, candidates[keep]])
+            if len(best_d2) >= k:
+                top = np.argsort(best_d2, kind="stable")[:k]
+                best_d2, best_index = best_d2[top], best_index[top]
+                bound = min(bound, float(best_d2[-1]))
+        order = np.argsort(best_d2, kind="stable")
+        return np.sqrt(best_d2[order]), best_index[order]
+
+    def query_radius(self, point: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """距离不超过 radius 的全部点，返回 (距离, 点下标)，按距离升序。"""
+        return self.query(point, k=len(self.points), max_distance=radius)
+
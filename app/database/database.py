@@ -3,6 +3,8 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+from app.database.sharding import SHARDED_TABLES, ShardRoutingSession, shard_for
+
 # 强制要求显式设置 DATABASE_URL（生产环境必须提供）
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
@@ -10,11 +12,24 @@ if not DATABASE_URL:
         "DATABASE_URL is not set. Configure DATABASE_URL to point to the PostgreSQL database."
     )
 
+# 测量数据分片（逗号分隔的数据库 URL，按 system_id 哈希分布；未设置时测量数据与其他表同库）
+# 只能在列表末尾增减分片，修改后需执行 scripts/rebalance_shards.py 迁移数据
+MEASUREMENT_SHARD_URLS = [url.strip() for url in os.getenv("MEASUREMENT_SHARD_URLS", "").split(",") if url.strip()]
+
 # 创建 SQLAlchemy 引擎
 engine = create_engine(DATABASE_URL)
+shard_engines = [create_engine(url) for url in MEASUREMENT_SHARD_URLS]
+SHARDING_ENABLED = bool(shard_engines)
+if any(shard.dialect.name != engine.dialect.name for shard in shard_engines):
+    raise RuntimeError("MEASUREMENT_SHARD_URLS must use the same database type as DATABASE_URL")
 
-# 创建 SessionLocal 类
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 创建 SessionLocal 类（配置分片时测量数据表按作用域路由到分片）
+if SHARDING_ENABLED:
+    SessionLocal = sessionmaker(
+        class_=ShardRoutingSession, shards=shard_engines, autocommit=False, autoflush=False, bind=engine
+    )
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # 创建模型的 Base 基类
 Base = declarative_base()
@@ -32,10 +47,35 @@ def get_db():
         db.close()
 
 
+def measurement_engines():
+    """存放测量数据的数据库引擎（分片，未分片时为主库）。"""
+    return shard_engines or [engine]
+
+
+def measurement_engine(system_id: str):
+    """存放指定系统测量数据的数据库引擎（供绕过会话直接写入的脚本使用）。"""
+    if not shard_engines:
+        return engine
+    return shard_engines[shard_for(system_id, len(shard_engines))]
+
+
+def dispose_engines():
+    """子进程中丢弃继承自父进程的连接池（不关闭父进程的连接）。"""
+    for item in [engine, *shard_engines]:
+        item.dispose(close=False)
+
+
 def init_db():
     """
     初始化数据库表。
-    创建模型中定义的所有表。
+    创建模型中定义的所有表；配置分片时测量数据表只在各分片上创建，不在主库中创建。
     """
-    from app.models import measurement, system_config, weather
-    Base.metadata.create_all(bind=engine)
+    from app.models import degradation, job, kpi, measurement, prediction, system_config, validation, weather
+    sharded = [table for name, table in Base.metadata.tables.items() if name in SHARDED_TABLES]
+    if shard_engines:
+        primary = [table for name, table in Base.metadata.tables.items() if name not in SHARDED_TABLES]
+        Base.metadata.create_all(bind=engine, tables=primary)
+    else:
+        Base.metadata.create_all(bind=engine)
+    for shard in shard_engines:
+        Base.metadata.create_all(bind=shard, tables=sharded)
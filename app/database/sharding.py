@@ -0,0 +1,191 @@
+"""
+测量数据分片路由。
+
+测量数据相关的表（measurements、measurement_latest、measurement_blocks、measurement_coverage）按 system_id
+的稳定哈希分布到 MEASUREMENT_SHARD_URLS 配置的多个数据库，其余表仍在 DATABASE_URL 对应的主库中：
+- 分片号 = jump consistent hash(blake2b(system_id))，与进程、Python 版本无关；
+  在列表末尾增加分片时只有约 1/N 的系统需要迁移（迁移见 scripts/rebalance_shards.py）
+- ShardRoutingSession 把涉及上述表的语句路由到当前作用域的分片，其余语句仍发往主库：
+  单个系统的读写在 shard_scope(db, system_id) 内执行；同一会话可先后访问多个分片，
+  提交时依次提交各数据库（不是分布式事务）
+- 跨系统查询用 fan_out / fan_out_by_system 在各分片上并行执行（每个分片一个线程、一个会话），由调用方合并结果
+- 未配置分片时以上函数直接使用原会话，行为与单库一致
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, TypeVar
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper, Session
+from sqlalchemy.sql.util import find_tables
+
+SHARDED_TABLES = frozenset({"measurements", "measurement_latest", "measurement_blocks", "measurement_coverage"})
+
+T = TypeVar("T")
+
+
+class ShardRoutingError(RuntimeError):
+    """测量数据语句无法确定目标分片。"""
+
+
+def shard_key(system_id: str) -> int:
+    """system_id 的 64 位稳定哈希。"""
+    return int.from_bytes(hashlib.blake2b(system_id.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash（Lamping & Veach）：桶数从 N 增加到 N+1 时只有约 1/(N+1) 的键改变归属。"""
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def shard_for(system_id: str, shard_count: int) -> int:
+    """系统所在的分片号。"""
+    return jump_hash(shard_key(system_id), shard_count)
+
+
+def _statement_tables(mapper: Any, clause: Any) -> Set[str]:
+    """语句涉及的表名（ORM 实体的表与语句中出现的表）。"""
+    tables: Set[str] = set()
+    if mapper is not None:
+        target = inspect(mapper, raiseerr=False)
+        if isinstance(target, Mapper):
+            tables.update(table.name for table in target.tables)
+        elif hasattr(target, "name"):
+            tables.add(target.name)
+    if clause is not None:
+        tables.update(
+            table.name for table in find_tables(clause, check_columns=True, include_crud=True)
+            if getattr(table, "name", None)
+        )
+    return tables
+
+
+class ShardRoutingSession(Session):
+    """
+    按作用域路由测量数据表的会话（配置了分片时由 SessionLocal 创建）。
+
+    shard 为当前作用域的分片号；涉及测量数据表的语句在作用域外执行时抛出 ShardRoutingError，
+    同一条语句同时涉及测量数据表与主库的表（跨库 JOIN）时同样报错。
+    """
+
+    def __init__(self, *args, shards: Sequence[Engine] = (), shard: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shards = list(shards)
+        self.shard = shard
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self.shards:
+            tables = _statement_tables(mapper, clause)
+            sharded = tables & SHARDED_TABLES
+            if sharded:
+                if sharded != tables:
+                    raise ShardRoutingError(
+                        f"Statement joins sharded tables {sorted(sharded)} with tables on the primary database"
+                    )
+                if self.shard is None:
+                    raise ShardRoutingError(f"Statement on {sorted(sharded)} needs a shard scope (shard_scope / fan_out)")
+                return self.shards[self.shard]
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def for_shard(self, index: int) -> "ShardRoutingSession":
+        """新建固定在指定分片的会话（供并行扇出的线程使用，调用方负责关闭）。"""
+        return type(self)(
+            bind=self.bind,
+            shards=self.shards,
+            shard=index,
+            autoflush=self.autoflush,
+            expire_on_commit=self.expire_on_commit,
+        )
+
+
+def shard_count(db: Session) -> int:
+    """会话配置的分片数（未分片时为 0）。"""
+    return len(db.shards) if isinstance(db, ShardRoutingSession) else 0
+
+
+def system_shard(db: Session, system_id: str) -> Optional[int]:
+    """系统所在的分片号（未分片时为 None）。"""
+    count = shard_count(db)
+    return shard_for(system_id, count) if count else None
+
+
+@contextmanager
+def use_shard(db: Session, index: Optional[int]) -> Iterator[Session]:
+    """
+    在指定分片的作用域内使用会话（index 为 None 或未分片时不做任何事）。
+
+    进入与离开作用域时 flush，作用域内新增或修改的 ORM 对象写入该分片，不会在之后落到其他分片。
+    """
+    if index is None or not shard_count(db):
+        yield db
+        return
+    previous = db.shard
+    if previous != index:
+        db.flush()
+    db.shard = index
+    try:
+        yield db
+        db.flush()
+    finally:
+        db.shard = previous
+
+
+def shard_scope(db: Session, system_id: str):
+    """单个系统测量数据的读写作用域。"""
+    return use_shard(db, system_shard(db, system_id))
+
+
+def group_by_shard(db: Session, system_ids: Iterable[str]) -> Dict[Optional[int], List[str]]:
+    """按分片分组系统（保持原顺序；未分片时全部归入 None）。"""
+    groups: Dict[Optional[int], List[str]] = {}
+    for system_id in system_ids:
+        groups.setdefault(system_shard(db, system_id), []).append(system_id)
+    return groups
+
+
+def fan_out(db: Session, fn: Callable[[Session], T], shards: Optional[Iterable[int]] = None) -> List[T]:
+    """
+    在各分片（默认全部分片）上并行执行 fn(session)，按分片顺序返回结果列表。
+
+    只涉及一个分片时在当前会话中执行；多个分片时每个分片使用独立的会话与线程，
+    只能读到已提交的数据。未分片时返回 [fn(db)]。
+    """
+    count = shard_count(db)
+    if not count:
+        return [fn(db)]
+    indices = list(range(count)) if shards is None else sorted(set(shards))
+    if len(indices) == 1:
+        with use_shard(db, indices[0]):
+            return [fn(db)]
+
+    def run(index: int) -> T:
+        session = db.for_shard(index)
+        try:
+            return fn(session)
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=len(indices), thread_name_prefix="shard") as pool:
+        return list(pool.map(run, indices))
+
+
+def fan_out_by_system(
+    db: Session,
+    system_ids: Sequence[str],
+    fn: Callable[[Session, List[str]], T],
+) -> List[T]:
+    """按分片分组系统后并行执行 fn(session, 该分片上的系统)；没有系统时返回空列表。"""
+    groups = group_by_shard(db, system_ids)
+    if not groups:
+        return []
+    if None in groups:
+        return [fn(db, groups[None])]
+    return fan_out(db, lambda session: fn(session, groups[session.shard]), groups)
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime
+from app.database.database import Base
+
+
+class DegradationResult(Base):
+    """
+    每个系统、每种方法的衰减率分析结果（缓存表）。
+
+    由衰减分析任务（scripts/analyze_degradation.py）写入；输入签名（daily_kpis 的天数、最后日期与最近计算时间）
+    与参数签名均未变化时不重新计算。
+    """
+    __tablename__ = "degradation_results"
+
+    system_id = Column(String, primary_key=True, comment="光伏系统唯一标识")
+    method = Column(String, primary_key=True, comment="分析方法：yoy / rolling")
+    status = Column(String, nullable=False, comment="ok / insufficient_data / missing_location / no_data")
+
+    rate_percent_per_year = Column(Float, nullable=True, comment="年衰减率（%/年，负值表示性能下降）")
+    ci_low = Column(Float, nullable=True, comment="68.2% 置信区间下界（%/年）")
+    ci_high = Column(Float, nullable=True, comment="68.2% 置信区间上界（%/年）")
+    used_days = Column(Integer, nullable=False, default=0, comment="筛选后参与分析的天数")
+    pairs = Column(Integer, nullable=False, default=0, comment="同比配对数或回归点数")
+    first_day = Column(Date, nullable=True, comment="参与分析的第一天")
+    last_day = Column(Date, nullable=True, comment="参与分析的最后一天")
+
+    # 输入与参数签名（用于判断是否需要重算）
+    input_days = Column(Integer, nullable=False, comment="daily_kpis 中的天数")
+    input_last_day = Column(Date, nullable=True, comment="daily_kpis 中的最后日期")
+    input_computed_at = Column(DateTime, nullable=True, comment="daily_kpis 最近计算时间")
+    params_hash = Column(String, nullable=False, comment="分析参数签名")
+
+    computed_at = Column(DateTime, nullable=False, comment="分析时间（本地时间）")
+
+    def __repr__(self):
+        return f"<DegradationResult(system_id={self.system_id}, method={self.method}, rate={self.rate_percent_per_year})>"
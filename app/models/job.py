@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON, Index, text
+from app.database.database import Base
+
+
+class Job(Base):
+    """
+    后台任务队列（导出、KPI 重算、衰减分析等耗时计算）。
+
+    由接口或脚本提交，任务进程（scripts/job_worker.py）以 FOR UPDATE SKIP LOCKED 领取后在进程池中执行；
+    参数相同的待执行任务只保留一个（dedupe_key 上的部分唯一索引）。
+    时间戳使用 Asia/Shanghai 本地时间。
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False, comment="任务类型")
+    params = Column(JSON, nullable=False, comment="任务参数")
+    dedupe_key = Column(String, nullable=False, comment="任务类型与参数的签名（去重用）")
+    status = Column(String, nullable=False, default="pending", comment="pending / running / succeeded / failed / cancelled")
+    priority = Column(Integer, nullable=False, default=0, comment="优先级（数值大的先执行）")
+
+    progress = Column(Float, nullable=False, default=0.0, comment="进度（0~1）")
+    progress_message = Column(String, nullable=True, comment="进度说明")
+    result = Column(JSON, nullable=True, comment="执行结果（JSON）")
+    error = Column(Text, nullable=True, comment="失败原因")
+
+    attempts = Column(Integer, nullable=False, default=0, comment="已执行次数")
+    max_attempts = Column(Integer, nullable=False, default=1, comment="最多执行次数（失败后自动重试）")
+    worker = Column(String, nullable=True, comment="执行该任务的任务进程标识")
+
+    created_at = Column(DateTime, nullable=False, comment="提交时间（本地时间）")
+    started_at = Column(DateTime, nullable=True, comment="最近一次开始执行时间")
+    heartbeat_at = Column(DateTime, nullable=True, comment="任务进程最近一次心跳时间")
+    finished_at = Column(DateTime, nullable=True, comment="结束时间")
+
+    __table_args__ = (
+        Index("ix_jobs_status_priority", "status", "priority", "id"),
+        Index(
+            "uq_jobs_pending_dedupe",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status}, progress={self.progress})>"
@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Index
+from app.database.database import Base
+
+
+class DailyKPI(Base):
+    """
+    每个系统每天的性能指标（物化表）。
+
+    由 KPI 任务（scripts/compute_daily_kpis.py）按实测辐照度积分计算后写入，
+    日期为系统所在时区的本地日期。
+    """
+    __tablename__ = "daily_kpis"
+
+    system_id = Column(String, primary_key=True, comment="光伏系统唯一标识")
+    day = Column(Date, primary_key=True, comment="系统本地日期")
+
+    sample_count = Column(Integer, nullable=False, comment="当日测量点数")
+    coverage = Column(Float, nullable=False, comment="有效积分时长占全天比例（0~1）")
+    peak_sun_hours = Column(Float, nullable=False, comment="峰值日照时数（数值等于辐照量 kWh/m²）")
+    max_irradiance = Column(Float, nullable=True, comment="当日最大辐照度（W/m²）")
+    module_temperature = Column(Float, nullable=True, comment="辐照度加权的组件平均温度（°C）")
+    performance_ratio = Column(Float, nullable=False, comment="计算预期发电量使用的性能比（经温度修正，0~1）")
+    expected_energy_kwh = Column(Float, nullable=True, comment="预期发电量（kWh，未配置容量时为空）")
+
+    computed_at = Column(DateTime, nullable=False, comment="计算时间（本地时间）")
+
+    __table_args__ = (
+        Index("ix_daily_kpis_day", "day"),
+    )
+
+    def __repr__(self):
+        return f"<DailyKPI(system_id={self.system_id}, day={self.day}, psh={self.peak_sun_hours})>"
+
+
+class KPIDirtyDay(Base):
+    """
+    有新写入、待重新计算 KPI 的系统日期（Asia/Shanghai 本地日期）。
+
+    由写入回调与回填脚本登记，KPI 任务处理后删除。
+    """
+    __tablename__ = "kpi_dirty_days"
+
+    system_id = Column(String, primary_key=True, comment="光伏系统唯一标识")
+    day = Column(Date, primary_key=True, comment="写入数据所在日期（本地时间 Asia/Shanghai）")
+    marked_at = Column(DateTime, nullable=False, comment="最近一次登记时间（本地时间）")
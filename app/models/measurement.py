@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, Index
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, Index, LargeBinary
 from datetime import datetime
 from app.database.database import Base
 
@@ -28,10 +28,82 @@ class Measurement(Base):
     # 元数据
     created_at = Column(DateTime, nullable=False)
 
-    # 复合索引用于高效时序查询
+    # 复合唯一索引：用于高效时序查询，同时保证 (system_id, timestamp) 幂等写入
     __table_args__ = (
-        Index('ix_measurements_system_timestamp', 'system_id', 'timestamp'),
+        Index('ix_measurements_system_timestamp', 'system_id', 'timestamp', unique=True),
     )
 
     def __repr__(self):
         return f"<Measurement(id={self.id}, system_id={self.system_id}, timestamp={self.timestamp})>"
+
+
+class MeasurementLatest(Base):
+    """
+    每个系统最新一条测量记录（末值表）。
+
+    由写入路径在同一事务中维护，用于系统总览等“当前值”查询，避免扫描 measurements 表。
+    """
+    __tablename__ = "measurement_latest"
+
+    system_id = Column(String, primary_key=True, comment="光伏系统唯一标识")
+    measurement_id = Column(Integer, nullable=False, comment="对应 measurements.id")
+    timestamp = Column(DateTime, nullable=False, comment="测量时间戳（本地时间 Asia/Shanghai）")
+    irradiance = Column(Float, nullable=True, comment="太阳辐照度（W/m²）")
+    temperature = Column(Float, nullable=True, comment="组件温度（°C）")
+    updated_at = Column(DateTime, nullable=False, comment="末值更新时间（本地时间）")
+
+    def __repr__(self):
+        return f"<MeasurementLatest(system_id={self.system_id}, timestamp={self.timestamp})>"
+
+
+class MeasurementBlock(Base):
+    """
+    分块压缩存储的测量数据（PACKED_STORAGE_ENABLED 开启时由压缩脚本生成）。
+
+    每行保存一个系统一个时间块（小时或天）内的全部采样点，各数组列为压缩后的二进制，
+    编解码见 app/services/packed_storage.py。块内的 (system_id, timestamp) 不会同时出现在 measurements 表中。
+    """
+    __tablename__ = "measurement_blocks"
+
+    system_id = Column(String, primary_key=True, comment="光伏系统唯一标识")
+    block_start = Column(DateTime, primary_key=True, comment="块起始时间（本地时间 Asia/Shanghai）")
+    sample_count = Column(Integer, nullable=False, comment="块内采样点数")
+    first_timestamp = Column(DateTime, nullable=False, comment="块内最早采样时间")
+    last_timestamp = Column(DateTime, nullable=False, comment="块内最晚采样时间")
+    min_id = Column(Integer, nullable=False, index=True, comment="块内最小原记录 ID")
+    max_id = Column(Integer, nullable=False, comment="块内最大原记录 ID")
+    codec = Column(String, nullable=False, comment="数组编码格式")
+
+    timestamps = Column(LargeBinary, nullable=False, comment="相对块起点的微秒偏移")
+    ids = Column(LargeBinary, nullable=False, comment="原记录 ID")
+    irradiance = Column(LargeBinary, nullable=False, comment="太阳辐照度（W/m²，缺失为 NaN）")
+    temperature = Column(LargeBinary, nullable=False, comment="组件温度（°C，缺失为 NaN）")
+    created_at = Column(LargeBinary, nullable=False, comment="原记录接收时间（微秒）")
+
+    packed_at = Column(DateTime, nullable=False, comment="最近一次打包时间（本地时间）")
+
+    def __repr__(self):
+        return f"<MeasurementBlock(system_id={self.system_id}, block_start={self.block_start}, samples={self.sample_count})>"
+
+
+class MeasurementCoverage(Base):
+    """
+    数据完整性索引：每个系统每天一行，按分钟记录是否有测量数据。
+
+    由写入路径在同一事务中维护（删除记录时同步清除对应分钟），覆盖率、缺测区间与静默系统查询
+    只读取该表，不统计 measurements 行。日期与分钟均按存储时间（本地时间 Asia/Shanghai）划分。
+    """
+    __tablename__ = "measurement_coverage"
+
+    system_id = Column(String, primary_key=True, comment="光伏系统唯一标识")
+    day = Column(Date, primary_key=True, comment="日期（本地时间 Asia/Shanghai）")
+    minutes = Column(LargeBinary, nullable=False, comment="1440 位分钟位图（大端位序，第 n 位为当日第 n 分钟）")
+    present_minutes = Column(Integer, nullable=False, comment="有数据的分钟数")
+    updated_at = Column(DateTime, nullable=False, comment="最近更新时间（本地时间）")
+
+    __table_args__ = (
+        Index("ix_measurement_coverage_day", "day"),
+    )
+
+    def __repr__(self):
+        return f"<MeasurementCoverage(system_id={self.system_id}, day={self.day}, minutes={self.present_minutes})>"
@@ -0,0 +1,56 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Index
+from app.database.database import Base
+
+
+class ProductionPrediction(Base):
+    """
+    每个系统每小时的发电预测（物化表）。
+
+    由预测任务根据最近一次气象预报计算后写入（拉取预报后自动执行），
+    时间戳为该小时时段的起点，使用 Asia/Shanghai 本地时间（与 measurements 一致）。
+    """
+    __tablename__ = "production_predictions"
+
+    system_id = Column(String, primary_key=True, comment="光伏系统唯一标识")
+    timestamp = Column(DateTime, primary_key=True, comment="时段起点（本地时间 Asia/Shanghai）")
+
+    forecast_id = Column(Integer, nullable=False, comment="来源预报记录 ID（weather_forecast.id）")
+    ghi = Column(Float, nullable=True, comment="预报水平总辐照度（W/m²，时段平均）")
+    poa_irradiance = Column(Float, nullable=True, comment="倾斜面辐照度（W/m²）")
+    module_temperature = Column(Float, nullable=True, comment="组件温度（°C）")
+    ac_power_kw = Column(Float, nullable=True, comment="预测交流功率（kW，未配置容量时为空）")
+    energy_kwh = Column(Float, nullable=True, comment="时段发电量（kWh）")
+
+    computed_at = Column(DateTime, nullable=False, comment="计算时间（本地时间）")
+
+    __table_args__ = (
+        Index("ix_production_predictions_timestamp", "timestamp"),
+    )
+
+    def __repr__(self):
+        return f"<ProductionPrediction(system_id={self.system_id}, timestamp={self.timestamp}, power={self.ac_power_kw})>"
+
+
+class DailyProductionPrediction(Base):
+    """
+    每个系统每天的发电预测（物化表），日期为系统所在时区的本地日期。
+    """
+    __tablename__ = "daily_production_predictions"
+
+    system_id = Column(String, primary_key=True, comment="光伏系统唯一标识")
+    day = Column(Date, primary_key=True, comment="系统本地日期")
+
+    energy_kwh = Column(Float, nullable=True, comment="预测发电量（kWh，未配置容量时为空）")
+    peak_power_kw = Column(Float, nullable=True, comment="预测最大交流功率（kW）")
+    insolation = Column(Float, nullable=False, comment="倾斜面辐照量（kWh/m²，即峰值日照时数）")
+    hours = Column(Integer, nullable=False, comment="预报覆盖的小时数")
+    forecast_id = Column(Integer, nullable=False, comment="来源预报记录 ID")
+
+    computed_at = Column(DateTime, nullable=False, comment="计算时间（本地时间）")
+
+    __table_args__ = (
+        Index("ix_daily_production_predictions_day", "day"),
+    )
+
+    def __repr__(self):
+        return f"<DailyProductionPrediction(system_id={self.system_id}, day={self.day}, energy={self.energy_kwh})>"
@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Index
+from app.database.database import Base
+
+
+class NeighborValidation(Base):
+    """
+    每个系统最近一次近邻交叉校验的结果（辐照度传感器是否与周边系统一致）。
+
+    由校验任务（scripts/validate_neighbors.py）写入，每个系统一行，重新校验时覆盖。
+    """
+    __tablename__ = "neighbor_validations"
+
+    system_id = Column(String, primary_key=True, comment="光伏系统唯一标识")
+    status = Column(String, nullable=False, comment="ok / divergent / insufficient_neighbors / insufficient_data")
+    window_start = Column(DateTime, nullable=False, comment="校验时间范围起点（本地时间，含）")
+    window_end = Column(DateTime, nullable=False, comment="校验时间范围终点（本地时间，不含）")
+
+    neighbors = Column(JSON, nullable=False, comment="参与比较的近邻系统 [{system_id, distance_km}]")
+    evaluated_hours = Column(Integer, nullable=False, default=0, comment="参与比较的小时数")
+    divergent_hours = Column(Integer, nullable=False, default=0, comment="偏离近邻中位数超出容差的小时数")
+    median_ratio = Column(Float, nullable=True, comment="本系统与近邻中位数之比的中位数")
+
+    computed_at = Column(DateTime, nullable=False, comment="校验时间（本地时间）")
+
+    def __repr__(self):
+        return f"<NeighborValidation(system_id={self.system_id}, status={self.status}, ratio={self.median_ratio})>"
+
+
+class NeighborDivergence(Base):
+    """
+    近邻交叉校验中偏离近邻的小时（只记录超出容差的小时）。
+    时间戳为小时起点，使用 Asia/Shanghai 本地时间。
+    """
+    __tablename__ = "neighbor_divergences"
+
+    system_id = Column(String, primary_key=True, comment="光伏系统唯一标识")
+    hour = Column(DateTime, primary_key=True, comment="小时起点（本地时间）")
+
+    irradiance = Column(Float, nullable=False, comment="本系统小时平均辐照度（W/m²）")
+    neighbor_median = Column(Float, nullable=False, comment="近邻小时平均辐照度的中位数（W/m²）")
+    ratio = Column(Float, nullable=False, comment="本系统 / 近邻中位数")
+    neighbor_count = Column(Integer, nullable=False, comment="该小时有数据的近邻数")
+
+    computed_at = Column(DateTime, nullable=False, comment="校验时间（本地时间）")
+
+    __table_args__ = (
+        Index("ix_neighbor_divergences_hour", "hour"),
+    )
@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import List, Optional
+
+
+class DayCoverage(BaseModel):
+    """单日覆盖率。"""
+    day: date
+    expected_slots: int = Field(..., description="查询范围内当日的采样时段数")
+    present_slots: int = Field(..., description="有数据的采样时段数")
+    coverage: float = Field(..., description="覆盖率（%）")
+
+
+class CoverageResponse(BaseModel):
+    """系统在时间范围内的数据覆盖率。"""
+    system_id: str
+    start_time: datetime
+    end_time: datetime
+    interval_minutes: int
+    expected_slots: int
+    present_slots: int
+    coverage: float = Field(..., description="覆盖率（%）")
+    days: List[DayCoverage]
+
+
+class CoverageGap(BaseModel):
+    """一段连续缺测区间（结束时间为恢复数据的时刻，不含）。"""
+    start_time: datetime
+    end_time: datetime
+    minutes: int
+
+
+class GapListResponse(BaseModel):
+    """系统在时间范围内的缺测区间。"""
+    system_id: str
+    start_time: datetime
+    end_time: datetime
+    min_gap_minutes: int
+    total_gap_minutes: int
+    gaps: List[CoverageGap]
+
+
+class SilentSystem(BaseModel):
+    """时间范围内没有任何数据的系统。"""
+    system_id: str
+    name: str
+    is_active: bool
+    last_seen: Optional[datetime] = Field(None, description="最新一条测量的时间（可能晚于查询范围）")
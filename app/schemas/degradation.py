@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import Optional
+
+
+class DegradationResultResponse(BaseModel):
+    """单个系统单种方法的衰减率分析结果。"""
+    system_id: str
+    method: str = Field(..., description="yoy（同比法）/ rolling（滚动 Theil-Sen 回归）")
+    status: str = Field(..., description="ok / insufficient_data / missing_location / no_data")
+    rate_percent_per_year: Optional[float] = Field(None, description="年衰减率（%/年，负值表示性能下降）")
+    ci_low: Optional[float] = Field(None, description="68.2% 置信区间下界")
+    ci_high: Optional[float] = Field(None, description="68.2% 置信区间上界")
+    used_days: int
+    pairs: int
+    first_day: Optional[date] = None
+    last_day: Optional[date] = None
+    input_days: int
+    input_last_day: Optional[date] = None
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class LatestMeasurement(BaseModel):
+    """系统最新测量值。"""
+    measurement_id: int
+    timestamp: datetime
+    irradiance: Optional[float] = None
+    temperature: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class LatestWeather(BaseModel):
+    """系统最新实时气象快照（展平）。"""
+    fetched_at: datetime
+    shortwave_radiation: Optional[float] = None
+    cloud_cover: Optional[float] = None
+    temperature_2m: Optional[float] = None
+    wind_speed_10m: Optional[float] = None
+
+
+class FleetSystemStatus(BaseModel):
+    """单个系统的总览状态。"""
+    system_id: str
+    name: str
+    capacity: Optional[float] = None
+    timezone: Optional[str] = None
+    is_active: bool
+    latest_measurement: Optional[LatestMeasurement] = None
+    latest_weather: Optional[LatestWeather] = None
+    data_age_seconds: Optional[float] = Field(None, description="最新测量距当前的秒数")
+    status: str = Field(..., description="数据新鲜度：online / stale / no_data")
@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class JobCreate(BaseModel):
+    """提交后台任务。"""
+    kind: str = Field(..., description="任务类型（见 GET /jobs/kinds）")
+    params: Dict[str, Any] = Field(default_factory=dict, description="任务参数（日期与时间为 ISO 格式字符串）")
+    priority: int = Field(0, ge=-100, le=100, description="优先级（数值大的先执行）")
+    max_attempts: int = Field(1, ge=1, le=5, description="最多执行次数（失败后自动重试）")
+
+
+class JobResponse(BaseModel):
+    """后台任务状态。"""
+    id: int
+    kind: str
+    params: Dict[str, Any]
+    status: str = Field(..., description="pending / running / succeeded / failed / cancelled")
+    priority: int
+    progress: float = Field(..., description="进度（0~1）")
+    progress_message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    worker: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobSubmitResponse(BaseModel):
+    """提交结果；已有参数相同的待执行任务时返回该任务，created 为 false。"""
+    created: bool
+    job: JobResponse
@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import List, Optional
+
+
+class DailyKPIResponse(BaseModel):
+    """单个系统单日的性能指标。"""
+    system_id: str
+    day: date
+    sample_count: int
+    coverage: float = Field(..., description="有效积分时长占全天比例（0~1）")
+    peak_sun_hours: float = Field(..., description="峰值日照时数（h，数值等于辐照量 kWh/m²）")
+    max_irradiance: Optional[float] = None
+    module_temperature: Optional[float] = Field(None, description="辐照度加权的组件平均温度（°C）")
+    performance_ratio: float = Field(..., description="计算预期发电量使用的性能比（0~1）")
+    expected_energy_kwh: Optional[float] = None
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class KPISummaryItem(BaseModel):
+    """日期范围内的 KPI 汇总（按系统或按日分组，或全站合计）。"""
+    system_id: Optional[str] = None
+    day: Optional[date] = None
+    days: int = Field(..., description="参与汇总的系统日数")
+    peak_sun_hours: float = Field(..., description="峰值日照时数合计（h）")
+    mean_peak_sun_hours: Optional[float] = None
+    expected_energy_kwh: Optional[float] = Field(None, description="预期发电量合计（kWh）")
+    performance_ratio: Optional[float] = Field(None, description="平均性能比")
+    coverage: Optional[float] = Field(None, description="平均数据覆盖率")
+
+
+class KPISummaryResponse(BaseModel):
+    """KPI 汇总结果。"""
+    start_date: date
+    end_date: date
+    group_by: str
+    totals: KPISummaryItem
+    items: List[KPISummaryItem]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class MeasurementCreate(BaseModel):
@@ -34,7 +34,7 @@ class MeasurementResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 
 class MeasurementBatch(BaseModel):
@@ -56,3 +56,30 @@ class MeasurementBatch(BaseModel):
                 ]
             }
         }
+
+
+class IngestSummary(BaseModel):
+    """批量写入结果摘要（下位机列式批量上报的响应）。"""
+    received: int = Field(..., description="接收的读数条数")
+    written: int = Field(..., description="实际写入（插入或覆盖）的条数")
+    duplicates: int = Field(..., description="重复 (system_id, timestamp) 的条数")
+
+
+class ResampledSeries(BaseModel):
+    """单个系统在规则网格上的序列（与 timestamps 一一对应，缺失为 null）。"""
+    system_id: str
+    irradiance: List[Optional[float]] = Field(..., description="太阳辐照度（W/m²）")
+    temperature: List[Optional[float]] = Field(..., description="组件温度（°C）")
+    samples: List[int] = Field(..., description="各时段的原始采样数（0 表示值来自补缺或缺失）")
+
+
+class ResampleResponse(BaseModel):
+    """规则网格重采样结果。"""
+    start_time: datetime
+    end_time: datetime
+    interval_minutes: int
+    aggregation: str
+    fill: str
+    max_fill_minutes: int
+    timestamps: List[datetime] = Field(..., description="网格时段起点（本地时间 Asia/Shanghai）")
+    systems: List[ResampledSeries]
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import Optional
+
+
+class HourlyPredictionResponse(BaseModel):
+    """单个系统单个小时的发电预测。"""
+    system_id: str
+    timestamp: datetime = Field(..., description="时段起点（本地时间 Asia/Shanghai）")
+    forecast_id: int
+    ghi: Optional[float] = Field(None, description="预报水平总辐照度（W/m²）")
+    poa_irradiance: Optional[float] = Field(None, description="倾斜面辐照度（W/m²）")
+    module_temperature: Optional[float] = Field(None, description="组件温度（°C）")
+    ac_power_kw: Optional[float] = Field(None, description="预测交流功率（kW）")
+    energy_kwh: Optional[float] = Field(None, description="时段发电量（kWh）")
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class DailyPredictionResponse(BaseModel):
+    """单个系统单日的发电预测。"""
+    system_id: str
+    day: date = Field(..., description="系统本地日期")
+    energy_kwh: Optional[float] = Field(None, description="预测发电量（kWh）")
+    peak_power_kw: Optional[float] = Field(None, description="预测最大交流功率（kW）")
+    insolation: float = Field(..., description="倾斜面辐照量（kWh/m²）")
+    hours: int = Field(..., description="预报覆盖的小时数（小于 24 表示只覆盖当天部分时段）")
+    forecast_id: int
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,49 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+
+class NeighborResponse(BaseModel):
+    """近邻系统。"""
+    system_id: str
+    name: str
+    latitude: float
+    longitude: float
+    is_active: bool
+    distance_km: float = Field(..., description="大圆距离（公里）")
+
+
+class ValidationNeighbor(BaseModel):
+    """参与交叉校验的近邻。"""
+    system_id: str
+    distance_km: float
+
+
+class NeighborValidationResponse(BaseModel):
+    """单个系统最近一次近邻交叉校验的结果。"""
+    system_id: str
+    status: str = Field(..., description="ok / divergent / insufficient_neighbors / insufficient_data")
+    window_start: datetime
+    window_end: datetime
+    neighbors: List[ValidationNeighbor]
+    evaluated_hours: int
+    divergent_hours: int
+    median_ratio: Optional[float] = Field(None, description="本系统与近邻中位数之比的中位数")
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class NeighborDivergenceResponse(BaseModel):
+    """偏离近邻的小时。"""
+    system_id: str
+    hour: datetime = Field(..., description="小时起点（本地时间）")
+    irradiance: float
+    neighbor_median: float
+    ratio: float
+    neighbor_count: int
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -77,4 +77,4 @@ class SystemConfigurationResponse(BaseModel):
     updated_at: datetime
 
     class Config:
-        orm_mode = True
+        from_attributes = True
@@ -0,0 +1,3 @@
+"""
+业务服务包（写入、缓存等跨路由共享的逻辑）。
+"""
@@ -0,0 +1,205 @@
+"""
+HTTP 准入控制与过载保护。
+
+网络恢复时大量下位机同时补传积压数据，若全部放行会耗尽数据库连接，所有接口的延迟一起恶化。
+本模块在请求进入业务代码前按路由类别做并发限制：
+- 请求分为 ingest（下位机写入：POST /、POST /measurements/、POST /measurements/batch）
+  与 interactive（仪表盘查询及其他接口）两类；健康检查、指标、静态页面与 SSE 推送不受限制
+- 两类共享 ADMISSION_MAX_CONCURRENCY 个执行名额（应不超过数据库连接池容量），
+  ingest 最多同时占用 ADMISSION_INGEST_CONCURRENCY 个，其余名额始终留给查询
+- 名额释放时优先唤醒排队的 interactive 请求；有查询在排队时新到的写入请求也不会插队
+- 每类有界排队（ADMISSION_*_QUEUE）：队列已满立即返回 429，排队超时（ADMISSION_*_TIMEOUT_SECONDS）返回 503，
+  均带 Retry-After（加随机抖动，避免大量设备同时重试）
+- 限制按进程生效，多 worker 部署时总并发为各进程之和
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+from app.services.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_WAIT, ADMISSION_QUEUED, ADMISSION_REJECTIONS
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "12"))
+ADMISSION_INGEST_CONCURRENCY = int(os.getenv("ADMISSION_INGEST_CONCURRENCY", "4"))
+ADMISSION_INGEST_QUEUE = int(os.getenv("ADMISSION_INGEST_QUEUE", "64"))
+ADMISSION_INGEST_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_INGEST_TIMEOUT_SECONDS", "2"))
+ADMISSION_INTERACTIVE_QUEUE = int(os.getenv("ADMISSION_INTERACTIVE_QUEUE", "256"))
+ADMISSION_INTERACTIVE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_INTERACTIVE_TIMEOUT_SECONDS", "10"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+
+CLASS_INGEST = "ingest"
+CLASS_INTERACTIVE = "interactive"
+
+REASON_QUEUE_FULL = "queue_full"
+REASON_QUEUE_TIMEOUT = "queue_timeout"
+
+INGEST_PATHS = frozenset({"/", "/measurements", "/measurements/", "/measurements/batch"})
+EXEMPT_PATHS = frozenset({
+    "/health", "/metrics", "/docs", "/redoc", "/openapi.json",
+    "/admin", "/data-view", "/weather-view", "/measurements/stream",
+})
+EXEMPT_PREFIXES = ("/static/", "/docs/")
+
+
+def classify_request(method: str, path: str) -> Optional[str]:
+    """请求所属的路由类别；不受限制的请求返回 None。"""
+    if path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES):
+        return None
+    if method == "POST" and path in INGEST_PATHS:
+        return CLASS_INGEST
+    if path == "/" and method in ("GET", "HEAD"):
+        return None
+    return CLASS_INTERACTIVE
+
+
+@dataclass
+class ClassLimit:
+    """单个路由类别的限制（priority 越小越优先）。"""
+    priority: int
+    concurrency: int
+    queue_size: int
+    timeout_seconds: float
+
+
+class AdmissionRejected(Exception):
+    """请求被准入控制拒绝。"""
+
+    def __init__(self, route_class: str, reason: str, status_code: int, retry_after: int):
+        super().__init__(f"{route_class} request rejected: {reason}")
+        self.route_class = route_class
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def detail(self) -> str:
+        if self.reason == REASON_QUEUE_FULL:
+            return "Server is busy, request queue is full"
+        return "Server is busy, timed out waiting for capacity"
+
+
+class AdmissionController:
+    """
+    带优先级的共享并发名额（只在事件循环线程中使用，不需要加锁）。
+
+    acquire 成功后必须调用 release 归还名额。
+    """
+
+    def __init__(self, max_concurrency: int, limits: Dict[str, ClassLimit], retry_after_seconds: int = 5):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limits = limits
+        self.retry_after_seconds = max(1, retry_after_seconds)
+        self._running: Dict[str, int] = {name: 0 for name in limits}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in limits}
+        self._by_priority = sorted(limits, key=lambda name: limits[name].priority)
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    def queued(self, route_class: str) -> int:
+        return len(self._waiters[route_class])
+
+    def _has_capacity(self, route_class: str) -> bool:
+        return (
+            self.running < self.max_concurrency
+            and self._running[route_class] < self.limits[route_class].concurrency
+        )
+
+    def _higher_priority_waiting(self, route_class: str) -> bool:
+        priority = self.limits[route_class].priority
+        return any(
+            self._waiters[name] for name in self._by_priority if self.limits[name].priority <= priority
+        )
+
+    def _retry_after(self) -> int:
+        return self.retry_after_seconds + random.randint(0, self.retry_after_seconds)
+
+    def _grant(self, route_class: str) -> None:
+        self._running[route_class] += 1
+        ADMISSION_IN_FLIGHT.labels(route_class).inc()
+
+    async def acquire(self, route_class: str) -> float:
+        """
+        获取一个执行名额。
+
+        Returns:
+            排队时间（秒）
+
+        Raises:
+            AdmissionRejected: 队列已满（429）或排队超时（503）
+        """
+        limit = self.limits[route_class]
+        if self._has_capacity(route_class) and not self._higher_priority_waiting(route_class):
+            self._grant(route_class)
+            ADMISSION_QUEUE_WAIT.labels(route_class).observe(0.0)
+            return 0.0
+
+        waiters = self._waiters[route_class]
+        if len(waiters) >= limit.queue_size:
+            ADMISSION_REJECTIONS.labels(route_class, REASON_QUEUE_FULL).inc()
+            raise AdmissionRejected(route_class, REASON_QUEUE_FULL, 429, self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        ADMISSION_QUEUED.labels(route_class).inc()
+        start = time.perf_counter()
+        try:
+            # 不用 wait_for：超时与被唤醒同时发生时以 future 的状态为准，名额不会丢失
+            await asyncio.wait({future}, timeout=limit.timeout_seconds)
+        except BaseException:
+            # 客户端断开等原因取消时，若名额已分配则立即归还
+            if future.done() and not future.cancelled():
+                self.release(route_class)
+            raise
+        finally:
+            ADMISSION_QUEUED.labels(route_class).dec()
+            if not future.done():
+                waiters.remove(future)
+                future.cancel()
+        waited = time.perf_counter() - start
+        ADMISSION_QUEUE_WAIT.labels(route_class).observe(waited)
+        if future.cancelled():
+            ADMISSION_REJECTIONS.labels(route_class, REASON_QUEUE_TIMEOUT).inc()
+            raise AdmissionRejected(route_class, REASON_QUEUE_TIMEOUT, 503, self._retry_after())
+        return waited
+
+    def release(self, route_class: str) -> None:
+        """归还名额，并按优先级唤醒排队的请求。"""
+        self._running[route_class] -= 1
+        ADMISSION_IN_FLIGHT.labels(route_class).dec()
+        for name in self._by_priority:
+            waiters = self._waiters[name]
+            while waiters and self._has_capacity(name):
+                future = waiters.popleft()
+                if not future.done():
+                    self._grant(name)
+                    future.set_result(None)
+            if waiters:
+                # 高优先级仍在排队时不唤醒低优先级请求
+                return
+
+
+admission = AdmissionController(
+    ADMISSION_MAX_CONCURRENCY,
+    {
+        CLASS_INTERACTIVE: ClassLimit(
+            priority=0,
+            concurrency=ADMISSION_MAX_CONCURRENCY,
+            queue_size=ADMISSION_INTERACTIVE_QUEUE,
+            timeout_seconds=ADMISSION_INTERACTIVE_TIMEOUT_SECONDS,
+        ),
+        CLASS_INGEST: ClassLimit(
+            priority=1,
+            concurrency=ADMISSION_INGEST_CONCURRENCY,
+            queue_size=ADMISSION_INGEST_QUEUE,
+            timeout_seconds=ADMISSION_INGEST_TIMEOUT_SECONDS,
+        ),
+    },
+    ADMISSION_RETRY_AFTER_SECONDS,
+)
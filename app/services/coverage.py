@@ -0,0 +1,392 @@
+"""
+数据完整性索引（measurement_coverage）。
+
+每个系统每天一个 1440 位的分钟位图：写入路径在同一事务中置位，删除记录时若该分钟已无其他采样则清除。
+覆盖率、缺测区间与静默系统查询只读取位图，不统计 measurements 行。
+不经过写入路径的数据（合成数据、PostgreSQL 回填的 COPY 路径）用 rebuild_coverage 按日期重建。
+"""
+
+import os
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.database.sharding import fan_out, fan_out_by_system, shard_scope
+from app.models.measurement import Measurement, MeasurementBlock, MeasurementCoverage
+from app.services.packed_storage import PACKED_STORAGE_ENABLED, packed_timestamps
+from app.utils.time_utils import get_local_now
+
+COVERAGE_TRACKING_ENABLED = os.getenv("COVERAGE_TRACKING_ENABLED", "1") == "1"
+
+MINUTES_PER_DAY = 24 * 60
+_EMPTY_BITMAP = bytes(MINUTES_PER_DAY // 8)
+# 重建时每次读取的天数（一个系统一个月的分钟级数据约 4.5 万条时间戳）
+REBUILD_WINDOW_DAYS = 31
+
+
+# ---- 位图编解码 ----
+
+def _to_bits(blob: bytes) -> np.ndarray:
+    return np.unpackbits(np.frombuffer(blob, dtype=np.uint8)).astype(bool)
+
+
+def _to_blob(bits: np.ndarray) -> bytes:
+    return np.packbits(bits).tobytes()
+
+
+def minute_numbers(timestamps: Sequence[Any]) -> np.ndarray:
+    """时间戳（datetime 或 datetime64）转换为自 1970-01-01 00:00 起的分钟序号（本地时间，不做时区换算）。"""
+    return np.asarray(timestamps, dtype="datetime64[m]").astype(np.int64)
+
+
+def _minute_to_datetime(minute: int) -> datetime:
+    return np.datetime64(int(minute), "m").astype("datetime64[us]").tolist()
+
+
+def _day_of(day_number: int) -> date:
+    return np.datetime64(int(day_number), "D").tolist()
+
+
+def _day_number(day: date) -> int:
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+def day_bitmaps(minutes: np.ndarray) -> Dict[date, np.ndarray]:
+    """按日期分组的分钟位图（布尔数组，长度 1440）。"""
+    result: Dict[date, np.ndarray] = {}
+    if not len(minutes):
+        return result
+    days = minutes // MINUTES_PER_DAY
+    order = np.argsort(days, kind="stable")
+    days, minutes = days[order], minutes[order]
+    bounds = np.flatnonzero(np.diff(days)) + 1
+    for chunk_days, chunk_minutes in zip(np.split(days, bounds), np.split(minutes, bounds)):
+        bits = np.zeros(MINUTES_PER_DAY, dtype=bool)
+        bits[chunk_minutes % MINUTES_PER_DAY] = True
+        result[_day_of(chunk_days[0])] = bits
+    return result
+
+
+# ---- 写入与删除路径 ----
+
+def _lock_bitmaps(db: Session, keys: Sequence[Tuple[str, date]]) -> Dict[Tuple[str, date], bytes]:
+    """按 (system_id, day) 顺序加行锁读取位图（PostgreSQL 为 SELECT ... FOR UPDATE）。"""
+    days_by_system: Dict[str, List[date]] = {}
+    for system_id, day in keys:
+        days_by_system.setdefault(system_id, []).append(day)
+    table = MeasurementCoverage.__table__
+    stored: Dict[Tuple[str, date], bytes] = {}
+    for system_id in sorted(days_by_system):
+        rows = db.execute(
+            select(table.c.day, table.c.minutes)
+            .where(table.c.system_id == system_id, table.c.day.in_(days_by_system[system_id]))
+            .order_by(table.c.day)
+            .with_for_update()
+        ).all()
+        stored.update({(system_id, row.day): row.minutes for row in rows})
+    return stored
+
+
+def mark_coverage(db: Session, insert, rows: Sequence[Any]) -> None:
+    """
+    将写入的记录置位到完整性索引（不提交事务，与测量记录在同一事务中生效）。
+
+    先以 ON CONFLICT DO NOTHING 补齐缺失的行，再加行锁读取、按位或合并，
+    并发写入同一系统日期时不会丢失置位；位图未变化的行不更新。
+
+    Args:
+        db: 数据库会话
+        insert: 方言 insert 构造函数（见 get_dialect_insert）
+        rows: 实际写入的记录（需含 system_id 与 timestamp）
+    """
+    if not rows:
+        return
+    timestamps_by_system: Dict[str, List[datetime]] = {}
+    for row in rows:
+        timestamps_by_system.setdefault(row.system_id, []).append(row.timestamp)
+    incoming: Dict[Tuple[str, date], np.ndarray] = {}
+    for system_id, timestamps in timestamps_by_system.items():
+        for day, bits in day_bitmaps(minute_numbers(timestamps)).items():
+            incoming[(system_id, day)] = bits
+
+    now = get_local_now()
+    keys = sorted(incoming)
+    table = MeasurementCoverage.__table__
+    db.execute(
+        insert(table)
+        .values([
+            {"system_id": system_id, "day": day, "minutes": _EMPTY_BITMAP, "present_minutes": 0, "updated_at": now}
+            for system_id, day in keys
+        ])
+        .on_conflict_do_nothing(index_elements=["system_id", "day"])
+    )
+    stored = _lock_bitmaps(db, keys)
+
+    changes = []
+    for key in keys:
+        current = stored.get(key, _EMPTY_BITMAP)
+        merged = _to_bits(current) | incoming[key]
+        blob = _to_blob(merged)
+        if blob != current:
+            changes.append({
+                "system_id": key[0],
+                "day": key[1],
+                "minutes": blob,
+                "present_minutes": int(merged.sum()),
+                "updated_at": now,
+            })
+    if changes:
+        db.execute(update(MeasurementCoverage), changes)
+
+
+def _minute_has_samples(db: Session, system_id: str, minute_start: datetime) -> bool:
+    minute_end = minute_start + timedelta(minutes=1)
+    exists = db.query(Measurement.id).filter(
+        Measurement.system_id == system_id,
+        Measurement.timestamp >= minute_start,
+        Measurement.timestamp < minute_end,
+    ).first() is not None
+    if not exists and PACKED_STORAGE_ENABLED:
+        exists = len(packed_timestamps(db, system_id, minute_start, minute_end)) > 0
+    return exists
+
+
+def unmark_measurement(db: Session, system_id: str, timestamp: datetime) -> None:
+    """删除记录后调用（不提交事务）：该分钟内已无其他采样时清除对应位，整天无数据时删除该行。"""
+    with shard_scope(db, system_id):
+        db.flush()
+        minute_start = timestamp.replace(second=0, microsecond=0)
+        if _minute_has_samples(db, system_id, minute_start):
+            return
+        record = db.get(MeasurementCoverage, (system_id, minute_start.date()), with_for_update=True)
+        if record is None:
+            return
+        bits = _to_bits(record.minutes)
+        bits[minute_start.hour * 60 + minute_start.minute] = False
+        if not bits.any():
+            db.delete(record)
+            return
+        record.minutes = _to_blob(bits)
+        record.present_minutes = int(bits.sum())
+        record.updated_at = get_local_now()
+
+
+def rebuild_coverage(db: Session, system_id: str, start_day: date, end_day: date) -> int:
+    """
+    按实际数据（行存储与已打包数据块）重建系统在 [start_day, end_day] 的完整性索引（不提交事务）。
+
+    Returns:
+        有数据的天数
+    """
+    with shard_scope(db, system_id):
+        table = MeasurementCoverage.__table__
+        now = get_local_now()
+        days_with_data = 0
+        window_start = start_day
+        while window_start <= end_day:
+            window_end = min(window_start + timedelta(days=REBUILD_WINDOW_DAYS - 1), end_day)
+            start_time = datetime.combine(window_start, dt_time.min)
+            end_time = datetime.combine(window_end + timedelta(days=1), dt_time.min)
+
+            stamps = db.execute(
+                select(Measurement.timestamp).where(
+                    Measurement.system_id == system_id,
+                    Measurement.timestamp >= start_time,
+                    Measurement.timestamp < end_time,
+                )
+            ).scalars().all()
+            minutes = minute_numbers(stamps)
+            if PACKED_STORAGE_ENABLED:
+                minutes = np.concatenate([minutes, minute_numbers(packed_timestamps(db, system_id, start_time, end_time))])
+
+            db.query(MeasurementCoverage).filter(
+                MeasurementCoverage.system_id == system_id,
+                MeasurementCoverage.day >= window_start,
+                MeasurementCoverage.day <= window_end,
+            ).delete(synchronize_session=False)
+            bitmaps = day_bitmaps(minutes)
+            if bitmaps:
+                db.execute(table.insert(), [
+                    {
+                        "system_id": system_id,
+                        "day": day,
+                        "minutes": _to_blob(bits),
+                        "present_minutes": int(bits.sum()),
+                        "updated_at": now,
+                    }
+                    for day, bits in bitmaps.items()
+                ])
+            days_with_data += len(bitmaps)
+            window_start = window_end + timedelta(days=1)
+        return days_with_data
+
+
+def systems_with_measurements(db: Session) -> List[str]:
+    """有测量数据（含已打包数据块）的全部系统（分片时汇总各分片）。"""
+    system_ids: Set[str] = set()
+    for shard_ids in fan_out(db, _shard_systems):
+        system_ids.update(shard_ids)
+    return sorted(system_ids)
+
+
+def _shard_systems(db: Session) -> Set[str]:
+    system_ids = {row[0] for row in db.query(Measurement.system_id).distinct()}
+    if PACKED_STORAGE_ENABLED:
+        system_ids.update(row[0] for row in db.query(MeasurementBlock.system_id).distinct())
+    return system_ids
+
+
+def data_day_range(db: Session, system_id: str) -> Optional[Tuple[date, date]]:
+    """系统测量数据（含已打包数据块）的首末日期，无数据时返回 None。"""
+    with shard_scope(db, system_id):
+        first, last = db.query(
+            func.min(Measurement.timestamp), func.max(Measurement.timestamp)
+        ).filter(Measurement.system_id == system_id).one()
+        if PACKED_STORAGE_ENABLED:
+            packed_first, packed_last = db.query(
+                func.min(MeasurementBlock.first_timestamp), func.max(MeasurementBlock.last_timestamp)
+            ).filter(MeasurementBlock.system_id == system_id).one()
+            first = min((v for v in (first, packed_first) if v is not None), default=None)
+            last = max((v for v in (last, packed_last) if v is not None), default=None)
+        if first is None:
+            return None
+        return first.date(), last.date()
+
+
+# ---- 查询 ----
+
+def _minute_range(start_time: datetime, end_time: datetime) -> Tuple[int, int]:
+    """查询范围对应的分钟序号 [first, last)：开始时间向下取整、结束时间向上取整到分钟。"""
+    first = int(minute_numbers([start_time])[0])
+    last = int(minute_numbers([end_time])[0])
+    if end_time.second or end_time.microsecond:
+        last += 1
+    return first, last
+
+
+def _day_bounds(first: int, last: int) -> Tuple[date, date]:
+    return _day_of(first // MINUTES_PER_DAY), _day_of((last - 1) // MINUTES_PER_DAY)
+
+
+def _overlap(day: date, blob: bytes, first: int, last: int) -> Tuple[int, np.ndarray]:
+    """位图与 [first, last) 的重叠部分，返回 (重叠起始分钟序号, 位数组)。"""
+    day_first = _day_number(day) * MINUTES_PER_DAY
+    lo = max(first, day_first)
+    hi = min(last, day_first + MINUTES_PER_DAY)
+    return lo, _to_bits(blob)[lo - day_first:hi - day_first]
+
+
+def range_bitmap(db: Session, system_id: str, start_time: datetime, end_time: datetime) -> Tuple[int, np.ndarray]:
+    """
+    读取系统在时间范围内的逐分钟数据存在性。
+
+    Returns:
+        (首分钟序号, 布尔数组)；数组第 i 位对应首分钟之后第 i 分钟
+    """
+    with shard_scope(db, system_id):
+        first, last = _minute_range(start_time, end_time)
+        bits = np.zeros(max(last - first, 0), dtype=bool)
+        if not len(bits):
+            return first, bits
+        first_day, last_day = _day_bounds(first, last)
+        rows = db.query(MeasurementCoverage.day, MeasurementCoverage.minutes).filter(
+            MeasurementCoverage.system_id == system_id,
+            MeasurementCoverage.day >= first_day,
+            MeasurementCoverage.day <= last_day,
+        )
+        for day, blob in rows:
+            lo, overlap = _overlap(day, blob, first, last)
+            bits[lo - first:lo - first + len(overlap)] = overlap
+        return first, bits
+
+
+def slot_coverage(first: int, bits: np.ndarray, interval_minutes: int) -> List[Dict[str, Any]]:
+    """
+    按采样间隔统计每天的覆盖情况：时段按当日零点对齐，时段内任一分钟有数据即视为有数据。
+
+    Returns:
+        每天一项：day、expected_slots、present_slots
+    """
+    if not len(bits):
+        return []
+    slots = (first + np.arange(len(bits))) // interval_minutes
+    slot_index = slots - slots[0]
+    present = np.bincount(slot_index, weights=bits, minlength=slot_index[-1] + 1) > 0
+    slot_days = (slots[0] + np.arange(len(present))) * interval_minutes // MINUTES_PER_DAY
+    days, expected = np.unique(slot_days, return_counts=True)
+    present_counts = np.bincount(slot_days - days[0], weights=present)[days - days[0]]
+    return [
+        {"day": _day_of(day), "expected_slots": int(total), "present_slots": int(count)}
+        for day, total, count in zip(days, expected, present_counts)
+    ]
+
+
+def find_gaps(first: int, bits: np.ndarray, min_gap_minutes: int = 1) -> List[Dict[str, Any]]:
+    """
+    连续无数据的区间（不短于 min_gap_minutes 分钟），结束时间为恢复数据的分钟（不含）。
+    """
+    padded = np.concatenate(([True], bits, [True])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == -1)
+    ends = np.flatnonzero(edges == 1)
+    keep = (ends - starts) >= min_gap_minutes
+    return [
+        {
+            "start_time": _minute_to_datetime(first + start),
+            "end_time": _minute_to_datetime(first + end),
+            "minutes": int(end - start),
+        }
+        for start, end in zip(starts[keep], ends[keep])
+    ]
+
+
+def systems_with_data(db: Session, system_ids: Sequence[str], start_time: datetime, end_time: datetime) -> Set[str]:
+    """
+    返回时间范围内有数据的系统。
+
+    范围完整覆盖的日期只按 present_minutes 判断，首尾不完整的日期才解码位图；分片时在各分片上并行查询。
+    """
+    found: Set[str] = set()
+    for shard_found in fan_out_by_system(
+        db, list(system_ids), lambda session, ids: _systems_with_data(session, ids, start_time, end_time)
+    ):
+        found.update(shard_found)
+    return found
+
+
+def _systems_with_data(db: Session, system_ids: Sequence[str], start_time: datetime, end_time: datetime) -> Set[str]:
+    first, last = _minute_range(start_time, end_time)
+    if last <= first or not system_ids:
+        return set()
+    first_day, last_day = _day_bounds(first, last)
+    full_first = first_day if first % MINUTES_PER_DAY == 0 else first_day + timedelta(days=1)
+    full_last = last_day if last % MINUTES_PER_DAY == 0 else last_day - timedelta(days=1)
+
+    found: Set[str] = set()
+    candidates = list(system_ids)
+    if full_first <= full_last:
+        found.update(
+            row[0] for row in db.query(MeasurementCoverage.system_id).filter(
+                MeasurementCoverage.system_id.in_(candidates),
+                MeasurementCoverage.day >= full_first,
+                MeasurementCoverage.day <= full_last,
+                MeasurementCoverage.present_minutes > 0,
+            ).distinct()
+        )
+    partial_days = {first_day, last_day} - (
+        {full_first, full_last} if full_first <= full_last else set()
+    )
+    remaining = [system_id for system_id in candidates if system_id not in found]
+    if partial_days and remaining:
+        rows = db.query(MeasurementCoverage.system_id, MeasurementCoverage.day, MeasurementCoverage.minutes).filter(
+            MeasurementCoverage.system_id.in_(remaining),
+            MeasurementCoverage.day.in_(sorted(partial_days)),
+        )
+        for system_id, day, blob in rows:
+            if system_id not in found and _overlap(day, blob, first, last)[1].any():
+                found.add(system_id)
+    return found
@@ -0,0 +1,190 @@
+"""
+按系统、按天的测量数据响应缓存。
+
+已结束的历史日期数据几乎不再变化，但每次访问都会重新查询与序列化。本模块缓存
+预编码好的 JSON 响应体，键为 (system_id, 日期, 分辨率)：
+- 内存层：按字节数限制大小的 LRU
+- 磁盘层（可选，设置 DAY_CACHE_DIR 启用）：多进程共享，内存未命中时读取并提升到内存
+- 写入路径写入某系统某天的数据时，仅失效该系统当天的全部缓存条目
+- 内存与磁盘条目均有存活时间上限（DAY_CACHE_TTL_SECONDS，磁盘条目按文件修改时间计算），
+  限制未注册失效回调的进程写入时的过期窗口
+"""
+
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from app.utils.time_utils import get_local_now
+
+DAY_CACHE_ENABLED = os.getenv("DAY_CACHE_ENABLED", "1") == "1"
+DAY_CACHE_MAX_BYTES = int(os.getenv("DAY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DAY_CACHE_TTL_SECONDS = float(os.getenv("DAY_CACHE_TTL_SECONDS", "3600"))
+DAY_CACHE_DIR = os.getenv("DAY_CACHE_DIR") or None
+
+# 记录失效版本号的系统-日期数量上限（只用于防止并发写入时缓存旧数据）
+_MAX_TRACKED_GENERATIONS = 100_000
+
+CacheKey = Tuple[str, date, str]
+
+
+class DayResponseCache:
+    """系统-日期响应缓存（线程安全）。"""
+
+    def __init__(
+        self,
+        max_bytes: int = DAY_CACHE_MAX_BYTES,
+        ttl_seconds: float = DAY_CACHE_TTL_SECONDS,
+        cache_dir: Optional[str] = DAY_CACHE_DIR,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, Tuple[bytes, float]]" = OrderedDict()
+        self._keys_by_day: Dict[Tuple[str, date], set] = {}
+        self._generations: "OrderedDict[Tuple[str, date], int]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ---- 磁盘层 ----
+
+    def _day_dir(self, system_id: str, day: date) -> str:
+        return os.path.join(self.cache_dir, quote(system_id, safe=""), day.isoformat())
+
+    def _disk_path(self, key: CacheKey) -> str:
+        system_id, day, resolution = key
+        return os.path.join(self._day_dir(system_id, day), quote(resolution, safe="") + ".json")
+
+    def _disk_read(self, key: CacheKey) -> Optional[Tuple[bytes, float]]:
+        """读取磁盘条目，返回 (响应体, 已存在秒数)；超过存活时间的条目删除并返回 None。"""
+        path = self._disk_path(key)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                return f.read(), max(age, 0.0)
+        except OSError:
+            return None
+
+    def _disk_write(self, key: CacheKey, body: bytes) -> None:
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"❌ 日缓存写入磁盘失败 {path}: {e}")
+
+    # ---- 内存层 ----
+
+    def _store(self, key: CacheKey, body: bytes, age: float = 0.0) -> None:
+        self._drop(key)
+        self._entries[key] = (body, time.monotonic() - age)
+        self._keys_by_day.setdefault(key[:2], set()).add(key)
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry[0])
+        keys = self._keys_by_day.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_day[key[:2]]
+
+    # ---- 对外接口 ----
+
+    def generation(self, system_id: str, day: date) -> int:
+        """返回系统-日期的失效版本号；查询前获取，写缓存时校验，避免并发写入期间缓存旧数据。"""
+        with self._lock:
+            return self._generations.get((system_id, day), 0)
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, stored_at = entry
+                if time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+                self._drop(key)
+
+        if self.cache_dir:
+            entry = self._disk_read(key)
+            if entry is not None:
+                body, age = entry
+                with self._lock:
+                    # 提升到内存层时沿用磁盘条目的写入时间，存活时间不因提升而延长
+                    self._store(key, body, age)
+                    self.disk_hits += 1
+                return body
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, body: bytes, generation: int) -> None:
+        """写入缓存；若查询期间该系统-日期已被写入失效则放弃。"""
+        with self._lock:
+            if self._generations.get(key[:2], 0) != generation:
+                return
+            self._store(key, body)
+        if self.cache_dir:
+            self._disk_write(key, body)
+
+    def invalidate(self, system_id: str, day: date) -> None:
+        """失效某系统某天的全部缓存条目（内存与磁盘）。"""
+        day_key = (system_id, day)
+        with self._lock:
+            self._generations[day_key] = self._generations.get(day_key, 0) + 1
+            self._generations.move_to_end(day_key)
+            while len(self._generations) > _MAX_TRACKED_GENERATIONS:
+                self._generations.popitem(last=False)
+            for key in list(self._keys_by_day.get(day_key, ())):
+                self._drop(key)
+            self.invalidations += 1
+        if self.cache_dir:
+            shutil.rmtree(self._day_dir(system_id, day), ignore_errors=True)
+
+    def on_ingest(self, source: str, rows: List[Any]) -> None:
+        """写入回调：按写入记录涉及的系统-日期失效缓存（当天及以后的日期不缓存，无需失效）。"""
+        today = get_local_now().date()
+        for system_id, day in {(row.system_id, row.timestamp.date()) for row in rows}:
+            if day < today:
+                self.invalidate(system_id, day)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "disk_tier": bool(self.cache_dir),
+            }
+
+
+# 写入回调由 register_writer_listeners 在各写入进程启动时注册
+day_cache = DayResponseCache()
@@ -0,0 +1,317 @@
+"""
+多年衰减率分析。
+
+性能指数取每日实测倾斜面辐照量（daily_kpis.peak_sun_hours）与晴空模型倾斜面辐照量之比：
+晴空日该比值反映传感器与组件表面的长期变化（积灰、老化、遮挡），据此估计年衰减率。
+当前测量数据不含发电量，接入功率数据后可将性能指数替换为实际/预期发电量之比，分析流程不变。
+
+- 晴空筛选（晴空指数与覆盖率阈值）与 MAD 离群值剔除后，分别用同比法与滚动 Theil-Sen 回归估计
+- 全站分析在进程池中按系统并行，子进程只读数据库，结果由主进程统一写入 degradation_results
+- 每个系统的结果带输入签名与参数签名，未变化时跳过，只有新增天数或重算过 KPI 的系统才重新分析
+"""
+
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.calculations.degradation import (
+    mad_outlier_mask,
+    quality_mask,
+    rolling_median,
+    theil_sen_degradation,
+    yoy_degradation,
+)
+from app.calculations.insolation import STC_IRRADIANCE
+from app.calculations.solar import clear_sky_ghi, plane_of_array_irradiance, solar_position
+from app.database.database import SessionLocal, dispose_engines
+from app.models.degradation import DegradationResult
+from app.models.kpi import DailyKPI
+from app.models.system_config import SystemConfiguration
+from app.utils.time_utils import SYSTEM_TIMEZONE, get_local_now, get_zone, local_to_epochs
+
+DEGRADATION_CLEAR_SKY_MIN = float(os.getenv("DEGRADATION_CLEAR_SKY_MIN", "0.8"))
+DEGRADATION_CLEAR_SKY_MAX = float(os.getenv("DEGRADATION_CLEAR_SKY_MAX", "1.2"))
+DEGRADATION_MIN_COVERAGE = float(os.getenv("DEGRADATION_MIN_COVERAGE", "0.9"))
+DEGRADATION_OUTLIER_Z = float(os.getenv("DEGRADATION_OUTLIER_Z", "3.5"))
+
+METHOD_YOY = "yoy"
+METHOD_ROLLING = "rolling"
+METHODS = (METHOD_YOY, METHOD_ROLLING)
+
+STATUS_OK = "ok"
+STATUS_INSUFFICIENT = "insufficient_data"
+STATUS_MISSING_LOCATION = "missing_location"
+STATUS_NO_DATA = "no_data"
+
+# 晴空模型积分步长（分钟）与晴空散射比例（与合成数据生成器一致）
+_CLEAR_SKY_STEP_MINUTES = 5
+_CLEAR_SKY_DIFFUSE_FRACTION = 0.2
+# 参数变化时需要全部重算，算法调整时修改版本号
+_ALGORITHM_VERSION = "1"
+
+
+@dataclass
+class DegradationRunStats:
+    """一次衰减分析任务的统计。"""
+    systems: int = 0
+    analyzed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+
+def params_hash() -> str:
+    """当前分析参数的签名。"""
+    text = "|".join(str(v) for v in (
+        _ALGORITHM_VERSION,
+        DEGRADATION_CLEAR_SKY_MIN,
+        DEGRADATION_CLEAR_SKY_MAX,
+        DEGRADATION_MIN_COVERAGE,
+        DEGRADATION_OUTLIER_Z,
+    ))
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def clear_sky_daily_insolation(
+    days: np.ndarray,
+    latitude: float,
+    longitude: float,
+    tilt: float,
+    surface_azimuth: float,
+    tz_name: str,
+) -> np.ndarray:
+    """晴空模型的每日倾斜面辐照量（kWh/m²，即晴空峰值日照时数），days 为系统本地日期（datetime64[D]）。"""
+    steps = 24 * 60 // _CLEAR_SKY_STEP_MINUTES
+    local = (
+        days.astype("datetime64[m]")[:, None]
+        + np.arange(steps) * np.timedelta64(_CLEAR_SKY_STEP_MINUTES, "m")
+    ).ravel()
+    epochs = local_to_epochs(local, tz_name)
+    zenith, azimuth = solar_position(epochs, latitude, longitude)
+    ghi = clear_sky_ghi(zenith)
+    poa = plane_of_array_irradiance(ghi, ghi * _CLEAR_SKY_DIFFUSE_FRACTION, zenith, azimuth, tilt, surface_azimuth)
+    return poa.reshape(len(days), steps).sum(axis=1) * _CLEAR_SKY_STEP_MINUTES / 60 / STC_IRRADIANCE
+
+
+_EMPTY_RESULT = {
+    "rate_percent_per_year": None,
+    "ci_low": None,
+    "ci_high": None,
+    "used_days": 0,
+    "pairs": 0,
+    "first_day": None,
+    "last_day": None,
+}
+
+
+def _result(system_id: str, method: str, status: str, **values) -> Dict[str, Any]:
+    return {"system_id": system_id, "method": method, "status": status, **values}
+
+
+def analyze_system(system: Dict[str, Any], methods: Sequence[str] = METHODS) -> List[Dict[str, Any]]:
+    """
+    分析单个系统（可在子进程中执行，只读数据库）。
+
+    Args:
+        system: 系统参数（system_id、latitude、longitude、tilt_angle、azimuth、timezone）
+        methods: 分析方法
+
+    Returns:
+        每种方法一条结果字典（不含签名字段）
+    """
+    system_id = system["system_id"]
+    if system.get("latitude") is None or system.get("longitude") is None:
+        return [_result(system_id, method, STATUS_MISSING_LOCATION) for method in methods]
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(DailyKPI.day, DailyKPI.peak_sun_hours, DailyKPI.coverage)
+            .filter(DailyKPI.system_id == system_id)
+            .order_by(DailyKPI.day)
+            .all()
+        )
+    finally:
+        db.close()
+    if not rows:
+        return [_result(system_id, method, STATUS_NO_DATA) for method in methods]
+
+    days = np.array([row.day for row in rows], dtype="datetime64[D]")
+    measured = np.array([row.peak_sun_hours for row in rows], dtype=np.float64)
+    coverage = np.array([row.coverage for row in rows], dtype=np.float64)
+    tz_name = system.get("timezone") if get_zone(system.get("timezone")) else SYSTEM_TIMEZONE
+    clear = clear_sky_daily_insolation(
+        days,
+        system["latitude"],
+        system["longitude"],
+        system.get("tilt_angle") or 0.0,
+        system.get("azimuth") if system.get("azimuth") is not None else 180.0,
+        tz_name,
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        index = np.where(clear > 0, measured / clear, np.nan)
+
+    keep = quality_mask(index, coverage, DEGRADATION_CLEAR_SKY_MIN, DEGRADATION_CLEAR_SKY_MAX, DEGRADATION_MIN_COVERAGE)
+    keep &= mad_outlier_mask(np.where(keep, index, np.nan), DEGRADATION_OUTLIER_Z)
+    day_numbers = days[keep].astype(np.int64)
+    values = index[keep]
+    span = {
+        "used_days": int(keep.sum()),
+        "first_day": days[keep][0].tolist() if keep.any() else None,
+        "last_day": days[keep][-1].tolist() if keep.any() else None,
+    }
+
+    results = []
+    for method in methods:
+        if method == METHOD_YOY:
+            fit = yoy_degradation(day_numbers, values)
+            pairs = fit["pairs"]
+        else:
+            centers, medians = rolling_median(day_numbers, values)
+            fit = theil_sen_degradation(centers, medians)
+            pairs = fit["points"]
+        status = STATUS_OK if fit["rate"] is not None else STATUS_INSUFFICIENT
+        results.append(_result(
+            system_id,
+            method,
+            status,
+            rate_percent_per_year=round(fit["rate"], 4) if fit["rate"] is not None else None,
+            ci_low=round(fit["ci_low"], 4) if fit["ci_low"] is not None else None,
+            ci_high=round(fit["ci_high"], 4) if fit["ci_high"] is not None else None,
+            pairs=pairs,
+            **span,
+        ))
+    return results
+
+
+def _init_worker():
+    # 子进程不复用父进程的数据库连接
+    dispose_engines()
+
+
+def _input_signatures(db: Session, system_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    rows = (
+        db.query(
+            DailyKPI.system_id,
+            func.count().label("days"),
+            func.max(DailyKPI.day).label("last_day"),
+            func.max(DailyKPI.computed_at).label("computed_at"),
+        )
+        .filter(DailyKPI.system_id.in_(list(system_ids)))
+        .group_by(DailyKPI.system_id)
+        .all()
+    )
+    return {
+        row.system_id: {"input_days": row.days, "input_last_day": row.last_day, "input_computed_at": row.computed_at}
+        for row in rows
+    }
+
+
+def _is_current(cached: Dict[str, DegradationResult], methods: Sequence[str], signature: Dict[str, Any], current_hash: str) -> bool:
+    for method in methods:
+        result = cached.get(method)
+        if result is None or result.params_hash != current_hash:
+            return False
+        if (result.input_days, result.input_last_day, result.input_computed_at) != (
+            signature["input_days"], signature["input_last_day"], signature["input_computed_at"]
+        ):
+            return False
+    return True
+
+
+def run_degradation(
+    db: Session,
+    system_ids: Optional[Sequence[str]] = None,
+    methods: Sequence[str] = METHODS,
+    workers: int = 1,
+    force: bool = False,
+) -> DegradationRunStats:
+    """
+    分析全部启用系统（或指定系统）的衰减率，输入与参数均未变化的系统跳过。
+
+    Args:
+        workers: 进程数；为 1 时在当前进程内顺序执行
+        force: 忽略缓存全部重算
+    """
+    began = time.perf_counter()
+    stats = DegradationRunStats()
+    query = db.query(SystemConfiguration)
+    if system_ids:
+        query = query.filter(SystemConfiguration.system_id.in_(list(system_ids)))
+    else:
+        query = query.filter(SystemConfiguration.is_active == True)
+    systems = [
+        {
+            "system_id": config.system_id,
+            "latitude": config.latitude,
+            "longitude": config.longitude,
+            "tilt_angle": config.tilt_angle,
+            "azimuth": config.azimuth,
+            "timezone": config.timezone,
+        }
+        for config in query.order_by(SystemConfiguration.system_id).all()
+    ]
+    stats.systems = len(systems)
+
+    ids = [system["system_id"] for system in systems]
+    signatures = _input_signatures(db, ids) if ids else {}
+    cached: Dict[str, Dict[str, DegradationResult]] = {}
+    for result in db.query(DegradationResult).filter(DegradationResult.system_id.in_(ids)).all() if ids else []:
+        cached.setdefault(result.system_id, {})[result.method] = result
+    current_hash = params_hash()
+    empty_signature = {"input_days": 0, "input_last_day": None, "input_computed_at": None}
+
+    pending = []
+    for system in systems:
+        signature = signatures.get(system["system_id"], empty_signature)
+        if not force and _is_current(cached.get(system["system_id"], {}), methods, signature, current_hash):
+            stats.skipped += 1
+        else:
+            pending.append(system)
+
+    def store(system_id: str, results: List[Dict[str, Any]]) -> None:
+        now = get_local_now()
+        signature = signatures.get(system_id, empty_signature)
+        db.query(DegradationResult).filter(
+            DegradationResult.system_id == system_id,
+            DegradationResult.method.in_(list(methods)),
+        ).delete(synchronize_session=False)
+        db.execute(DegradationResult.__table__.insert(), [
+            {
+                **_EMPTY_RESULT,
+                **result,
+                **signature,
+                "params_hash": current_hash,
+                "computed_at": now,
+            }
+            for result in results
+        ])
+        db.commit()
+
+    def collect(system: Dict[str, Any], outcome) -> None:
+        try:
+            store(system["system_id"], outcome())
+            stats.analyzed += 1
+        except Exception as e:
+            db.rollback()
+            stats.failed += 1
+            print(f"❌ {system['system_id']} 衰减分析失败: {e}")
+
+    if workers <= 1 or len(pending) <= 1:
+        for system in pending:
+            collect(system, lambda system=system: analyze_system(system, methods))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [(system, pool.submit(analyze_system, system, tuple(methods))) for system in pending]
+            for system, future in futures:
+                collect(system, future.result)
+
+    stats.elapsed_seconds = round(time.perf_counter() - began, 3)
+    return stats
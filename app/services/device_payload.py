@@ -0,0 +1,167 @@
+"""
+下位机上报数据解析模块。
+
+下位机上报格式：
+- 单条读数（JSON）：{"system_id": "...", "ts": 毫秒时间戳, "params": {"NR": ..., "Tbody": ...}}
+- 列式批量（JSON / MessagePack / CBOR）：ts 与 params 中各字段均为等长数组，
+  请求体可以是单个设备对象，也可以是多个设备对象组成的数组
+
+列式数据使用 NumPy 整列转换，不逐条解析。
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.time_utils import epoch_to_local, epochs_to_local
+
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+try:
+    import cbor2
+except Exception:
+    cbor2 = None
+
+# 下位机参数名 → 测量字段
+DEVICE_FIELD_MAP = {
+    "NR": "irradiance",
+    "Tbody": "temperature",
+}
+
+CONTENT_TYPES_MSGPACK = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+CONTENT_TYPES_CBOR = ("application/cbor",)
+
+
+class DevicePayloadError(ValueError):
+    """下位机上报数据无法解析或校验失败。"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def decode_body(body: bytes, content_type: Optional[str]) -> Any:
+    """
+    按 Content-Type 解码请求体。
+
+    Args:
+        body: 原始请求体
+        content_type: 请求的 Content-Type（默认按 JSON 处理）
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    try:
+        if media_type in CONTENT_TYPES_MSGPACK:
+            if msgpack is None:
+                raise DevicePayloadError(415, "MessagePack payloads require the 'msgpack' package")
+            return msgpack.unpackb(body, raw=False)
+        if media_type in CONTENT_TYPES_CBOR:
+            if cbor2 is None:
+                raise DevicePayloadError(415, "CBOR payloads require the 'cbor2' package")
+            return cbor2.loads(body)
+        return json.loads(body)
+    except DevicePayloadError:
+        raise
+    except Exception:
+        raise DevicePayloadError(400, f"Invalid {media_type or 'JSON'} payload")
+
+
+def is_columnar(block: Dict[str, Any]) -> bool:
+    """判断设备对象是否为列式批量格式（ts 为数组）。"""
+    return isinstance(block.get("ts"), (list, tuple))
+
+
+def map_device_reading(payload: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """将单条下位机读数映射为测量记录（未上报 ts 时使用接收时间）。"""
+    system_id = payload.get("system_id")
+    if not system_id:
+        raise DevicePayloadError(422, "system_id is required")
+
+    timestamp = now
+    ts = payload.get("ts")
+    if isinstance(ts, (int, float)):
+        # 下位机上报的ts是UTC时间戳(毫秒)，转换为Asia/Shanghai本地时间（naive datetime）
+        timestamp = epoch_to_local(ts, unit="ms")
+
+    params = payload.get("params") or {}
+    data = {
+        "system_id": system_id,
+        "timestamp": timestamp,
+        "created_at": now,
+    }
+    for param, column in DEVICE_FIELD_MAP.items():
+        data[column] = params.get(param)
+    return data
+
+
+def _column_values(values: Any, length: int, name: str) -> List[Optional[float]]:
+    """将一列参数转换为浮点列表（缺失值为 None）。"""
+    if values is None:
+        return [None] * length
+    if not isinstance(values, (list, tuple)) or len(values) != length:
+        raise DevicePayloadError(422, f"params.{name} must be an array with the same length as ts")
+    try:
+        array = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise DevicePayloadError(422, f"params.{name} must contain numbers")
+    return np.where(np.isnan(array), None, array).tolist()
+
+
+def map_device_columns(block: Dict[str, Any], now: datetime) -> List[Dict[str, Any]]:
+    """将一个设备的列式数据映射为测量记录列表（整列向量化转换）。"""
+    system_id = block.get("system_id")
+    if not system_id:
+        raise DevicePayloadError(422, "system_id is required")
+
+    ts = block["ts"]
+    try:
+        epochs = np.array(ts, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise DevicePayloadError(422, "ts must contain millisecond epoch numbers")
+    if epochs.ndim != 1 or not np.isfinite(epochs).all():
+        raise DevicePayloadError(422, "ts must contain millisecond epoch numbers")
+
+    timestamps = epochs_to_local(epochs, unit="ms")
+    params = block.get("params") or {}
+    columns = {
+        column: _column_values(params.get(param), len(timestamps), param)
+        for param, column in DEVICE_FIELD_MAP.items()
+    }
+
+    names = list(columns)
+    return [
+        {
+            "system_id": system_id,
+            "timestamp": timestamp,
+            "created_at": now,
+            **dict(zip(names, values)),
+        }
+        for timestamp, *values in zip(timestamps, *columns.values())
+    ]
+
+
+def payload_to_rows(payload: Any, now: datetime) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    将解码后的上报数据转换为测量记录。
+
+    Returns:
+        (测量记录列表, 是否为单条读数)
+    """
+    if isinstance(payload, dict) and not is_columnar(payload):
+        return [map_device_reading(payload, now)], True
+
+    blocks = payload if isinstance(payload, list) else [payload]
+    rows: List[Dict[str, Any]] = []
+    for block in blocks:
+        if not isinstance(block, dict):
+            raise DevicePayloadError(422, "Each device entry must be an object")
+        if is_columnar(block):
+            rows.extend(map_device_columns(block, now))
+        else:
+            rows.append(map_device_reading(block, now))
+    return rows, False
@@ -0,0 +1,385 @@
+"""
+近期测量数据内存热窗口。
+
+为每个活跃系统保留最近 HOT_WINDOW_HOURS 小时的测量数据（NumPy 数组存储、按时间排序），
+使最常见的“某系统今天的数据”查询无需访问数据库、无需构造 ORM 对象。
+
+- 启动时一次批量查询预热所有系统；未预热的系统在首次查询时按需加载
+- 写入路径通过写入回调实时追加；其他进程（独立行协议监听、导入脚本等）写入的数据
+  通过按 created_at 的增量同步补齐（每个系统至多每 HOT_WINDOW_RESYNC_SECONDS 秒一次）
+- 每个系统的行数与系统总数均有上限，超出时淘汰最旧数据 / 最久未访问的系统
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database.sharding import fan_out, shard_scope
+from app.models.measurement import Measurement
+from app.services.ingest import register_ingest_listener
+from app.utils.time_utils import get_local_now
+
+HOT_WINDOW_ENABLED = os.getenv("HOT_WINDOW_ENABLED", "1") == "1"
+HOT_WINDOW_HOURS = int(os.getenv("HOT_WINDOW_HOURS", "48"))
+# 每个系统最多保留的行数（分钟级数据 48 小时为 2880 行，留出余量）
+HOT_WINDOW_CAPACITY = int(os.getenv("HOT_WINDOW_CAPACITY", "4096"))
+HOT_WINDOW_MAX_SYSTEMS = int(os.getenv("HOT_WINDOW_MAX_SYSTEMS", "500"))
+HOT_WINDOW_RESYNC_SECONDS = float(os.getenv("HOT_WINDOW_RESYNC_SECONDS", "30"))
+
+# 增量同步时 created_at 的回看余量，覆盖并发事务提交顺序与时钟误差
+_RESYNC_MARGIN = timedelta(seconds=5)
+
+_COLUMNS = (
+    Measurement.id,
+    Measurement.system_id,
+    Measurement.timestamp,
+    Measurement.irradiance,
+    Measurement.temperature,
+    Measurement.created_at,
+)
+
+
+def _to_us(values: Sequence[datetime]) -> np.ndarray:
+    return np.array(values, dtype="datetime64[us]").astype(np.int64)
+
+
+def _to_float(values: Sequence[Optional[float]]) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def _iso_list(values_us: np.ndarray) -> List[str]:
+    return [dt.isoformat() for dt in values_us.astype("datetime64[us]").tolist()]
+
+
+def _float_list(values: np.ndarray) -> List[Optional[float]]:
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+class _SystemWindow:
+    """单个系统的热窗口：按时间排序的列式数组，预留 2 倍容量以摊销追加成本。"""
+
+    __slots__ = (
+        "system_id", "capacity", "ts", "ids", "irradiance", "temperature", "created",
+        "start", "end", "covered_from", "synced_at", "last_access",
+    )
+
+    def __init__(self, system_id: str, capacity: int, covered_from: int):
+        self.system_id = system_id
+        self.capacity = capacity
+        size = capacity * 2
+        self.ts = np.empty(size, dtype=np.int64)
+        self.ids = np.empty(size, dtype=np.int64)
+        self.irradiance = np.empty(size, dtype=np.float64)
+        self.temperature = np.empty(size, dtype=np.float64)
+        self.created = np.empty(size, dtype=np.int64)
+        self.start = 0
+        self.end = 0
+        # 窗口完整性下界：数据库中 timestamp >= covered_from 的记录均在窗口内
+        self.covered_from = covered_from
+        self.synced_at = time.monotonic()
+        self.last_access = time.monotonic()
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.ts, self.ids, self.irradiance, self.temperature, self.created))
+
+    def _arrays(self):
+        return (self.ts, self.ids, self.irradiance, self.temperature, self.created)
+
+    def _compact(self) -> None:
+        live = slice(self.start, self.end)
+        for array in self._arrays():
+            array[:self.size] = array[live]
+        self.end = self.size
+        self.start = 0
+
+    def merge(self, ts, ids, irradiance, temperature, created) -> None:
+        """合并新记录（相同时间戳以新记录为准），并按容量与时间窗口裁剪。"""
+        n = len(ts)
+        if n == 0:
+            return
+        new_sorted = n == 1 or bool(np.all(np.diff(ts) > 0))
+        if new_sorted and (self.size == 0 or ts[0] > self.ts[self.end - 1]) and n <= self.capacity:
+            # 快速路径：按时间顺序追加到尾部
+            if self.end + n > len(self.ts):
+                self._compact()
+            for array, values in zip(self._arrays(), (ts, ids, irradiance, temperature, created)):
+                array[self.end:self.end + n] = values
+            self.end += n
+        else:
+            live = slice(self.start, self.end)
+            merged = [
+                np.concatenate([array[live], values])
+                for array, values in zip(self._arrays(), (ts, ids, irradiance, temperature, created))
+            ]
+            order = np.argsort(merged[0], kind="stable")
+            merged = [array[order] for array in merged]
+            # 稳定排序后同一时间戳的最后一条为最新写入
+            keep = np.append(merged[0][1:] != merged[0][:-1], True)
+            merged = [array[keep] for array in merged]
+            if len(merged[0]) > self.capacity:
+                # 超出容量时丢弃最旧的记录，完整性下界随之提高到保留的第一条
+                merged = [array[-self.capacity:] for array in merged]
+                self.covered_from = max(self.covered_from, int(merged[0][0]))
+            count = len(merged[0])
+            for array, values in zip(self._arrays(), merged):
+                array[:count] = values
+            self.start, self.end = 0, count
+
+        self._trim()
+
+    def _trim(self) -> None:
+        if self.size > self.capacity:
+            self.start = self.end - self.capacity
+            self.covered_from = max(self.covered_from, int(self.ts[self.start]))
+        cutoff = int(self.ts[self.end - 1]) - HOT_WINDOW_HOURS * 3600 * 1_000_000
+        drop = int(np.searchsorted(self.ts[self.start:self.end], cutoff, side="left"))
+        if drop:
+            self.start += drop
+        self.covered_from = max(self.covered_from, cutoff)
+
+    def remove(self, timestamp_us: int) -> None:
+        index = self.start + int(np.searchsorted(self.ts[self.start:self.end], timestamp_us))
+        if index < self.end and self.ts[index] == timestamp_us:
+            for array in self._arrays():
+                array[index:self.end - 1] = array[index + 1:self.end]
+            self.end -= 1
+
+    def max_created(self) -> Optional[int]:
+        return int(self.created[self.start:self.end].max()) if self.size else None
+
+    def select(
+        self,
+        start_us: Optional[int],
+        end_us: Optional[int],
+        limit: int,
+        offset: int,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """按时间降序返回 [start, end] 内的记录；窗口无法完整覆盖时返回 None。"""
+        ts = self.ts[self.start:self.end]
+        lo = 0 if start_us is None else int(np.searchsorted(ts, start_us, side="left"))
+        hi = len(ts) if end_us is None else int(np.searchsorted(ts, end_us, side="right"))
+        available = max(hi - lo, 0)
+
+        if start_us is not None:
+            if start_us < self.covered_from:
+                return None
+        elif available < offset + limit:
+            # 未限定开始时间且窗口内记录不足：更早的数据可能只在数据库中
+            return None
+
+        # 降序分页：从 hi 向前取
+        top = hi - offset
+        bottom = max(top - limit, lo)
+        if top <= bottom:
+            return []
+        picked = slice(self.start + bottom, self.start + top)
+        timestamps = _iso_list(self.ts[picked])
+        rows = [
+            {
+                "id": id_,
+                "system_id": self.system_id,
+                "timestamp": timestamp,
+                "local_time": timestamp,
+                "irradiance": irradiance,
+                "temperature": temperature,
+                "ambient_temperature": None,
+                "created_at": created_at,
+            }
+            for id_, timestamp, irradiance, temperature, created_at in zip(
+                self.ids[picked].tolist(),
+                timestamps,
+                _float_list(self.irradiance[picked]),
+                _float_list(self.temperature[picked]),
+                _iso_list(self.created[picked]),
+            )
+        ]
+        rows.reverse()
+        return rows
+
+
+class HotWindowStore:
+    """所有系统热窗口的容器（线程安全，按最近访问顺序淘汰）。"""
+
+    def __init__(
+        self,
+        capacity: int = HOT_WINDOW_CAPACITY,
+        max_systems: int = HOT_WINDOW_MAX_SYSTEMS,
+        resync_seconds: float = HOT_WINDOW_RESYNC_SECONDS,
+    ):
+        self.capacity = capacity
+        self.max_systems = max_systems
+        self.resync_seconds = resync_seconds
+        self._lock = threading.Lock()
+        self._windows: "OrderedDict[str, _SystemWindow]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # ---- 加载 ----
+
+    @staticmethod
+    def _window_start() -> datetime:
+        return get_local_now() - timedelta(hours=HOT_WINDOW_HOURS)
+
+    @staticmethod
+    def _columns(rows) -> tuple:
+        return (
+            _to_us([r.timestamp for r in rows]),
+            np.array([r.id for r in rows], dtype=np.int64),
+            _to_float([r.irradiance for r in rows]),
+            _to_float([r.temperature for r in rows]),
+            _to_us([r.created_at for r in rows]),
+        )
+
+    def _install(self, system_id: str, covered_from: datetime, rows) -> _SystemWindow:
+        window = _SystemWindow(system_id, self.capacity, int(_to_us([covered_from])[0]))
+        window.merge(*self._columns(rows))
+        self._windows[system_id] = window
+        self._windows.move_to_end(system_id)
+        while len(self._windows) > self.max_systems:
+            self._windows.popitem(last=False)
+        return window
+
+    def warm_up(self, db: Session) -> int:
+        """启动预热：一次批量查询（分片时各分片并行）加载所有系统最近窗口内的数据，返回加载的系统数。"""
+        window_start = self._window_start()
+        rows = [
+            row
+            for shard_rows in fan_out(db, lambda session: session.execute(
+                select(*_COLUMNS)
+                .where(Measurement.timestamp >= window_start)
+                .order_by(Measurement.system_id, Measurement.timestamp)
+            ).all())
+            for row in shard_rows
+        ]
+
+        grouped: "OrderedDict[str, list]" = OrderedDict()
+        for row in rows:
+            grouped.setdefault(row.system_id, []).append(row)
+
+        # 超出系统数上限时优先保留最近有数据的系统
+        latest_first = sorted(grouped.items(), key=lambda item: item[1][-1].timestamp)
+        with self._lock:
+            for system_id, system_rows in latest_first[-self.max_systems:]:
+                self._install(system_id, window_start, system_rows)
+            return len(self._windows)
+
+    def _load(self, db: Session, system_id: str) -> _SystemWindow:
+        window_start = self._window_start()
+        with shard_scope(db, system_id):
+            rows = db.execute(
+                select(*_COLUMNS)
+                .where(Measurement.system_id == system_id, Measurement.timestamp >= window_start)
+                .order_by(Measurement.timestamp)
+            ).all()
+        with self._lock:
+            return self._install(system_id, window_start, rows)
+
+    def _resync(self, db: Session, window: _SystemWindow) -> None:
+        """增量同步其他进程写入的记录（按 created_at 回看）。"""
+        with self._lock:
+            max_created = window.max_created()
+            covered_from = window.covered_from
+        query = select(*_COLUMNS).where(
+            Measurement.system_id == window.system_id,
+            Measurement.timestamp >= np.datetime64(covered_from, "us").tolist(),
+        )
+        if max_created is not None:
+            since = np.datetime64(max_created, "us").tolist() - _RESYNC_MARGIN
+            query = query.where(Measurement.created_at >= since)
+        with shard_scope(db, window.system_id):
+            rows = db.execute(query.order_by(Measurement.timestamp)).all()
+        with self._lock:
+            if rows:
+                window.merge(*self._columns(rows))
+            window.synced_at = time.monotonic()
+
+    # ---- 查询与维护 ----
+
+    def query(
+        self,
+        db: Session,
+        system_id: str,
+        start_time: Optional[datetime],
+        end_time: Optional[datetime],
+        limit: int,
+        offset: int,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        从热窗口查询记录（与 GET /measurements/ 的排序与分页一致）。
+
+        Returns:
+            已序列化的记录列表；窗口无法完整覆盖请求范围时返回 None（由调用方回退到数据库）
+        """
+        if (start_time and start_time.tzinfo) or (end_time and end_time.tzinfo):
+            return None
+
+        with self._lock:
+            window = self._windows.get(system_id)
+        if window is None:
+            # 请求范围早于热窗口时加载后也只能回退到数据库：直接返回，不加载、不淘汰其他系统
+            window_start = self._window_start()
+            if (start_time and start_time < window_start) or (end_time and end_time < window_start):
+                with self._lock:
+                    self.misses += 1
+                return None
+            window = self._load(db, system_id)
+        elif time.monotonic() - window.synced_at > self.resync_seconds:
+            self._resync(db, window)
+
+        start_us = int(_to_us([start_time])[0]) if start_time else None
+        end_us = int(_to_us([end_time])[0]) if end_time else None
+        with self._lock:
+            window.last_access = time.monotonic()
+            if system_id in self._windows:
+                self._windows.move_to_end(system_id)
+            rows = window.select(start_us, end_us, limit, offset)
+            if rows is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return rows
+
+    def on_ingest(self, source: str, rows: List[Any]) -> None:
+        """写入回调：将新记录合并进已加载的系统窗口（未加载的系统在首次查询时加载）。"""
+        by_system: Dict[str, list] = {}
+        for row in rows:
+            by_system.setdefault(row.system_id, []).append(row)
+        with self._lock:
+            for system_id, system_rows in by_system.items():
+                window = self._windows.get(system_id)
+                if window is not None:
+                    system_rows.sort(key=lambda r: r.timestamp)
+                    window.merge(*self._columns(system_rows))
+
+    def discard(self, system_id: str, timestamp: datetime) -> None:
+        """删除记录后同步移除窗口中的对应数据。"""
+        with self._lock:
+            window = self._windows.get(system_id)
+            if window is not None:
+                window.remove(int(_to_us([timestamp])[0]))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "systems": len(self._windows),
+                "rows": sum(w.size for w in self._windows.values()),
+                "memory_bytes": sum(w.nbytes() for w in self._windows.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+hot_window = HotWindowStore()
+if HOT_WINDOW_ENABLED:
+    register_ingest_listener(hot_window.on_ingest)
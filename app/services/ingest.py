@@ -0,0 +1,379 @@
+"""
+测量数据写入服务。
+
+所有写入路径（单条、批量、下位机上报、行协议、历史回填）共用此模块：
+- 以 (system_id, timestamp) 为唯一键执行 INSERT ... ON CONFLICT
+- 冲突策略可配置：ignore（保留已有数据）或 update（后写覆盖）
+- 在同一事务中维护每个系统的末值表（measurement_latest）与数据完整性索引（measurement_coverage）
+- 配置了测量数据分片时按系统所在分片分组写入
+- 开启分块压缩存储时，落入已打包时段的记录按冲突策略跳过或改写数据块
+- 统计各写入路径的接收数、写入数与重复数
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database.sharding import fan_out_by_system, shard_count, shard_scope, system_shard, use_shard
+from app.models.measurement import Measurement, MeasurementLatest
+from app.services.coverage import COVERAGE_TRACKING_ENABLED, mark_coverage
+from app.services.metrics import record_ingest
+from app.services.packed_storage import (
+    PACKED_STORAGE_ENABLED,
+    absorb_packed_rows,
+    find_packed_sample,
+    latest_packed_sample,
+)
+
+CONFLICT_IGNORE = "ignore"
+CONFLICT_UPDATE = "update"
+CONFLICT_MODES = (CONFLICT_IGNORE, CONFLICT_UPDATE)
+ConflictMode = Literal["ignore", "update"]
+
+# 默认冲突策略（下位机重传时通常内容一致，默认忽略重复）
+INGEST_CONFLICT_MODE = os.getenv("INGEST_CONFLICT_MODE", CONFLICT_IGNORE)
+if INGEST_CONFLICT_MODE not in CONFLICT_MODES:
+    raise RuntimeError(
+        f"INGEST_CONFLICT_MODE must be one of {CONFLICT_MODES}, got '{INGEST_CONFLICT_MODE}'"
+    )
+
+# 单条 INSERT 语句的最大行数（避免超出数据库参数个数上限）
+INSERT_CHUNK_SIZE = 1000
+
+# 写入来源标识
+SOURCE_SINGLE = "single"
+SOURCE_BATCH = "batch"
+SOURCE_DEVICE = "device"
+SOURCE_LINE = "line"
+SOURCE_BACKFILL = "backfill"
+
+_UNIQUE_KEY = ("system_id", "timestamp")
+_UPDATABLE_COLUMNS = ("irradiance", "temperature", "created_at")
+
+
+@dataclass
+class IngestResult:
+    """一次写入操作的结果。"""
+    received: int
+    written: int
+    duplicates: int
+    rows: List[Any] = field(default_factory=list)
+
+    def headers(self) -> Dict[str, str]:
+        """写入统计响应头，供客户端判断重传情况。"""
+        return {
+            "X-Ingest-Received": str(self.received),
+            "X-Ingest-Written": str(self.written),
+            "X-Ingest-Duplicates": str(self.duplicates),
+        }
+
+
+class IngestStats:
+    """进程内的写入统计（按写入来源累计）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def record(self, source: str, result: IngestResult) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(
+                source, {"received": 0, "written": 0, "duplicates": 0}
+            )
+            counters["received"] += result.received
+            counters["written"] += result.written
+            counters["duplicates"] += result.duplicates
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            result = {}
+            for source, counters in self._counters.items():
+                received = counters["received"]
+                result[source] = {
+                    **counters,
+                    "duplicate_rate": round(counters["duplicates"] / received, 4) if received else 0.0,
+                }
+            return result
+
+
+ingest_stats = IngestStats()
+
+# 写入提交后的回调（实时推送、缓存维护等），参数为写入来源与实际写入的记录
+_ingest_listeners: List[Callable[[str, List[Any]], None]] = []
+
+
+def register_ingest_listener(listener: Callable[[str, List[Any]], None]) -> None:
+    """注册写入提交后的回调；回调异常只记录日志，不影响写入结果。"""
+    if listener not in _ingest_listeners:
+        _ingest_listeners.append(listener)
+
+
+def register_writer_listeners() -> None:
+    """
+    注册维护跨进程共享状态的写入回调，所有写入测量数据的进程（接口服务、独立行协议监听等）启动时调用：
+    - KPI 待重算日期登记（迟到或重放的数据使对应日期的 KPI 重算）
+    - 共享日缓存（DAY_CACHE_DIR）失效
+    热窗口、实时推送等进程内回调由各自模块在导入时注册。
+    """
+    from app.services.day_cache import DAY_CACHE_ENABLED, day_cache
+    from app.services.kpi import KPI_TRACKING_ENABLED, dirty_days
+
+    if KPI_TRACKING_ENABLED:
+        register_ingest_listener(dirty_days.on_ingest)
+    if DAY_CACHE_ENABLED:
+        register_ingest_listener(day_cache.on_ingest)
+
+
+def _notify_listeners(source: str, rows: List[Any]) -> None:
+    if not rows:
+        return
+    for listener in _ingest_listeners:
+        try:
+            listener(source, rows)
+        except Exception as e:
+            print(f"❌ 写入回调 {getattr(listener, '__name__', listener)} 执行失败: {e}")
+
+
+def resolve_conflict_mode(on_conflict: Optional[str]) -> str:
+    """返回请求指定的冲突策略，未指定时使用默认配置。"""
+    return on_conflict or INGEST_CONFLICT_MODE
+
+
+def _dedupe_rows(rows: Sequence[Dict[str, Any]], mode: str) -> List[Dict[str, Any]]:
+    """
+    去除同一批次内的重复键。
+
+    PostgreSQL 不允许同一条 ON CONFLICT DO UPDATE 语句两次修改同一行，
+    因此批内重复需先行合并：ignore 保留首条，update 保留末条。
+    结果按 (system_id, timestamp) 排序，使并发批次以相同顺序加锁，避免死锁。
+    """
+    unique: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    for row in rows:
+        key = (row["system_id"], row["timestamp"])
+        if mode == CONFLICT_UPDATE or key not in unique:
+            unique[key] = row
+    return [unique[key] for key in sorted(unique)]
+
+
+def get_dialect_insert(db: Session):
+    """返回当前数据库方言支持 ON CONFLICT 的 insert 构造函数（PostgreSQL / SQLite）。"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise RuntimeError(f"Upsert ingestion is not supported for database dialect '{dialect}'")
+
+
+def _count_existing(db: Session, rows: Sequence[Dict[str, Any]]) -> int:
+    """统计已存在于数据库中的键数量（按系统分组做一次索引范围查询）。"""
+    keys_by_system: Dict[str, set] = {}
+    for row in rows:
+        keys_by_system.setdefault(row["system_id"], set()).add(row["timestamp"])
+
+    existing = 0
+    for system_id, timestamps in keys_by_system.items():
+        stored = db.execute(
+            select(Measurement.timestamp).where(
+                Measurement.system_id == system_id,
+                Measurement.timestamp >= min(timestamps),
+                Measurement.timestamp <= max(timestamps),
+            )
+        ).scalars()
+        existing += len(timestamps.intersection(stored))
+    return existing
+
+
+def _upsert_latest(db: Session, insert, written_rows: Sequence[Any]) -> None:
+    """按系统更新末值表：仅当新记录时间戳不早于已存末值时覆盖（按 system_id 顺序加锁，避免并发批次死锁）。"""
+    latest: Dict[str, Any] = {}
+    for row in written_rows:
+        current = latest.get(row.system_id)
+        if current is None or row.timestamp >= current.timestamp:
+            latest[row.system_id] = row
+    if not latest:
+        return
+
+    table = MeasurementLatest.__table__
+    stmt = insert(table).values([
+        {
+            "system_id": row.system_id,
+            "measurement_id": row.id,
+            "timestamp": row.timestamp,
+            "irradiance": row.irradiance,
+            "temperature": row.temperature,
+            "updated_at": row.created_at,
+        }
+        for _, row in sorted(latest.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["system_id"],
+        set_={
+            name: getattr(stmt.excluded, name)
+            for name in ("measurement_id", "timestamp", "irradiance", "temperature", "updated_at")
+        },
+        where=stmt.excluded.timestamp >= table.c.timestamp,
+    )
+    db.execute(stmt)
+
+
+def refresh_latest_measurement(db: Session, system_id: str) -> None:
+    """重新计算单个系统的末值（删除记录后调用，不提交事务）。"""
+    with shard_scope(db, system_id):
+        _refresh_latest(db, system_id)
+
+
+def _refresh_latest(db: Session, system_id: str) -> None:
+    db.flush()
+    db.query(MeasurementLatest).filter(MeasurementLatest.system_id == system_id).delete()
+    row = (
+        db.query(Measurement)
+        .filter(Measurement.system_id == system_id)
+        .order_by(Measurement.timestamp.desc())
+        .first()
+    )
+    if PACKED_STORAGE_ENABLED:
+        packed = latest_packed_sample(db, system_id)
+        if packed is not None and (row is None or packed.timestamp > row.timestamp):
+            row = packed
+    if row is not None:
+        _upsert_latest(db, get_dialect_insert(db), [row])
+
+
+def _group_rows_by_shard(db: Session, rows: Sequence[Dict[str, Any]]) -> Dict[Optional[int], List[Dict[str, Any]]]:
+    """按系统所在分片分组记录（未分片时全部归入 None）。"""
+    if not shard_count(db):
+        return {None: list(rows)}
+    groups: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(system_shard(db, row["system_id"]), []).append(row)
+    return groups
+
+
+def _write_rows(
+    db: Session,
+    insert,
+    unique_rows: List[Dict[str, Any]],
+    mode: str,
+) -> Tuple[List[Any], int, int, int]:
+    """
+    写入已去重的记录并维护末值表与完整性索引（不提交事务）。
+
+    Returns:
+        (实际写入的记录, 进入行存储的记录数, 落入数据块的记录数, 已存在的键数)
+    """
+    table = Measurement.__table__
+
+    # 已打包时段的记录不进入行存储（update 策略下直接改写数据块）
+    packed_rows: List[Any] = []
+    if PACKED_STORAGE_ENABLED:
+        unique_rows, packed_rows = absorb_packed_rows(db, unique_rows, mode == CONFLICT_UPDATE)
+
+    existing = _count_existing(db, unique_rows) + len(packed_rows) if mode == CONFLICT_UPDATE else 0
+
+    written_rows: List[Any] = []
+    for offset in range(0, len(unique_rows), INSERT_CHUNK_SIZE):
+        chunk = unique_rows[offset:offset + INSERT_CHUNK_SIZE]
+        stmt = insert(table).values(chunk)
+        if mode == CONFLICT_UPDATE:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(_UNIQUE_KEY),
+                set_={name: getattr(stmt.excluded, name) for name in _UPDATABLE_COLUMNS},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(_UNIQUE_KEY))
+        written_rows.extend(db.execute(stmt.returning(*table.columns)).all())
+    written_rows.extend(packed_rows)
+    _upsert_latest(db, insert, written_rows)
+    if COVERAGE_TRACKING_ENABLED:
+        mark_coverage(db, insert, written_rows)
+    return written_rows, len(unique_rows), len(packed_rows), existing
+
+
+def load_latest_measurements(db: Session, system_ids: Sequence[str]) -> Dict[str, MeasurementLatest]:
+    """批量读取系统的末值记录（分片时在各分片上并行查询），返回 system_id → 末值。"""
+    latest: Dict[str, MeasurementLatest] = {}
+    for shard_latest in fan_out_by_system(db, list(system_ids), _load_latest):
+        latest.update(shard_latest)
+    return latest
+
+
+def _load_latest(db: Session, system_ids: List[str]) -> Dict[str, MeasurementLatest]:
+    latest: Dict[str, MeasurementLatest] = {}
+    for offset in range(0, len(system_ids), INSERT_CHUNK_SIZE):
+        for record in db.query(MeasurementLatest).filter(
+            MeasurementLatest.system_id.in_(system_ids[offset:offset + INSERT_CHUNK_SIZE])
+        ):
+            latest[record.system_id] = record
+    return latest
+
+
+def write_measurements(
+    db: Session,
+    rows: Sequence[Dict[str, Any]],
+    source: str,
+    on_conflict: Optional[str] = None,
+) -> IngestResult:
+    """
+    以幂等方式写入测量记录并提交事务。
+
+    Args:
+        db: 数据库会话
+        rows: 测量记录字典列表（需包含 system_id、timestamp、created_at）
+        source: 写入来源（single / batch / device / line / backfill），用于统计
+        on_conflict: 冲突策略（ignore / update），默认使用 INGEST_CONFLICT_MODE
+
+    Returns:
+        写入结果；rows 为实际插入或更新的记录
+    """
+    start = time.perf_counter()
+    mode = resolve_conflict_mode(on_conflict)
+    unique_rows = _dedupe_rows(rows, mode)
+    insert = get_dialect_insert(db)
+
+    # 配置了分片时按系统所在分片分组写入，各分片在同一会话中依次提交
+    stored = packed = existing = 0
+    written_rows: List[Any] = []
+    for shard, shard_rows in _group_rows_by_shard(db, unique_rows).items():
+        with use_shard(db, shard):
+            written, shard_stored, shard_packed, shard_existing = _write_rows(db, insert, shard_rows, mode)
+        written_rows.extend(written)
+        stored += shard_stored
+        packed += shard_packed
+        existing += shard_existing
+    db.commit()
+
+    if mode == CONFLICT_UPDATE:
+        duplicates = len(rows) - stored - packed + existing
+    else:
+        duplicates = len(rows) - len(written_rows)
+
+    result = IngestResult(
+        received=len(rows),
+        written=len(written_rows),
+        duplicates=duplicates,
+        rows=written_rows,
+    )
+    ingest_stats.record(source, result)
+    record_ingest(source, result.received, result.written, result.duplicates, time.perf_counter() - start)
+    _notify_listeners(source, written_rows)
+    return result
+
+
+def get_existing_measurement(db: Session, system_id: str, timestamp) -> Optional[Any]:
+    """按唯一键获取已存在的测量记录（用于重复提交时返回原记录，可能来自已打包的数据块）。"""
+    with shard_scope(db, system_id):
+        measurement = (
+            db.query(Measurement)
+            .filter(Measurement.system_id == system_id, Measurement.timestamp == timestamp)
+            .first()
+        )
+        if measurement is None and PACKED_STORAGE_ENABLED:
+            return find_packed_sample(db, system_id, timestamp)
+        return measurement
@@ -0,0 +1,158 @@
+"""
+后台任务类型。
+
+每个处理函数接收数据库会话与任务上下文（参数、进度回调、结果文件路径），返回写入 result 的 JSON；
+参数均为 JSON（日期与时间为 ISO 格式字符串）。导入本模块即完成注册。
+"""
+
+import csv
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.system_config import SystemConfiguration
+from app.services.coverage import data_day_range, rebuild_coverage, systems_with_measurements
+from app.services.degradation import METHODS, run_degradation
+from app.services.jobs import JobContext, register_job
+from app.services.kpi import run_kpi_job
+from app.services.neighbor_validation import run_validation
+from app.services.prediction import run_predictions
+from app.services.resampling import load_fleet_samples
+
+# KPI 重算与导出每批处理的系统数（每批结束后更新进度）
+_BATCH_SYSTEMS = 20
+
+
+def _date_param(params: Dict[str, Any], name: str, default: Optional[date] = None) -> Optional[date]:
+    value = params.get(name)
+    return date.fromisoformat(value) if value else default
+
+
+def _datetime_param(params: Dict[str, Any], name: str) -> datetime:
+    value = params.get(name)
+    if not value:
+        raise ValueError(f"Missing parameter '{name}'")
+    return datetime.fromisoformat(value)
+
+
+def _system_ids_param(params: Dict[str, Any]) -> Optional[List[str]]:
+    system_ids = params.get("system_ids")
+    if isinstance(system_ids, str):
+        system_ids = [system_ids]
+    return list(system_ids) if system_ids else None
+
+
+def _active_system_ids(db: Session) -> List[str]:
+    return [
+        row[0] for row in db.query(SystemConfiguration.system_id)
+        .filter(SystemConfiguration.is_active == True)
+        .order_by(SystemConfiguration.system_id)
+    ]
+
+
+@register_job("kpi_recompute")
+def kpi_recompute(db: Session, ctx: JobContext) -> Dict[str, Any]:
+    """重算日期范围内的每日 KPI（params: start, end, system_ids）"""
+    start = _date_param(ctx.params, "start")
+    if start is None:
+        raise ValueError("Missing parameter 'start'")
+    end = _date_param(ctx.params, "end", start)
+    if end < start:
+        raise ValueError("end must not be earlier than start")
+    days = {start + timedelta(days=n) for n in range((end - start).days + 1)}
+    system_ids = _system_ids_param(ctx.params) or _active_system_ids(db)
+
+    totals = {"systems": 0, "days": 0, "written": 0, "failed": 0}
+    for i in range(0, len(system_ids), _BATCH_SYSTEMS):
+        batch = system_ids[i:i + _BATCH_SYSTEMS]
+        stats = run_kpi_job(db, {system_id: set(days) for system_id in batch})
+        for key in totals:
+            totals[key] += getattr(stats, key)
+        done = i + len(batch)
+        ctx.progress(done / len(system_ids), f"{done}/{len(system_ids)} systems")
+    return totals
+
+
+@register_job("degradation")
+def degradation(db: Session, ctx: JobContext) -> Dict[str, Any]:
+    """分析衰减率（params: system_ids, methods, force）"""
+    methods = ctx.params.get("methods") or list(METHODS)
+    unknown = set(methods) - set(METHODS)
+    if unknown:
+        raise ValueError(f"Unknown degradation methods: {sorted(unknown)}")
+    # 任务本身已在任务进程池的子进程中执行，不再开进程池
+    stats = run_degradation(
+        db, _system_ids_param(ctx.params), methods=methods, workers=1, force=bool(ctx.params.get("force")),
+    )
+    return asdict(stats)
+
+
+@register_job("coverage_rebuild")
+def coverage_rebuild(db: Session, ctx: JobContext) -> Dict[str, Any]:
+    """重建数据完整性索引（params: start, end, system_ids）"""
+    start = _date_param(ctx.params, "start")
+    end = _date_param(ctx.params, "end")
+    system_ids = _system_ids_param(ctx.params) or systems_with_measurements(db)
+    total_days = 0
+    for n, system_id in enumerate(system_ids, start=1):
+        first, last = start, end
+        if first is None or last is None:
+            data_range = data_day_range(db, system_id)
+            if data_range is None:
+                continue
+            first, last = first or data_range[0], last or data_range[1]
+        if last >= first:
+            total_days += rebuild_coverage(db, system_id, first, last)
+            db.commit()
+        ctx.progress(n / len(system_ids), f"{n}/{len(system_ids)} systems")
+    return {"systems": len(system_ids), "days": total_days}
+
+
+@register_job("neighbor_validation")
+def neighbor_validation(db: Session, ctx: JobContext) -> Dict[str, Any]:
+    """辐照度近邻交叉校验（params: start_time, end_time, system_ids）"""
+    start_time = _datetime_param(ctx.params, "start_time")
+    end_time = _datetime_param(ctx.params, "end_time")
+    if end_time <= start_time:
+        raise ValueError("end_time must be later than start_time")
+    return asdict(run_validation(db, start_time, end_time, _system_ids_param(ctx.params)))
+
+
+@register_job("production_prediction")
+def production_prediction(db: Session, ctx: JobContext) -> Dict[str, Any]:
+    """按最新天气预报预测发电量（params: system_ids）"""
+    return asdict(run_predictions(db, _system_ids_param(ctx.params)))
+
+
+@register_job("measurement_export")
+def measurement_export(db: Session, ctx: JobContext) -> Dict[str, Any]:
+    """导出测量数据为 CSV（params: start_time, end_time, system_ids）"""
+    start_time = _datetime_param(ctx.params, "start_time")
+    end_time = _datetime_param(ctx.params, "end_time")
+    if end_time <= start_time:
+        raise ValueError("end_time must be later than start_time")
+    system_ids = _system_ids_param(ctx.params) or systems_with_measurements(db)
+
+    filename, path = ctx.result_path(".csv")
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["system_id", "timestamp", "irradiance", "temperature"])
+        for i in range(0, len(system_ids), _BATCH_SYSTEMS):
+            batch = system_ids[i:i + _BATCH_SYSTEMS]
+            groups, timestamps, irradiance, temperature = load_fleet_samples(db, batch, start_time, end_time)
+            for group, ts, irr, temp in zip(
+                groups.tolist(), np.datetime_as_string(timestamps, unit="s").tolist(),
+                irradiance.tolist(), temperature.tolist(),
+            ):
+                writer.writerow([
+                    batch[group], ts.replace("T", " "),
+                    "" if np.isnan(irr) else irr, "" if np.isnan(temp) else temp,
+                ])
+            rows += len(groups)
+            done = i + len(batch)
+            ctx.progress(done / len(system_ids), f"{done}/{len(system_ids)} systems, {rows} rows")
+    return {"file": filename, "media_type": "text/csv", "rows": rows, "systems": len(system_ids)}
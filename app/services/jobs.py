@@ -0,0 +1,490 @@
+"""
+后台任务队列。
+
+导出、KPI 重算、衰减分析等耗时计算不在请求处理中执行，而是提交为 jobs 表中的任务，由任务进程执行：
+- 提交：按任务类型与参数计算签名，参数相同的待执行任务只保留一个（部分唯一索引 + ON CONFLICT DO NOTHING），
+  重复提交返回已有任务
+- 领取：SELECT ... FOR UPDATE SKIP LOCKED 取优先级最高的待执行任务，多个任务进程（可在不同主机）并发领取互不阻塞；
+  再以带状态条件的 UPDATE 确认（SQLite 不支持行锁时同样保证只被领取一次）
+- 执行：任务进程（scripts/job_worker.py）在进程池中运行任务处理函数，主进程定期为执行中的任务写心跳，
+  心跳超过 JOB_STALE_SECONDS 的任务视为任务进程已退出，重新放回队列
+- 结果：处理函数返回的 JSON 写入 result，导出等文件结果写入 JOB_RESULT_DIR；
+  失败时记录原因，未达到 max_attempts 的任务自动重新排队
+- 已结束超过 JOB_RETENTION_DAYS 天的任务及其结果文件由任务进程定期清理
+
+任务类型在 app/services/job_handlers.py 中以 register_job 注册。
+"""
+
+import hashlib
+import json
+import os
+import socket
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database.database import SessionLocal, dispose_engines
+from app.models.job import Job
+from app.services.ingest import get_dialect_insert
+from app.utils.time_utils import get_local_now
+
+JOB_RESULT_DIR = os.getenv("JOB_RESULT_DIR", "job_results")
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+STATUSES = (STATUS_PENDING, STATUS_RUNNING, STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+# 进度写库的最小间隔（秒）
+_PROGRESS_INTERVAL = 1.0
+_PURGE_INTERVAL = 3600.0
+
+
+@dataclass
+class JobContext:
+    """传给任务处理函数的执行上下文。"""
+    job_id: int
+    params: Dict[str, Any]
+    progress: Callable[..., None]
+
+    def result_path(self, suffix: str) -> Tuple[str, str]:
+        """结果文件的 (文件名, 完整路径)，文件名记录到 result["file"] 后可通过接口下载。"""
+        os.makedirs(JOB_RESULT_DIR, exist_ok=True)
+        filename = f"job-{self.job_id}{suffix}"
+        return filename, os.path.join(JOB_RESULT_DIR, filename)
+
+
+JobHandler = Callable[[Session, JobContext], Optional[Dict[str, Any]]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def register_job(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """注册任务类型的处理函数（处理函数的文档字符串首行作为任务说明）。"""
+    def decorator(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def job_kinds() -> Dict[str, str]:
+    """已注册的任务类型及说明。"""
+    return {
+        kind: (handler.__doc__ or "").strip().splitlines()[0] if handler.__doc__ else ""
+        for kind, handler in sorted(JOB_HANDLERS.items())
+    }
+
+
+def normalize_params(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """参数转换为可 JSON 序列化的形式（日期等转为字符串）。"""
+    return json.loads(json.dumps(params or {}, default=str))
+
+
+def dedupe_key(kind: str, params: Dict[str, Any]) -> str:
+    """任务类型与参数的签名（参数键顺序无关）。"""
+    text_ = kind + "|" + json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text_.encode()).hexdigest()
+
+
+def enqueue_job(
+    db: Session,
+    kind: str,
+    params: Optional[Dict[str, Any]] = None,
+    priority: int = 0,
+    max_attempts: int = 1,
+) -> Tuple[Job, bool]:
+    """
+    提交任务；已有参数相同的待执行任务时不重复提交。
+
+    Returns:
+        (任务, 是否新建)
+
+    Raises:
+        ValueError: 任务类型未注册
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    params = normalize_params(params)
+    key = dedupe_key(kind, params)
+    insert = get_dialect_insert(db)
+    # 已有任务恰好在两次查询之间被领取时再插入一次
+    for _ in range(2):
+        stmt = (
+            insert(Job.__table__)
+            .values(
+                kind=kind,
+                params=params,
+                dedupe_key=key,
+                status=STATUS_PENDING,
+                priority=priority,
+                progress=0.0,
+                attempts=0,
+                max_attempts=max(1, max_attempts),
+                created_at=get_local_now(),
+            )
+            .on_conflict_do_nothing(index_elements=["dedupe_key"], index_where=text("status = 'pending'"))
+            .returning(Job.__table__.c.id)
+        )
+        job_id = db.execute(stmt).scalar()
+        db.commit()
+        if job_id is not None:
+            return db.get(Job, job_id), True
+        existing = (
+            db.query(Job)
+            .filter(Job.dedupe_key == key, Job.status == STATUS_PENDING)
+            .first()
+        )
+        if existing is not None:
+            return existing, False
+    raise RuntimeError("Failed to enqueue job")
+
+
+def claim_job(db: Session, worker: str, kinds: Optional[Sequence[str]] = None) -> Optional[Job]:
+    """领取一个待执行任务（按优先级、提交顺序），没有可领取的任务时返回 None。"""
+    while True:
+        query = db.query(Job.id).filter(Job.status == STATUS_PENDING)
+        if kinds:
+            query = query.filter(Job.kind.in_(list(kinds)))
+        row = query.order_by(Job.priority.desc(), Job.id).with_for_update(skip_locked=True).first()
+        if row is None:
+            db.rollback()
+            return None
+        now = get_local_now()
+        claimed = (
+            db.query(Job)
+            .filter(Job.id == row.id, Job.status == STATUS_PENDING)
+            .update(
+                {
+                    Job.status: STATUS_RUNNING,
+                    Job.attempts: Job.attempts + 1,
+                    Job.worker: worker,
+                    Job.started_at: now,
+                    Job.heartbeat_at: now,
+                    Job.progress: 0.0,
+                    Job.progress_message: None,
+                    Job.error: None,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if claimed:
+            return db.get(Job, row.id)
+
+
+def _requeue_or_fail(db: Session, job: Job, error: str, count_attempt: bool = True) -> None:
+    """
+    未达到最多执行次数时重新排队（已有相同的待执行任务时直接记为失败），否则记为失败。
+
+    count_attempt 为 False 时（任务进程被中断）本次执行不计入执行次数。
+    """
+    if not count_attempt:
+        job.attempts = max(job.attempts - 1, 0)
+    now = get_local_now()
+    duplicate = (
+        db.query(Job.id)
+        .filter(Job.dedupe_key == job.dedupe_key, Job.status == STATUS_PENDING, Job.id != job.id)
+        .first()
+    )
+    job.error = error
+    job.heartbeat_at = now
+    if job.attempts < job.max_attempts and duplicate is None:
+        job.status = STATUS_PENDING
+        job.worker = None
+    else:
+        job.status = STATUS_FAILED
+        job.finished_at = now
+
+
+def fail_job(db: Session, job_id: int, error: str, worker: Optional[str] = None) -> None:
+    """记录任务失败（可能重新排队）；指定 worker 时只处理仍由该任务进程执行的任务。"""
+    job = db.get(Job, job_id)
+    if job is not None and job.status == STATUS_RUNNING and (worker is None or job.worker == worker):
+        _requeue_or_fail(db, job, error)
+        db.commit()
+
+
+def cancel_job(db: Session, job_id: int) -> Optional[Job]:
+    """
+    取消待执行的任务。
+
+    Returns:
+        任务（不存在时为 None）
+
+    Raises:
+        ValueError: 任务已开始执行或已结束
+    """
+    now = get_local_now()
+    cancelled = (
+        db.query(Job)
+        .filter(Job.id == job_id, Job.status == STATUS_PENDING)
+        .update({Job.status: STATUS_CANCELLED, Job.finished_at: now}, synchronize_session=False)
+    )
+    db.commit()
+    job = db.get(Job, job_id)
+    if job is not None and not cancelled:
+        raise ValueError(f"Job is {job.status}")
+    return job
+
+
+def requeue_stale_jobs(db: Session, stale_seconds: float = JOB_STALE_SECONDS) -> int:
+    """心跳超时（任务进程已退出）的执行中任务重新排队或记为失败，返回处理的任务数。"""
+    cutoff = get_local_now() - timedelta(seconds=stale_seconds)
+    stale = (
+        db.query(Job)
+        .filter(Job.status == STATUS_RUNNING, Job.heartbeat_at < cutoff)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for job in stale:
+        _requeue_or_fail(db, job, f"Worker {job.worker} stopped responding")
+    db.commit()
+    return len(stale)
+
+
+def heartbeat(db: Session, job_ids: Sequence[int], worker: Optional[str] = None) -> None:
+    """为执行中的任务写心跳（指定 worker 时跳过已被重新排队、由其他任务进程领取的任务）。"""
+    if job_ids:
+        query = db.query(Job).filter(Job.id.in_(list(job_ids)), Job.status == STATUS_RUNNING)
+        if worker is not None:
+            query = query.filter(Job.worker == worker)
+        query.update(
+            {Job.heartbeat_at: get_local_now()}, synchronize_session=False
+        )
+        db.commit()
+
+
+def result_file_path(job: Job) -> Optional[str]:
+    """任务结果文件的完整路径（结果不含文件时为 None）。"""
+    filename = (job.result or {}).get("file") if isinstance(job.result, dict) else None
+    return os.path.join(JOB_RESULT_DIR, os.path.basename(filename)) if filename else None
+
+
+def purge_finished_jobs(db: Session, retention_days: float = JOB_RETENTION_DAYS) -> int:
+    """删除结束超过保留天数的任务及其结果文件，返回删除的任务数。"""
+    cutoff = get_local_now() - timedelta(days=retention_days)
+    jobs = db.query(Job).filter(Job.status.in_(FINISHED_STATUSES), Job.finished_at < cutoff).all()
+    for job in jobs:
+        path = result_file_path(job)
+        if path and os.path.exists(path):
+            os.remove(path)
+        db.delete(job)
+    db.commit()
+    return len(jobs)
+
+
+def _progress_reporter(job_id: int) -> Callable[..., None]:
+    """返回进度回调：用独立会话写入进度，不影响处理函数自身的事务。"""
+    last = [0.0]
+
+    def report(fraction: float, message: Optional[str] = None, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - last[0] < _PROGRESS_INTERVAL:
+            return
+        last[0] = now
+        session = SessionLocal()
+        try:
+            session.query(Job).filter(Job.id == job_id, Job.status == STATUS_RUNNING).update(
+                {
+                    Job.progress: round(min(max(float(fraction), 0.0), 1.0), 4),
+                    Job.progress_message: message,
+                    Job.heartbeat_at: get_local_now(),
+                },
+                synchronize_session=False,
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    return report
+
+
+def execute_job(job_id: int, worker: str) -> str:
+    """
+    执行已领取的任务（在任务进程池的子进程中运行），返回最终状态。
+
+    任务心跳超时后可能已被重新排队并由其他任务进程领取，此时本次执行的结果不再写入。
+    """
+    import app.services.job_handlers  # noqa: F401  导入即注册任务类型
+
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        if job is None or job.status != STATUS_RUNNING or job.worker != worker:
+            return job.status if job is not None else STATUS_FAILED
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            job.status = STATUS_FAILED
+            job.error = f"Unknown job kind '{job.kind}'"
+            job.finished_at = get_local_now()
+            db.commit()
+            return STATUS_FAILED
+        context = JobContext(job_id=job.id, params=dict(job.params or {}), progress=_progress_reporter(job.id))
+        try:
+            result = handler(db, context)
+        except Exception as e:
+            db.rollback()
+            fail_job(db, job_id, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}", worker)
+            job = db.get(Job, job_id)
+            return job.status if job is not None else STATUS_FAILED
+
+        now = get_local_now()
+        finished = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == STATUS_RUNNING, Job.worker == worker)
+            .update(
+                {
+                    Job.status: STATUS_SUCCEEDED,
+                    Job.result: normalize_params(result) if result is not None else None,
+                    Job.progress: 1.0,
+                    Job.finished_at: now,
+                    Job.heartbeat_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if not finished:
+            job = db.get(Job, job_id)
+            return job.status if job is not None else STATUS_FAILED
+        return STATUS_SUCCEEDED
+    finally:
+        db.close()
+
+
+def _init_worker():
+    # 子进程不复用父进程的数据库连接
+    dispose_engines()
+
+
+def _new_pool(processes: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=max(1, processes), initializer=_init_worker)
+
+
+def _restart_pool(
+    db: Session,
+    pool: ProcessPoolExecutor,
+    running: Dict[Future, int],
+    worker: str,
+    processes: int,
+    error: str,
+) -> ProcessPoolExecutor:
+    """
+    子进程异常退出后进程池不再可用：执行中的任务记录失败（可能重新排队），并重建进程池。
+    """
+    for job_id in running.values():
+        fail_job(db, job_id, error, worker)
+        print(f"❌ 任务 {job_id} 结束：{error}")
+    running.clear()
+    pool.shutdown(wait=False, cancel_futures=True)
+    print("♻️  任务进程池已重建")
+    return _new_pool(processes)
+
+
+def run_worker(
+    processes: int = JOB_WORKER_PROCESSES,
+    kinds: Optional[Sequence[str]] = None,
+    once: bool = False,
+    poll_seconds: float = JOB_POLL_SECONDS,
+) -> int:
+    """
+    任务进程主循环：领取任务交给进程池执行，为执行中的任务写心跳。
+
+    Args:
+        processes: 同时执行的任务数（子进程数）
+        kinds: 只领取指定类型的任务
+        once: 队列为空且所有任务执行完后退出（否则持续轮询）
+
+    Returns:
+        执行的任务数
+    """
+    import app.services.job_handlers  # noqa: F401  导入即注册任务类型
+
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    db = SessionLocal()
+    running: Dict[Future, int] = {}
+    executed = 0
+    last_purge = 0.0
+    pool = _new_pool(processes)
+    try:
+        try:
+            while True:
+                if time.monotonic() - last_purge > _PURGE_INTERVAL:
+                    purged = purge_finished_jobs(db)
+                    if purged:
+                        print(f"🧹 已清理 {purged} 个过期任务")
+                    last_purge = time.monotonic()
+                requeued = requeue_stale_jobs(db)
+                if requeued:
+                    print(f"♻️  {requeued} 个任务心跳超时，已重新排队")
+
+                while len(running) < processes:
+                    job = claim_job(db, worker, kinds)
+                    if job is None:
+                        break
+                    print(f"▶️  任务 {job.id}（{job.kind}）开始执行，第 {job.attempts} 次")
+                    try:
+                        running[pool.submit(execute_job, job.id, worker)] = job.id
+                    except BrokenProcessPool as e:
+                        # 刚领取的任务尚未执行，与执行中的任务一起放回队列或记为失败
+                        fail_job(db, job.id, f"Worker process crashed: {e}", worker)
+                        executed += len(running)
+                        pool = _restart_pool(db, pool, running, worker, processes, f"Worker process crashed: {e}")
+                        break
+
+                if not running:
+                    if once:
+                        break
+                    time.sleep(poll_seconds)
+                    continue
+
+                done, _ = wait(list(running), timeout=poll_seconds, return_when=FIRST_COMPLETED)
+                broken = None
+                for future in done:
+                    job_id = running.pop(future)
+                    executed += 1
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        # 子进程异常退出（如内存不足被终止）
+                        status = STATUS_FAILED
+                        fail_job(db, job_id, f"Worker process crashed: {e}", worker)
+                        if isinstance(e, BrokenProcessPool):
+                            broken = e
+                    icon = "✅" if status == STATUS_SUCCEEDED else "❌"
+                    print(f"{icon} 任务 {job_id} 结束：{status}")
+                if broken is not None:
+                    # 其余执行中的任务随进程池一并中止
+                    executed += len(running)
+                    pool = _restart_pool(db, pool, running, worker, processes, f"Worker process crashed: {broken}")
+                heartbeat(db, list(running.values()), worker)
+        finally:
+            pool.shutdown(wait=True)
+    except KeyboardInterrupt:
+        # 中断时把本进程执行中的任务放回队列（已有相同的待执行任务时记为失败，避免违反待执行任务的唯一索引）
+        db.rollback()
+        interrupted = (
+            db.query(Job)
+            .filter(Job.id.in_(list(running.values())), Job.status == STATUS_RUNNING, Job.worker == worker)
+            .all()
+        )
+        for job in interrupted:
+            _requeue_or_fail(db, job, f"Worker {worker} was interrupted", count_attempt=False)
+        db.commit()
+        print(f"⏹️  任务进程已停止，{len(running)} 个执行中的任务已放回队列")
+    finally:
+        db.close()
+    return executed
@@ -0,0 +1,350 @@
+"""
+每日性能指标（KPI）物化。
+
+按系统、按本地日期对实测辐照度做梯形积分得到峰值日照时数，结合装机容量与性能比计算预期发电量，
+结果写入 daily_kpis 表；KPI 接口直接聚合该表，任意日期范围的全站查询只需一次索引扫描。
+
+- 写入回调把有新数据的 (系统, 日期) 登记到 kpi_dirty_days（同一进程对同一键在
+  KPI_DIRTY_MEMO_SECONDS 内只登记一次），KPI 任务增量重算登记的日期
+- 夜间任务额外补算所有启用系统的前一天（系统本地日期）
+- 性能比默认 KPI_DEFAULT_PR，可在系统 extra_metadata 中以 performance_ratio 覆盖；
+  并按辐照度加权的组件温度做温度修正（temperature_coefficient，默认 KPI_TEMPERATURE_COEFFICIENT /°C，参考 25°C）
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.calculations.insolation import STC_IRRADIANCE, daily_insolation, weighted_daily_mean
+from app.calculations.pv_performance import estimate_daily_energy
+from app.database.database import SessionLocal
+from app.database.sharding import shard_scope
+from app.models.kpi import DailyKPI, KPIDirtyDay
+from app.models.measurement import Measurement
+from app.models.system_config import SystemConfiguration
+from app.services.ingest import get_dialect_insert
+from app.services.packed_storage import PACKED_STORAGE_ENABLED, merge_tiers, query_packed
+from app.utils.time_utils import SYSTEM_TIMEZONE, epochs_to_datetime64, get_local_now, get_zone, local_to_epochs
+
+KPI_TRACKING_ENABLED = os.getenv("KPI_TRACKING_ENABLED", "1") == "1"
+KPI_DEFAULT_PR = float(os.getenv("KPI_DEFAULT_PR", "0.85"))
+KPI_TEMPERATURE_COEFFICIENT = float(os.getenv("KPI_TEMPERATURE_COEFFICIENT", "-0.004"))
+KPI_MAX_GAP_MINUTES = float(os.getenv("KPI_MAX_GAP_MINUTES", "15"))
+KPI_DIRTY_MEMO_SECONDS = float(os.getenv("KPI_DIRTY_MEMO_SECONDS", "300"))
+
+REFERENCE_TEMPERATURE = 25.0
+# 单次读取的最大连续日数（控制全量重算时的内存占用）
+_CHUNK_DAYS = 92
+_MAX_MEMO_KEYS = 100_000
+_MARK_CHUNK_SIZE = 1000
+
+
+@dataclass
+class KPIRunStats:
+    """一次 KPI 任务的统计。"""
+    systems: int = 0
+    days: int = 0
+    written: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+
+class DirtyDayTracker:
+    """登记有新写入的 (系统, 日期)，供 KPI 任务增量重算。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memo: Dict[Tuple[str, date], float] = {}
+
+    def _fresh_keys(self, keys: Iterable[Tuple[str, date]]) -> List[Tuple[str, date]]:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._memo) > _MAX_MEMO_KEYS:
+                self._memo = {k: t for k, t in self._memo.items() if now - t < KPI_DIRTY_MEMO_SECONDS}
+            fresh = [k for k in keys if now - self._memo.get(k, -KPI_DIRTY_MEMO_SECONDS) >= KPI_DIRTY_MEMO_SECONDS]
+            for key in fresh:
+                self._memo[key] = now
+        return fresh
+
+    def mark(self, db: Session, keys: Iterable[Tuple[str, date]]) -> None:
+        """登记待重算的 (system_id, 本地日期)，不提交事务。"""
+        keys = sorted(set(keys))
+        if not keys:
+            return
+        insert = get_dialect_insert(db)
+        now = get_local_now()
+        for start in range(0, len(keys), _MARK_CHUNK_SIZE):
+            stmt = insert(KPIDirtyDay.__table__).values([
+                {"system_id": system_id, "day": day, "marked_at": now}
+                for system_id, day in keys[start:start + _MARK_CHUNK_SIZE]
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["system_id", "day"],
+                set_={"marked_at": stmt.excluded.marked_at},
+            )
+            db.execute(stmt)
+
+    def on_ingest(self, source: str, rows: List[Any]) -> None:
+        keys = self._fresh_keys({(row.system_id, row.timestamp.date()) for row in rows})
+        if not keys:
+            return
+        db = SessionLocal()
+        try:
+            self.mark(db, keys)
+            db.commit()
+        except Exception:
+            # 登记失败时允许下一次写入重试
+            with self._lock:
+                for key in keys:
+                    self._memo.pop(key, None)
+            raise
+        finally:
+            db.close()
+
+
+# 写入回调由 register_writer_listeners 在各写入进程启动时注册
+dirty_days = DirtyDayTracker()
+
+
+# ---- 日期换算 ----
+
+def system_zone(config: Optional[SystemConfiguration]) -> str:
+    """系统所在时区（未配置或无法识别时为 Asia/Shanghai）。"""
+    if config is not None and get_zone(config.timezone) is not None:
+        return config.timezone
+    return SYSTEM_TIMEZONE
+
+
+def _stored_to_local_days(timestamps: np.ndarray, tz_name: str) -> np.ndarray:
+    """存储时间（Asia/Shanghai 本地）转换为系统时区的本地日期（datetime64[D]）。"""
+    if tz_name == SYSTEM_TIMEZONE:
+        return timestamps.astype("datetime64[D]")
+    epochs = local_to_epochs(timestamps, SYSTEM_TIMEZONE)
+    return epochs_to_datetime64(epochs, unit="s", tz_name=tz_name).astype("datetime64[D]")
+
+
+def local_days_covering(stored_day: date, tz_name: str) -> Set[date]:
+    """存储时间的某一天（Asia/Shanghai 本地日期）覆盖的系统本地日期。"""
+    bounds = np.array(
+        [datetime.combine(stored_day, dt_time.min), datetime.combine(stored_day, dt_time.max)],
+        dtype="datetime64[us]",
+    )
+    first, last = _stored_to_local_days(bounds, tz_name).tolist()
+    return {first + timedelta(days=n) for n in range((last - first).days + 1)}
+
+
+def local_today(tz_name: str) -> date:
+    return epochs_to_datetime64([time.time()], unit="s", tz_name=tz_name).astype("datetime64[D]").tolist()[0]
+
+
+# ---- 计算 ----
+
+def load_series(db: Session, system_id: str, start_time: datetime, end_time: datetime):
+    """读取时间范围内的测量序列（含已打包数据），返回按时间升序的 (时间, 辐照度, 温度) 数组。"""
+    with shard_scope(db, system_id):
+        rows = (
+            db.query(Measurement)
+            .with_entities(Measurement.system_id, Measurement.timestamp, Measurement.irradiance, Measurement.temperature)
+            .filter(
+                Measurement.system_id == system_id,
+                Measurement.timestamp >= start_time,
+                Measurement.timestamp <= end_time,
+            )
+            .order_by(Measurement.timestamp.desc())
+            .all()
+        )
+        if PACKED_STORAGE_ENABLED:
+            rows = merge_tiers(rows, query_packed(db, system_id, start_time, end_time))
+        rows.reverse()
+        timestamps = np.array([row.timestamp for row in rows], dtype="datetime64[us]")
+        irradiance = np.array([np.nan if row.irradiance is None else row.irradiance for row in rows], dtype=np.float64)
+        temperature = np.array([np.nan if row.temperature is None else row.temperature for row in rows], dtype=np.float64)
+        return timestamps, irradiance, temperature
+
+
+def _day_chunks(days: Sequence[date]) -> List[List[date]]:
+    chunks: List[List[date]] = []
+    for day in days:
+        if chunks and (day - chunks[-1][0]).days < _CHUNK_DAYS:
+            chunks[-1].append(day)
+        else:
+            chunks.append([day])
+    return chunks
+
+
+def system_parameters(config: Optional[SystemConfiguration]) -> Tuple[Optional[float], float, float]:
+    """返回 (装机容量 kW, 基准性能比, 温度系数)；性能比与温度系数可在 extra_metadata 中覆盖。"""
+    metadata = (config.extra_metadata if config is not None else None) or {}
+    capacity = config.capacity if config is not None else None
+    base_pr = float(metadata.get("performance_ratio", KPI_DEFAULT_PR))
+    gamma = float(metadata.get("temperature_coefficient", KPI_TEMPERATURE_COEFFICIENT))
+    return capacity, base_pr, gamma
+
+
+def compute_system_days(
+    db: Session,
+    system_id: str,
+    config: Optional[SystemConfiguration],
+    days: Iterable[date],
+) -> int:
+    """
+    重算单个系统指定本地日期的 KPI 并替换 daily_kpis 中对应行（不提交事务）。
+
+    无测量数据的日期删除已有 KPI 行。
+
+    Returns:
+        写入的 KPI 行数
+    """
+    tz_name = system_zone(config)
+    capacity, base_pr, gamma = system_parameters(config)
+    now = get_local_now()
+    written = 0
+
+    for chunk in _day_chunks(sorted(set(days))):
+        first, last = chunk[0], chunk[-1]
+        n_days = (last - first).days + 1
+        # 系统时区与存储时区的日界不同，前后各多读一天
+        timestamps, irradiance, temperature = load_series(
+            db,
+            system_id,
+            datetime.combine(first - timedelta(days=1), dt_time.min),
+            datetime.combine(last + timedelta(days=1), dt_time.max),
+        )
+        day_index = (_stored_to_local_days(timestamps, tz_name) - np.datetime64(first, "D")).astype(np.int64)
+        inside = (day_index >= 0) & (day_index < n_days)
+        timestamps, irradiance, temperature, day_index = (
+            timestamps[inside], irradiance[inside], temperature[inside], day_index[inside]
+        )
+        epochs = timestamps.astype(np.int64) / 1_000_000
+
+        insolation, covered = daily_insolation(epochs, irradiance, day_index, n_days, KPI_MAX_GAP_MINUTES * 60)
+        counts = np.bincount(day_index, minlength=n_days)
+        finite = np.isfinite(irradiance)
+        max_irradiance = np.full(n_days, -np.inf)
+        np.maximum.at(max_irradiance, day_index[finite], irradiance[finite])
+        module_temperature = weighted_daily_mean(temperature, irradiance, day_index, n_days)
+
+        performance_ratio = np.where(
+            np.isnan(module_temperature),
+            base_pr,
+            base_pr * (1 + gamma * (module_temperature - REFERENCE_TEMPERATURE)),
+        )
+        performance_ratio = np.clip(performance_ratio, 0.0, 1.0)
+        peak_sun_hours = insolation / STC_IRRADIANCE
+        expected = estimate_daily_energy(capacity, peak_sun_hours, performance_ratio) if capacity else None
+
+        rows = []
+        for day in chunk:
+            i = (day - first).days
+            if not counts[i]:
+                continue
+            rows.append({
+                "system_id": system_id,
+                "day": day,
+                "sample_count": int(counts[i]),
+                "coverage": round(float(covered[i]) / 86400, 4),
+                "peak_sun_hours": round(float(peak_sun_hours[i]), 4),
+                "max_irradiance": float(max_irradiance[i]) if np.isfinite(max_irradiance[i]) else None,
+                "module_temperature": round(float(module_temperature[i]), 2) if np.isfinite(module_temperature[i]) else None,
+                "performance_ratio": round(float(performance_ratio[i]), 4),
+                "expected_energy_kwh": float(expected[i]) if expected is not None else None,
+                "computed_at": now,
+            })
+
+        db.query(DailyKPI).filter(DailyKPI.system_id == system_id, DailyKPI.day.in_(chunk)).delete(
+            synchronize_session=False
+        )
+        if rows:
+            db.execute(DailyKPI.__table__.insert(), rows)
+        written += len(rows)
+    return written
+
+
+def run_kpi_job(
+    db: Session,
+    targets: Dict[str, Set[date]],
+    dirty: Optional[Dict[str, Set[date]]] = None,
+    started_at: Optional[datetime] = None,
+) -> KPIRunStats:
+    """
+    重算各系统指定日期的 KPI（每个系统提交一次）。
+
+    Args:
+        targets: {system_id: 系统本地日期集合}
+        dirty: 本次处理的登记 {system_id: 存储日期集合}，成功后删除（只删除 started_at 之前的登记）
+        started_at: 读取登记的时间
+    """
+    began = time.perf_counter()
+    stats = KPIRunStats()
+    configs = {
+        config.system_id: config
+        for config in db.query(SystemConfiguration).filter(SystemConfiguration.system_id.in_(list(targets))).all()
+    } if targets else {}
+
+    for system_id, days in sorted(targets.items()):
+        config = configs.get(system_id)
+        today = local_today(system_zone(config))
+        days = {day for day in days if day <= today}
+        try:
+            stats.written += compute_system_days(db, system_id, config, days)
+            if dirty and dirty.get(system_id):
+                db.query(KPIDirtyDay).filter(
+                    KPIDirtyDay.system_id == system_id,
+                    KPIDirtyDay.day.in_(sorted(dirty[system_id])),
+                    KPIDirtyDay.marked_at <= started_at,
+                ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            stats.failed += 1
+            print(f"❌ {system_id} KPI 计算失败: {e}")
+            continue
+        stats.systems += 1
+        stats.days += len(days)
+
+    stats.elapsed_seconds = round(time.perf_counter() - began, 3)
+    return stats
+
+
+def pending_targets(db: Session) -> Tuple[Dict[str, Set[date]], Dict[str, Set[date]], datetime]:
+    """
+    读取待重算登记并换算为系统本地日期。
+
+    Returns:
+        (重算目标, 原始登记, 读取时间)
+    """
+    started_at = get_local_now()
+    dirty: Dict[str, Set[date]] = {}
+    for mark in db.query(KPIDirtyDay).filter(KPIDirtyDay.marked_at <= started_at).all():
+        dirty.setdefault(mark.system_id, set()).add(mark.day)
+    zones = {
+        config.system_id: system_zone(config)
+        for config in db.query(SystemConfiguration).filter(SystemConfiguration.system_id.in_(list(dirty))).all()
+    } if dirty else {}
+
+    targets: Dict[str, Set[date]] = {}
+    for system_id, stored_days in dirty.items():
+        tz_name = zones.get(system_id, SYSTEM_TIMEZONE)
+        for stored_day in stored_days:
+            targets.setdefault(system_id, set()).update(local_days_covering(stored_day, tz_name))
+    return targets, dirty, started_at
+
+
+def nightly_targets(db: Session, system_ids: Optional[Sequence[str]] = None) -> Dict[str, Set[date]]:
+    """所有启用系统（或指定系统）的本地前一天。"""
+    query = db.query(SystemConfiguration)
+    if system_ids:
+        query = query.filter(SystemConfiguration.system_id.in_(list(system_ids)))
+    else:
+        query = query.filter(SystemConfiguration.is_active == True)
+    return {
+        config.system_id: {local_today(system_zone(config)) - timedelta(days=1)}
+        for config in query.all()
+    }
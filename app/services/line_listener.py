@@ -0,0 +1,231 @@
+"""
+行协议写入监听器（TCP / UDP）。
+
+为每分钟上报一次的小报文提供比 HTTP 更轻量的写入通道。每行一条读数：
+
+    system_id,ts,NR,Tbody
+
+- ts 为 UTC 毫秒时间戳（可留空，使用接收时间）
+- NR、Tbody 可留空表示缺失
+- 字段映射与 POST / 完全一致（复用 DEVICE_FIELD_MAP / map_device_reading）
+
+读数进入有界队列，由批量写入器按条数或时间间隔合并后一次性 upsert 到 measurements。
+可随应用启动（LINE_LISTENER_ENABLED=1），也可通过 scripts/line_listener.py 独立运行。
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from app.database.database import SessionLocal
+from app.services.device_payload import DEVICE_FIELD_MAP, map_device_reading
+from app.services.ingest import SOURCE_LINE, write_measurements
+from app.utils.time_utils import get_local_now
+
+LINE_LISTENER_ENABLED = os.getenv("LINE_LISTENER_ENABLED", "0") == "1"
+LINE_LISTENER_HOST = os.getenv("LINE_LISTENER_HOST", "0.0.0.0")
+LINE_LISTENER_TCP_PORT = int(os.getenv("LINE_LISTENER_TCP_PORT", "8089"))
+LINE_LISTENER_UDP_PORT = int(os.getenv("LINE_LISTENER_UDP_PORT", "8089"))
+
+# 批量写入参数：满 LINE_BATCH_SIZE 条或距上次写入超过 LINE_FLUSH_INTERVAL 秒即写库
+LINE_BATCH_SIZE = int(os.getenv("LINE_BATCH_SIZE", "500"))
+LINE_FLUSH_INTERVAL = float(os.getenv("LINE_FLUSH_INTERVAL", "1.0"))
+LINE_QUEUE_SIZE = int(os.getenv("LINE_QUEUE_SIZE", "50000"))
+
+_FIELD_COUNT = 2 + len(DEVICE_FIELD_MAP)
+
+
+def parse_line(line: str, now) -> Dict[str, Any]:
+    """
+    解析一行读数并映射为测量记录。
+
+    Raises:
+        ValueError: 字段数量或数值格式不正确
+    """
+    parts = [part.strip() for part in line.split(",")]
+    if len(parts) != _FIELD_COUNT:
+        raise ValueError(f"expected {_FIELD_COUNT} fields, got {len(parts)}")
+
+    system_id, ts, *values = parts
+    payload = {
+        "system_id": system_id,
+        "ts": float(ts) if ts else None,
+        "params": {
+            param: float(value) if value else None
+            for param, value in zip(DEVICE_FIELD_MAP, values)
+        },
+    }
+    return map_device_reading(payload, now)
+
+
+class BatchedMeasurementWriter:
+    """将读数缓冲后批量写入数据库的写入器（数据库操作在线程池中执行）。"""
+
+    def __init__(
+        self,
+        batch_size: int = LINE_BATCH_SIZE,
+        flush_interval: float = LINE_FLUSH_INTERVAL,
+        queue_size: int = LINE_QUEUE_SIZE,
+        on_conflict: Optional[str] = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_conflict = on_conflict
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, row: Dict[str, Any]) -> None:
+        """入队一条读数（队列满时等待，对 TCP 连接形成背压）。"""
+        await self.queue.put(row)
+
+    def put_nowait(self, row: Dict[str, Any]) -> None:
+        """入队一条读数（队列满时丢弃，用于 UDP）。"""
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.rows_dropped += 1
+
+    async def stop(self) -> None:
+        """停止写入器并写入队列中剩余的读数。"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        remaining = []
+        while not self.queue.empty():
+            remaining.append(self.queue.get_nowait())
+        if remaining:
+            await self._flush(remaining)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            result = await asyncio.to_thread(self._write_batch, rows)
+            self.rows_written += result.written
+        except Exception as e:
+            self.rows_dropped += len(rows)
+            print(f"❌ 行协议批量写入失败（{len(rows)} 条）: {e}")
+
+    def _write_batch(self, rows: List[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            return write_measurements(db, rows, SOURCE_LINE, self.on_conflict)
+        finally:
+            db.close()
+
+
+class _UdpLineProtocol(asyncio.DatagramProtocol):
+    def __init__(self, listener: "LineProtocolListener"):
+        self.listener = listener
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        now = get_local_now()
+        for line in data.decode("utf-8", errors="ignore").splitlines():
+            row = self.listener.handle_line(line, now)
+            if row is not None:
+                self.listener.writer.put_nowait(row)
+
+
+class LineProtocolListener:
+    """同时监听 TCP 与 UDP 的行协议服务（端口为 None 时不启用对应协议）。"""
+
+    def __init__(
+        self,
+        host: str = LINE_LISTENER_HOST,
+        tcp_port: Optional[int] = LINE_LISTENER_TCP_PORT,
+        udp_port: Optional[int] = LINE_LISTENER_UDP_PORT,
+        writer: Optional[BatchedMeasurementWriter] = None,
+    ):
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.writer = writer or BatchedMeasurementWriter()
+        self.lines_received = 0
+        self.lines_invalid = 0
+        self._tcp_server: Optional[asyncio.AbstractServer] = None
+        self._udp_transport: Optional[asyncio.DatagramTransport] = None
+
+    def handle_line(self, line: str, now) -> Optional[Dict[str, Any]]:
+        """解析一行读数；空行返回 None，格式错误计数后丢弃。"""
+        line = line.strip()
+        if not line:
+            return None
+        self.lines_received += 1
+        try:
+            return parse_line(line, now)
+        except Exception:
+            self.lines_invalid += 1
+            return None
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                row = self.handle_line(raw.decode("utf-8", errors="ignore"), get_local_now())
+                if row is not None:
+                    await self.writer.put(row)
+        except (ValueError, asyncio.LimitOverrunError):
+            # 单行超过 StreamReader 缓冲上限（未换行的超长数据），计为无效并断开连接
+            self.lines_received += 1
+            self.lines_invalid += 1
+            print(f"⚠️ 行协议 TCP 连接发送超长行，已断开: {writer.get_extra_info('peername')}")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self) -> None:
+        self.writer.start()
+        if self.tcp_port is not None:
+            self._tcp_server = await asyncio.start_server(self._handle_tcp, self.host, self.tcp_port)
+            print(f"📡 行协议 TCP 监听: {self.host}:{self.tcp_port}")
+        if self.udp_port is not None:
+            loop = asyncio.get_running_loop()
+            self._udp_transport, _ = await loop.create_datagram_endpoint(
+                lambda: _UdpLineProtocol(self), local_addr=(self.host, self.udp_port)
+            )
+            print(f"📡 行协议 UDP 监听: {self.host}:{self.udp_port}")
+
+    async def stop(self) -> None:
+        if self._tcp_server:
+            self._tcp_server.close()
+            await self._tcp_server.wait_closed()
+        if self._udp_transport:
+            self._udp_transport.close()
+        await self.writer.stop()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "lines_received": self.lines_received,
+            "lines_invalid": self.lines_invalid,
+            "rows_written": self.writer.rows_written,
+            "rows_dropped": self.writer.rows_dropped,
+            "queue_size": self.writer.queue.qsize(),
+        }
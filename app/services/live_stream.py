@@ -0,0 +1,95 @@
+"""
+测量数据实时推送模块（Server-Sent Events）。
+
+写入路径提交后通过写入回调发布新记录，按 system_id 推送给已订阅的浏览器，
+看板只需首次加载历史数据，之后追加增量，无需轮询数据库。
+
+说明：订阅与发布均在当前进程内完成；多 worker 部署时需将写入与订阅路由到同一进程
+（或使用单 worker / 会话保持）。
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.schemas.measurement import MeasurementResponse
+from app.services.ingest import register_ingest_listener
+
+# 每个订阅者的待发送事件上限（浏览器消费过慢时丢弃最旧事件）
+SUBSCRIBER_QUEUE_SIZE = 2000
+
+# 心跳间隔（秒），防止代理断开空闲连接
+HEARTBEAT_INTERVAL = 15.0
+
+
+def encode_measurement_event(row: Any) -> str:
+    """将测量记录编码为 SSE 事件文本（与 GET /measurements/ 的响应字段一致）。"""
+    data = MeasurementResponse.from_orm(row).dict()
+    data["local_time"] = row.timestamp
+    return f"id: {row.id}\nevent: measurement\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+class MeasurementBroadcaster:
+    """按 system_id 管理订阅者并分发新写入的测量记录（线程安全，可从同步路由中发布）。"""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self.events_published = 0
+        self.events_dropped = 0
+
+    def subscribe(self, system_id: str) -> asyncio.Queue:
+        """在当前事件循环中订阅指定系统的新记录。"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(system_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, system_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(system_id)
+            if not subscribers:
+                return
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                del self._subscribers[system_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _offer(self, queue: asyncio.Queue, events: List[str]) -> None:
+        for event in events:
+            if queue.full():
+                queue.get_nowait()
+                self.events_dropped += 1
+            queue.put_nowait(event)
+
+    def publish(self, source: str, rows: List[Any]) -> None:
+        """发布新写入的记录（写入回调）；没有订阅者的系统不做任何编码。"""
+        with self._lock:
+            if not self._subscribers:
+                return
+            targets = {system_id: list(subs) for system_id, subs in self._subscribers.items()}
+
+        events_by_system: Dict[str, List[str]] = {}
+        for row in sorted(rows, key=lambda r: r.timestamp):
+            if row.system_id in targets:
+                events_by_system.setdefault(row.system_id, []).append(encode_measurement_event(row))
+
+        for system_id, events in events_by_system.items():
+            for loop, queue in targets[system_id]:
+                try:
+                    loop.call_soon_threadsafe(self._offer, queue, events)
+                except RuntimeError:
+                    # 事件循环已关闭，订阅者随连接断开清理
+                    continue
+            self.events_published += len(events)
+
+
+broadcaster = MeasurementBroadcaster()
+register_ingest_listener(broadcaster.publish)
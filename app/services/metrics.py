@@ -0,0 +1,197 @@
+"""
+Prometheus 指标模块。
+
+统一定义并采集平台运行指标，由 GET /metrics 以 Prometheus 文本格式导出：
+- HTTP 请求耗时（按路由模板、方法、状态码）
+- 写入行数（按写入来源与结果，配合 rate() 即为每秒写入行数）与写入耗时
+- 数据库语句耗时（SQLAlchemy 引擎事件）与连接池占用
+- 气象接口拉取耗时与失败次数
+- 计算函数耗时
+- 准入控制的排队耗时、排队 / 执行中请求数与拒绝次数（按路由类别）
+
+热路径上每次请求 / 每批写入只做常数次计数，不按行计数。
+多 worker 部署时设置 PROMETHEUS_MULTIPROC_DIR（启动前清空该目录），
+各进程写入共享目录，/metrics 汇总全部进程的指标。
+未安装 prometheus_client 或 METRICS_ENABLED=0 时所有采集调用为空操作。
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        REGISTRY,
+        generate_latest,
+        multiprocess,
+    )
+except Exception:
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    Counter = Gauge = Histogram = None
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1" and Counter is not None
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+
+# 耗时分桶（秒）：覆盖毫秒级查询到数秒级外部请求
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NoopMetric:
+    """指标未启用时的占位对象，接口与 prometheus_client 指标一致。"""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def observe(self, amount: float) -> None:
+        pass
+
+
+def _counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+    if not METRICS_ENABLED:
+        return _NoopMetric()
+    return Counter(name, documentation, labelnames)
+
+
+def _histogram(name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+    if not METRICS_ENABLED:
+        return _NoopMetric()
+    return Histogram(name, documentation, labelnames, buckets=LATENCY_BUCKETS)
+
+
+def _gauge(name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+    if not METRICS_ENABLED:
+        return _NoopMetric()
+    # livesum：多进程模式下汇总存活进程的当前值
+    return Gauge(name, documentation, labelnames, multiprocess_mode="livesum")
+
+
+HTTP_REQUEST_DURATION = _histogram(
+    "pv_http_request_duration_seconds", "HTTP 请求耗时", ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = _gauge("pv_http_requests_in_progress", "正在处理的 HTTP 请求数")
+
+INGEST_ROWS = _counter("pv_ingest_rows_total", "测量数据写入行数", ("source", "outcome"))
+INGEST_DURATION = _histogram("pv_ingest_write_duration_seconds", "一次写入（含提交）耗时", ("source",))
+
+DB_QUERY_DURATION = _histogram("pv_db_query_duration_seconds", "数据库语句执行耗时", ("operation",))
+DB_POOL_CHECKED_OUT = _gauge("pv_db_pool_checked_out", "当前从连接池借出的连接数")
+DB_POOL_CHECKOUTS = _counter("pv_db_pool_checkouts_total", "连接池借出次数")
+DB_CONNECTIONS_CREATED = _counter("pv_db_connections_created_total", "新建数据库连接数")
+
+WEATHER_FETCH_DURATION = _histogram("pv_weather_fetch_duration_seconds", "气象接口请求耗时", ("kind",))
+WEATHER_FETCH_ERRORS = _counter("pv_weather_fetch_errors_total", "气象接口请求失败次数", ("kind",))
+
+CALCULATION_DURATION = _histogram("pv_calculation_duration_seconds", "计算函数耗时", ("name",))
+
+ADMISSION_QUEUE_WAIT = _histogram("pv_admission_queue_wait_seconds", "请求在准入队列中的等待时间", ("route_class",))
+ADMISSION_REJECTIONS = _counter("pv_admission_rejections_total", "准入控制拒绝的请求数", ("route_class", "reason"))
+ADMISSION_IN_FLIGHT = _gauge("pv_admission_in_flight", "已准入、正在处理的请求数", ("route_class",))
+ADMISSION_QUEUED = _gauge("pv_admission_queued", "在准入队列中等待的请求数", ("route_class",))
+
+_SQL_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def record_http_request(method: str, route: str, status: int, elapsed: float) -> None:
+    HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(elapsed)
+
+
+def record_ingest(source: str, received: int, written: int, duplicates: int, elapsed: float) -> None:
+    """记录一次写入（每批一次，不按行调用）。"""
+    INGEST_ROWS.labels(source, "received").inc(received)
+    INGEST_ROWS.labels(source, "written").inc(written)
+    INGEST_ROWS.labels(source, "duplicate").inc(duplicates)
+    INGEST_DURATION.labels(source).observe(elapsed)
+
+
+@contextmanager
+def observe_weather_fetch(kind: str) -> Iterator[None]:
+    """统计一次气象接口请求的耗时；抛出异常时计入失败次数。"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        WEATHER_FETCH_ERRORS.labels(kind).inc()
+        raise
+    finally:
+        WEATHER_FETCH_DURATION.labels(kind).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def observe_calculation(name: str) -> Iterator[None]:
+    """统计一段计算的耗时。"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        CALCULATION_DURATION.labels(name).observe(time.perf_counter() - start)
+
+
+def _sql_operation(statement: str) -> str:
+    keyword = statement.lstrip()[:6].upper()
+    return keyword if keyword in _SQL_OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine) -> None:
+    """为 SQLAlchemy 引擎注册语句耗时与连接池事件监听。"""
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_metrics_query_start")
+        if starts:
+            DB_QUERY_DURATION.labels(_sql_operation(statement)).observe(time.perf_counter() - starts.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get("_metrics_query_start") if conn is not None else None
+        if starts:
+            starts.pop()
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        DB_CONNECTIONS_CREATED.inc()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc()
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def render_metrics() -> Optional[bytes]:
+    """导出 Prometheus 文本格式指标；未启用时返回 None。"""
+    if not METRICS_ENABLED:
+        return None
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    """worker 退出时清理本进程的 livesum 指标文件（仅多进程模式）。"""
+    if METRICS_ENABLED and PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,205 @@
+"""
+辐照度传感器近邻交叉校验。
+
+相邻系统的小时平均辐照度应基本一致，传感器故障（积灰、遮挡、倾斜、漂移）表现为长期偏离周边系统：
+- 用空间索引为每个启用系统找出 NEIGHBOR_COUNT 个距离不超过 NEIGHBOR_MAX_DISTANCE_KM 的启用近邻
+- 全部系统一次重采样为小时平均（采样数不足 NEIGHBOR_MIN_SAMPLES_PER_HOUR 的小时视为缺测），
+  按近邻下标表取出 系统 × 近邻 × 小时 的三维数组，整批计算近邻中位数与本系统的比值
+- 只比较近邻中位数不低于 NEIGHBOR_MIN_IRRADIANCE 的白天时段，比值偏离 1 超过 NEIGHBOR_TOLERANCE 的小时记为偏离
+- 偏离小时占比不低于 NEIGHBOR_FLAG_FRACTION 的系统标记为 divergent；
+  结果写入 neighbor_validations（每系统一行）与 neighbor_divergences（偏离的小时）
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.validation import NeighborDivergence, NeighborValidation
+from app.services.ingest import get_dialect_insert
+from app.services.metrics import observe_calculation
+from app.services.resampling import resample_systems
+from app.services.spatial_index import get_spatial_index
+from app.utils.time_utils import get_local_now
+
+NEIGHBOR_COUNT = int(os.getenv("NEIGHBOR_COUNT", "5"))
+NEIGHBOR_MAX_DISTANCE_KM = float(os.getenv("NEIGHBOR_MAX_DISTANCE_KM", "50"))
+NEIGHBOR_MIN_NEIGHBORS = int(os.getenv("NEIGHBOR_MIN_NEIGHBORS", "2"))
+NEIGHBOR_MIN_IRRADIANCE = float(os.getenv("NEIGHBOR_MIN_IRRADIANCE", "100"))
+NEIGHBOR_MIN_SAMPLES_PER_HOUR = int(os.getenv("NEIGHBOR_MIN_SAMPLES_PER_HOUR", "4"))
+NEIGHBOR_TOLERANCE = float(os.getenv("NEIGHBOR_TOLERANCE", "0.3"))
+NEIGHBOR_FLAG_FRACTION = float(os.getenv("NEIGHBOR_FLAG_FRACTION", "0.25"))
+NEIGHBOR_MIN_HOURS = int(os.getenv("NEIGHBOR_MIN_HOURS", "3"))
+
+STATUS_OK = "ok"
+STATUS_DIVERGENT = "divergent"
+STATUS_INSUFFICIENT_NEIGHBORS = "insufficient_neighbors"
+STATUS_INSUFFICIENT_DATA = "insufficient_data"
+
+_UPSERT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class ValidationRunStats:
+    """一次近邻校验任务的统计。"""
+    systems: int = 0
+    divergent: int = 0
+    insufficient: int = 0
+    divergent_hours: int = 0
+    elapsed_seconds: float = 0.0
+
+
+def neighbor_ratios(
+    hourly: np.ndarray,
+    rows: np.ndarray,
+    neighbors: np.ndarray,
+    min_neighbors: int,
+    min_irradiance: float,
+):
+    """
+    按近邻下标表计算系统每小时与近邻中位数的比值。
+
+    Args:
+        hourly: 系统 × 小时 的小时平均辐照度（缺测为 NaN）
+        rows: 待校验系统在 hourly 中的行号
+        neighbors: 待校验系统 × k 的近邻行号（-1 表示空位）
+
+    Returns:
+        (本系统小时均值, 近邻中位数, 有数据的近邻数, 比值, 参与比较的掩码)，形状均为 待校验系统 × 小时
+    """
+    padded = np.vstack([hourly, np.full((1, hourly.shape[1]), np.nan)])
+    stacked = padded[neighbors]  # -1 指向补充的全 NaN 行
+    counts = np.sum(~np.isnan(stacked), axis=1)
+    own = hourly[rows]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        median = np.where(counts > 0, np.nanmedian(np.where(counts[:, None, :] > 0, stacked, 0.0), axis=1), np.nan)
+        ratio = own / median
+        compared = (counts >= min_neighbors) & (median >= min_irradiance) & ~np.isnan(own)
+    return own, median, counts, ratio, compared
+
+
+def _upsert_validations(db: Session, rows: List[Dict[str, Any]]) -> None:
+    insert = get_dialect_insert(db)
+    for i in range(0, len(rows), _UPSERT_CHUNK_SIZE):
+        stmt = insert(NeighborValidation.__table__).values(rows[i:i + _UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["system_id"],
+            set_={column: stmt.excluded[column] for column in rows[0] if column != "system_id"},
+        )
+        db.execute(stmt)
+
+
+def run_validation(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    system_ids: Optional[Sequence[str]] = None,
+) -> ValidationRunStats:
+    """
+    校验 [start_time, end_time) 内全部启用系统（或指定系统）的辐照度，写入结果并提交。
+
+    指定系统时近邻仍从全部启用系统中选取。
+    """
+    began = time.perf_counter()
+    stats = ValidationRunStats()
+    index = get_spatial_index(db)
+
+    selected = set(system_ids or [])
+    targets = [
+        i for i in np.flatnonzero(index.active).tolist()
+        if not selected or index.system_ids[i] in selected
+    ]
+    if not targets:
+        return stats
+
+    # 近邻只在启用系统中选取；待校验系统与其近邻一起重采样
+    neighbor_table = np.full((len(targets), NEIGHBOR_COUNT), -1, dtype=np.int64)
+    distance_table = np.full((len(targets), NEIGHBOR_COUNT), np.nan)
+    for n, i in enumerate(targets):
+        found, distances = index.nearest_indices(
+            float(index.latitude[i]), float(index.longitude[i]), NEIGHBOR_COUNT,
+            max_distance_km=NEIGHBOR_MAX_DISTANCE_KM, exclude=i,
+        )
+        neighbor_table[n, :len(found)] = found
+        distance_table[n, :len(found)] = distances
+    needed = np.union1d(targets, neighbor_table[neighbor_table >= 0])
+    remap = np.full(len(index) + 1, -1, dtype=np.int64)  # 末位对应空位 -1
+    remap[needed] = np.arange(len(needed))
+
+    fleet = resample_systems(db, [index.system_ids[i] for i in needed], start_time, end_time, 60)
+    hourly = np.where(fleet.samples >= NEIGHBOR_MIN_SAMPLES_PER_HOUR, fleet.irradiance, np.nan)
+    with observe_calculation("neighbor_validation"):
+        own, median, counts, ratio, compared = neighbor_ratios(
+            hourly, remap[targets], remap[neighbor_table], NEIGHBOR_MIN_NEIGHBORS, NEIGHBOR_MIN_IRRADIANCE
+        )
+        divergent = compared & (np.abs(ratio - 1) > NEIGHBOR_TOLERANCE)
+
+    now = get_local_now()
+    hours = fleet.grid.astype("datetime64[us]").tolist()
+    summaries: List[Dict[str, Any]] = []
+    divergence_rows: List[Dict[str, Any]] = []
+    for n, i in enumerate(targets):
+        system_id = index.system_ids[i]
+        neighbor_list = [
+            {"system_id": index.system_ids[j], "distance_km": round(float(d), 3)}
+            for j, d in zip(neighbor_table[n].tolist(), distance_table[n].tolist()) if j >= 0
+        ]
+        evaluated = int(compared[n].sum())
+        flagged = int(divergent[n].sum())
+        if len(neighbor_list) < NEIGHBOR_MIN_NEIGHBORS:
+            status = STATUS_INSUFFICIENT_NEIGHBORS
+        elif evaluated < NEIGHBOR_MIN_HOURS:
+            status = STATUS_INSUFFICIENT_DATA
+        elif flagged >= NEIGHBOR_FLAG_FRACTION * evaluated:
+            status = STATUS_DIVERGENT
+        else:
+            status = STATUS_OK
+        stats.divergent += status == STATUS_DIVERGENT
+        stats.insufficient += status in (STATUS_INSUFFICIENT_NEIGHBORS, STATUS_INSUFFICIENT_DATA)
+        summaries.append({
+            "system_id": system_id,
+            "status": status,
+            "window_start": start_time,
+            "window_end": end_time,
+            "neighbors": neighbor_list,
+            "evaluated_hours": evaluated,
+            "divergent_hours": flagged,
+            "median_ratio": round(float(np.median(ratio[n][compared[n]])), 4) if evaluated else None,
+            "computed_at": now,
+        })
+        for h in np.flatnonzero(divergent[n]).tolist():
+            divergence_rows.append({
+                "system_id": system_id,
+                "hour": hours[h],
+                "irradiance": round(float(own[n, h]), 1),
+                "neighbor_median": round(float(median[n, h]), 1),
+                "ratio": round(float(ratio[n, h]), 4),
+                "neighbor_count": int(counts[n, h]),
+                "computed_at": now,
+            })
+
+    try:
+        target_ids = [row["system_id"] for row in summaries]
+        for k in range(0, len(target_ids), _UPSERT_CHUNK_SIZE):
+            db.query(NeighborDivergence).filter(
+                NeighborDivergence.system_id.in_(target_ids[k:k + _UPSERT_CHUNK_SIZE]),
+                NeighborDivergence.hour >= start_time,
+                NeighborDivergence.hour < end_time,
+            ).delete(synchronize_session=False)
+        if divergence_rows:
+            db.execute(NeighborDivergence.__table__.insert(), divergence_rows)
+        if summaries:
+            _upsert_validations(db, summaries)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    stats.systems = len(summaries)
+    stats.divergent_hours = len(divergence_rows)
+    stats.elapsed_seconds = round(time.perf_counter() - began, 3)
+    return stats
@@ -0,0 +1,516 @@
+"""
+测量数据分块压缩存储（可选）。
+
+measurements 表每个采样点一行（整数主键、system_id 字符串、两个时间戳及唯一索引），
+行开销是数据本身的数倍，索引维护也是写入的主要成本。开启 PACKED_STORAGE_ENABLED 后，
+由压缩脚本（scripts/compact_measurements.py）将超过一定时间的数据按“系统 × 小时/天”
+打包为 measurement_blocks 表中的一行：
+- 时间戳存为相对块起点的微秒偏移向量（差分编码）
+- 辐照度、温度存为 float64 数组（缺失值为 NaN）
+- 原记录 ID 与接收时间同样差分编码保存，解包结果与行存储完全一致（无损）
+- 各数组按字节位重排后 zlib 压缩（分钟级数据的差分值与高位字节高度重复）
+
+近期数据仍写入行存储，查询接口（列表、降采样、按 ID 查询与删除、实测辐射）合并两层结果，
+对调用方透明；同一键同时存在于两层时（如回填直接写入已打包时段）以行存储为准。
+写入路径在写入前检查目标时间是否已打包：ignore 策略下计为重复，update 策略下直接改写所在数据块。
+配置了测量数据分片时数据块与行存储位于系统所在的同一分片；按 ID 查找与删除由调用方在各分片上执行。
+"""
+
+import os
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database.sharding import fan_out, shard_scope, system_shard, use_shard
+from app.models.measurement import Measurement, MeasurementBlock
+from app.utils.time_utils import get_local_now
+
+PACKED_STORAGE_ENABLED = os.getenv("PACKED_STORAGE_ENABLED", "0") == "1"
+PACKED_BLOCK_SPAN = os.getenv("PACKED_BLOCK_SPAN", "day")
+PACKED_COMPACT_AFTER_HOURS = int(os.getenv("PACKED_COMPACT_AFTER_HOURS", "72"))
+
+_BLOCK_SPANS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+if PACKED_BLOCK_SPAN not in _BLOCK_SPANS:
+    raise RuntimeError(
+        f"PACKED_BLOCK_SPAN must be one of {tuple(_BLOCK_SPANS)}, got '{PACKED_BLOCK_SPAN}'"
+    )
+BLOCK_SPAN = _BLOCK_SPANS[PACKED_BLOCK_SPAN]
+# 最长的块跨度：切换 PACKED_BLOCK_SPAN 后新旧块并存，范围查询按最长跨度放宽下界
+_MAX_BLOCK_SPAN = max(_BLOCK_SPANS.values())
+
+CODEC = "shuffle-zlib-v1"
+_ZLIB_LEVEL = 6
+_EPOCH = np.datetime64(0, "us")
+
+
+class PackedMeasurement(NamedTuple):
+    """从数据块解出的单条测量记录（字段与 measurements 表一致）。"""
+    id: int
+    system_id: str
+    timestamp: datetime
+    irradiance: Optional[float]
+    temperature: Optional[float]
+    created_at: datetime
+
+
+@dataclass
+class BlockArrays:
+    """一个数据块解包后的列数组（按时间升序，时间均为本地 naive 时间的微秒数）。"""
+    ids: np.ndarray
+    timestamps: np.ndarray
+    irradiance: np.ndarray
+    temperature: np.ndarray
+    created_at: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def take(self, index) -> "BlockArrays":
+        return BlockArrays(
+            ids=self.ids[index],
+            timestamps=self.timestamps[index],
+            irradiance=self.irradiance[index],
+            temperature=self.temperature[index],
+            created_at=self.created_at[index],
+        )
+
+    def to_measurements(self, system_id: str) -> List[PackedMeasurement]:
+        timestamps = self.timestamps.astype("datetime64[us]").tolist()
+        created_at = self.created_at.astype("datetime64[us]").tolist()
+        irradiance = np.where(np.isnan(self.irradiance), None, self.irradiance).tolist()
+        temperature = np.where(np.isnan(self.temperature), None, self.temperature).tolist()
+        return [
+            PackedMeasurement(int(i), system_id, ts, irr, temp, created)
+            for i, ts, irr, temp, created in zip(self.ids.tolist(), timestamps, irradiance, temperature, created_at)
+        ]
+
+
+def block_start_of(timestamp: datetime) -> datetime:
+    """返回时间戳所在数据块的起始时间。"""
+    if BLOCK_SPAN == timedelta(hours=1):
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _to_micros(values: Iterable[datetime]) -> np.ndarray:
+    return (np.array(list(values), dtype="datetime64[us]") - _EPOCH).astype(np.int64)
+
+
+def _to_floats(values: Iterable[Optional[float]]) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+# ---- 编解码 ----
+
+def _encode(values: np.ndarray) -> bytes:
+    """8 字节数组按字节位重排（各元素的同一字节连续存放）后 zlib 压缩。"""
+    raw = np.ascontiguousarray(values).view(np.uint8).reshape(-1, 8).T.tobytes()
+    return zlib.compress(raw, _ZLIB_LEVEL)
+
+
+def _decode(blob: bytes, dtype: str, count: int) -> np.ndarray:
+    raw = np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(8, count).T
+    return np.ascontiguousarray(raw).view(dtype).reshape(count)
+
+
+def _encode_ints(values: np.ndarray) -> bytes:
+    """整数序列差分编码后压缩（等间隔采样的时间偏移几乎全部为同一个值）。"""
+    return _encode(np.diff(values.astype("<i8"), prepend=np.int64(0)))
+
+
+def _decode_ints(blob: bytes, count: int) -> np.ndarray:
+    return np.cumsum(_decode(blob, "<i8", count))
+
+
+def unpack_block(block: MeasurementBlock) -> BlockArrays:
+    """解包数据块为列数组。"""
+    if block.codec != CODEC:
+        raise RuntimeError(f"Unsupported measurement block codec '{block.codec}'")
+    count = block.sample_count
+    base = int((np.datetime64(block.block_start, "us") - _EPOCH).astype(np.int64))
+    return BlockArrays(
+        ids=_decode_ints(block.ids, count),
+        timestamps=_decode_ints(block.timestamps, count) + base,
+        irradiance=_decode(block.irradiance, "<f8", count).astype(np.float64),
+        temperature=_decode(block.temperature, "<f8", count).astype(np.float64),
+        created_at=_decode_ints(block.created_at, count),
+    )
+
+
+def _decode_block_ids(block: MeasurementBlock) -> np.ndarray:
+    return _decode_ints(block.ids, block.sample_count)
+
+
+def _block_values(arrays: BlockArrays, block_start: datetime) -> Dict[str, Any]:
+    base = int((np.datetime64(block_start, "us") - _EPOCH).astype(np.int64))
+    return {
+        "sample_count": len(arrays),
+        "first_timestamp": np.datetime64(int(arrays.timestamps[0]), "us").tolist(),
+        "last_timestamp": np.datetime64(int(arrays.timestamps[-1]), "us").tolist(),
+        "min_id": int(arrays.ids.min()),
+        "max_id": int(arrays.ids.max()),
+        "codec": CODEC,
+        "timestamps": _encode_ints(arrays.timestamps - base),
+        "ids": _encode_ints(arrays.ids),
+        "irradiance": _encode(arrays.irradiance.astype("<f8")),
+        "temperature": _encode(arrays.temperature.astype("<f8")),
+        "created_at": _encode_ints(arrays.created_at),
+        "packed_at": get_local_now(),
+    }
+
+
+def _merge_arrays(existing: Optional[BlockArrays], incoming: BlockArrays) -> BlockArrays:
+    """合并两组采样点并按时间排序；时间戳相同时保留 incoming。"""
+    if existing is None or not len(existing):
+        merged = incoming
+    else:
+        merged = BlockArrays(*(
+            np.concatenate([getattr(existing, name), getattr(incoming, name)])
+            for name in ("ids", "timestamps", "irradiance", "temperature", "created_at")
+        ))
+    # 稳定排序后每个时间戳取最后一个（incoming 在后）
+    order = np.argsort(merged.timestamps, kind="stable")
+    merged = merged.take(order)
+    keep = np.append(merged.timestamps[1:] != merged.timestamps[:-1], True)
+    return merged.take(keep)
+
+
+def _write_block(
+    db: Session,
+    system_id: str,
+    block_start: datetime,
+    arrays: BlockArrays,
+    block: Optional[MeasurementBlock],
+) -> None:
+    """写入（或删除已空的）数据块，不提交事务。"""
+    if not len(arrays):
+        if block is not None:
+            db.delete(block)
+        return
+    values = _block_values(arrays, block_start)
+    if block is None:
+        db.add(MeasurementBlock(system_id=system_id, block_start=block_start, **values))
+    else:
+        for name, value in values.items():
+            setattr(block, name, value)
+
+
+def _rows_to_arrays(rows: Sequence[Any]) -> BlockArrays:
+    return BlockArrays(
+        ids=np.array([row.id for row in rows], dtype=np.int64),
+        timestamps=_to_micros(row.timestamp for row in rows),
+        irradiance=_to_floats(row.irradiance for row in rows),
+        temperature=_to_floats(row.temperature for row in rows),
+        created_at=_to_micros(row.created_at for row in rows),
+    )
+
+
+# ---- 读取 ----
+
+def _block_query(db: Session, system_id: Optional[str], start_time: Optional[datetime], end_time: Optional[datetime]):
+    query = db.query(MeasurementBlock)
+    if system_id:
+        query = query.filter(MeasurementBlock.system_id == system_id)
+    if end_time:
+        query = query.filter(MeasurementBlock.block_start <= end_time)
+    if start_time:
+        query = query.filter(
+            MeasurementBlock.block_start > start_time - _MAX_BLOCK_SPAN,
+            MeasurementBlock.last_timestamp >= start_time,
+        )
+    return query
+
+
+def query_packed(
+    db: Session,
+    system_id: Optional[str],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    limit: Optional[int] = None,
+) -> List[PackedMeasurement]:
+    """
+    按时间降序返回已打包数据中落在时间范围内的记录。
+
+    指定 limit 时只保证包含最新的 limit 条：数据块按起始时间倒序扫描，
+    后续数据块不可能再出现更新的记录时提前结束，避免解包整个历史。
+    """
+    with use_shard(db, system_shard(db, system_id) if system_id else None):
+        query = _block_query(db, system_id, start_time, end_time).order_by(MeasurementBlock.block_start.desc())
+        start_us = _to_micros([start_time])[0] if start_time else None
+        end_us = _to_micros([end_time])[0] if end_time else None
+
+        samples: List[PackedMeasurement] = []
+        threshold: Optional[datetime] = None
+        for block in query.yield_per(64):
+            if threshold is not None:
+                if block.block_start + _MAX_BLOCK_SPAN <= threshold:
+                    break
+                if block.last_timestamp < threshold:
+                    continue
+            arrays = unpack_block(block)
+            mask = np.ones(len(arrays), dtype=bool)
+            if start_us is not None:
+                mask &= arrays.timestamps >= start_us
+            if end_us is not None:
+                mask &= arrays.timestamps <= end_us
+            samples.extend(reversed(arrays.take(mask).to_measurements(block.system_id)))
+            if limit is not None and len(samples) >= limit:
+                samples.sort(key=lambda s: s.timestamp, reverse=True)
+                del samples[limit:]
+                threshold = samples[-1].timestamp
+
+        samples.sort(key=lambda s: s.timestamp, reverse=True)
+        return samples
+
+
+def packed_timestamps(db: Session, system_id: str, start_time: datetime, end_time: datetime) -> np.ndarray:
+    """返回已打包数据中 start_time <= t < end_time 的采样时间（datetime64[us]，升序，只解码时间列）。"""
+    with shard_scope(db, system_id):
+        start_us, end_us = _to_micros([start_time, end_time])
+        chunks = []
+        for block in _block_query(db, system_id, start_time, end_time).order_by(MeasurementBlock.block_start):
+            if block.codec != CODEC:
+                raise RuntimeError(f"Unsupported measurement block codec '{block.codec}'")
+            offsets = _decode_ints(block.timestamps, block.sample_count) + _to_micros([block.block_start])[0]
+            chunks.append(offsets[(offsets >= start_us) & (offsets < end_us)])
+        if not chunks:
+            return np.array([], dtype="datetime64[us]")
+        return (np.concatenate(chunks) + _EPOCH).astype("datetime64[us]")
+
+
+def merge_tiers(rows: Sequence[Any], packed: Sequence[PackedMeasurement]) -> List[Any]:
+    """合并按时间降序的行存储记录与打包数据（均需含 system_id 与 timestamp），按时间降序返回；同一键以行存储为准。"""
+    if not packed:
+        return list(rows)
+    stored = {(row.system_id, row.timestamp) for row in rows}
+    merged = list(rows)
+    merged.extend(s for s in packed if (s.system_id, s.timestamp) not in stored)
+    merged.sort(key=lambda row: row.timestamp, reverse=True)
+    return merged
+
+
+def _candidate_blocks(db: Session, measurement_id: int) -> List[MeasurementBlock]:
+    return (
+        db.query(MeasurementBlock)
+        .filter(MeasurementBlock.min_id <= measurement_id, MeasurementBlock.max_id >= measurement_id)
+        .all()
+    )
+
+
+def find_packed_by_id(db: Session, measurement_id: int) -> Optional[PackedMeasurement]:
+    """按原记录 ID 查找已打包的记录（按 ID 范围筛选候选块后只解码 ID 列）。"""
+    for block in _candidate_blocks(db, measurement_id):
+        index = np.flatnonzero(_decode_block_ids(block) == measurement_id)
+        if len(index):
+            return unpack_block(block).take(index).to_measurements(block.system_id)[0]
+    return None
+
+
+def find_packed_sample(db: Session, system_id: str, timestamp: datetime) -> Optional[PackedMeasurement]:
+    """按唯一键查找已打包的记录。"""
+    with shard_scope(db, system_id):
+        block = db.get(MeasurementBlock, (system_id, block_start_of(timestamp)))
+        if block is None:
+            return None
+        arrays = unpack_block(block)
+        index = np.flatnonzero(arrays.timestamps == _to_micros([timestamp])[0])
+        if not len(index):
+            return None
+        return arrays.take(index).to_measurements(system_id)[0]
+
+
+def latest_packed_sample(db: Session, system_id: str) -> Optional[PackedMeasurement]:
+    """返回系统已打包数据中时间最新的一条记录。"""
+    with shard_scope(db, system_id):
+        block = (
+            db.query(MeasurementBlock)
+            .filter(MeasurementBlock.system_id == system_id)
+            .order_by(MeasurementBlock.block_start.desc())
+            .first()
+        )
+        if block is None:
+            return None
+        return unpack_block(block).take([-1]).to_measurements(system_id)[0]
+
+
+# ---- 写入与删除 ----
+
+def delete_packed_by_id(db: Session, measurement_id: int) -> Optional[PackedMeasurement]:
+    """从所在数据块中删除一条记录并重写该块（不提交事务），返回被删除的记录。"""
+    for block in _candidate_blocks(db, measurement_id):
+        if not np.any(_decode_block_ids(block) == measurement_id):
+            continue
+        arrays = unpack_block(block)
+        hit = arrays.ids == measurement_id
+        deleted = arrays.take(hit).to_measurements(block.system_id)[0]
+        _write_block(db, block.system_id, block.block_start, arrays.take(~hit), block)
+        return deleted
+    return None
+
+
+def absorb_packed_rows(
+    db: Session,
+    rows: Sequence[Dict[str, Any]],
+    update: bool,
+) -> Tuple[List[Dict[str, Any]], List[PackedMeasurement]]:
+    """
+    处理写入批次中键已存在于数据块内的记录（rows 需已批内去重，不提交事务）。
+
+    ignore 策略下这些记录直接丢弃（计为重复）；update 策略下改写数据块中的对应采样点。
+
+    Returns:
+        (仍需写入行存储的记录, update 策略下被改写的记录)
+    """
+    if not rows:
+        return list(rows), []
+    systems = {row["system_id"] for row in rows}
+    starts = {block_start_of(row["timestamp"]) for row in rows}
+    blocks = {
+        (block.system_id, block.block_start): block
+        for block in db.query(MeasurementBlock).filter(
+            MeasurementBlock.system_id.in_(systems),
+            MeasurementBlock.block_start.in_(starts),
+        )
+    }
+    if not blocks:
+        return list(rows), []
+
+    remaining: List[Dict[str, Any]] = []
+    hits: Dict[Tuple[str, datetime], List[Dict[str, Any]]] = {}
+    for row in rows:
+        key = (row["system_id"], block_start_of(row["timestamp"]))
+        if key in blocks:
+            hits.setdefault(key, []).append(row)
+        else:
+            remaining.append(row)
+
+    updated: List[PackedMeasurement] = []
+    for (system_id, block_start), block_rows in hits.items():
+        arrays = unpack_block(blocks[(system_id, block_start)])
+        stamps = _to_micros(row["timestamp"] for row in block_rows)
+        positions = np.searchsorted(arrays.timestamps, stamps)
+        found = np.zeros(len(block_rows), dtype=bool)
+        for i, (row, stamp, pos) in enumerate(zip(block_rows, stamps, positions)):
+            if pos < len(arrays) and arrays.timestamps[pos] == stamp:
+                found[i] = True
+                if update:
+                    arrays.irradiance[pos] = np.nan if row.get("irradiance") is None else row["irradiance"]
+                    arrays.temperature[pos] = np.nan if row.get("temperature") is None else row["temperature"]
+                    arrays.created_at[pos] = _to_micros([row["created_at"]])[0]
+            else:
+                remaining.append(row)
+        if update and found.any():
+            _write_block(db, system_id, block_start, arrays, blocks[(system_id, block_start)])
+            updated.extend(arrays.take(positions[found]).to_measurements(system_id))
+    return remaining, updated
+
+
+def compact_rows(db: Session, system_id: str, cutoff: datetime, batch_rows: int = 200_000) -> Tuple[int, int]:
+    """
+    将系统早于 cutoff 的行存储记录打包进数据块并从 measurements 删除（每批提交一次）。
+
+    每批按时间顺序读取至多 batch_rows 行，与已有数据块合并后重写；
+    批次末尾未读完的数据块在下一批再次合并，结果不受批次边界影响。
+
+    Returns:
+        (打包的记录数, 重写的数据块数)
+    """
+    with shard_scope(db, system_id):
+        table = Measurement.__table__
+        packed = blocks_written = 0
+        while True:
+            query = (
+                db.query(Measurement)
+                .with_entities(*table.columns)
+                .filter(Measurement.system_id == system_id, Measurement.timestamp < cutoff)
+                .order_by(Measurement.timestamp)
+                .limit(batch_rows)
+            )
+            if db.get_bind().dialect.name == "postgresql":
+                # 锁定待打包的行，避免与并发的 update 写入交错导致覆盖丢失
+                query = query.with_for_update()
+            rows = query.all()
+            if not rows:
+                break
+
+            groups: Dict[datetime, List[Any]] = {}
+            for row in rows:
+                groups.setdefault(block_start_of(row.timestamp), []).append(row)
+            for block_start, block_rows in groups.items():
+                block = db.get(MeasurementBlock, (system_id, block_start))
+                existing = unpack_block(block) if block is not None else None
+                _write_block(db, system_id, block_start, _merge_arrays(existing, _rows_to_arrays(block_rows)), block)
+                blocks_written += 1
+
+            ids = [row.id for row in rows]
+            for start in range(0, len(ids), 1000):
+                db.execute(table.delete().where(table.c.id.in_(ids[start:start + 1000])))
+            db.commit()
+            packed += len(rows)
+            if len(rows) < batch_rows:
+                break
+        return packed, blocks_written
+
+
+def unpack_blocks(db: Session, system_id: str) -> int:
+    """
+    将系统的全部数据块还原为 measurements 行（保留原记录 ID）并删除数据块，每块提交一次。
+
+    关闭 PACKED_STORAGE_ENABLED 前需执行，否则已打包的数据对查询接口不可见。
+    """
+    with shard_scope(db, system_id):
+        table = Measurement.__table__
+        restored = 0
+        for block_start, in db.query(MeasurementBlock.block_start).filter(MeasurementBlock.system_id == system_id).all():
+            block = db.get(MeasurementBlock, (system_id, block_start))
+            samples = unpack_block(block).to_measurements(system_id)
+            stored = set(
+                db.execute(select(Measurement.timestamp).where(
+                    Measurement.system_id == system_id,
+                    Measurement.timestamp >= samples[0].timestamp,
+                    Measurement.timestamp <= samples[-1].timestamp,
+                )).scalars()
+            )
+            values = [s._asdict() for s in samples if s.timestamp not in stored]
+            for start in range(0, len(values), 1000):
+                db.execute(table.insert(), values[start:start + 1000])
+            db.delete(block)
+            db.commit()
+            restored += len(values)
+        return restored
+
+
+def _storage_totals(db: Session) -> Tuple[int, int, int, int]:
+    blocks, samples, systems = db.query(
+        func.count(),
+        func.coalesce(func.sum(MeasurementBlock.sample_count), 0),
+        func.count(func.distinct(MeasurementBlock.system_id)),
+    ).one()
+    payload = db.query(func.coalesce(func.sum(
+        func.length(MeasurementBlock.timestamps) + func.length(MeasurementBlock.ids)
+        + func.length(MeasurementBlock.irradiance) + func.length(MeasurementBlock.temperature)
+        + func.length(MeasurementBlock.created_at)
+    ), 0)).scalar()
+    return blocks, samples, systems, payload
+
+
+def storage_summary(db: Session) -> Dict[str, Any]:
+    """打包存储的概况（数据块数、采样点数、压缩后字节数；分片时汇总各分片）。"""
+    totals = [0, 0, 0, 0]
+    for shard_totals in fan_out(db, _storage_totals):
+        totals = [total + int(value) for total, value in zip(totals, shard_totals)]
+    blocks, samples, systems, payload = totals
+    return {
+        "enabled": PACKED_STORAGE_ENABLED,
+        "block_span": PACKED_BLOCK_SPAN,
+        "systems": systems,
+        "blocks": blocks,
+        "samples": int(samples),
+        "payload_bytes": int(payload),
+        "bytes_per_sample": round(payload / samples, 2) if samples else None,
+    }
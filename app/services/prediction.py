@@ -0,0 +1,295 @@
+"""
+基于气象预报的发电预测。
+
+把每个系统最近一次的逐小时预报（水平总辐照度、气温、风速）换算为倾斜面辐照度、组件温度与交流功率，
+并按系统本地日期汇总日发电量，结果写入 production_predictions / daily_production_predictions，
+仪表盘与导出直接读取预计算结果。
+
+- 所有系统的预报拼接为一组数组整批计算（太阳位置、散射分离、倾斜面换算与功率模型均向量化）
+- Open-Meteo 的 shortwave_radiation 为前一小时的平均值，按时段 [t - 1h, t) 处理，太阳位置取时段中点
+- 预报含 diffuse_radiation 时直接使用，否则用 Erbs 模型由总辐照度估计散射比例
+- 性能比与温度系数沿用 KPI 的系统参数（extra_metadata 可覆盖），extra_metadata.ac_capacity 为交流限幅（kW）
+- 拉取预报后自动执行（PREDICTION_ENABLED=0 时关闭），也可单独调用 run_predictions 重算
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.calculations.insolation import STC_IRRADIANCE
+from app.calculations.production import predict_ac_power
+from app.calculations.solar import (
+    erbs_diffuse_fraction,
+    module_temperature,
+    plane_of_array_irradiance,
+    solar_position,
+)
+from app.models.prediction import DailyProductionPrediction, ProductionPrediction
+from app.models.system_config import SystemConfiguration
+from app.models.weather import WeatherForecast
+from app.services.ingest import get_dialect_insert
+from app.services.kpi import system_parameters, system_zone
+from app.services.metrics import observe_calculation
+from app.utils.time_utils import SYSTEM_TIMEZONE, epochs_to_datetime64, get_local_now, get_zone, local_to_epochs
+
+PREDICTION_ENABLED = os.getenv("PREDICTION_ENABLED", "1") == "1"
+
+# 预报时间标签为时段终点，时段长 1 小时
+_INTERVAL_SECONDS = 3600
+_UPSERT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class PredictionRunStats:
+    """一次发电预测任务的统计。"""
+    systems: int = 0
+    predicted: int = 0
+    skipped: int = 0
+    hourly_rows: int = 0
+    daily_rows: int = 0
+    elapsed_seconds: float = 0.0
+
+
+def _float_array(values: Optional[Sequence[Any]], length: int) -> np.ndarray:
+    """预报字段转换为 float 数组（缺失字段或 None 为 NaN）。"""
+    if values is None:
+        return np.full(length, np.nan)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def forecast_epochs(data: Dict[str, Any]) -> np.ndarray:
+    """预报时间标签（响应时区的本地时间字符串）转换为 UTC 纪元秒。"""
+    labels = np.array(data.get("hourly", {}).get("time") or [], dtype="datetime64[m]")
+    tz_name = data.get("timezone")
+    if tz_name and get_zone(tz_name) is not None:
+        return local_to_epochs(labels, tz_name)
+    offset = float(data.get("utc_offset_seconds") or 0)
+    return labels.astype("datetime64[s]").astype(np.int64).astype(np.float64) - offset
+
+
+def load_latest_forecasts(db: Session, system_ids: Sequence[str]) -> Dict[str, WeatherForecast]:
+    """每个系统最近一次拉取的预报记录。"""
+    if not system_ids:
+        return {}
+    latest = (
+        db.query(func.max(WeatherForecast.id))
+        .filter(WeatherForecast.system_id.in_(list(system_ids)))
+        .group_by(WeatherForecast.system_id)
+    )
+    return {
+        record.system_id: record
+        for record in db.query(WeatherForecast).filter(WeatherForecast.id.in_(latest.scalar_subquery())).all()
+    }
+
+
+def _collect_samples(
+    systems: Sequence[SystemConfiguration],
+    forecasts: Dict[str, WeatherForecast],
+) -> Tuple[List[Tuple[SystemConfiguration, WeatherForecast]], Dict[str, np.ndarray]]:
+    """把各系统的逐小时预报与系统参数拼接为等长数组（group 为系统在返回列表中的序号）。"""
+    used = []
+    columns: Dict[str, List[np.ndarray]] = {
+        key: [] for key in (
+            "group", "end", "ghi", "dhi", "temperature", "wind",
+            "latitude", "longitude", "tilt", "azimuth", "capacity", "pr", "gamma", "ac_limit",
+        )
+    }
+    for config in systems:
+        record = forecasts.get(config.system_id)
+        hourly = (record.data or {}).get("hourly") if record is not None else None
+        if not hourly or not hourly.get("time"):
+            continue
+        end = forecast_epochs(record.data)
+        n = len(end)
+        capacity, base_pr, gamma = system_parameters(config)
+        ac_limit = ((config.extra_metadata or {}).get("ac_capacity"))
+        group = len(used)
+        used.append((config, record))
+
+        ghi = _float_array(hourly.get("shortwave_radiation"), n)
+        columns["group"].append(np.full(n, group, dtype=np.int64))
+        columns["end"].append(end)
+        columns["ghi"].append(ghi)
+        columns["dhi"].append(_float_array(hourly.get("diffuse_radiation"), n))
+        columns["temperature"].append(_float_array(hourly.get("temperature_2m"), n))
+        columns["wind"].append(_float_array(hourly.get("wind_speed_10m"), n))
+        for key, value in (
+            ("latitude", config.latitude),
+            ("longitude", config.longitude),
+            ("tilt", config.tilt_angle or 0.0),
+            ("azimuth", config.azimuth if config.azimuth is not None else 180.0),
+            ("capacity", capacity),
+            ("pr", base_pr),
+            ("gamma", gamma),
+            ("ac_limit", ac_limit),
+        ):
+            columns[key].append(np.full(n, np.nan if value is None else float(value)))
+
+    if not used:
+        return used, {}
+    return used, {key: np.concatenate(parts) for key, parts in columns.items()}
+
+
+def predict_samples(samples: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    整批计算逐小时预测（各数组等长，可混合任意多个系统）。
+
+    Returns:
+        start（时段起点 UTC 纪元秒）、poa、module_temperature、ac_power（未配置容量为 NaN）
+    """
+    start = samples["end"] - _INTERVAL_SECONDS
+    middle = start + _INTERVAL_SECONDS / 2
+    zenith, azimuth = solar_position(middle, samples["latitude"], samples["longitude"])
+
+    ghi = np.maximum(np.nan_to_num(samples["ghi"]), 0.0)
+    dhi = np.where(
+        np.isnan(samples["dhi"]),
+        ghi * erbs_diffuse_fraction(ghi, zenith, middle),
+        np.minimum(np.maximum(samples["dhi"], 0.0), ghi),
+    )
+    poa = plane_of_array_irradiance(ghi, dhi, zenith, azimuth, samples["tilt"], samples["azimuth"])
+    wind = np.where(np.isnan(samples["wind"]), 1.0, samples["wind"])
+    temperature = module_temperature(poa, samples["temperature"], wind)
+
+    power = predict_ac_power(
+        poa,
+        temperature,
+        np.nan_to_num(samples["capacity"]),
+        samples["pr"],
+        samples["gamma"],
+        samples["ac_limit"],
+    )
+    power = np.where(np.isnan(samples["capacity"]), np.nan, power)
+    return {"start": start, "poa": poa, "module_temperature": temperature, "ac_power": power}
+
+
+def _optional(value: float, digits: int) -> Optional[float]:
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+def _upsert(
+    db: Session,
+    model,
+    rows: List[Dict[str, Any]],
+    keys: Sequence[str],
+    keep_larger: Optional[str] = None,
+) -> None:
+    """按主键 ON CONFLICT DO UPDATE 分批写入（指定 keep_larger 时只在新值不小于已有值时覆盖）。"""
+    insert = get_dialect_insert(db)
+    table = model.__table__
+    for i in range(0, len(rows), _UPSERT_CHUNK_SIZE):
+        stmt = insert(table).values(rows[i:i + _UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: stmt.excluded[column] for column in rows[0] if column not in keys},
+            where=table.c[keep_larger] <= stmt.excluded[keep_larger] if keep_larger else None,
+        )
+        db.execute(stmt)
+
+
+def run_predictions(db: Session, system_ids: Optional[Sequence[str]] = None) -> PredictionRunStats:
+    """
+    根据最近一次预报重算全部启用系统（或指定系统）的发电预测，写入预测表并提交。
+
+    缺少经纬度或没有预报的系统跳过；同一时段的旧预测被新结果覆盖，
+    日预测只在新结果的时数不少于已有结果时覆盖。
+    """
+    began = time.perf_counter()
+    stats = PredictionRunStats()
+    query = db.query(SystemConfiguration)
+    if system_ids:
+        query = query.filter(SystemConfiguration.system_id.in_(list(system_ids)))
+    else:
+        query = query.filter(SystemConfiguration.is_active == True)
+    systems = [
+        config for config in query.order_by(SystemConfiguration.system_id).all()
+        if config.latitude is not None and config.longitude is not None
+    ]
+    stats.systems = len(systems)
+
+    forecasts = load_latest_forecasts(db, [config.system_id for config in systems])
+    used, samples = _collect_samples(systems, forecasts)
+    stats.predicted = len(used)
+    stats.skipped = stats.systems - stats.predicted
+    if not used:
+        stats.elapsed_seconds = round(time.perf_counter() - began, 3)
+        return stats
+
+    with observe_calculation("production_prediction"):
+        result = predict_samples(samples)
+    group = samples["group"]
+    valid = np.isfinite(result["start"])
+    stored = epochs_to_datetime64(result["start"], unit="s", tz_name=SYSTEM_TIMEZONE)
+
+    # 日汇总：时段按起点归入系统本地日期。预报第一个时段（00:00 标签）起点在前一天 23:00，
+    # 只覆盖该日最后 1 小时，不完整的首日不参与汇总，以免覆盖上次预报算出的整日结果
+    local_days = np.empty(len(group), dtype="datetime64[D]")
+    full_day = valid.copy()
+    for index, (config, _) in enumerate(used):
+        mask = group == index
+        local_starts = epochs_to_datetime64(result["start"][mask], unit="s", tz_name=system_zone(config))
+        days = local_starts.astype("datetime64[D]")
+        local_days[mask] = days
+        usable = np.flatnonzero(valid[mask])
+        if len(usable) and local_starts[usable[0]] != days[usable[0]]:
+            full_day[np.flatnonzero(mask)] &= days != days[usable[0]]
+    day_numbers = local_days.astype(np.int64)
+    daily = valid & full_day
+    keys, inverse = np.unique(np.stack([group, day_numbers])[:, daily], axis=1, return_inverse=True)
+    inverse = inverse.ravel()
+    n_keys = keys.shape[1]
+    power = result["ac_power"][daily]
+    insolation = np.bincount(inverse, weights=result["poa"][daily], minlength=n_keys) / STC_IRRADIANCE
+    hours = np.bincount(inverse, minlength=n_keys)
+    energy = np.bincount(inverse, weights=np.nan_to_num(power), minlength=n_keys) * _INTERVAL_SECONDS / 3600
+    peak = np.full(n_keys, -np.inf)
+    np.maximum.at(peak, inverse, np.nan_to_num(power, nan=-np.inf))
+
+    now = get_local_now()
+    hourly_rows = []
+    for i in np.flatnonzero(valid):
+        config, record = used[group[i]]
+        ac_power = _optional(result["ac_power"][i], 3)
+        hourly_rows.append({
+            "system_id": config.system_id,
+            "timestamp": stored[i].item(),
+            "forecast_id": record.id,
+            "ghi": _optional(samples["ghi"][i], 1),
+            "poa_irradiance": round(float(result["poa"][i]), 1),
+            "module_temperature": _optional(result["module_temperature"][i], 2),
+            "ac_power_kw": ac_power,
+            "energy_kwh": round(ac_power * _INTERVAL_SECONDS / 3600, 3) if ac_power is not None else None,
+            "computed_at": now,
+        })
+    daily_rows = []
+    for k in range(n_keys):
+        config, record = used[keys[0, k]]
+        has_capacity = config.capacity is not None
+        daily_rows.append({
+            "system_id": config.system_id,
+            "day": np.datetime64(int(keys[1, k]), "D").item(),
+            "energy_kwh": round(float(energy[k]), 3) if has_capacity else None,
+            "peak_power_kw": round(float(peak[k]), 3) if has_capacity and np.isfinite(peak[k]) else None,
+            "insolation": round(float(insolation[k]), 4),
+            "hours": int(hours[k]),
+            "forecast_id": record.id,
+            "computed_at": now,
+        })
+
+    try:
+        _upsert(db, ProductionPrediction, hourly_rows, ("system_id", "timestamp"))
+        # 预报末尾不完整的日期时数较少，不覆盖已有的时数更多的日预测
+        _upsert(db, DailyProductionPrediction, daily_rows, ("system_id", "day"), keep_larger="hours")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    stats.hourly_rows = len(hourly_rows)
+    stats.daily_rows = len(daily_rows)
+    stats.elapsed_seconds = round(time.perf_counter() - began, 3)
+    return stats
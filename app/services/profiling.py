@@ -0,0 +1,306 @@
+"""
+按需性能剖析与慢查询日志。
+
+默认完全关闭（PROFILING_ENABLED=0 时不注册中间件与引擎事件，零开销）。开启后：
+- 请求带 X-Profile: 1 请求头，或命中管理接口设置的采样率时，对该请求进行栈采样剖析
+  （后台线程按固定间隔采样线程调用栈，输出折叠栈，可直接用于火焰图工具），
+  并记录该请求内每条 SQL 的时间线；响应头 X-Profile-Id 返回剖析记录编号
+- 执行时间超过阈值的 SQL 记入慢查询日志，并在后台线程中获取 EXPLAIN 执行计划
+
+说明：栈采样覆盖进程内所有非空闲线程，高并发时会混入同时进行的其他请求，
+建议在低流量时段或对单个请求使用请求头触发。
+"""
+
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.time_utils import get_local_now
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "5"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# 保留的剖析记录与慢查询条数
+PROFILE_HISTORY_SIZE = 50
+SLOW_QUERY_LOG_SIZE = 200
+# 单个剖析记录保留的 SQL 条数与折叠栈条数上限
+_MAX_TIMELINE_STATEMENTS = 500
+_MAX_STACKS = 200
+_MAX_STACK_DEPTH = 64
+_MAX_STATEMENT_CHARS = 2000
+_MAX_PARAMETER_CHARS = 500
+# 已获取的执行计划缓存（按语句文本）
+_MAX_CACHED_PLANS = 256
+
+# 栈顶位于这些文件时视为线程空闲（事件循环等待、线程池等待任务等）
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py", "thread.py", "runners.py", "base_events.py")
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+_explaining = threading.local()
+
+
+@dataclass
+class RequestProfile:
+    """单个请求的剖析记录。"""
+    id: int
+    method: str
+    path: str
+    started_at: Any
+    sample_interval_ms: float
+    status: Optional[int] = None
+    duration_ms: float = 0.0
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+    sql: List[Dict[str, Any]] = field(default_factory=list)
+    _start: float = field(default_factory=time.perf_counter, repr=False)
+
+    def add_statement(self, statement: str, start: float, elapsed: float) -> None:
+        if len(self.sql) < _MAX_TIMELINE_STATEMENTS:
+            self.sql.append({
+                "offset_ms": round((start - self._start) * 1000, 3),
+                "duration_ms": round(elapsed * 1000, 3),
+                "statement": statement[:_MAX_STATEMENT_CHARS],
+            })
+
+    def summary(self) -> Dict[str, Any]:
+        sql_ms = sum(item["duration_ms"] for item in self.sql)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "status": self.status,
+            "duration_ms": self.duration_ms,
+            "sql_count": len(self.sql),
+            "sql_ms": round(sql_ms, 3),
+            "samples": self.samples,
+        }
+
+    def detail(self) -> Dict[str, Any]:
+        # 栈顶函数的采样次数（自身耗时占比）
+        self_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack.rsplit(";", 1)[-1]] += count
+        return {
+            **self.summary(),
+            "sample_interval_ms": self.sample_interval_ms,
+            "top_functions": [
+                {"function": name, "samples": count} for name, count in self_counts.most_common(30)
+            ],
+            "folded_stacks": [f"{stack} {count}" for stack, count in self.stacks.most_common(_MAX_STACKS)],
+            "sql_timeline": self.sql,
+        }
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _collapse(frame) -> Optional[str]:
+    """将调用栈折叠为 'outer;...;inner' 形式；空闲线程返回 None。"""
+    if os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+        return None
+    names = []
+    while frame is not None and len(names) < _MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _StackSampler(threading.Thread):
+    """请求剖析期间按固定间隔采样所有线程的调用栈。"""
+
+    def __init__(self, profile: RequestProfile, interval: float):
+        super().__init__(name=f"profile-sampler-{profile.id}", daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _collapse(frame)
+                if stack:
+                    self.profile.stacks[stack] += 1
+            self.profile.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler:
+    """剖析开关、剖析记录与慢查询日志（线程安全）。"""
+
+    def __init__(self):
+        self.sample_rate = PROFILING_SAMPLE_RATE
+        self.slow_query_ms = SLOW_QUERY_MS
+        self.sample_interval_ms = PROFILING_SAMPLE_INTERVAL_MS
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._profiles: "deque[RequestProfile]" = deque(maxlen=PROFILE_HISTORY_SIZE)
+        self._slow_queries: "deque[Dict[str, Any]]" = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self._plans: Dict[str, List[str]] = {}
+        self._explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+
+    # ---- 请求剖析 ----
+
+    def should_profile(self, header_value: Optional[str]) -> bool:
+        if header_value == "1":
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, method: str, path: str) -> Tuple[RequestProfile, _StackSampler, Token]:
+        profile = RequestProfile(
+            id=next(self._ids),
+            method=method,
+            path=path,
+            started_at=get_local_now(),
+            sample_interval_ms=self.sample_interval_ms,
+        )
+        sampler = _StackSampler(profile, self.sample_interval_ms / 1000)
+        sampler.start()
+        token = _current_profile.set(profile)
+        return profile, sampler, token
+
+    def finish(self, profile: RequestProfile, sampler: _StackSampler, token: Token, status: int) -> None:
+        sampler.stop()
+        _current_profile.reset(token)
+        profile.status = status
+        profile.duration_ms = round((time.perf_counter() - profile._start) * 1000, 3)
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._profiles)]
+
+    def get_profile(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for profile in self._profiles:
+                if profile.id == profile_id:
+                    return profile.detail()
+        return None
+
+    # ---- 慢查询 ----
+
+    def _record_slow_query(
+        self, engine, statement: str, parameters: Any, elapsed: float, executemany: bool
+    ) -> None:
+        profile = _current_profile.get()
+        entry = {
+            "recorded_at": get_local_now(),
+            "duration_ms": round(elapsed * 1000, 3),
+            "statement": statement[:_MAX_STATEMENT_CHARS],
+            "parameters": repr(parameters)[:_MAX_PARAMETER_CHARS],
+            "path": profile.path if profile else None,
+            "plan": None,
+        }
+        with self._lock:
+            self._slow_queries.append(entry)
+            cached_plan = self._plans.get(statement)
+        print(f"🐢 慢查询 {entry['duration_ms']} ms: {entry['statement'][:200]}")
+        if cached_plan is not None:
+            entry["plan"] = cached_plan
+        elif not executemany:
+            self._explain_executor.submit(self._explain, engine, entry, statement, parameters)
+
+    def _explain(self, engine, entry: Dict[str, Any], statement: str, parameters: Any) -> None:
+        """在后台线程中获取执行计划（EXPLAIN 不实际执行语句；在执行该语句的引擎上运行，分片时即所在分片）。"""
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+        _explaining.active = True
+        try:
+            with engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+            plan = [str(row[-1]) for row in rows]
+        except Exception as e:
+            plan = [f"EXPLAIN failed: {e}"]
+        finally:
+            _explaining.active = False
+        entry["plan"] = plan
+        with self._lock:
+            if len(self._plans) >= _MAX_CACHED_PLANS:
+                self._plans.pop(next(iter(self._plans)))
+            self._plans[statement] = plan
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self._slow_queries))
+
+    def clear_slow_queries(self) -> None:
+        with self._lock:
+            self._slow_queries.clear()
+
+    # ---- 引擎事件 ----
+
+    def instrument_engine(self, engine) -> None:
+        """注册 SQL 计时事件（仅在开启剖析时调用；主库与各分片引擎分别调用）。"""
+        from sqlalchemy import event
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("_profiling_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get("_profiling_query_start")
+            if not starts:
+                return
+            start = starts.pop()
+            elapsed = time.perf_counter() - start
+            profile = _current_profile.get()
+            if profile is not None:
+                profile.add_statement(statement, start, elapsed)
+            if elapsed * 1000 >= self.slow_query_ms and not getattr(_explaining, "active", False):
+                self._record_slow_query(conn.engine, statement, parameters, elapsed, executemany)
+
+        @event.listens_for(engine, "handle_error")
+        def _handle_error(exception_context):
+            conn = exception_context.connection
+            starts = conn.info.get("_profiling_query_start") if conn is not None else None
+            if starts:
+                starts.pop()
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "enabled": PROFILING_ENABLED,
+            "sample_rate": self.sample_rate,
+            "sample_interval_ms": self.sample_interval_ms,
+            "slow_query_ms": self.slow_query_ms,
+            "profile_header": PROFILE_HEADER,
+        }
+
+
+profiler = Profiler()
+
+
+async def profile_requests(request, call_next):
+    """剖析中间件：仅在 PROFILING_ENABLED=1 时注册。"""
+    if not profiler.should_profile(request.headers.get(PROFILE_HEADER)):
+        return await call_next(request)
+    profile, sampler, token = profiler.start(request.method, request.url.path)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers[PROFILE_ID_HEADER] = str(profile.id)
+        return response
+    finally:
+        profiler.finish(profile, sampler, token, status)
@@ -0,0 +1,150 @@
+"""
+系统空间索引。
+
+对配置了经纬度的系统建立 KD 树（app/calculations/spatial.py），供近邻查询与近邻交叉校验使用：
+- 每个进程缓存一份索引；每次使用前用一次聚合查询（系统数、最大 ID、最近更新时间）核对签名，
+  系统新增、删除或修改后自动重建，其他进程（脚本直接写库）的修改同样能被发现
+- 系统配置接口修改后立即失效本进程的索引
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.calculations.spatial import KDTree, chord_to_km, km_to_chord, unit_vectors
+from app.models.system_config import SystemConfiguration
+
+
+@dataclass
+class Neighbor:
+    """近邻查询结果。"""
+    system_id: str
+    name: str
+    latitude: float
+    longitude: float
+    is_active: bool
+    distance_km: float
+
+
+@dataclass
+class SystemSpatialIndex:
+    """某一时刻系统配置的空间索引（建立后只读）。"""
+    signature: Tuple[Any, ...]
+    system_ids: List[str]
+    names: List[str]
+    latitude: np.ndarray
+    longitude: np.ndarray
+    active: np.ndarray
+    points: np.ndarray
+    tree: KDTree
+    positions: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.positions = {system_id: i for i, system_id in enumerate(self.system_ids)}
+
+    def __len__(self) -> int:
+        return len(self.system_ids)
+
+    def nearest_indices(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        max_distance_km: Optional[float] = None,
+        include_inactive: bool = False,
+        exclude: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """最近的 k 个系统的 (下标, 距离 km)，按距离升序。"""
+        bound = km_to_chord(max_distance_km) if max_distance_km is not None else np.inf
+        # 停用系统与自身在结果中剔除，多取相应数量
+        extra = (0 if include_inactive else int((~self.active).sum())) + (1 if exclude is not None else 0)
+        chords, indices = self.tree.query(unit_vectors(latitude, longitude)[0], k + extra, bound)
+        keep = indices != (exclude if exclude is not None else -1)
+        if not include_inactive:
+            keep &= self.active[indices]
+        return indices[keep][:k], chord_to_km(chords[keep][:k])
+
+    def nearest(self, latitude: float, longitude: float, k: int, **options) -> List[Neighbor]:
+        indices, distances = self.nearest_indices(latitude, longitude, k, **options)
+        return [
+            Neighbor(
+                system_id=self.system_ids[i],
+                name=self.names[i],
+                latitude=float(self.latitude[i]),
+                longitude=float(self.longitude[i]),
+                is_active=bool(self.active[i]),
+                distance_km=round(float(d), 3),
+            )
+            for i, d in zip(indices.tolist(), distances.tolist())
+        ]
+
+    def neighbors_of(self, system_id: str, k: int, **options) -> List[Neighbor]:
+        """指定系统的 k 个近邻（不含自身）；系统不在索引中（未配置经纬度）时抛出 KeyError。"""
+        i = self.positions[system_id]
+        return self.nearest(float(self.latitude[i]), float(self.longitude[i]), k, exclude=i, **options)
+
+
+def _signature(db: Session) -> Tuple[Any, ...]:
+    row = db.query(
+        func.count(SystemConfiguration.id),
+        func.max(SystemConfiguration.id),
+        func.max(SystemConfiguration.updated_at),
+    ).one()
+    return tuple(row)
+
+
+def build_spatial_index(db: Session, signature: Optional[Tuple[Any, ...]] = None) -> SystemSpatialIndex:
+    """读取全部配置了经纬度的系统并建立索引。"""
+    rows = (
+        db.query(
+            SystemConfiguration.system_id,
+            SystemConfiguration.name,
+            SystemConfiguration.latitude,
+            SystemConfiguration.longitude,
+            SystemConfiguration.is_active,
+        )
+        .filter(SystemConfiguration.latitude.isnot(None), SystemConfiguration.longitude.isnot(None))
+        .order_by(SystemConfiguration.system_id)
+        .all()
+    )
+    latitude = np.array([row.latitude for row in rows], dtype=np.float64)
+    longitude = np.array([row.longitude for row in rows], dtype=np.float64)
+    points = unit_vectors(latitude, longitude)
+    return SystemSpatialIndex(
+        signature=signature if signature is not None else _signature(db),
+        system_ids=[row.system_id for row in rows],
+        names=[row.name for row in rows],
+        latitude=latitude,
+        longitude=longitude,
+        active=np.array([bool(row.is_active) for row in rows], dtype=bool),
+        points=points,
+        tree=KDTree(points),
+    )
+
+
+_lock = threading.Lock()
+_index: Optional[SystemSpatialIndex] = None
+
+
+def get_spatial_index(db: Session) -> SystemSpatialIndex:
+    """返回当前进程的空间索引，系统配置变化后自动重建。"""
+    global _index
+    signature = _signature(db)
+    with _lock:
+        if _index is not None and _index.signature == signature:
+            return _index
+    index = build_spatial_index(db, signature)
+    with _lock:
+        _index = index
+    return index
+
+
+def invalidate_spatial_index() -> None:
+    """丢弃本进程的空间索引（系统配置接口修改后调用）。"""
+    global _index
+    with _lock:
+        _index = None
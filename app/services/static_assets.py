@@ -0,0 +1,237 @@
+"""
+静态资源发布：内容指纹、预压缩与缓存头。
+
+原先页面与 /static 下的 JS / CSS 每次都以未压缩的原文件返回，也没有可长期缓存的文件名，
+每次打开仪表盘都重新下载全部资源。启动时扫描 STATIC_DIR 下的全部文件一次性处理：
+- 按内容计算指纹，生成带指纹的文件名（css/base.css → css/base.3f2a9c1de0b4.css）
+- 文本类资源预先压缩为 gzip 与 brotli（需安装 brotli，未安装时只提供 gzip），压缩后不更小的不保留
+- HTML 中对 /static/ 下资源的引用改写为带指纹的文件名（原有的 ?v= 版本参数一并去掉）
+请求时只按 Accept-Encoding 选择已压缩好的版本：
+- 带指纹的文件名内容不会改变，返回 Cache-Control: public, max-age=31536000, immutable
+- 原文件名与页面（/admin 等）返回 no-cache 与 ETag，浏览器每次校验，未变化时返回 304
+- 启动后新增的文件由 StaticFiles 按原方式返回；修改已有文件需重启生效
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.types import Scope
+
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+STATIC_GZIP_LEVEL = int(os.getenv("STATIC_GZIP_LEVEL", "9"))
+STATIC_BROTLI_QUALITY = int(os.getenv("STATIC_BROTLI_QUALITY", "11"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# 指纹长度（十六进制字符数）
+_DIGEST_LENGTH = 12
+# 优先级从高到低
+_ENCODINGS = ("br", "gzip")
+_IDENTITY = "identity"
+_COMPRESSIBLE_TYPES = ("application/javascript", "application/json", "image/svg+xml", "text/javascript")
+_STATIC_REFERENCE = re.compile(
+    r"""(?P<prefix>(?:href|src)\s*=\s*["'])/static/(?P<path>[^"'?#]+)(?:\?[^"'#]*)?(?P<suffix>["'])"""
+)
+
+
+@dataclass
+class StaticAsset:
+    """一个静态资源的全部编码版本。"""
+    path: str
+    hashed_path: str
+    media_type: str
+    digest: str
+    bodies: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}"' if encoding == _IDENTITY else f'"{self.digest}-{encoding}"'
+
+
+def hashed_name(path: str, digest: str) -> str:
+    """在扩展名前插入指纹：css/base.css → css/base.<digest>.css。"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+
+def _is_compressible(media_type: str) -> bool:
+    return media_type.startswith("text/") or media_type in _COMPRESSIBLE_TYPES
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    """gzip / brotli 压缩结果（只保留比原文件更小的版本）。"""
+    variants = {"gzip": gzip.compress(body, STATIC_GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=STATIC_BROTLI_QUALITY)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+def _accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """解析 Accept-Encoding，返回 编码 → q 值。"""
+    accepted: Dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(asset: StaticAsset, accept_encoding: Optional[str]) -> str:
+    """按 Accept-Encoding 选择已有的压缩版本（q 值相同时 br 优先），均不接受时返回 identity。"""
+    accepted = _accepted_encodings(accept_encoding)
+    best, best_q = _IDENTITY, 0.0
+    for encoding in _ENCODINGS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if encoding in asset.bodies and q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _etag_matches(if_none_match: Optional[str], asset: StaticAsset) -> bool:
+    """If-None-Match 是否命中资源的任一编码版本（弱比较）。"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or any(asset.etag(encoding) in tags for encoding in asset.bodies)
+
+
+class StaticAssetStore:
+    """启动时构建的静态资源表（构建后只读，可在多个请求间共享）。"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._by_path: Dict[str, StaticAsset] = {}
+        self._by_hashed_path: Dict[str, StaticAsset] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_path)
+
+    def _walk(self) -> Iterator[str]:
+        for root, _, names in os.walk(self.directory):
+            for name in sorted(names):
+                yield os.path.relpath(os.path.join(root, name), self.directory).replace(os.sep, "/")
+
+    def build(self) -> "StaticAssetStore":
+        """读取、改写、计算指纹并预压缩目录下的全部文件（先处理被引用的资源，再改写 HTML）。"""
+        if not os.path.isdir(self.directory):
+            return self
+        paths = sorted(self._walk(), key=lambda path: path.endswith(".html"))
+        for path in paths:
+            with open(os.path.join(self.directory, path), "rb") as f:
+                body = f.read()
+            if path.endswith(".html"):
+                body = self.rewrite_html(body.decode("utf-8")).encode("utf-8")
+            self._add(path, body)
+        return self
+
+    def _add(self, path: str, body: bytes) -> None:
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        digest = hashlib.sha256(body).hexdigest()[:_DIGEST_LENGTH]
+        asset = StaticAsset(path, hashed_name(path, digest), media_type, digest, {_IDENTITY: body})
+        if _is_compressible(media_type):
+            asset.bodies.update(_compress(body))
+        self._by_path[path] = asset
+        self._by_hashed_path[asset.hashed_path] = asset
+
+    def url(self, path: str) -> str:
+        """资源的带指纹 URL（未收录的文件返回原 URL）。"""
+        asset = self._by_path.get(path)
+        return f"/static/{asset.hashed_path if asset else path}"
+
+    def rewrite_html(self, html: str) -> str:
+        """将 HTML 中已收录资源的 /static/ 引用改写为带指纹的 URL。"""
+        def replace(match: "re.Match[str]") -> str:
+            path = match.group("path")
+            if path not in self._by_path:
+                return match.group(0)
+            return f"{match.group('prefix')}{self.url(path)}{match.group('suffix')}"
+        return _STATIC_REFERENCE.sub(replace, html)
+
+    def lookup(self, path: str) -> Tuple[Optional[StaticAsset], bool]:
+        """按请求路径查找资源，返回 (资源, 是否为带指纹的文件名)。"""
+        asset = self._by_hashed_path.get(path)
+        if asset is not None:
+            return asset, True
+        return self._by_path.get(path), False
+
+    def response(self, asset: StaticAsset, headers: Headers, immutable: bool) -> Response:
+        """按请求头返回资源（选择压缩版本，ETag 命中时返回 304）。"""
+        encoding = choose_encoding(asset, headers.get("accept-encoding"))
+        response_headers = {
+            "ETag": asset.etag(encoding),
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        }
+        if len(asset.bodies) > 1:
+            response_headers["Vary"] = "Accept-Encoding"
+        if _etag_matches(headers.get("if-none-match"), asset):
+            return Response(status_code=304, headers=response_headers)
+        if encoding != _IDENTITY:
+            response_headers["Content-Encoding"] = encoding
+        return Response(asset.bodies[encoding], media_type=asset.media_type, headers=response_headers)
+
+    def page(self, request: Request, path: str) -> Response:
+        """返回 HTML 页面（引用已改写为带指纹的 URL，每次校验 ETag）。"""
+        asset = self._by_path.get(path)
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+        return self.response(asset, request.headers, immutable=False)
+
+    def summary(self) -> Dict[str, int]:
+        """资源数与各编码的总字节数。"""
+        totals: Dict[str, int] = {"files": len(self._by_path)}
+        for asset in self._by_path.values():
+            for encoding, body in asset.bodies.items():
+                totals[f"{encoding}_bytes"] = totals.get(f"{encoding}_bytes", 0) + len(body)
+        return totals
+
+
+class StaticAssets(StaticFiles):
+    """挂载在 /static 的资源服务：已收录的文件从资源表返回，其余交给 StaticFiles。"""
+
+    def __init__(self, store: StaticAssetStore, **kwargs):
+        super().__init__(directory=store.directory, **kwargs)
+        self.store = store
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD"):
+            asset, immutable = self.store.lookup(path.replace(os.sep, "/"))
+            if asset is not None:
+                return self.store.response(asset, Headers(scope=scope), immutable)
+        return await super().get_response(path, scope)
+
+
+def build_static_assets(directory: str = STATIC_DIR) -> StaticAssetStore:
+    """构建资源表并输出压缩概况。"""
+    store = StaticAssetStore(directory).build()
+    summary = store.summary()
+    compressed: List[str] = [
+        f"{encoding} {summary[f'{encoding}_bytes']} 字节" for encoding in _ENCODINGS if f"{encoding}_bytes" in summary
+    ]
+    print(
+        f"🗜️ 静态资源 {summary['files']} 个文件，原始 {summary.get('identity_bytes', 0)} 字节"
+        + (f"，预压缩 {'，'.join(compressed)}" if compressed else "")
+    )
+    return store
@@ -0,0 +1,189 @@
+"""
+时间与时区工具模块。
+
+集中处理平台内的时间戳转换：
+- 缓存 ZoneInfo 对象，避免在循环中重复构造
+- 将 UTC 纪元时间戳数组批量转换为本地/UTC 时间（基于 NumPy 向量化）
+- 数据库中的测量时间戳统一为 Asia/Shanghai 本地时间（naive datetime）
+"""
+
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+SYSTEM_TIMEZONE = "Asia/Shanghai"
+
+# 时区偏移按 15 分钟分桶计算：覆盖所有实际存在的夏令时切换点，
+# 同时使分桶数量远小于分钟级数据的行数
+_OFFSET_BUCKET_SECONDS = 900
+
+_EPOCH_UNIT_DIVISORS = {
+    "s": 1.0,
+    "ms": 1_000.0,
+    "us": 1_000_000.0,
+}
+
+
+@lru_cache(maxsize=256)
+def get_zone(tz_name: Optional[str]) -> Optional[ZoneInfo]:
+    """
+    获取缓存的 ZoneInfo 对象。
+
+    Args:
+        tz_name: IANA 时区标识（如 Asia/Shanghai）
+
+    Returns:
+        ZoneInfo 对象；若时区为空或无法识别则返回 None
+    """
+    if not tz_name:
+        return None
+    try:
+        return ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def get_local_now() -> datetime:
+    """返回系统时区（Asia/Shanghai）的当前时间（naive datetime）。"""
+    return datetime.now(get_zone(SYSTEM_TIMEZONE)).replace(tzinfo=None)
+
+
+def epoch_to_local(ts: float, unit: str = "ms", tz_name: str = SYSTEM_TIMEZONE) -> datetime:
+    """
+    将单个 UTC 纪元时间戳转换为本地时间（naive datetime）。
+
+    Args:
+        ts: UTC 纪元时间戳
+        unit: 时间戳单位（s / ms / us）
+        tz_name: 目标时区
+    """
+    utc_dt = datetime.fromtimestamp(ts / _EPOCH_UNIT_DIVISORS[unit], tz=timezone.utc)
+    return utc_dt.astimezone(get_zone(tz_name)).replace(tzinfo=None)
+
+
+def _utc_offsets_seconds(epoch_seconds: np.ndarray, zone: ZoneInfo) -> np.ndarray:
+    """按分桶计算每个时间点相对 UTC 的偏移秒数（每个分桶只查询一次时区规则）。"""
+    buckets = np.floor(epoch_seconds / _OFFSET_BUCKET_SECONDS).astype(np.int64)
+    unique_buckets, inverse = np.unique(buckets, return_inverse=True)
+    bucket_offsets = np.fromiter(
+        (
+            datetime.fromtimestamp(int(b) * _OFFSET_BUCKET_SECONDS, tz=zone).utcoffset().total_seconds()
+            for b in unique_buckets
+        ),
+        dtype=np.float64,
+        count=len(unique_buckets),
+    )
+    return bucket_offsets[inverse]
+
+
+def epochs_to_datetime64(
+    epochs: Iterable[Optional[float]],
+    unit: str = "ms",
+    tz_name: Optional[str] = SYSTEM_TIMEZONE,
+) -> np.ndarray:
+    """
+    批量将 UTC 纪元时间戳转换为 datetime64[us] 数组。
+
+    Args:
+        epochs: UTC 纪元时间戳序列（允许 None / NaN）
+        unit: 时间戳单位（s / ms / us）
+        tz_name: 目标时区；为 None 时返回 UTC 时间
+
+    Returns:
+        datetime64[us] 数组，缺失值为 NaT
+    """
+    seconds = np.asarray(epochs, dtype=np.float64) / _EPOCH_UNIT_DIVISORS[unit]
+    valid = np.isfinite(seconds)
+
+    zone = get_zone(tz_name) if tz_name else None
+    if zone is not None and valid.any():
+        seconds = seconds.copy()
+        seconds[valid] += _utc_offsets_seconds(seconds[valid], zone)
+
+    micros = np.zeros(seconds.shape, dtype=np.int64)
+    micros[valid] = np.round(seconds[valid] * 1_000_000).astype(np.int64)
+    result = micros.astype("datetime64[us]")
+    result[~valid] = np.datetime64("NaT")
+    return result
+
+
+def local_to_epochs(values: np.ndarray, tz_name: str) -> np.ndarray:
+    """
+    批量将指定时区的本地时间（naive datetime64 数组）转换为 UTC 纪元秒。
+
+    夏令时切换附近不存在或重复的本地时间按切换前后的偏移近似处理。
+
+    Args:
+        values: naive datetime64 数组（允许 NaT）
+        tz_name: 本地时间所在时区
+
+    Returns:
+        UTC 纪元秒（float64），缺失值为 NaN
+    """
+    zone = get_zone(tz_name)
+    if zone is None:
+        raise ValueError(f"Unknown timezone '{tz_name}'")
+    stamps = np.asarray(values, dtype="datetime64[us]")
+    valid = ~np.isnat(stamps)
+    result = np.full(stamps.shape, np.nan)
+    if valid.any():
+        local_seconds = stamps[valid].astype(np.int64) / 1_000_000
+        # 先按本地时间估计 UTC，再用估计时刻的偏移修正
+        guess = local_seconds - _utc_offsets_seconds(local_seconds, zone)
+        result[valid] = local_seconds - _utc_offsets_seconds(guess, zone)
+    return result
+
+
+def epochs_to_local(
+    epochs: Iterable[Optional[float]],
+    unit: str = "ms",
+    tz_name: str = SYSTEM_TIMEZONE,
+) -> List[Optional[datetime]]:
+    """批量将 UTC 纪元时间戳转换为本地时间（naive datetime 列表，缺失值为 None）。"""
+    return epochs_to_datetime64(epochs, unit=unit, tz_name=tz_name).tolist()
+
+
+def epochs_to_utc(
+    epochs: Iterable[Optional[float]],
+    unit: str = "ms",
+) -> List[Optional[datetime]]:
+    """批量将 UTC 纪元时间戳转换为 UTC 时间（naive datetime 列表，缺失值为 None）。"""
+    return epochs_to_datetime64(epochs, unit=unit, tz_name=None).tolist()
+
+
+def utc_naive_to_zone(
+    values: Sequence[Optional[datetime]],
+    tz_name: Optional[str],
+) -> List[Optional[datetime]]:
+    """
+    批量将 naive UTC 时间转换为指定时区的带时区时间。
+
+    Args:
+        values: naive UTC datetime 序列（允许 None）
+        tz_name: 目标时区
+
+    Returns:
+        带时区信息的 datetime 列表；时区无效时全部为 None
+    """
+    zone = get_zone(tz_name)
+    if zone is None or not values:
+        return [None] * len(values)
+
+    stamps = np.array(
+        [np.datetime64(v, "us") if v is not None else np.datetime64("NaT") for v in values],
+        dtype="datetime64[us]",
+    )
+    valid = ~np.isnat(stamps)
+    seconds = stamps[valid].astype(np.int64) / 1_000_000
+    offsets = _utc_offsets_seconds(seconds, zone) if valid.any() else np.empty(0)
+
+    local = stamps.copy()
+    local[valid] = stamps[valid] + (offsets * 1_000_000).astype("timedelta64[us]")
+
+    result: List[Optional[datetime]] = [None] * len(values)
+    for index, naive_local in zip(np.flatnonzero(valid), local[valid].tolist()):
+        result[index] = naive_local.replace(tzinfo=zone)
+    return result
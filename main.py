@@ -4,23 +4,40 @@ except Exception:
     def load_dotenv():
         return None
 import asyncio
-from fastapi import FastAPI, Request, Depends, HTTPException
+import time
+from typing import Optional, Union
+from fastapi import FastAPI, Request, Response, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from datetime import datetime, timezone
-from zoneinfo import ZoneInfo
-from zoneinfo import ZoneInfo
 
-from app.api import measurements, systems
+from app.api import coverage, degradation, fleet, jobs, kpi, measurements, predictions, profiling, spatial, systems
 import app.api.weather as weather
-from app.database.database import init_db, get_db, SessionLocal
-from app.models.measurement import Measurement
-
-SYSTEM_TIMEZONE = "Asia/Shanghai"
-from app.models.system_config import SystemConfiguration
-from app.schemas.measurement import MeasurementResponse
+from app.database.database import engine, init_db, get_db, measurement_engines, SessionLocal
+from app.schemas.measurement import IngestSummary, MeasurementResponse
+from app.services.admission import ADMISSION_ENABLED, AdmissionRejected, admission, classify_request
+from app.services.device_payload import DevicePayloadError, decode_body, payload_to_rows
+from app.services.ingest import (
+    SOURCE_DEVICE,
+    ConflictMode,
+    get_existing_measurement,
+    register_writer_listeners,
+    write_measurements,
+)
+from app.services.hot_window import HOT_WINDOW_ENABLED, hot_window
+from app.services.line_listener import LINE_LISTENER_ENABLED, LineProtocolListener
+from app.services.metrics import (
+    CONTENT_TYPE_LATEST,
+    HTTP_REQUESTS_IN_PROGRESS,
+    instrument_engine,
+    mark_process_dead,
+    record_http_request,
+    render_metrics,
+)
+from app.services.profiling import PROFILING_ENABLED, profile_requests, profiler
+from app.services.static_assets import StaticAssets, build_static_assets
+from app.utils.time_utils import get_local_now
 
 load_dotenv()
 
@@ -32,13 +49,20 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# 启动时计算内容指纹并预压缩静态资源，页面引用改写为带指纹的 URL
+static_assets = build_static_assets()
+app.mount("/static", StaticAssets(static_assets), name="static")
 
 
 @app.middleware("http")
 async def log_http_requests(request: Request, call_next):
     body = await request.body()
-    body_text = body.decode("utf-8", errors="ignore")
+    content_type = request.headers.get("content-type", "")
+    if body and ("json" in content_type or content_type.startswith("text/") or not content_type):
+        body_text = body.decode("utf-8", errors="ignore")
+    else:
+        # 二进制请求体（MessagePack / CBOR）只记录长度
+        body_text = f"<{len(body)} bytes {content_type}>" if body else ""
     if len(body_text) > 2000:
         body_text = body_text[:2000] + "..."
     response = await call_next(request)
@@ -49,6 +73,47 @@ async def log_http_requests(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    # 位于请求日志之外：被拒绝的写入请求不读取请求体，尽快返回
+    route_class = classify_request(request.method, request.url.path) if ADMISSION_ENABLED else None
+    if route_class is None:
+        return await call_next(request)
+    try:
+        await admission.acquire(route_class)
+    except AdmissionRejected as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"detail": e.detail},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    try:
+        return await call_next(request)
+    finally:
+        admission.release(route_class)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # 按路由模板（而非实际路径）统计，避免指标标签数量随 ID 增长
+    start = time.perf_counter()
+    HTTP_REQUESTS_IN_PROGRESS.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUESTS_IN_PROGRESS.dec()
+        route = request.scope.get("route")
+        record_http_request(
+            request.method,
+            getattr(route, "path", "unmatched"),
+            status,
+            time.perf_counter() - start,
+        )
+
+
 # 配置 CORS（开发环境允许所有来源）
 app.add_middleware(
     CORSMiddleware,
@@ -63,6 +128,14 @@ app.add_middleware(
 app.include_router(measurements.router)
 app.include_router(systems.router)
 app.include_router(weather.router)
+app.include_router(fleet.router)
+app.include_router(kpi.router)
+app.include_router(degradation.router)
+app.include_router(coverage.router)
+app.include_router(predictions.router)
+app.include_router(spatial.router)
+app.include_router(jobs.router)
+app.include_router(profiling.router)
 
 # Remove any accidental temporary admin routes from the registered routes
 # (defensive: ensures removed trigger endpoint won't be exposed in OpenAPI)
@@ -75,9 +148,42 @@ except Exception:
 
 
 
+# 主库与测量数据分片的引擎均需注册（分片时测量数据的读写都在分片上执行）
+instrumented_engines = [engine] + [shard for shard in measurement_engines() if shard is not engine]
+for instrumented in instrumented_engines:
+    instrument_engine(instrumented)
+
+# 按需剖析（默认关闭；最后注册，位于最外层以覆盖其他中间件的耗时）
+if PROFILING_ENABLED:
+    app.middleware("http")(profile_requests)
+    for instrumented in instrumented_engines:
+        profiler.instrument_engine(instrumented)
+
+
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    register_writer_listeners()
+    # 一次批量查询预热近期测量数据热窗口
+    if HOT_WINDOW_ENABLED:
+        db = SessionLocal()
+        try:
+            loaded = await asyncio.to_thread(hot_window.warm_up, db)
+            print(f"🔥 热窗口已预热 {loaded} 个系统")
+        finally:
+            db.close()
+    # 可选：随应用启动行协议监听（多 worker 部署时请改用 scripts/line_listener.py 独立运行）
+    if LINE_LISTENER_ENABLED:
+        app.state.line_listener = LineProtocolListener()
+        await app.state.line_listener.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    listener = getattr(app.state, "line_listener", None)
+    if listener:
+        await listener.stop()
+    mark_process_dead()
 
 
 @app.get("/", tags=["Root"])
@@ -89,62 +195,80 @@ async def root():
         "endpoints": {
             "measurements": "/measurements",
             "systems": "/systems",
+            "fleet": "/fleet/status",
+            "metrics": "/metrics",
         },
     }
 
 
 @app.get("/admin", tags=["Root"])
-async def admin_page():
-    return FileResponse("static/admin.html")
+async def admin_page(request: Request):
+    return static_assets.page(request, "admin.html")
 
 
 @app.get("/data-view", tags=["Root"])
-async def data_view_page():
-    return FileResponse("static/data-view.html")
+async def data_view_page(request: Request):
+    return static_assets.page(request, "data-view.html")
 
 
 @app.get("/weather-view", tags=["Root"])
-async def weather_view_page():
-    return FileResponse("static/weather-view.html")
+async def weather_view_page(request: Request):
+    return static_assets.page(request, "weather-view.html")
+
+
+@app.post("/", response_model=Union[MeasurementResponse, IngestSummary], status_code=201, tags=["Root"])
+async def ingest_from_device(
+    request: Request,
+    response: Response,
+    on_conflict: Optional[ConflictMode] = Query(None, description="重复 (system_id, timestamp) 的处理策略：ignore 或 update"),
+    db: Session = Depends(get_db),
+):
+    """兼容下位机固定上报路径的入口（POST /）。将下位机数据映射为测量记录并写入数据库。
+
+    下位机网络异常时会重传，按 (system_id, timestamp) 幂等写入，重复上报返回 200 与已存储的记录。
+    除单条 JSON 读数外，还支持 JSON / MessagePack（application/msgpack）/ CBOR（application/cbor）
+    编码的列式批量上报（ts 与 params 各字段为等长数组），批量上报返回写入摘要。
+    解码与写入在线程池中执行，大批量上报不阻塞事件循环上的其他请求。
+    """
+    body = await request.body()
+    return await run_in_threadpool(
+        _ingest_device_body, db, body, request.headers.get("content-type"), response, on_conflict
+    )
 
 
-@app.post("/", response_model=MeasurementResponse, status_code=201, tags=["Root"])
-async def ingest_from_device(request: Request, db: Session = Depends(get_db)):
-    """兼容下位机固定上报路径的入口（POST /）。将下位机数据映射为测量记录并写入数据库。"""
+def _ingest_device_body(
+    db: Session,
+    body: bytes,
+    content_type: Optional[str],
+    response: Response,
+    on_conflict: Optional[ConflictMode],
+):
+    """解码下位机上报并写入（同步执行，由 ingest_from_device 放入线程池）。"""
     try:
-        payload = await request.json()
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid JSON payload")
-
-    system_id = payload.get("system_id")
-    if not system_id:
-        raise HTTPException(status_code=422, detail="system_id is required")
-
-    timestamp = None
-    ts = payload.get("ts")
-    if isinstance(ts, (int, float)):
-        # 下位机上报的ts是UTC时间戳(毫秒)，转换为Asia/Shanghai本地时间
-        utc_dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
-        local_dt = utc_dt.astimezone(ZoneInfo(SYSTEM_TIMEZONE))
-        timestamp = local_dt.replace(tzinfo=None)  # 存储为naive datetime
-
-    params = payload.get("params") or {}
-    measurement_data = {
-        "system_id": system_id,
-        "timestamp": timestamp,
-        "temperature": params.get("Tbody"),
-        "irradiance": params.get("NR"),
-        "created_at": datetime.now(ZoneInfo(SYSTEM_TIMEZONE)).replace(tzinfo=None),
-    }
-
-    db_measurement = Measurement(**measurement_data)
-    db.add(db_measurement)
-    db.commit()
-    db.refresh(db_measurement)
+        payload = decode_body(body, content_type)
+        rows, is_single = payload_to_rows(payload, get_local_now())
+    except DevicePayloadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    result = write_measurements(db, rows, SOURCE_DEVICE, on_conflict)
+    response.headers.update(result.headers())
+
+    if not is_single:
+        return IngestSummary(
+            received=result.received,
+            written=result.written,
+            duplicates=result.duplicates,
+        )
+
+    if result.duplicates:
+        response.status_code = 200
+    stored = result.rows[0] if result.rows else get_existing_measurement(
+        db, rows[0]["system_id"], rows[0]["timestamp"]
+    )
 
-    data = MeasurementResponse.from_orm(db_measurement).dict()
+    data = MeasurementResponse.from_orm(stored).dict()
     # timestamp已经是本地时间，local_time保持一致
-    data["local_time"] = db_measurement.timestamp
+    data["local_time"] = stored.timestamp
 
     return data
 
@@ -154,6 +278,15 @@ async def health_check():
     return {"status": "healthy", "service": "photovoltaic-data-analysis-platform"}
 
 
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """Prometheus 指标（多 worker 部署时需设置 PROMETHEUS_MULTIPROC_DIR 汇总各进程）"""
+    body = render_metrics()
+    if body is None:
+        raise HTTPException(status_code=503, detail="Metrics disabled or prometheus_client not installed")
+    return Response(content=body, media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
 
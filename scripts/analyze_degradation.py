@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+多年衰减率分析
+基于 daily_kpis 按系统并行估计年衰减率，结果缓存在 degradation_results 表；
+输入（KPI 天数、最后日期、最近计算时间）与分析参数未变化的系统自动跳过，建议每周执行一次：
+    0 3 * * 0 cd /path/to/project && python scripts/analyze_degradation.py
+
+修改晴空筛选、离群值阈值后结果会自动全部重算；--force 忽略缓存强制重算
+"""
+import sys
+import os
+import argparse
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import SessionLocal, init_db
+from app.services.degradation import METHODS, run_degradation
+
+
+def main():
+    """主函数：解析参数并执行衰减分析"""
+    parser = argparse.ArgumentParser(description="多年衰减率分析")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行进程数（默认 CPU 核数）")
+    parser.add_argument("--system-id", action="append", help="只分析指定系统（可重复）")
+    parser.add_argument("--method", action="append", choices=METHODS, help="只运行指定方法（可重复，默认全部）")
+    parser.add_argument("--force", action="store_true", help="忽略缓存全部重算")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        methods = tuple(args.method) if args.method else METHODS
+        print(f"📉 衰减分析：方法 {', '.join(methods)}，{args.workers} 个进程")
+        stats = run_degradation(db, args.system_id, methods, workers=args.workers, force=args.force)
+        print(f"✅ 共 {stats.systems} 个系统：分析 {stats.analyzed} 个，跳过 {stats.skipped} 个（结果未过期），"
+              f"失败 {stats.failed} 个，用时 {stats.elapsed_seconds} 秒")
+        if stats.failed:
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+行存储与分块压缩存储的对比基准
+- 按指定规模写入分钟级测试数据（系统 ID 以 PACKBENCH- 开头，固定随机种子）
+- 统计行存储（measurements 表及索引）与数据块（measurement_blocks）每个采样点占用的字节数
+- 对相同的随机时间窗口分别在两种布局上执行范围扫描，统计延迟与条/s，并校验结果一致
+- 结束时清理测试数据（--keep 保留）
+
+示例：
+    DATABASE_URL=sqlite:///./bench.db python scripts/bench_block_storage.py --systems 10 --days 30
+未设置 DATABASE_URL 时使用 SQLite（./bench.db）；PostgreSQL 下会对两张表执行 VACUUM
+"""
+import sys
+import os
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(PROJECT_ROOT, 'bench.db')}")
+
+import numpy as np
+from sqlalchemy import text
+
+from app.database.database import SessionLocal, engine, init_db, measurement_engines
+from app.database.sharding import fan_out, shard_scope
+from app.models.measurement import Measurement, MeasurementBlock
+from app.services.packed_storage import PACKED_BLOCK_SPAN, compact_rows, merge_tiers, query_packed
+from app.utils.time_utils import get_local_now
+
+BENCH_PREFIX = "PACKBENCH-"
+SEED = 42
+SEED_CHUNK_SIZE = 5000
+
+# (场景名, 窗口天数, 返回条数上限)；None 表示取窗口内全部数据
+SCAN_SCENARIOS = (
+    ("latest_100", 30, 100),
+    ("scan_1d", 1, None),
+    ("scan_7d", 7, None),
+    ("scan_30d", 30, None),
+)
+
+
+# ---- 数据预置与清理 ----
+
+def _cleanup_shard(session):
+    session.query(Measurement).filter(Measurement.system_id.like(f"{BENCH_PREFIX}%")).delete(synchronize_session=False)
+    session.query(MeasurementBlock).filter(MeasurementBlock.system_id.like(f"{BENCH_PREFIX}%")).delete(synchronize_session=False)
+    session.commit()
+
+
+def cleanup(db):
+    """删除全部测试系统的行存储记录与数据块（配置分片时在每个分片上执行）"""
+    fan_out(db, _cleanup_shard)
+    db.commit()
+
+
+def seed(db, system_ids, start, days):
+    """写入分钟级测试数据（辐照度日曲线叠加云量扰动，数值保留一位小数，约 1% 缺失）"""
+    rng = np.random.default_rng(SEED)
+    minutes = days * 1440
+    offsets = np.arange(minutes)
+    hours = (offsets % 1440) / 60
+    clear_sky = np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None) * 1000
+    timestamps = [start + timedelta(minutes=int(m)) for m in offsets]
+    created_at = get_local_now()
+    table = Measurement.__table__
+
+    for system_id in system_ids:
+        clouds = np.clip(1 - np.abs(rng.normal(0, 0.25, minutes)), 0.1, 1)
+        irradiance = np.round(clear_sky * clouds, 1)
+        temperature = np.round(20 + irradiance * 0.03 + rng.normal(0, 0.3, minutes), 1)
+        missing = rng.random(minutes) < 0.01
+        rows = [
+            {
+                "system_id": system_id,
+                "timestamp": ts,
+                "irradiance": None if gap else float(irr),
+                "temperature": None if gap else float(temp),
+                "created_at": created_at,
+            }
+            for ts, irr, temp, gap in zip(timestamps, irradiance, temperature, missing)
+        ]
+        with shard_scope(db, system_id):
+            for i in range(0, len(rows), SEED_CHUNK_SIZE):
+                db.execute(table.insert(), rows[i:i + SEED_CHUNK_SIZE])
+        db.commit()
+
+
+# ---- 存储占用 ----
+
+def vacuum():
+    """回收删除后的空间，使表大小统计反映实际数据（每个存放测量数据的库）"""
+    for item in measurement_engines():
+        with item.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if item.dialect.name == "postgresql":
+                conn.execute(text("VACUUM measurements"))
+                conn.execute(text("VACUUM measurement_blocks"))
+            else:
+                conn.execute(text("VACUUM"))
+
+
+def table_bytes(table_name):
+    """表及其全部索引占用的字节数（各分片合计）"""
+    total = 0
+    for item in measurement_engines():
+        with item.connect() as conn:
+            if item.dialect.name == "postgresql":
+                total += conn.execute(text("SELECT pg_total_relation_size(:t)"), {"t": table_name}).scalar()
+            else:
+                total += conn.execute(
+                    text(
+                        "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN "
+                        "(SELECT name FROM sqlite_master WHERE tbl_name = :t)"
+                    ),
+                    {"t": table_name},
+                ).scalar()
+    return total
+
+
+def storage_snapshot():
+    vacuum()
+    return {name: table_bytes(name) for name in ("measurements", "measurement_blocks")}
+
+
+# ---- 范围扫描 ----
+
+def make_windows(system_ids, start, days, repeats):
+    """为每个场景生成固定的随机 (系统, 起止时间) 窗口，两种布局使用同一组窗口"""
+    rnd = random.Random(SEED)
+    windows = {}
+    for name, window_days, limit in SCAN_SCENARIOS:
+        window_days = min(window_days, days)
+        span = timedelta(days=window_days) - timedelta(seconds=1)
+        windows[name] = []
+        for _ in range(repeats):
+            day = rnd.randrange(0, days - window_days + 1)
+            window_start = start + timedelta(days=day)
+            windows[name].append((rnd.choice(system_ids), window_start, window_start + span, limit))
+    return windows
+
+
+def scan_rows(db, system_id, start_time, end_time, limit):
+    with shard_scope(db, system_id):
+        query = (
+            db.query(Measurement)
+            .with_entities(*Measurement.__table__.columns)
+            .filter(
+                Measurement.system_id == system_id,
+                Measurement.timestamp >= start_time,
+                Measurement.timestamp <= end_time,
+            )
+            .order_by(Measurement.timestamp.desc())
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+
+def scan_packed(db, system_id, start_time, end_time, limit):
+    # 与查询接口一致：两层合并（打包完成后行存储中已无该时段数据）
+    rows = scan_rows(db, system_id, start_time, end_time, limit)
+    merged = merge_tiers(rows, query_packed(db, system_id, start_time, end_time, limit))
+    return merged if limit is None else merged[:limit]
+
+
+def run_scans(db, windows, scan):
+    """执行各场景的范围扫描，返回统计与结果校验和"""
+    results = {}
+    for name, items in windows.items():
+        latencies = []
+        rows_total = 0
+        checksum = 0.0
+        for system_id, start_time, end_time, limit in items:
+            began = time.perf_counter()
+            rows = scan(db, system_id, start_time, end_time, limit)
+            latencies.append(time.perf_counter() - began)
+            rows_total += len(rows)
+            checksum += sum(row.irradiance or 0.0 for row in rows) + sum(row.id for row in rows)
+        elapsed = sum(latencies)
+        results[name] = {
+            "queries": len(items),
+            "rows": rows_total,
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+            "rows_per_second": round(rows_total / elapsed) if elapsed else None,
+            "checksum": round(checksum, 3),
+        }
+    return results
+
+
+def print_comparison(storage, row_scans, packed_scans):
+    print()
+    print(f"{'存储':<16}{'总字节':>14}{'字节/点':>10}")
+    for layout in ("row", "packed"):
+        item = storage[layout]
+        print(f"{layout:<16}{item['bytes']:>14}{item['bytes_per_sample']:>10}")
+    print(f"压缩比: {storage['ratio']}x")
+    print()
+    print(f"{'场景':<14}{'行 p50 ms':>11}{'块 p50 ms':>11}{'行 条/s':>12}{'块 条/s':>12}{'一致':>6}")
+    for name in row_scans:
+        row, packed = row_scans[name], packed_scans[name]
+        same = row["rows"] == packed["rows"] and row["checksum"] == packed["checksum"]
+        print(
+            f"{name:<14}{row['p50_ms']:>11}{packed['p50_ms']:>11}"
+            f"{row['rows_per_second'] or '-':>12}{packed['rows_per_second'] or '-':>12}{'✓' if same else '✗':>6}"
+        )
+
+
+def main():
+    """主函数：预置数据、分别在行存储与分块存储上统计占用与扫描性能"""
+    parser = argparse.ArgumentParser(description="行存储与分块压缩存储的对比基准")
+    parser.add_argument("--systems", type=int, default=10, help="测试系统数量")
+    parser.add_argument("--days", type=int, default=30, help="每个系统的数据天数（分钟级）")
+    parser.add_argument("--repeats", type=int, default=20, help="每个扫描场景的查询次数")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    parser.add_argument("--keep", action="store_true", help="结束后保留测试数据")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        cleanup(db)
+        system_ids = [f"{BENCH_PREFIX}{i:04d}" for i in range(args.systems)]
+        # 数据放在热窗口与打包延迟之前，整段均可打包
+        start = datetime.combine(get_local_now().date(), datetime.min.time()) - timedelta(days=args.days + 7)
+        samples = args.systems * args.days * 1440
+
+        before = storage_snapshot()
+        print(f"🌱 写入 {samples} 条测试数据（{args.systems} 个系统 × {args.days} 天）...")
+        seed(db, system_ids, start, args.days)
+        seeded = storage_snapshot()
+
+        windows = make_windows(system_ids, start, args.days, args.repeats)
+        print("🔎 行存储范围扫描...")
+        row_scans = run_scans(db, windows, scan_rows)
+
+        print(f"🗜️ 打包为数据块（块跨度: {PACKED_BLOCK_SPAN}）...")
+        began = time.perf_counter()
+        blocks = 0
+        for system_id in system_ids:
+            blocks += compact_rows(db, system_id, start + timedelta(days=args.days))[1]
+        compact_seconds = time.perf_counter() - began
+        packed = storage_snapshot()
+
+        print("🔎 分块存储范围扫描...")
+        packed_scans = run_scans(db, windows, scan_packed)
+
+        row_bytes = seeded["measurements"] - before["measurements"]
+        packed_bytes = packed["measurement_blocks"] - before["measurement_blocks"]
+        storage = {
+            "row": {"bytes": row_bytes, "bytes_per_sample": round(row_bytes / samples, 2)},
+            "packed": {"bytes": packed_bytes, "bytes_per_sample": round(packed_bytes / samples, 2)},
+            "ratio": round(row_bytes / packed_bytes, 1) if packed_bytes else None,
+            "compact_seconds": round(compact_seconds, 2),
+            "compact_rows_per_second": round(samples / compact_seconds) if compact_seconds else None,
+        }
+        print_comparison(storage, row_scans, packed_scans)
+        print(f"打包用时 {storage['compact_seconds']} 秒（{storage['compact_rows_per_second']} 条/s，{blocks} 次块写入）")
+
+        if args.output:
+            result = {
+                "recorded_at": get_local_now().isoformat(),
+                "dialect": engine.dialect.name,
+                "params": vars(args),
+                "block_span": PACKED_BLOCK_SPAN,
+                "storage": storage,
+                "row_scans": row_scans,
+                "packed_scans": packed_scans,
+            }
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            print(f"💾 结果已写入 {args.output}")
+
+        if not args.keep:
+            cleanup(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
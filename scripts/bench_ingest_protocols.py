@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+对比 HTTP（POST /）与行协议（TCP）两种写入通道的吞吐量
+需先启动应用（python main.py）与行协议监听（LINE_LISTENER_ENABLED=1 或 scripts/line_listener.py），
+且本脚本与服务端使用同一个 DATABASE_URL（用于确认数据已落库）
+"""
+import sys
+import os
+import argparse
+import asyncio
+import socket
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.database.database import SessionLocal
+from app.database.sharding import shard_scope
+from app.models.measurement import Measurement
+
+# 起始时间戳（UTC 毫秒），每条读数间隔一分钟
+BASE_TS = 1_700_000_000_000
+
+
+def _readings(system_id, count):
+    for i in range(count):
+        yield system_id, BASE_TS + i * 60_000, 500.0 + i % 300, 30.0 + i % 10
+
+
+def _count_rows(system_id):
+    db = SessionLocal()
+    try:
+        with shard_scope(db, system_id):
+            return db.query(Measurement).filter(Measurement.system_id == system_id).count()
+    finally:
+        db.close()
+
+
+def _delete_rows(system_id):
+    db = SessionLocal()
+    try:
+        with shard_scope(db, system_id):
+            db.query(Measurement).filter(Measurement.system_id == system_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _wait_for_rows(system_id, count, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if _count_rows(system_id) >= count:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+async def bench_http(base_url, system_id, count, concurrency):
+    """并发发送单条 JSON 读数到 POST /"""
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        async def send(reading):
+            sid, ts, nr, tbody = reading
+            async with semaphore:
+                response = await client.post("/", json={"system_id": sid, "ts": ts, "params": {"NR": nr, "Tbody": tbody}})
+                response.raise_for_status()
+
+        await asyncio.gather(*(send(r) for r in _readings(system_id, count)))
+
+
+def bench_tcp(host, port, system_id, count):
+    """通过一条 TCP 连接发送行协议读数"""
+    payload = "".join(f"{sid},{ts},{nr},{tbody}\n" for sid, ts, nr, tbody in _readings(system_id, count))
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall(payload.encode("utf-8"))
+
+
+def _report(name, count, elapsed):
+    print(f"{name:<6} {count:>8} 条  {elapsed:8.2f} s  {count / elapsed:>10.0f} 条/s")
+
+
+def main():
+    """主函数：依次测试两种通道并输出吞吐量"""
+    parser = argparse.ArgumentParser(description="HTTP 与行协议写入吞吐量对比")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--line-host", default="localhost")
+    parser.add_argument("--line-port", type=int, default=8089)
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    print("-" * 60)
+    for name in ("http", "tcp"):
+        system_id = f"BENCH-{name.upper()}"
+        _delete_rows(system_id)
+        start = time.perf_counter()
+        if name == "http":
+            asyncio.run(bench_http(args.base_url, system_id, args.count, args.concurrency))
+        else:
+            bench_tcp(args.line_host, args.line_port, system_id, args.count)
+        if not _wait_for_rows(system_id, args.count):
+            print(f"❌ {name}: 等待落库超时")
+            continue
+        _report(name, args.count, time.perf_counter() - start)
+        _delete_rows(system_id)
+    print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+写入与查询路径的可复现性能基准
+- 按指定规模向数据库预置测试系统与测量数据（固定随机种子，系统 ID 以 BENCH- 开头）
+- 以进程内（ASGI 直连）或 HTTP 方式并发驱动接口，统计每个场景的条/s、请求/s、p50/p99 延迟与内存
+- 结果写入 JSON（含提交号与运行参数），可用 --compare 与其他提交的结果对比
+
+示例：
+    DATABASE_URL=sqlite:///./bench.db python scripts/bench_suite.py --systems 20 --days 7
+    python scripts/bench_suite.py --mode http --base-url http://localhost:8000 --compare bench_results/old.json
+未设置 DATABASE_URL 时使用 SQLite（./bench.db）
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(PROJECT_ROOT, 'bench.db')}")
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+import httpx
+import numpy as np
+from sqlalchemy import func
+
+from app.database.database import SessionLocal, engine, init_db
+from app.database.sharding import fan_out
+from app.models.measurement import Measurement, MeasurementBlock, MeasurementCoverage, MeasurementLatest
+from app.models.system_config import SystemConfiguration
+from app.services.ingest import CONFLICT_IGNORE, SOURCE_BACKFILL, refresh_latest_measurement, write_measurements
+from app.utils.time_utils import SYSTEM_TIMEZONE, get_local_now, get_zone
+
+BENCH_PREFIX = "BENCH-"
+SEED = 42
+SEED_CHUNK_SIZE = 5000
+
+# 查询场景在前、写入场景在后，写入的数据在结束时清理，保证重复运行结果可比
+QUERY_SCENARIOS = ("query_recent", "query_day", "query_downsample")
+INGEST_SCENARIOS = ("ingest_single", "ingest_batch", "ingest_device")
+ALL_SCENARIOS = QUERY_SCENARIOS + INGEST_SCENARIOS
+
+
+@dataclass
+class BenchContext:
+    """场景共享的预置数据信息"""
+    system_ids: list
+    seed_start: datetime
+    seed_end: datetime
+    interval_minutes: int
+    batch_size: int
+    ingest_start: datetime
+    next_row: int = 0
+
+    def take_rows(self, count):
+        """分配 count 个互不重复的 (system_id, timestamp)，写入场景使用预置范围之后的时间"""
+        rows = []
+        for _ in range(count):
+            k = self.next_row
+            self.next_row += 1
+            system_id = self.system_ids[k % len(self.system_ids)]
+            rows.append((system_id, self.ingest_start + timedelta(seconds=k)))
+        return rows
+
+
+# ---- 数据预置 ----
+
+def _irradiance_profile(timestamps, rng):
+    """按钟点生成晴空辐照度曲线并叠加云量扰动"""
+    hours = np.array([ts.hour + ts.minute / 60 for ts in timestamps])
+    clear_sky = np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None) * 1000
+    clouds = rng.uniform(0.6, 1.0, len(timestamps))
+    return np.round(clear_sky * clouds, 2)
+
+
+def seed_fleet(systems, days, interval_minutes, reseed):
+    """预置测试系统与测量数据；已有相同规模的数据时跳过"""
+    end = get_local_now().replace(second=0, microsecond=0)
+    end -= timedelta(minutes=end.minute % interval_minutes)
+    start = end - timedelta(days=days)
+    system_ids = [f"{BENCH_PREFIX}{i:04d}" for i in range(systems)]
+    per_system = days * 24 * 60 // interval_minutes
+
+    db = SessionLocal()
+    try:
+        existing = sum(fan_out(
+            db, lambda session: session.query(Measurement).filter(Measurement.system_id.in_(system_ids)).count()
+        ))
+        if existing == systems * per_system and not reseed:
+            latest = max(
+                value for value in fan_out(db, lambda session: session.query(func.max(Measurement.timestamp))
+                                           .filter(Measurement.system_id.in_(system_ids)).scalar())
+                if value is not None
+            )
+            print(f"♻️ 复用已预置数据: {systems} 个系统 × {per_system} 条")
+            return system_ids, latest - timedelta(minutes=interval_minutes * (per_system - 1)), latest
+
+        clear_bench_data(db)
+        now = get_local_now()
+        db.add_all([
+            SystemConfiguration(
+                system_id=system_id,
+                name=f"Benchmark {system_id}",
+                capacity=10.0,
+                latitude=30.0,
+                longitude=120.0,
+                timezone=SYSTEM_TIMEZONE,
+                is_active=True,
+                created_at=now,
+                updated_at=now,
+            )
+            for system_id in system_ids
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    # 经与接口相同的写入路径预置（分片路由、末值表与完整性索引均与实际运行一致）
+    rng = np.random.default_rng(SEED)
+    timestamps = [start + timedelta(minutes=interval_minutes * (i + 1)) for i in range(per_system)]
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        for system_id in system_ids:
+            irradiance = _irradiance_profile(timestamps, rng)
+            temperature = np.round(20 + irradiance / 40 + rng.normal(0, 0.5, per_system), 2)
+            rows = [
+                {
+                    "system_id": system_id,
+                    "timestamp": ts,
+                    "irradiance": float(irr),
+                    "temperature": float(temp),
+                    "created_at": now,
+                }
+                for ts, irr, temp in zip(timestamps, irradiance, temperature)
+            ]
+            for i in range(0, len(rows), SEED_CHUNK_SIZE):
+                write_measurements(db, rows[i:i + SEED_CHUNK_SIZE], SOURCE_BACKFILL, CONFLICT_IGNORE)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+    print(f"🌱 已预置 {systems} 个系统 × {per_system} 条测量数据，用时 {elapsed:.1f} s")
+    return system_ids, timestamps[0], timestamps[-1]
+
+
+def _clear_measurements(session, after):
+    """删除一个分片上的基准测试测量数据并提交"""
+    query = session.query(Measurement).filter(Measurement.system_id.like(f"{BENCH_PREFIX}%"))
+    if after is not None:
+        query = query.filter(Measurement.timestamp > after)
+    query.delete(synchronize_session=False)
+    if after is not None:
+        # 写入场景的数据从预置范围结束后的第二天开始，所在日期的完整性索引一并删除
+        session.query(MeasurementCoverage).filter(
+            MeasurementCoverage.system_id.like(f"{BENCH_PREFIX}%"), MeasurementCoverage.day > after.date()
+        ).delete(synchronize_session=False)
+    else:
+        for model in (MeasurementLatest, MeasurementCoverage, MeasurementBlock):
+            session.query(model).filter(model.system_id.like(f"{BENCH_PREFIX}%")).delete(synchronize_session=False)
+    session.commit()
+
+
+def clear_bench_data(db, after=None):
+    """删除基准测试数据；指定 after 时只删除该时间之后（写入场景产生）的测量数据，并重新计算末值"""
+    fan_out(db, lambda session: _clear_measurements(session, after))
+    if after is None:
+        db.query(SystemConfiguration).filter(SystemConfiguration.system_id.like(f"{BENCH_PREFIX}%")) \
+            .delete(synchronize_session=False)
+    else:
+        system_ids = [row[0] for row in db.query(SystemConfiguration.system_id)
+                      .filter(SystemConfiguration.system_id.like(f"{BENCH_PREFIX}%"))]
+        for system_id in system_ids:
+            refresh_latest_measurement(db, system_id)
+    db.commit()
+
+
+# ---- 场景：返回 (method, path, 请求参数, 涉及行数) ----
+
+def _random_system(ctx, rng):
+    return rng.choice(ctx.system_ids)
+
+
+def scenario_query_recent(ctx, rng):
+    return "GET", "/measurements/", {"params": {"system_id": _random_system(ctx, rng), "limit": 1000}}, 0
+
+
+def scenario_query_day(ctx, rng):
+    days = max((ctx.seed_end - ctx.seed_start).days, 1)
+    day = (ctx.seed_start + timedelta(days=rng.randrange(days))).replace(hour=0, minute=0, second=0, microsecond=0)
+    params = {
+        "system_id": _random_system(ctx, rng),
+        "start_time": day.isoformat(),
+        # 与日缓存的整天查询一致（00:00:00 至 23:59:59）
+        "end_time": (day + timedelta(days=1, seconds=-1)).isoformat(),
+        "limit": 1440,
+    }
+    return "GET", "/measurements/", {"params": params}, 0
+
+
+def scenario_query_downsample(ctx, rng):
+    params = {
+        "system_id": _random_system(ctx, rng),
+        "start_time": ctx.seed_start.isoformat(),
+        "end_time": ctx.seed_end.isoformat(),
+        "max_points": 500,
+    }
+    return "GET", "/measurements/", {"params": params}, 0
+
+
+def _measurement_json(system_id, ts, rng):
+    return {
+        "system_id": system_id,
+        "timestamp": ts.isoformat(),
+        "irradiance": round(rng.uniform(0, 1000), 2),
+        "temperature": round(rng.uniform(10, 50), 2),
+    }
+
+
+def scenario_ingest_single(ctx, rng):
+    system_id, ts = ctx.take_rows(1)[0]
+    return "POST", "/measurements/", {"json": _measurement_json(system_id, ts, rng)}, 1
+
+
+def scenario_ingest_batch(ctx, rng):
+    rows = [_measurement_json(system_id, ts, rng) for system_id, ts in ctx.take_rows(ctx.batch_size)]
+    return "POST", "/measurements/batch", {"json": {"measurements": rows}}, len(rows)
+
+
+def scenario_ingest_device(ctx, rng):
+    system_id, ts = ctx.take_rows(1)[0]
+    epoch_ms = int(ts.replace(tzinfo=get_zone(SYSTEM_TIMEZONE)).timestamp() * 1000)
+    payload = {
+        "system_id": system_id,
+        "ts": epoch_ms,
+        "params": {"NR": round(rng.uniform(0, 1000), 2), "Tbody": round(rng.uniform(10, 50), 2)},
+    }
+    return "POST", "/", {"json": payload}, 1
+
+
+SCENARIO_BUILDERS = {name: globals()[f"scenario_{name}"] for name in ALL_SCENARIOS}
+
+
+# ---- 运行与统计 ----
+
+def _rss_mb():
+    """当前进程常驻内存（MB）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_scenario(client, name, ctx, requests, concurrency, warmup):
+    """并发执行一个场景，返回统计结果"""
+    builder = SCENARIO_BUILDERS[name]
+    rng = random.Random(f"{SEED}-{name}")
+    specs = [builder(ctx, rng) for _ in range(warmup + requests)]
+    latencies = []
+    rows_written = 0
+    errors = 0
+
+    async def send(spec):
+        method, path, kwargs, _ = spec
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    # 预热请求串行执行且不计入统计
+    for spec in specs[:warmup]:
+        await send(spec)
+
+    pending = iter(specs[warmup:])
+
+    async def worker():
+        nonlocal rows_written, errors
+        for spec in pending:
+            ok, elapsed = await send(spec)
+            latencies.append(elapsed)
+            if ok:
+                rows_written += spec[3]
+            else:
+                errors += 1
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    rss_after = _rss_mb()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "rows": rows_written,
+        "wall_seconds": round(wall, 4),
+        "requests_per_second": round(len(latencies) / wall, 2) if wall else None,
+        "rows_per_second": round(rows_written / wall, 2) if wall and rows_written else None,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p90": round(float(np.percentile(latencies_ms, 90)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "max": round(float(latencies_ms.max()), 3),
+            "mean": round(float(latencies_ms.mean()), 3),
+        },
+        "memory_mb": {
+            "rss_before": round(rss_before, 1) if rss_before is not None else None,
+            "rss_after": round(rss_after, 1) if rss_after is not None else None,
+            "peak_rss": round(_peak_rss_mb(), 1) if resource is not None else None,
+        },
+    }
+
+
+async def run_all(args, ctx):
+    if args.mode == "inprocess":
+        # main.py 按相对路径挂载 static 目录
+        os.chdir(PROJECT_ROOT)
+        from main import app
+
+        await app.router.startup()
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60)
+    else:
+        app = None
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits)
+
+    results = []
+    try:
+        for name in [s for s in ALL_SCENARIOS if s in args.scenarios]:
+            result = await run_scenario(client, name, ctx, args.requests, args.concurrency, args.warmup)
+            results.append(result)
+            _print_result(result)
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+    return results
+
+
+def _print_result(result):
+    latency = result["latency_ms"]
+    rows_per_second = f"{result['rows_per_second']:>10.0f}" if result["rows_per_second"] else f"{'-':>10}"
+    print(
+        f"{result['scenario']:<18} {result['requests_per_second']:>9.1f} req/s {rows_per_second} 条/s  "
+        f"p50 {latency['p50']:>8.2f} ms  p99 {latency['p99']:>8.2f} ms  "
+        f"errors {result['errors']}  rss {result['memory_mb']['rss_after']} MB"
+    )
+
+
+def _git_revision():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip())
+        return commit, dirty
+    except Exception:
+        return None, None
+
+
+def compare(results, baseline_path):
+    """与另一份结果文件逐场景对比吞吐量与 p99 延迟"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    print("-" * 72)
+    print(f"对比基线: {baseline_path}")
+    for result in results:
+        base = baseline.get(result["scenario"])
+        if not base:
+            continue
+        throughput_key = "rows_per_second" if result["rows_per_second"] else "requests_per_second"
+        old, new = base[throughput_key], result[throughput_key]
+        old_p99, new_p99 = base["latency_ms"]["p99"], result["latency_ms"]["p99"]
+        throughput_delta = (new - old) / old * 100 if old else 0.0
+        p99_delta = (new_p99 - old_p99) / old_p99 * 100 if old_p99 else 0.0
+        print(f"{result['scenario']:<18} 吞吐 {throughput_delta:+7.1f}%   p99 {p99_delta:+7.1f}%")
+
+
+def main():
+    """主函数：预置数据、依次运行场景并保存结果"""
+    parser = argparse.ArgumentParser(description="写入与查询路径性能基准")
+    parser.add_argument("--mode", choices=("inprocess", "http"), default="inprocess",
+                        help="inprocess：ASGI 直连当前代码；http：请求已启动的服务（需使用同一个 DATABASE_URL）")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--systems", type=int, default=20, help="预置系统数")
+    parser.add_argument("--days", type=int, default=7, help="每个系统预置的天数")
+    parser.add_argument("--interval-minutes", type=int, default=5, help="预置数据的采样间隔（分钟）")
+    parser.add_argument("--reseed", action="store_true", help="删除并重新预置基准数据")
+    parser.add_argument("--scenarios", nargs="+", choices=ALL_SCENARIOS, default=list(ALL_SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="每个场景的请求数")
+    parser.add_argument("--warmup", type=int, default=20, help="每个场景不计入统计的预热请求数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发客户端数")
+    parser.add_argument("--batch-size", type=int, default=500, help="ingest_batch 每个请求的行数")
+    parser.add_argument("--output", help="结果 JSON 路径（默认 bench_results/<时间>-<提交号>.json）")
+    parser.add_argument("--compare", help="对比的基线结果 JSON")
+    args = parser.parse_args()
+
+    init_db()
+    system_ids, seed_start, seed_end = seed_fleet(args.systems, args.days, args.interval_minutes, args.reseed)
+    ctx = BenchContext(
+        system_ids=system_ids,
+        seed_start=seed_start,
+        seed_end=seed_end,
+        interval_minutes=args.interval_minutes,
+        batch_size=args.batch_size,
+        ingest_start=seed_end + timedelta(days=1),
+    )
+
+    print("-" * 72)
+    try:
+        results = asyncio.run(run_all(args, ctx))
+    finally:
+        db = SessionLocal()
+        try:
+            clear_bench_data(db, after=seed_end)
+        finally:
+            db.close()
+    print("-" * 72)
+
+    commit, dirty = _git_revision()
+    report = {
+        "created_at": get_local_now().isoformat(),
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": engine.dialect.name,
+        "parameters": {
+            "mode": args.mode,
+            "systems": args.systems,
+            "days": args.days,
+            "interval_minutes": args.interval_minutes,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size,
+            "hot_window_enabled": os.getenv("HOT_WINDOW_ENABLED", "1"),
+            "day_cache_enabled": os.getenv("DAY_CACHE_ENABLED", "1"),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        PROJECT_ROOT, "bench_results",
+        f"{get_local_now():%Y%m%d-%H%M%S}-{(commit or 'nogit')[:8]}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 结果已保存: {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
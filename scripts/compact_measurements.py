@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+将较早的测量数据打包为分块压缩存储（measurement_blocks）
+需设置 PACKED_STORAGE_ENABLED=1（查询接口才会读取数据块），建议通过 cron 每小时执行一次：
+    0 * * * * cd /path/to/project && python scripts/compact_measurements.py
+
+只打包早于 PACKED_COMPACT_AFTER_HOURS 且不在内存热窗口范围内的完整时间块；
+--unpack 将数据块还原为 measurements 行（关闭分块存储前执行）
+"""
+import sys
+import os
+import argparse
+import time
+from datetime import timedelta
+from typing import List
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import SessionLocal, init_db
+from app.database.sharding import fan_out
+from app.models.measurement import Measurement, MeasurementBlock
+from app.services.hot_window import HOT_WINDOW_HOURS
+from app.services.packed_storage import (
+    PACKED_BLOCK_SPAN,
+    PACKED_COMPACT_AFTER_HOURS,
+    PACKED_STORAGE_ENABLED,
+    block_start_of,
+    compact_rows,
+    storage_summary,
+    unpack_blocks,
+)
+from app.utils.time_utils import get_local_now
+
+
+def compaction_cutoff(older_than_hours):
+    """返回打包截止时间：对齐到块边界，且不早于热窗口覆盖范围"""
+    hours = max(older_than_hours, HOT_WINDOW_HOURS)
+    return block_start_of(get_local_now() - timedelta(hours=hours))
+
+
+def distinct_systems(db, query) -> List[str]:
+    """在各分片上执行返回 system_id 的查询并合并（未分片时直接查询主库）"""
+    system_ids = set()
+    for rows in fan_out(db, lambda session: query(session).all()):
+        system_ids.update(row[0] for row in rows)
+    return sorted(system_ids)
+
+
+def main():
+    """主函数：按系统打包（或还原）测量数据并输出存储概况"""
+    parser = argparse.ArgumentParser(description="测量数据分块压缩存储维护")
+    parser.add_argument("--older-than-hours", type=int, default=PACKED_COMPACT_AFTER_HOURS,
+                        help="只打包早于该小时数的数据（不小于 HOT_WINDOW_HOURS）")
+    parser.add_argument("--system-id", action="append", help="只处理指定系统（可重复）")
+    parser.add_argument("--batch-rows", type=int, default=200_000, help="每批读取并提交的行数")
+    parser.add_argument("--unpack", action="store_true", help="将数据块还原为 measurements 行")
+    parser.add_argument("--status", action="store_true", help="只输出存储概况")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.status:
+            print(storage_summary(db))
+            return
+
+        if args.unpack:
+            system_ids = args.system_id or distinct_systems(
+                db, lambda session: session.query(MeasurementBlock.system_id).distinct()
+            )
+            restored = 0
+            for system_id in system_ids:
+                restored += unpack_blocks(db, system_id)
+            print(f"✅ 已还原 {len(system_ids)} 个系统的 {restored} 条记录")
+            return
+
+        if not PACKED_STORAGE_ENABLED:
+            print("❌ 未开启分块存储（PACKED_STORAGE_ENABLED=1），打包后的数据对查询接口不可见")
+            sys.exit(1)
+
+        cutoff = compaction_cutoff(args.older_than_hours)
+        print(f"🗜️ 打包 {cutoff} 之前的数据（块跨度: {PACKED_BLOCK_SPAN}）")
+        if args.system_id:
+            system_ids = args.system_id
+        else:
+            system_ids = distinct_systems(
+                db, lambda session: session.query(Measurement.system_id).filter(Measurement.timestamp < cutoff).distinct()
+            )
+
+        started = time.perf_counter()
+        total_rows = total_blocks = 0
+        for system_id in system_ids:
+            try:
+                rows, blocks = compact_rows(db, system_id, cutoff, args.batch_rows)
+            except Exception as e:
+                db.rollback()
+                print(f"❌ {system_id} 打包失败: {e}")
+                continue
+            if rows:
+                print(f"  {system_id}: {rows} 条 → {blocks} 个数据块")
+            total_rows += rows
+            total_blocks += blocks
+
+        elapsed = time.perf_counter() - started
+        print(f"✅ 共打包 {total_rows} 条记录，写入 {total_blocks} 个数据块，用时 {elapsed:.1f} 秒")
+        summary = storage_summary(db)
+        print(f"📦 数据块 {summary['blocks']} 个，{summary['samples']} 个采样点，"
+              f"压缩后 {summary['payload_bytes']} 字节（{summary['bytes_per_sample']} 字节/点）")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+计算每日性能指标（daily_kpis）
+默认增量模式：只重算写入回调登记过新数据的系统日期，建议每 15 分钟执行一次；
+夜间执行 --nightly 额外补算所有启用系统的前一天：
+    */15 * * * * cd /path/to/project && python scripts/compute_daily_kpis.py
+    30 0 * * * cd /path/to/project && python scripts/compute_daily_kpis.py --nightly
+
+首次部署或修改系统容量、性能比后，用 --start / --end 全量重算指定日期范围
+"""
+import sys
+import os
+import argparse
+from datetime import date, timedelta
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import SessionLocal, init_db
+from app.models.system_config import SystemConfiguration
+from app.services.kpi import nightly_targets, pending_targets, run_kpi_job
+
+
+def range_targets(db, start, end, system_ids):
+    """指定日期范围内所有启用系统（或指定系统）的重算目标"""
+    days = {start + timedelta(days=n) for n in range((end - start).days + 1)}
+    if not system_ids:
+        system_ids = [
+            row[0] for row in db.query(SystemConfiguration.system_id).filter(SystemConfiguration.is_active == True)
+        ]
+    return {system_id: set(days) for system_id in system_ids}
+
+
+def main():
+    """主函数：收集重算目标并执行 KPI 计算"""
+    parser = argparse.ArgumentParser(description="每日性能指标计算")
+    parser.add_argument("--nightly", action="store_true", help="额外补算所有启用系统的前一天")
+    parser.add_argument("--start", type=date.fromisoformat, help="全量重算的开始日期（YYYY-MM-DD）")
+    parser.add_argument("--end", type=date.fromisoformat, help="全量重算的结束日期（默认与开始日期相同）")
+    parser.add_argument("--system-id", action="append", help="只处理指定系统（可重复）")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.start:
+            end = args.end or args.start
+            if end < args.start:
+                print("❌ 结束日期早于开始日期")
+                sys.exit(1)
+            targets = range_targets(db, args.start, end, args.system_id)
+            dirty, started_at = None, None
+            print(f"📐 全量重算 {args.start} ~ {end}，{len(targets)} 个系统")
+        else:
+            targets, dirty, started_at = pending_targets(db)
+            if args.system_id:
+                targets = {k: v for k, v in targets.items() if k in args.system_id}
+                dirty = {k: v for k, v in dirty.items() if k in args.system_id}
+            if args.nightly:
+                for system_id, days in nightly_targets(db, args.system_id).items():
+                    targets.setdefault(system_id, set()).update(days)
+            print(f"📐 增量重算 {sum(len(days) for days in targets.values())} 个系统日")
+
+        stats = run_kpi_job(db, targets, dirty, started_at)
+        print(f"✅ 已处理 {stats.systems} 个系统、{stats.days} 个系统日，写入 {stats.written} 行，"
+              f"失败 {stats.failed} 个系统，用时 {stats.elapsed_seconds} 秒")
+        if stats.failed:
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
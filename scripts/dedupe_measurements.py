@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+清理重复测量数据并建立 (system_id, timestamp) 唯一索引
+已有数据库升级到幂等写入前执行一次（新建数据库由 init_db 自动创建唯一索引）
+"""
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.database.database import engine
+
+# 每组重复数据保留最新写入的一条（id 最大）
+DELETE_DUPLICATES_SQL = """
+DELETE FROM measurements
+WHERE id NOT IN (
+    SELECT MAX(id) FROM measurements GROUP BY system_id, timestamp
+)
+"""
+
+DROP_INDEX_SQL = "DROP INDEX IF EXISTS ix_measurements_system_timestamp"
+
+CREATE_UNIQUE_INDEX_SQL = """
+CREATE UNIQUE INDEX ix_measurements_system_timestamp
+ON measurements (system_id, timestamp)
+"""
+
+
+def main():
+    """主函数：删除重复行并重建唯一索引（单个事务内完成）"""
+    try:
+        with engine.begin() as conn:
+            deleted = conn.execute(text(DELETE_DUPLICATES_SQL)).rowcount
+            print(f"🧹 已删除重复测量记录: {deleted} 条")
+            conn.execute(text(DROP_INDEX_SQL))
+            conn.execute(text(CREATE_UNIQUE_INDEX_SQL))
+            print("✅ 已创建唯一索引 ix_measurements_system_timestamp")
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
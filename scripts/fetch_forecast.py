@@ -1,31 +1,27 @@
 #!/usr/bin/env python3
 """
 定时获取所有活跃系统的天气预报数据
-每小时整点执行一次
+每小时整点执行一次，拉取完成后整批重算所有系统的发电预测（PREDICTION_ENABLED=0 时跳过）
 """
 import sys
 import os
 from datetime import datetime
-from zoneinfo import ZoneInfo
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database.database import SessionLocal
+from app.database.database import SessionLocal, init_db
 from app.models.system_config import SystemConfiguration
 from app.models.weather import WeatherForecast
+from app.services.metrics import observe_weather_fetch
+from app.services.prediction import PREDICTION_ENABLED, run_predictions
+from app.utils.time_utils import get_local_now
 import requests
 
 OPEN_METEO_API_URL = "https://api.open-meteo.com/v1/forecast"
 
-SYSTEM_TIMEZONE = "Asia/Shanghai"
-
-
-def _get_local_now() -> datetime:
-    return datetime.now(ZoneInfo(SYSTEM_TIMEZONE)).replace(tzinfo=None)
-
 
 def _create_retry_session() -> requests.Session:
     retry = Retry(
@@ -50,19 +46,20 @@ def fetch_forecast_for_system(db, system, days=1):
         params = {
             "latitude": system.latitude,
             "longitude": system.longitude,
-            "hourly": "shortwave_radiation,cloud_cover,temperature_2m,wind_speed_10m",
+            "hourly": "shortwave_radiation,diffuse_radiation,cloud_cover,temperature_2m,wind_speed_10m",
             "timezone": system.timezone or "auto",
             "forecast_days": days,
             "wind_speed_unit": "ms",
         }
         
         session = _create_retry_session()
-        response = session.get(OPEN_METEO_API_URL, params=params, timeout=(5, 20))
-        response.raise_for_status()
-        data = response.json()
+        with observe_weather_fetch("forecast"):
+            response = session.get(OPEN_METEO_API_URL, params=params, timeout=(5, 20))
+            response.raise_for_status()
+            data = response.json()
         
         # 存入数据库
-        now = _get_local_now()
+        now = get_local_now()
         record = WeatherForecast(
             system_id=system.system_id,
             days=days,
@@ -83,6 +80,7 @@ def fetch_forecast_for_system(db, system, days=1):
 
 def main():
     """主函数：批量更新所有活跃系统的预报数据"""
+    init_db()
     db = SessionLocal()
     
     try:
@@ -108,6 +106,11 @@ def main():
         
         print("-" * 60)
         print(f"✨ 完成！成功: {success_count}/{len(systems)}")
+
+        if PREDICTION_ENABLED and success_count:
+            stats = run_predictions(db)
+            print(f"🔮 发电预测：{stats.predicted} 个系统，{stats.hourly_rows} 个小时、{stats.daily_rows} 个系统日，"
+                  f"用时 {stats.elapsed_seconds} 秒")
         
     except Exception as e:
         print(f"❌ 批量更新失败: {e}")
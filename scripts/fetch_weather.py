@@ -6,7 +6,6 @@
 import sys
 import os
 from datetime import datetime
-from zoneinfo import ZoneInfo
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -16,16 +15,12 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.database.database import SessionLocal
 from app.models.system_config import SystemConfiguration
 from app.models.weather import WeatherCurrent
+from app.services.metrics import observe_weather_fetch
+from app.utils.time_utils import get_local_now
 import requests
 
 OPEN_METEO_API_URL = "https://api.open-meteo.com/v1/forecast"
 
-SYSTEM_TIMEZONE = "Asia/Shanghai"
-
-
-def _get_local_now() -> datetime:
-    return datetime.now(ZoneInfo(SYSTEM_TIMEZONE)).replace(tzinfo=None)
-
 
 def _create_retry_session() -> requests.Session:
     retry = Retry(
@@ -56,12 +51,13 @@ def fetch_current_weather_for_system(db, system):
         }
         
         session = _create_retry_session()
-        response = session.get(OPEN_METEO_API_URL, params=params, timeout=(5, 20))
-        response.raise_for_status()
-        data = response.json()
+        with observe_weather_fetch("current"):
+            response = session.get(OPEN_METEO_API_URL, params=params, timeout=(5, 20))
+            response.raise_for_status()
+            data = response.json()
         
         # 存入数据库
-        now = _get_local_now()
+        now = get_local_now()
         record = WeatherCurrent(
             system_id=system.system_id,
             fetched_at=now,
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+合成光伏电站群测量数据（规模测试用）
+- 生成不同位置、倾角与朝向的 SystemConfiguration（系统 ID 默认以 SYN- 开头）
+- 按太阳几何 + 晴空模型计算倾斜面辐照度与组件背板温度，叠加云层、数据缺口与传感器故障
+  （卡值、尖峰、温度缺失），全部以 NumPy 向量化生成，并按系统 × 时间块流式输出
+- 输出到数据库（PostgreSQL 使用 COPY，其他数据库批量 INSERT；配置了测量数据分片时写入系统所在分片），
+  或写入 CSV / NPZ / Parquet 文件
+
+示例：
+    python scripts/generate_fleet.py --systems 1000 --start 2023-01-01 --days 730 --output db
+    python scripts/generate_fleet.py --systems 100 --days 365 --output npz --out-dir data/synthetic
+相同 --seed 与参数生成的数据完全一致（与输出方式、生成顺序无关）
+"""
+import sys
+import os
+import argparse
+import csv
+import io
+import json
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except Exception:
+    pyarrow = None
+
+from app.calculations.solar import (
+    clear_sky_ghi,
+    module_temperature,
+    plane_of_array_irradiance,
+    solar_position,
+)
+from app.utils.time_utils import SYSTEM_TIMEZONE, get_local_now, get_zone
+
+# 生成位置范围（中国大陆大致经纬度范围，统一使用 Asia/Shanghai 时区）
+LATITUDE_RANGE = (18.0, 50.0)
+LONGITUDE_RANGE = (75.0, 135.0)
+PANEL_WATTAGES = (400.0, 450.0, 550.0, 600.0)
+INVERTER_MODELS = ("SUN2000-100KTL", "SG110CX", "GW50K-MT", "MAX 125KTL3-X")
+
+# 云层扰动的平滑窗口（分钟）
+CLOUD_SMOOTHING_MINUTES = 20
+
+
+# ---- 系统配置 ----
+
+def generate_systems(count, prefix, seed):
+    """生成系统配置字典列表（位置、容量、倾角与朝向随机）"""
+    rng = np.random.default_rng([seed, 0])
+    latitudes = rng.uniform(*LATITUDE_RANGE, count)
+    longitudes = rng.uniform(*LONGITUDE_RANGE, count)
+    capacities = np.round(np.clip(rng.lognormal(np.log(50), 1.0, count), 3, 5000), 1)
+    wattages = rng.choice(PANEL_WATTAGES, count)
+    # 倾角大致随纬度增加，方位角以正南为中心
+    tilts = np.round(np.clip(latitudes * 0.8 + rng.normal(0, 5, count), 0, 60), 1)
+    azimuths = np.round((180 + rng.normal(0, 20, count)) % 360, 1)
+    inverters = rng.choice(INVERTER_MODELS, count)
+
+    systems = []
+    for i in range(count):
+        systems.append({
+            "system_id": f"{prefix}{i:06d}",
+            "name": f"Synthetic plant {i:06d}",
+            "capacity": float(capacities[i]),
+            "panel_count": int(round(capacities[i] * 1000 / wattages[i])),
+            "panel_wattage": float(wattages[i]),
+            "inverter_model": str(inverters[i]),
+            "location": "synthetic",
+            "latitude": round(float(latitudes[i]), 5),
+            "longitude": round(float(longitudes[i]), 5),
+            "timezone": SYSTEM_TIMEZONE,
+            "tilt_angle": float(tilts[i]),
+            "azimuth": float(azimuths[i]),
+            "is_active": True,
+            "extra_metadata": {"synthetic": True, "seed": seed},
+        })
+    return systems
+
+
+# ---- 测量数据 ----
+
+def _event_mask(rng, n, rate, median_length, max_length):
+    """按泊松过程生成若干持续区间，返回 (区间覆盖掩码, 每个位置所在区间的起点下标)"""
+    events = rng.poisson(rate)
+    starts = rng.integers(0, n, events)
+    lengths = np.clip(rng.lognormal(np.log(median_length), 1.0, events).astype(np.int64), 1, max_length)
+    marks = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(marks, starts, 1)
+    np.add.at(marks, np.minimum(starts + lengths, n), -1)
+    mask = np.cumsum(marks[:-1]) > 0
+    start_index = np.full(n, -1, dtype=np.int64)
+    start_index[starts] = starts
+    start_index = np.maximum.accumulate(start_index)
+    return mask, start_index
+
+
+def _smooth_noise(rng, n, window):
+    """滑动平均得到的时间相关噪声（标准差约为 1）"""
+    kernel = np.ones(window) / np.sqrt(window)
+    return np.convolve(rng.standard_normal(n + window - 1), kernel, mode="valid")
+
+
+def generate_chunk(system, index, chunk_index, start, days, interval_minutes, args):
+    """
+    生成单个系统一个时间块的测量数据。
+
+    Returns:
+        (本地时间 datetime64[s], 辐照度, 组件温度)，缺口已剔除，NaN 表示该字段缺失
+    """
+    rng = np.random.default_rng([args.seed, index + 1, chunk_index])
+    per_day = 24 * 60 // interval_minutes
+    n = days * per_day
+    step = np.timedelta64(interval_minutes, "m")
+    local = np.datetime64(start, "s") + np.arange(n) * step
+    utc_offset = get_zone(SYSTEM_TIMEZONE).utcoffset(start)
+    epoch = (local - np.datetime64("1970-01-01T00:00:00", "s")).astype(np.int64) - int(utc_offset.total_seconds())
+
+    zenith, azimuth = solar_position(epoch, system["latitude"], system["longitude"])
+    ghi_clear = clear_sky_ghi(zenith)
+
+    # 云层：每天一个晴空指数基准（多数晴好），日内叠加时间相关扰动，多云天波动更大
+    daily_clearness = np.repeat(rng.beta(4.0, 1.5, days), per_day)
+    window = max(CLOUD_SMOOTHING_MINUTES // interval_minutes, 1)
+    variability = 0.6 * (1 - daily_clearness) + 0.02
+    clearness = np.clip(daily_clearness + variability * _smooth_noise(rng, n, window), 0.05, 1.1)
+    ghi = ghi_clear * clearness
+    beam_fraction = np.clip((clearness - 0.3) / 0.7, 0.0, 1.0)
+    dhi = ghi * (1 - 0.8 * beam_fraction)
+    poa = plane_of_array_irradiance(ghi, dhi, zenith, azimuth, system["tilt_angle"], system["azimuth"])
+
+    # 环境温度：纬度与季节决定基准，午后最高，叠加缓慢变化的天气噪声
+    day_of_year = (local.astype("datetime64[D]") - local.astype("datetime64[Y]")).astype(np.int64)
+    hour = (local - local.astype("datetime64[D]")).astype(np.int64) / 3600.0
+    seasonal_amplitude = 5 + 0.4 * (system["latitude"] - LATITUDE_RANGE[0])
+    ambient = (
+        28 - 0.6 * (system["latitude"] - LATITUDE_RANGE[0])
+        - seasonal_amplitude * np.cos(2 * np.pi * (day_of_year - 15) / 365)
+        + 5 * np.sin(2 * np.pi * (hour - 9) / 24)
+        + 2 * _smooth_noise(rng, n, max(180 // interval_minutes, 1))
+    )
+    wind = np.abs(2 + 1.5 * _smooth_noise(rng, n, window))
+    temperature = module_temperature(poa, ambient, wind)
+
+    # 传感器噪声与夜间零点漂移
+    irradiance = poa * (1 + rng.normal(0, 0.01, n))
+    night = poa <= 0
+    irradiance[night] = rng.uniform(-2.0, 0.0, int(night.sum()))
+    temperature = temperature + rng.normal(0, 0.2, n)
+
+    # 故障：卡值（保持区间起点的读数）、尖峰、温度传感器缺失
+    stuck, stuck_start = _event_mask(rng, n, args.fault_rate * days, 60 // interval_minutes + 1, per_day)
+    irradiance[stuck] = irradiance[stuck_start[stuck]]
+    temperature[stuck] = temperature[stuck_start[stuck]]
+    spikes = rng.random(n) < args.spike_rate
+    irradiance[spikes] *= rng.uniform(2.0, 4.0, int(spikes.sum()))
+    temperature_missing, _ = _event_mask(rng, n, args.fault_rate * days, 120 // interval_minutes + 1, per_day)
+    temperature[temperature_missing] = np.nan
+
+    # 数据缺口：通信中断区间与零星丢点
+    outage, _ = _event_mask(rng, n, args.gap_rate * days, 30 // interval_minutes + 1, 3 * per_day)
+    keep = ~outage & (rng.random(n) >= args.drop_rate)
+
+    return local[keep], np.round(irradiance[keep], 2), np.round(temperature[keep], 2)
+
+
+# ---- 输出 ----
+
+def _csv_rows(system_id, timestamps, irradiance, temperature, created_at):
+    """拼接 CSV 行（NaN 输出为空字段，COPY 视为 NULL）"""
+    ts_text = np.datetime_as_string(timestamps, unit="s")
+    irr_text = np.where(np.isnan(irradiance), "", irradiance.astype(str))
+    temp_text = np.where(np.isnan(temperature), "", temperature.astype(str))
+    return "".join(
+        f"{system_id},{ts},{irr},{temp},{created_at}\n"
+        for ts, irr, temp in zip(ts_text.tolist(), irr_text.tolist(), temp_text.tolist())
+    )
+
+
+def _delete_measurements(db, system_ids):
+    """删除系统已有的测量数据与完整性索引并提交（配置了分片时在系统所在分片上执行）"""
+    from app.models.measurement import Measurement, MeasurementCoverage
+
+    db.query(Measurement).filter(Measurement.system_id.in_(system_ids)).delete(synchronize_session=False)
+    db.query(MeasurementCoverage).filter(MeasurementCoverage.system_id.in_(system_ids)) \
+        .delete(synchronize_session=False)
+    db.commit()
+
+
+class DatabaseWriter:
+    """写入数据库：PostgreSQL 使用 COPY，其他数据库使用批量 INSERT"""
+
+    def __init__(self, systems, replace):
+        from app.database.database import SessionLocal, engine, init_db, measurement_engine
+        from app.database.sharding import fan_out_by_system
+        from app.models.measurement import Measurement
+        from app.models.system_config import SystemConfiguration
+
+        init_db()
+        self.engine_for = measurement_engine
+        self.session_factory = SessionLocal
+        self.table = Measurement.__table__
+        self.system_ids = [system["system_id"] for system in systems]
+        self.created_at = get_local_now().replace(microsecond=0)
+        self.is_postgres = engine.dialect.name == "postgresql"
+
+        db = SessionLocal()
+        try:
+            existing = db.query(SystemConfiguration).filter(SystemConfiguration.system_id.in_(self.system_ids)).count()
+            if existing and not replace:
+                raise SystemExit(f"❌ 已存在 {existing} 个同名系统，使用 --replace 覆盖或更换 --prefix")
+            fan_out_by_system(db, self.system_ids, _delete_measurements)
+            db.query(SystemConfiguration).filter(SystemConfiguration.system_id.in_(self.system_ids)) \
+                .delete(synchronize_session=False)
+            db.add_all([
+                SystemConfiguration(**system, created_at=self.created_at, updated_at=self.created_at)
+                for system in systems
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+    def write(self, system_id, timestamps, irradiance, temperature):
+        if self.is_postgres:
+            buffer = io.StringIO(_csv_rows(system_id, timestamps, irradiance, temperature, self.created_at.isoformat()))
+            raw = self.engine_for(system_id).raw_connection()
+            try:
+                with raw.cursor() as cursor:
+                    cursor.copy_expert(
+                        "COPY measurements (system_id, timestamp, irradiance, temperature, created_at) "
+                        "FROM STDIN WITH (FORMAT csv)",
+                        buffer,
+                    )
+                raw.commit()
+            finally:
+                raw.close()
+            return
+        rows = [
+            {
+                "system_id": system_id,
+                "timestamp": ts,
+                "irradiance": None if np.isnan(irr) else irr,
+                "temperature": None if np.isnan(temp) else temp,
+                "created_at": self.created_at,
+            }
+            for ts, irr, temp in zip(timestamps.tolist(), irradiance.tolist(), temperature.tolist())
+        ]
+        with self.engine_for(system_id).begin() as conn:
+            conn.execute(self.table.insert(), rows)
+
+    def close(self):
+        from app.services.ingest import refresh_latest_measurement
+
+        # 回填各系统的最新测量值
+        db = self.session_factory()
+        try:
+            for system_id in self.system_ids:
+                refresh_latest_measurement(db, system_id)
+            db.commit()
+        finally:
+            db.close()
+
+
+class FileWriter:
+    """按时间块写入文件：csv / npz / parquet，并输出 systems.json"""
+
+    def __init__(self, systems, out_dir, file_format):
+        if file_format == "parquet" and pyarrow is None:
+            raise SystemExit("❌ 输出 Parquet 需要安装 pyarrow")
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.file_format = file_format
+        self.created_at = get_local_now().replace(microsecond=0).isoformat()
+        self.part = 0
+        with open(os.path.join(out_dir, "systems.json"), "w", encoding="utf-8") as f:
+            json.dump(systems, f, ensure_ascii=False, indent=2)
+
+    def write(self, system_id, timestamps, irradiance, temperature):
+        self.part += 1
+        path = os.path.join(self.out_dir, f"measurements-{self.part:06d}.{self.file_format}")
+        if self.file_format == "csv":
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                csv.writer(f).writerow(["system_id", "timestamp", "irradiance", "temperature", "created_at"])
+                f.write(_csv_rows(system_id, timestamps, irradiance, temperature, self.created_at))
+        elif self.file_format == "npz":
+            np.savez(path, system_id=system_id, timestamp=timestamps, irradiance=irradiance, temperature=temperature)
+        else:
+            table = pyarrow.table({
+                "system_id": pyarrow.array([system_id] * len(timestamps), pyarrow.string()),
+                "timestamp": pyarrow.array(timestamps.astype("datetime64[s]")),
+                "irradiance": pyarrow.array(irradiance, from_pandas=True),
+                "temperature": pyarrow.array(temperature, from_pandas=True),
+            })
+            parquet.write_table(table, path)
+
+    def close(self):
+        pass
+
+
+def main():
+    """主函数：生成系统配置，按系统 × 时间块生成并输出测量数据"""
+    parser = argparse.ArgumentParser(description="合成光伏电站群测量数据")
+    parser.add_argument("--systems", type=int, default=100, help="系统数量")
+    parser.add_argument("--start", default="2024-01-01", help="起始日期（本地时间，YYYY-MM-DD）")
+    parser.add_argument("--days", type=int, default=365, help="生成天数")
+    parser.add_argument("--interval-minutes", type=int, default=1, help="采样间隔（分钟）")
+    parser.add_argument("--chunk-days", type=int, default=30, help="每次生成与写入的天数")
+    parser.add_argument("--prefix", default="SYN-", help="系统 ID 前缀")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--gap-rate", type=float, default=0.05, help="每天发生通信中断的期望次数")
+    parser.add_argument("--drop-rate", type=float, default=0.002, help="零星丢点比例")
+    parser.add_argument("--fault-rate", type=float, default=0.02, help="每天发生卡值 / 温度缺失故障的期望次数")
+    parser.add_argument("--spike-rate", type=float, default=0.0005, help="辐照度尖峰比例")
+    parser.add_argument("--output", choices=("db", "csv", "npz", "parquet"), default="db")
+    parser.add_argument("--out-dir", default="data/synthetic", help="文件输出目录")
+    parser.add_argument("--replace", action="store_true", help="删除并覆盖已存在的同名系统")
+    args = parser.parse_args()
+
+    if (24 * 60) % args.interval_minutes:
+        parser.error("--interval-minutes 必须能整除 1440")
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    systems = generate_systems(args.systems, args.prefix, args.seed)
+    if args.output == "db":
+        writer = DatabaseWriter(systems, args.replace)
+    else:
+        writer = FileWriter(systems, args.out_dir, args.output)
+
+    total_rows = 0
+    generate_seconds = 0.0
+    progress_every = max(len(systems) // 100, 1)
+    started = time.perf_counter()
+    for index, system in enumerate(systems):
+        for chunk_index, chunk_start_day in enumerate(range(0, args.days, args.chunk_days)):
+            days = min(args.chunk_days, args.days - chunk_start_day)
+            chunk_start = start + timedelta(days=chunk_start_day)
+            t0 = time.perf_counter()
+            timestamps, irradiance, temperature = generate_chunk(
+                system, index, chunk_index, chunk_start, days, args.interval_minutes, args
+            )
+            generate_seconds += time.perf_counter() - t0
+            writer.write(system["system_id"], timestamps, irradiance, temperature)
+            total_rows += len(timestamps)
+        if (index + 1) % progress_every and index + 1 != len(systems):
+            continue
+        elapsed = time.perf_counter() - started
+        print(f"✅ [{index + 1}/{len(systems)}] {system['system_id']}  累计 {total_rows} 条  {total_rows / elapsed:,.0f} 条/s")
+    writer.close()
+
+    elapsed = time.perf_counter() - started
+    print("-" * 60)
+    print(f"📦 共 {len(systems)} 个系统、{total_rows} 条测量数据，用时 {elapsed:.1f} s")
+    print(f"   生成 {total_rows / max(generate_seconds, 1e-9):,.0f} 条/s，含输出 {total_rows / elapsed:,.0f} 条/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+历史数据回填导入（数据采集器 CSV / Parquet 导出文件）
+- 多个文件由进程池并行导入，单个文件按块流式读取，内存占用与文件大小无关
+- 列名映射与下位机上报一致（NR → irradiance，Tbody → temperature），也接受 irradiance / temperature
+- 时间列支持 UTC 纪元时间戳（秒 / 毫秒）或采集器本地时间（--source-tz 指定时区），统一转换为 Asia/Shanghai 本地时间
+- PostgreSQL：COPY 到临时表后 INSERT ... ON CONFLICT 写入（重复 (system_id, timestamp) 按冲突策略跳过或覆盖）；
+  其他数据库（及配置了测量数据分片时）使用与接口相同的幂等写入
+- 每个块提交后记录断点（--state-dir，含已写入的日期），中断后重新执行同一命令从断点继续，已完成且未修改的文件直接跳过；
+  中断前或导入失败的文件已写入的日期同样在结束时刷新末值、完整性索引、KPI 与日缓存
+
+示例：
+    python scripts/import_backfill.py exports/*.csv --workers 8
+    python scripts/import_backfill.py exports/ --system-id-from-filename --source-tz UTC --timestamp-column time
+"""
+import sys
+import os
+import argparse
+import csv
+import glob
+import hashlib
+import io
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+try:
+    import pyarrow.parquet as parquet
+except Exception:
+    parquet = None
+
+from app.database.database import SHARDING_ENABLED, SessionLocal, dispose_engines, engine, init_db
+from app.services.device_payload import DEVICE_FIELD_MAP
+from app.services.ingest import (
+    CONFLICT_MODES,
+    SOURCE_BACKFILL,
+    refresh_latest_measurement,
+    resolve_conflict_mode,
+    write_measurements,
+)
+from app.utils.time_utils import (
+    SYSTEM_TIMEZONE,
+    epochs_to_datetime64,
+    get_local_now,
+    local_to_epochs,
+)
+
+SUPPORTED_EXTENSIONS = (".csv", ".parquet")
+# 自动识别的时间列名（按顺序）
+TIMESTAMP_COLUMNS = ("ts", "timestamp", "time", "datetime")
+# 列名 → 测量字段（下位机参数名与测量字段名均可）
+FIELD_COLUMNS = {**DEVICE_FIELD_MAP, "irradiance": "irradiance", "temperature": "temperature"}
+
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS backfill_staging (
+    seq BIGINT,
+    system_id TEXT,
+    timestamp TIMESTAMP,
+    irradiance DOUBLE PRECISION,
+    temperature DOUBLE PRECISION
+) ON COMMIT DELETE ROWS
+"""
+
+# 同一块内重复的 (system_id, timestamp) 保留文件中最后一条
+MERGE_STAGING_SQL = """
+INSERT INTO measurements (system_id, timestamp, irradiance, temperature, created_at)
+SELECT DISTINCT ON (system_id, timestamp) system_id, timestamp, irradiance, temperature, %(created_at)s
+FROM backfill_staging
+ORDER BY system_id, timestamp, seq DESC
+ON CONFLICT (system_id, timestamp) {action}
+"""
+CONFLICT_ACTIONS = {
+    "ignore": "DO NOTHING",
+    "update": (
+        "DO UPDATE SET irradiance = EXCLUDED.irradiance, "
+        "temperature = EXCLUDED.temperature, created_at = EXCLUDED.created_at"
+    ),
+}
+
+
+# ---- 断点 ----
+
+def _state_path(state_dir, path):
+    digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(state_dir, f"{digest}.json")
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_state(state_dir, path):
+    """读取文件断点；文件大小或修改时间变化时从头导入"""
+    try:
+        with open(_state_path(state_dir, path), encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    signature = _file_signature(path)
+    if state.get("size") != signature["size"] or state.get("mtime") != signature["mtime"]:
+        return None
+    return state
+
+
+def state_days(state):
+    """断点中记录的已写入 (system_id, 日期)（尚未由 finalize 刷新时）"""
+    if not state or state.get("finalized"):
+        return []
+    return [tuple(item) for item in state.get("days", [])]
+
+
+def save_state(state_dir, path, state):
+    target = _state_path(state_dir, path)
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, target)
+
+
+# ---- 读取与映射 ----
+
+def _iter_csv(path, chunk_rows):
+    """按块读取 CSV，产出 {列名: 字符串列表}"""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader, [])]
+        while True:
+            rows = [row for _, row in zip(range(chunk_rows), reader)]
+            if not rows:
+                return
+            columns = {name: [] for name in header}
+            for row in rows:
+                for name, value in zip(header, row):
+                    columns[name].append(value)
+                for name in header[len(row):]:
+                    columns[name].append("")
+            yield columns
+
+
+def _iter_parquet(path, chunk_rows):
+    """按块读取 Parquet，产出 {列名: 列表}"""
+    if parquet is None:
+        raise RuntimeError("Parquet import requires the 'pyarrow' package")
+    for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pydict()
+
+
+def _to_float(values):
+    """批量转换为 float64（空值 / 无法解析的值为 NaN）"""
+    array = np.array([np.nan if v is None or v == "" else v for v in values], dtype=object)
+    try:
+        return array.astype(np.float64)
+    except (TypeError, ValueError):
+        result = np.full(len(array), np.nan)
+        for i, value in enumerate(array):
+            try:
+                result[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return result
+
+
+def _to_datetime64(values, options):
+    """将时间列转换为 Asia/Shanghai 本地时间（datetime64[us]，无法解析为 NaT）"""
+    fmt = options["timestamp_format"]
+    sample = next((v for v in values if v not in (None, "")), None)
+    if fmt == "auto":
+        if isinstance(sample, datetime) or sample is None:
+            fmt = "iso"
+        else:
+            try:
+                fmt = "epoch_ms" if float(sample) > 1e11 else "epoch_s"
+            except (TypeError, ValueError):
+                fmt = "iso"
+
+    if fmt in ("epoch_ms", "epoch_s"):
+        return epochs_to_datetime64(_to_float(values), unit="ms" if fmt == "epoch_ms" else "s")
+
+    if fmt == "iso":
+        local = np.array(
+            [np.datetime64(v, "us") if isinstance(v, datetime) else np.datetime64("NaT") for v in values]
+            if isinstance(sample, datetime) else
+            _parse_iso(values),
+            dtype="datetime64[us]",
+        )
+    else:
+        local = np.array([_parse_custom(v, fmt) for v in values], dtype="datetime64[us]")
+
+    if options["source_tz"] == SYSTEM_TIMEZONE:
+        return local
+    return epochs_to_datetime64(local_to_epochs(local, options["source_tz"]), unit="s")
+
+
+def _parse_iso(values):
+    try:
+        return np.array([v or "NaT" for v in values], dtype="datetime64[us]")
+    except ValueError:
+        result = []
+        for value in values:
+            try:
+                result.append(np.datetime64(value or "NaT", "us"))
+            except ValueError:
+                result.append(np.datetime64("NaT"))
+        return result
+
+
+def _parse_custom(value, fmt):
+    try:
+        return np.datetime64(datetime.strptime(value, fmt), "us")
+    except (TypeError, ValueError):
+        return np.datetime64("NaT")
+
+
+def map_chunk(columns, path, options):
+    """
+    将一块原始列数据映射为测量字段数组。
+
+    Returns:
+        (system_ids, timestamps, irradiance, temperature, 有效行掩码)
+    """
+    timestamp_column = options["timestamp_column"] or next((c for c in TIMESTAMP_COLUMNS if c in columns), None)
+    if timestamp_column not in columns:
+        raise ValueError(f"{path}: timestamp column not found (tried {options['timestamp_column'] or TIMESTAMP_COLUMNS})")
+    n = len(columns[timestamp_column])
+
+    if "system_id" in columns and not options["system_id"] and not options["system_id_from_filename"]:
+        system_ids = np.array([str(v or "").strip() for v in columns["system_id"]], dtype=object)
+    else:
+        system_id = options["system_id"] or os.path.splitext(os.path.basename(path))[0]
+        system_ids = np.full(n, system_id, dtype=object)
+
+    fields = {"irradiance": np.full(n, np.nan), "temperature": np.full(n, np.nan)}
+    for column, field in FIELD_COLUMNS.items():
+        if column in columns:
+            fields[field] = _to_float(columns[column])
+
+    timestamps = _to_datetime64(columns[timestamp_column], options)
+    valid = ~np.isnat(timestamps) & (system_ids != "")
+    return system_ids, timestamps, fields["irradiance"], fields["temperature"], valid
+
+
+# ---- 写入 ----
+
+def _csv_field(value):
+    return "" if np.isnan(value) else repr(float(value))
+
+
+def copy_chunk(raw_connection, seq_start, system_ids, timestamps, irradiance, temperature, options, created_at):
+    """PostgreSQL：COPY 到临时表并合并，返回写入行数"""
+    buffer = io.StringIO()
+    ts_text = np.datetime_as_string(timestamps, unit="us")
+    writer = csv.writer(buffer)
+    for i, (system_id, ts) in enumerate(zip(system_ids.tolist(), ts_text.tolist())):
+        writer.writerow((seq_start + i, system_id, ts, _csv_field(irradiance[i]), _csv_field(temperature[i])))
+    buffer.seek(0)
+    with raw_connection.cursor() as cursor:
+        cursor.execute(CREATE_STAGING_SQL)
+        cursor.copy_expert(
+            "COPY backfill_staging (seq, system_id, timestamp, irradiance, temperature) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        cursor.execute(
+            MERGE_STAGING_SQL.format(action=CONFLICT_ACTIONS[options["on_conflict"]]),
+            {"created_at": created_at},
+        )
+        written = cursor.rowcount
+    raw_connection.commit()
+    return written
+
+
+def insert_chunk(system_ids, timestamps, irradiance, temperature, options, created_at):
+    """其他数据库：复用接口的幂等写入，返回写入行数"""
+    rows = [
+        {
+            "system_id": system_id,
+            "timestamp": ts,
+            "irradiance": None if np.isnan(irr) else irr,
+            "temperature": None if np.isnan(temp) else temp,
+            "created_at": created_at,
+        }
+        for system_id, ts, irr, temp in zip(
+            system_ids.tolist(), timestamps.tolist(), irradiance.tolist(), temperature.tolist()
+        )
+    ]
+    db = SessionLocal()
+    try:
+        return write_measurements(db, rows, SOURCE_BACKFILL, options["on_conflict"]).written
+    finally:
+        db.close()
+
+
+def use_copy():
+    """是否使用 COPY 路径（PostgreSQL 且未分片；分片时按系统路由，使用接口相同的写入）"""
+    return engine.dialect.name == "postgresql" and not SHARDING_ENABLED
+
+
+def _init_worker():
+    # 子进程不复用父进程的数据库连接
+    dispose_engines()
+
+
+def import_file(path, options):
+    """
+    导入单个文件（在子进程中执行），返回导入统计。
+
+    每个块提交后写入断点（含已写入的 (system_id, 日期)，供 finalize 刷新）；中断后重新导入时跳过已提交的行，
+    未记录断点的块按冲突策略去重。
+    """
+    state = load_state(options["state_dir"], path) or {**_file_signature(path), "committed_rows": 0}
+    result = {
+        "path": path, "rows": 0, "written": 0, "rejected": 0,
+        "skipped_rows": state["committed_rows"], "days": state_days(state), "skipped": bool(state.get("done")),
+    }
+    if state.get("done"):
+        return result
+
+    created_at = get_local_now()
+    is_postgres = use_copy()
+    raw_connection = engine.raw_connection() if is_postgres else None
+    reader = _iter_parquet if path.lower().endswith(".parquet") else _iter_csv
+    # 断点续传时合并上次已提交块涉及的日期
+    touched_days = set(state_days(state))
+    state.pop("finalized", None)
+    offset = 0
+    try:
+        for columns in reader(path, options["chunk_rows"]):
+            chunk_size = len(next(iter(columns.values()), []))
+            chunk_end = offset + chunk_size
+            if chunk_end <= state["committed_rows"]:
+                offset = chunk_end
+                continue
+            skip = max(state["committed_rows"] - offset, 0)
+            if skip:
+                columns = {name: values[skip:] for name, values in columns.items()}
+
+            system_ids, timestamps, irradiance, temperature, valid = map_chunk(columns, path, options)
+            system_ids, timestamps = system_ids[valid], timestamps[valid]
+            irradiance, temperature = irradiance[valid], temperature[valid]
+            if len(timestamps):
+                if is_postgres:
+                    written = copy_chunk(
+                        raw_connection, offset + skip, system_ids, timestamps, irradiance, temperature,
+                        options, created_at,
+                    )
+                else:
+                    written = insert_chunk(system_ids, timestamps, irradiance, temperature, options, created_at)
+                days = timestamps.astype("datetime64[D]").astype(str)
+                touched_days.update(zip(system_ids.tolist(), days.tolist()))
+                result["written"] += written
+            result["rows"] += int(valid.sum())
+            result["rejected"] += int((~valid).sum())
+
+            offset = chunk_end
+            state["committed_rows"] = offset
+            state["days"] = sorted(touched_days)
+            save_state(options["state_dir"], path, state)
+            print(f"⏳ {os.path.basename(path)}: 已导入 {offset} 行")
+    finally:
+        if raw_connection is not None:
+            raw_connection.close()
+
+    state.update({"done": True, "rows": result["rows"], "written": result["written"]})
+    save_state(options["state_dir"], path, state)
+    result["days"] = sorted(touched_days)
+    return result
+
+
+# ---- 主流程 ----
+
+def collect_files(inputs):
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                files.extend(os.path.join(root, name) for name in names if name.lower().endswith(SUPPORTED_EXTENSIONS))
+        else:
+            files.extend(p for p in glob.glob(item) if p.lower().endswith(SUPPORTED_EXTENSIONS))
+    return sorted(set(files))
+
+
+def mark_finalized(state_dir, paths):
+    """finalize 完成后标记断点，之后重新执行不再重复刷新这些日期"""
+    for path in paths:
+        state = load_state(state_dir, path)
+        if state is not None and not state.get("finalized"):
+            state["finalized"] = True
+            save_state(state_dir, path, state)
+
+
+def finalize(results):
+    """刷新涉及系统的最新测量值与完整性索引，登记待重算 KPI 的日期，并失效涉及日期的共享日缓存"""
+    from app.services.coverage import COVERAGE_TRACKING_ENABLED, rebuild_coverage
+    from app.services.day_cache import DAY_CACHE_DIR, day_cache
+    from app.services.kpi import dirty_days
+
+    touched = {(system_id, day) for result in results for system_id, day in result["days"]}
+    db = SessionLocal()
+    try:
+        for system_id in sorted({system_id for system_id, _ in touched}):
+            refresh_latest_measurement(db, system_id)
+        # COPY 路径不经过接口写入，按涉及日期重建完整性索引（其他数据库的写入路径已同步维护）
+        if COVERAGE_TRACKING_ENABLED and use_copy():
+            days_by_system = {}
+            for system_id, day in touched:
+                days_by_system.setdefault(system_id, []).append(datetime.strptime(day, "%Y-%m-%d").date())
+            for system_id, days in sorted(days_by_system.items()):
+                rebuild_coverage(db, system_id, min(days), max(days))
+                db.commit()
+        dirty_days.mark(db, {
+            (system_id, datetime.strptime(day, "%Y-%m-%d").date()) for system_id, day in touched
+        })
+        db.commit()
+    finally:
+        db.close()
+    if DAY_CACHE_DIR:
+        for system_id, day in touched:
+            day_cache.invalidate(system_id, datetime.strptime(day, "%Y-%m-%d").date())
+
+
+def main():
+    """主函数：收集文件，进程池并行导入并汇总进度"""
+    parser = argparse.ArgumentParser(description="历史 CSV / Parquet 数据回填导入")
+    parser.add_argument("inputs", nargs="+", help="文件、目录或通配符")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行进程数")
+    parser.add_argument("--chunk-rows", type=int, default=50_000, help="每块行数（每块提交一次并记录断点）")
+    parser.add_argument("--system-id", help="所有文件使用的系统 ID（默认读取 system_id 列）")
+    parser.add_argument("--system-id-from-filename", action="store_true", help="以文件名（不含扩展名）作为系统 ID")
+    parser.add_argument("--timestamp-column", help=f"时间列名（默认自动识别 {', '.join(TIMESTAMP_COLUMNS)}）")
+    parser.add_argument("--timestamp-format", default="auto",
+                        help="auto / epoch_s / epoch_ms / iso，或 strptime 格式（如 %%Y/%%m/%%d %%H:%%M）")
+    parser.add_argument("--source-tz", default=SYSTEM_TIMEZONE, help="本地时间格式的时间列所在时区")
+    parser.add_argument("--on-conflict", choices=CONFLICT_MODES, default=None, help="重复数据处理策略（默认 INGEST_CONFLICT_MODE）")
+    parser.add_argument("--state-dir", default=".backfill_state", help="断点目录")
+    parser.add_argument("--restart", action="store_true", help="忽略断点，从头导入")
+    args = parser.parse_args()
+
+    files = collect_files(args.inputs)
+    if not files:
+        print("❌ 未找到 CSV / Parquet 文件")
+        sys.exit(1)
+    if args.restart:
+        for path in files:
+            try:
+                os.remove(_state_path(args.state_dir, path))
+            except OSError:
+                pass
+    os.makedirs(args.state_dir, exist_ok=True)
+    init_db()
+
+    options = {
+        "chunk_rows": args.chunk_rows,
+        "system_id": args.system_id,
+        "system_id_from_filename": args.system_id_from_filename,
+        "timestamp_column": args.timestamp_column,
+        "timestamp_format": args.timestamp_format,
+        "source_tz": args.source_tz,
+        "on_conflict": resolve_conflict_mode(args.on_conflict),
+        "state_dir": args.state_dir,
+    }
+    if args.system_id_from_filename:
+        options["system_id"] = None
+
+    print(f"📂 共 {len(files)} 个文件，{args.workers} 个进程，冲突策略 {options['on_conflict']}")
+    started = time.perf_counter()
+    results, failed = [], 0
+    total_rows = total_written = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(import_file, path, options): path for path in files}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ [{done}/{len(files)}] {path}: {e}")
+                # 失败前已提交的块仍需刷新：从断点读取已写入的日期
+                results.append({"path": path, "rows": 0, "written": 0,
+                                "days": state_days(load_state(args.state_dir, path))})
+                continue
+            results.append(result)
+            total_rows += result["rows"]
+            total_written += result["written"]
+            elapsed = time.perf_counter() - started
+            if result["skipped"]:
+                status = "已完成，跳过"
+            else:
+                status = f"{result['rows']} 行，写入 {result['written']}，重复 {result['rows'] - result['written']}"
+                if result["rejected"]:
+                    status += f"，无效 {result['rejected']}"
+                if result["skipped_rows"]:
+                    status += f"（从第 {result['skipped_rows']} 行继续）"
+            print(f"✅ [{done}/{len(files)}] {os.path.basename(path)}: {status}  累计 {total_rows / max(elapsed, 1e-9):,.0f} 行/s")
+
+    finalize(results)
+    mark_finalized(args.state_dir, [result["path"] for result in results])
+    elapsed = time.perf_counter() - started
+    print("-" * 60)
+    print(f"📦 导入 {total_rows} 行，写入 {total_written} 行，重复 {total_rows - total_written} 行，用时 {elapsed:.1f} s")
+    if failed:
+        print(f"❌ {failed} 个文件导入失败，修复后重新执行同一命令即可从断点继续")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
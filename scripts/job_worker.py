@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+后台任务进程
+从 jobs 表领取任务（FOR UPDATE SKIP LOCKED），在进程池中执行，可在多台主机上同时运行。
+常驻运行（建议由 systemd / supervisor 守护）：
+    python scripts/job_worker.py --processes 4
+
+也可以由 cron 定期执行，处理完队列中的任务后退出：
+    */5 * * * * cd /path/to/project && python scripts/job_worker.py --once
+
+用 --kind 只处理指定类型的任务（如单独部署导出任务进程）
+"""
+import sys
+import os
+import argparse
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import init_db
+from app.services.jobs import JOB_HANDLERS, JOB_POLL_SECONDS, JOB_WORKER_PROCESSES, run_worker
+import app.services.job_handlers  # noqa: F401  导入即注册任务类型
+
+
+def main():
+    """主函数：启动任务进程主循环"""
+    parser = argparse.ArgumentParser(description="后台任务进程")
+    parser.add_argument("--processes", type=int, default=JOB_WORKER_PROCESSES,
+                        help=f"同时执行的任务数（默认 {JOB_WORKER_PROCESSES}）")
+    parser.add_argument("--kind", action="append", choices=sorted(JOB_HANDLERS), help="只处理指定类型的任务（可重复）")
+    parser.add_argument("--once", action="store_true", help="队列为空后退出")
+    parser.add_argument("--poll", type=float, default=JOB_POLL_SECONDS, help=f"轮询间隔（秒，默认 {JOB_POLL_SECONDS}）")
+    args = parser.parse_args()
+
+    if args.processes < 1:
+        print("❌ --processes 必须大于 0")
+        sys.exit(1)
+
+    init_db()
+    kinds = ", ".join(args.kind) if args.kind else "全部类型"
+    print(f"🚀 任务进程启动：{args.processes} 个执行进程，处理 {kinds}")
+    executed = run_worker(args.processes, args.kind, args.once, args.poll)
+    print(f"✅ 任务进程退出，共执行 {executed} 个任务")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+独立运行行协议写入监听器（TCP / UDP）
+每行一条读数：system_id,ts,NR,Tbody（ts 为 UTC 毫秒时间戳）
+"""
+import sys
+import os
+import argparse
+import asyncio
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import init_db
+from app.services.ingest import register_writer_listeners
+from app.services.line_listener import (
+    LINE_BATCH_SIZE,
+    LINE_FLUSH_INTERVAL,
+    LINE_LISTENER_HOST,
+    LINE_LISTENER_TCP_PORT,
+    LINE_LISTENER_UDP_PORT,
+    BatchedMeasurementWriter,
+    LineProtocolListener,
+)
+
+
+async def run(args):
+    listener = LineProtocolListener(
+        host=args.host,
+        tcp_port=None if args.no_tcp else args.tcp_port,
+        udp_port=None if args.no_udp else args.udp_port,
+        writer=BatchedMeasurementWriter(
+            batch_size=args.batch_size,
+            flush_interval=args.flush_interval,
+            on_conflict=args.on_conflict,
+        ),
+    )
+    await listener.start()
+    try:
+        while True:
+            await asyncio.sleep(60)
+            print(f"📊 {listener.stats()}")
+    finally:
+        await listener.stop()
+        print(f"✨ 已停止: {listener.stats()}")
+
+
+def main():
+    """主函数：解析参数并启动监听"""
+    parser = argparse.ArgumentParser(description="行协议测量数据写入监听器")
+    parser.add_argument("--host", default=LINE_LISTENER_HOST)
+    parser.add_argument("--tcp-port", type=int, default=LINE_LISTENER_TCP_PORT)
+    parser.add_argument("--udp-port", type=int, default=LINE_LISTENER_UDP_PORT)
+    parser.add_argument("--no-tcp", action="store_true", help="不启用 TCP 监听")
+    parser.add_argument("--no-udp", action="store_true", help="不启用 UDP 监听")
+    parser.add_argument("--batch-size", type=int, default=LINE_BATCH_SIZE)
+    parser.add_argument("--flush-interval", type=float, default=LINE_FLUSH_INTERVAL)
+    parser.add_argument("--on-conflict", choices=["ignore", "update"], default=None)
+    args = parser.parse_args()
+
+    init_db()
+    register_writer_listeners()
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+测量数据分片迁移（启用分片或在 MEASUREMENT_SHARD_URLS 末尾增加分片后执行）
+- 扫描主库（启用分片前的历史数据）与各分片，找出所在数据库与 system_id 哈希结果不一致的系统
+- 按系统迁移 measurements（按时间分批，目标库重新分配记录 ID，重复键跳过）、measurement_blocks
+  与 measurement_coverage（按主键覆盖），在目标分片上重新计算末值，提交后再从原库删除
+- 中断后重新执行即可继续：已复制的批次在目标库按唯一键跳过，原库数据在系统迁移完成后才删除
+
+步骤：停止接口、行协议监听与导入等写入进程 → 在列表末尾追加分片（不要调整已有分片的顺序）→
+执行本脚本 → 启动服务
+    python scripts/rebalance_shards.py --dry-run
+    python scripts/rebalance_shards.py --batch-rows 50000
+"""
+import sys
+import os
+import argparse
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database.database import SHARDING_ENABLED, SessionLocal, engine, init_db, shard_engines
+from app.database.sharding import shard_for, shard_scope
+from app.models.measurement import Measurement, MeasurementBlock, MeasurementCoverage, MeasurementLatest
+from app.services.ingest import INSERT_CHUNK_SIZE, get_dialect_insert, refresh_latest_measurement
+
+# 迁移的表：(模型, 分批排序列, 冲突时是否覆盖)；measurements 的 ID 由目标库重新分配
+MIGRATED_TABLES = (
+    (Measurement, Measurement.timestamp, False),
+    (MeasurementBlock, MeasurementBlock.block_start, True),
+    (MeasurementCoverage, MeasurementCoverage.day, True),
+)
+
+
+def source_systems(session):
+    """数据库中有测量数据（任一测量数据表）的系统"""
+    system_ids = set()
+    for model in (Measurement, MeasurementBlock, MeasurementCoverage, MeasurementLatest):
+        system_ids.update(row[0] for row in session.query(model.system_id).distinct())
+    return system_ids
+
+
+def copy_table(source, target, model, order_column, overwrite, system_id, batch_rows):
+    """按排序列分批复制系统在一张表中的数据，每批在目标库提交一次，返回复制的行数"""
+    table = model.__table__
+    columns = [column for column in table.columns if column.name != "id"]
+    key_columns = ["system_id", "timestamp"] if model is Measurement else [c.name for c in table.primary_key]
+    insert = get_dialect_insert(target)
+    copied = 0
+    last = None
+    while True:
+        query = select(*columns).where(table.c.system_id == system_id)
+        if last is not None:
+            query = query.where(order_column > last)
+        rows = source.execute(query.order_by(order_column).limit(batch_rows)).mappings().all()
+        if not rows:
+            return copied
+        with shard_scope(target, system_id):
+            for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+                stmt = insert(table).values([dict(row) for row in rows[start:start + INSERT_CHUNK_SIZE]])
+                if overwrite:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=key_columns,
+                        set_={c.name: stmt.excluded[c.name] for c in columns if c.name not in key_columns},
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=key_columns)
+                target.execute(stmt)
+        target.commit()
+        copied += len(rows)
+        last = rows[-1][order_column.name]
+
+
+def migrate_system(source, target, system_id, batch_rows):
+    """将一个系统的测量数据从原库迁移到所在分片，返回各表复制的行数"""
+    copied = {}
+    for model, order_column, overwrite in MIGRATED_TABLES:
+        copied[model.__tablename__] = copy_table(
+            source, target, model, order_column, overwrite, system_id, batch_rows
+        )
+    refresh_latest_measurement(target, system_id)
+    target.commit()
+
+    for model in (Measurement, MeasurementBlock, MeasurementCoverage, MeasurementLatest):
+        source.query(model).filter(model.system_id == system_id).delete(synchronize_session=False)
+    source.commit()
+    return copied
+
+
+def main():
+    """主函数：找出不在所属分片上的系统并逐个迁移"""
+    parser = argparse.ArgumentParser(description="测量数据分片迁移")
+    parser.add_argument("--batch-rows", type=int, default=50_000, help="每批复制并提交的行数")
+    parser.add_argument("--dry-run", action="store_true", help="只输出迁移计划")
+    args = parser.parse_args()
+
+    if not SHARDING_ENABLED:
+        print("❌ 未配置 MEASUREMENT_SHARD_URLS，无需迁移")
+        sys.exit(1)
+
+    init_db()
+    count = len(shard_engines)
+    sources = [("primary", None, engine)] + [(f"shard {i}", i, shard) for i, shard in enumerate(shard_engines)]
+    target = SessionLocal()
+    started = time.perf_counter()
+    planned = moved_systems = moved_rows = 0
+    try:
+        for name, index, source_engine in sources:
+            source = Session(bind=source_engine)
+            try:
+                moves = sorted(
+                    (system_id, shard_for(system_id, count)) for system_id in source_systems(source)
+                    if shard_for(system_id, count) != index
+                )
+                if not moves:
+                    continue
+                planned += len(moves)
+                if args.dry_run:
+                    rows = dict(
+                        source.query(Measurement.system_id, func.count())
+                        .group_by(Measurement.system_id).all()
+                    )
+                    print(f"📋 {name}: {len(moves)} 个系统待迁移")
+                    for system_id, shard in moves:
+                        print(f"  {system_id} → shard {shard}（{rows.get(system_id, 0)} 条行存储记录）")
+                    continue
+                print(f"🔀 {name}: 迁移 {len(moves)} 个系统")
+                for system_id, shard in moves:
+                    copied = migrate_system(source, target, system_id, args.batch_rows)
+                    moved_systems += 1
+                    moved_rows += copied[Measurement.__tablename__]
+                    print(f"  {system_id} → shard {shard}: " + "，".join(f"{t} {n} 行" for t, n in copied.items()))
+            finally:
+                source.close()
+    except Exception as e:
+        target.rollback()
+        print(f"❌ 迁移失败（可重新执行继续）: {e}")
+        sys.exit(1)
+    finally:
+        target.close()
+
+    if args.dry_run:
+        print(f"📋 共 {planned} 个系统待迁移（{count} 个分片）")
+    else:
+        elapsed = time.perf_counter() - started
+        print(f"✅ 已迁移 {moved_systems} 个系统、{moved_rows} 条行存储记录，用时 {elapsed:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
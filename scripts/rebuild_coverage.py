@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+重建数据完整性索引 measurement_coverage
+升级到完整性接口前执行一次；合成数据（generate_fleet.py）等直接写库的数据导入后也需执行
+（接口写入、删除与回填导入会自动维护该表）：
+    python scripts/rebuild_coverage.py
+    python scripts/rebuild_coverage.py --start 2025-01-01 --end 2025-01-31 --system-id PV-001
+"""
+import sys
+import os
+import argparse
+from datetime import date
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import SessionLocal, init_db
+from app.services.coverage import data_day_range, rebuild_coverage, systems_with_measurements
+
+
+def main():
+    """主函数：逐个系统按日期范围重建分钟位图（每个系统提交一次）"""
+    parser = argparse.ArgumentParser(description="重建数据完整性索引")
+    parser.add_argument("--start", type=date.fromisoformat, help="开始日期（YYYY-MM-DD，默认为系统最早数据日期）")
+    parser.add_argument("--end", type=date.fromisoformat, help="结束日期（YYYY-MM-DD，默认为系统最新数据日期）")
+    parser.add_argument("--system-id", action="append", help="只处理指定系统（可重复）")
+    args = parser.parse_args()
+
+    if args.start and args.end and args.end < args.start:
+        print("❌ 结束日期早于开始日期")
+        sys.exit(1)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        system_ids = args.system_id or systems_with_measurements(db)
+        total_days = 0
+        for system_id in system_ids:
+            if args.start and args.end:
+                start, end = args.start, args.end
+            else:
+                data_range = data_day_range(db, system_id)
+                if data_range is None:
+                    continue
+                start, end = args.start or data_range[0], args.end or data_range[1]
+            if end < start:
+                continue
+            days = rebuild_coverage(db, system_id, start, end)
+            db.commit()
+            total_days += days
+            print(f"⏳ {system_id}: {start} ~ {end}，{days} 天有数据")
+        print(f"✅ 已重建 {len(system_ids)} 个系统、{total_days} 个系统日的完整性索引")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ 重建失败: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+重建各系统最新测量值表 measurement_latest
+升级到总览接口前执行一次，或末值表与测量数据不一致时执行（写入路径会自动维护该表）
+配置了测量数据分片时依次重建每个分片
+"""
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.database.database import SessionLocal, init_db, measurement_engines
+from app.database.sharding import fan_out
+from app.models.measurement import MeasurementBlock
+from app.services.ingest import refresh_latest_measurement
+from app.services.packed_storage import PACKED_STORAGE_ENABLED
+
+CLEAR_LATEST_SQL = "DELETE FROM measurement_latest"
+
+# 每个系统取时间戳最大的一条（(system_id, timestamp) 唯一，无需再去重）
+REBUILD_LATEST_SQL = """
+INSERT INTO measurement_latest
+    (system_id, measurement_id, timestamp, irradiance, temperature, updated_at)
+SELECT m.system_id, m.id, m.timestamp, m.irradiance, m.temperature, m.created_at
+FROM measurements m
+JOIN (
+    SELECT system_id, MAX(timestamp) AS timestamp
+    FROM measurements
+    GROUP BY system_id
+) latest ON latest.system_id = m.system_id AND latest.timestamp = m.timestamp
+"""
+
+
+def refresh_packed_systems(db):
+    """重新计算有数据块的系统的末值并提交，返回系统数"""
+    system_ids = [row[0] for row in db.query(MeasurementBlock.system_id).distinct()]
+    for system_id in system_ids:
+        refresh_latest_measurement(db, system_id)
+    db.commit()
+    return len(system_ids)
+
+
+def main():
+    """主函数：清空并重建末值表（单个事务内完成）"""
+    try:
+        init_db()
+        rebuilt = 0
+        for engine in measurement_engines():
+            with engine.begin() as conn:
+                conn.execute(text(CLEAR_LATEST_SQL))
+                rebuilt += conn.execute(text(REBUILD_LATEST_SQL)).rowcount
+        print(f"✅ 已重建 {rebuilt} 个系统的最新测量值")
+        if PACKED_STORAGE_ENABLED:
+            # 末值可能已被打包（系统长期离线），逐个有数据块的系统重新比较两层
+            db = SessionLocal()
+            try:
+                corrected = sum(fan_out(db, refresh_packed_systems))
+                print(f"✅ 已按打包数据校正 {corrected} 个系统的最新测量值")
+            finally:
+                db.close()
+    except Exception as e:
+        print(f"❌ 重建失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
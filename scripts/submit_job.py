@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+提交后台任务
+任务由 scripts/job_worker.py 执行；参数相同的待执行任务不会重复提交：
+    python scripts/submit_job.py kpi_recompute --param start=2025-01-01 --param end=2025-01-31
+    python scripts/submit_job.py measurement_export --param start_time=2025-01-01T00:00:00 \\
+        --param end_time=2025-01-02T00:00:00 --param 'system_ids=["PV-001"]' --wait
+
+参数值按 JSON 解析（解析失败时作为字符串）；--wait 等待任务结束并输出结果
+"""
+import sys
+import os
+import argparse
+import json
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import SessionLocal, init_db
+from app.models.job import Job
+from app.services.jobs import FINISHED_STATUSES, JOB_HANDLERS, STATUS_SUCCEEDED, enqueue_job, result_file_path
+import app.services.job_handlers  # noqa: F401  导入即注册任务类型
+
+
+def parse_param(text):
+    """解析 key=value 形式的参数"""
+    key, sep, value = text.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"参数格式应为 key=value: {text}")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+
+def main():
+    """主函数：提交任务，可选等待任务结束"""
+    parser = argparse.ArgumentParser(description="提交后台任务")
+    parser.add_argument("kind", choices=sorted(JOB_HANDLERS), help="任务类型")
+    parser.add_argument("--param", type=parse_param, action="append", default=[], help="任务参数 key=value（可重复）")
+    parser.add_argument("--priority", type=int, default=0, help="优先级（数值大的先执行，默认 0）")
+    parser.add_argument("--max-attempts", type=int, default=1, help="最多执行次数（默认 1）")
+    parser.add_argument("--wait", action="store_true", help="等待任务结束并输出结果")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        job, created = enqueue_job(db, args.kind, dict(args.param), args.priority, args.max_attempts)
+        if created:
+            print(f"📥 已提交任务 {job.id}（{job.kind}）")
+        else:
+            print(f"ℹ️  已有相同的待执行任务 {job.id}，未重复提交")
+        if not args.wait:
+            return
+
+        job_id = job.id
+        while job.status not in FINISHED_STATUSES:
+            time.sleep(2)
+            db.expire_all()
+            job = db.get(Job, job_id)
+            if job.progress_message:
+                print(f"⏳ {job.status} {job.progress:.0%} {job.progress_message}")
+        if job.status != STATUS_SUCCEEDED:
+            print(f"❌ 任务 {job.id} {job.status}: {job.error or ''}")
+            sys.exit(1)
+        path = result_file_path(job)
+        print(f"✅ 任务 {job.id} 完成：{json.dumps(job.result, ensure_ascii=False)}")
+        if path:
+            print(f"📄 结果文件：{path}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
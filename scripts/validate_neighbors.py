@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+辐照度传感器近邻交叉校验
+将每个启用系统的小时平均辐照度与最近的若干个相邻系统比较，持续偏离近邻中位数的系统标记为 divergent，
+结果写入 neighbor_validations / neighbor_divergences。默认校验截至当前整点的前 24 小时，建议每天执行一次：
+    15 1 * * * cd /path/to/project && python scripts/validate_neighbors.py
+
+用 --start / --end 校验指定时间范围（本地时间，结束时间不含）
+"""
+import sys
+import os
+import argparse
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import SessionLocal, init_db
+from app.services.neighbor_validation import NEIGHBOR_COUNT, NEIGHBOR_MAX_DISTANCE_KM, run_validation
+from app.utils.time_utils import get_local_now
+
+
+def main():
+    """主函数：解析时间范围并执行近邻交叉校验"""
+    parser = argparse.ArgumentParser(description="辐照度传感器近邻交叉校验")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="开始时间（本地时间，默认结束时间前 --hours 小时）")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="结束时间（本地时间，默认当前整点）")
+    parser.add_argument("--hours", type=int, default=24, help="未指定开始时间时的校验时长（小时，默认 24）")
+    parser.add_argument("--system-id", action="append", help="只校验指定系统（可重复）")
+    args = parser.parse_args()
+
+    end = args.end or get_local_now().replace(minute=0, second=0, microsecond=0)
+    start = args.start or end - timedelta(hours=args.hours)
+    if end <= start:
+        print("❌ 结束时间必须晚于开始时间")
+        sys.exit(1)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"🛰️  近邻校验 {start} ~ {end}：每个系统比较 {NEIGHBOR_COUNT} 个 {NEIGHBOR_MAX_DISTANCE_KM} km 内的近邻")
+        stats = run_validation(db, start, end, args.system_id)
+        print(f"✅ 共校验 {stats.systems} 个系统：偏离 {stats.divergent} 个（{stats.divergent_hours} 个小时），"
+              f"数据或近邻不足 {stats.insufficient} 个，用时 {stats.elapsed_seconds} 秒")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
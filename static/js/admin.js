@@ -1,6 +1,7 @@
 /* Admin 页面 JavaScript */
 var API_BASE_URL = window.location.protocol + '//' + window.location.host;
 var allSystems = [];
+var fleetStatus = {};
 var currentPage = 1;
 var pageSize = 20;
 var totalCount = 0;
@@ -92,11 +93,34 @@ function refreshList() {
     if (totalCountEl) totalCountEl.textContent = totalCount; 
     renderTable(); 
     renderPagination(); 
+    refreshFleetStatus();
   }).catch(function(e) { 
     if (tableWrap) tableWrap.innerHTML = '<div style="padding:20px;color:red;">❌ 加载失败: ' + e.message + '</div>'; 
   });
 }
 
+// 一次请求获取全部系统的最新数据状态
+function refreshFleetStatus() {
+  fetch(API_BASE_URL + '/fleet/status?include_inactive=true').then(function(r) {
+    if (!r.ok) throw new Error('HTTP ' + r.status);
+    return r.json();
+  }).then(function(list) {
+    fleetStatus = {};
+    list.forEach(function(s) { fleetStatus[s.system_id] = s; });
+    renderTable();
+  }).catch(function() { /* 总览不可用时保持原表格 */ });
+}
+
+function formatFreshness(s) {
+  if (!s || s.status === 'no_data') return '<span style="color:#999;">无数据</span>';
+  var age = s.data_age_seconds;
+  var text = age < 60 ? Math.round(age) + ' 秒前' : age < 3600 ? Math.round(age / 60) + ' 分钟前' : age < 86400 ? Math.round(age / 3600) + ' 小时前' : Math.round(age / 86400) + ' 天前';
+  var color = s.status === 'online' ? 'green' : 'orange';
+  var m = s.latest_measurement;
+  var value = (m && m.irradiance != null) ? ' · ' + m.irradiance + ' W/m²' : '';
+  return '<span style="color:' + color + ';">●</span> ' + text + value;
+}
+
 function renderTable() {
   if (!tableWrap) return;
   if (allSystems.length === 0) { tableWrap.innerHTML = '<div style="padding:20px;text-align:center;color:#999;">暂无数据</div>'; return; }
@@ -105,9 +129,9 @@ function renderTable() {
     var sts = item.is_active ? '<span style="color:green;">●</span> 启用' : '<span style="color:gray;">●</span> 停用';
     var eid = 'e_' + item.system_id.replace(/[^a-zA-Z0-9]/g, '_');
     var did = 'd_' + item.system_id.replace(/[^a-zA-Z0-9]/g, '_');
-    return '<tr><td>' + esc(item.name) + '</td><td>' + cap + ' kW</td><td>' + ('📍 ' + (item.latitude||'-') + ',' + (item.longitude||'-')) + '</td><td>' + sts + '</td><td><button id="' + eid + '" class="btn-edit">编辑</button> <button id="' + did + '" class="btn-delete">删除</button></td></tr>';
+    return '<tr><td>' + esc(item.name) + '</td><td>' + cap + ' kW</td><td>' + ('📍 ' + (item.latitude||'-') + ',' + (item.longitude||'-')) + '</td><td>' + sts + '</td><td>' + formatFreshness(fleetStatus[item.system_id]) + '</td><td><button id="' + eid + '" class="btn-edit">编辑</button> <button id="' + did + '" class="btn-delete">删除</button></td></tr>';
   }).join('');
-  tableWrap.innerHTML = '<table><thead><tr><th>名称</th><th>容量(kW)</th><th>地址</th><th>状态</th><th>操作</th></tr></thead><tbody>' + rows + '</tbody></table>';
+  tableWrap.innerHTML = '<table><thead><tr><th>名称</th><th>容量(kW)</th><th>地址</th><th>状态</th><th>最新数据</th><th>操作</th></tr></thead><tbody>' + rows + '</tbody></table>';
   allSystems.forEach(function(item) {
     var eid = 'e_' + item.system_id.replace(/[^a-zA-Z0-9]/g, '_');
     var did = 'd_' + item.system_id.replace(/[^a-zA-Z0-9]/g, '_');
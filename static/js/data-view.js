@@ -10,6 +10,7 @@ let totalPages = 0;
 let allMeasurements = [];
 let irradianceChart = null;
 let temperatureChart = null;
+let liveSource = null;
 
 // DOM 元素引用
 const systemSelect = document.getElementById('systemSelect');
@@ -81,6 +82,7 @@ async function loadSystems() {
 
 function onSystemChange() {
   currentSystemId = systemSelect.value;
+  stopLiveStream();
   if (currentSystemId) {
     queryData();
   }
@@ -178,6 +180,12 @@ async function queryData() {
     }
 
     allMeasurements = data;
+    // 查看今天的数据时订阅实时推送，之后只追加增量，不再重复拉取整天数据
+    if (selectedDateTime.getTime() === today.getTime()) {
+      startLiveStream(currentSystemId);
+    } else {
+      stopLiveStream();
+    }
     updateChart();
     // 保留当前页码，如果超出范围则回到第1页
     const maxPage = Math.ceil(allMeasurements.length / pageSize);
@@ -196,6 +204,54 @@ async function queryData() {
   }
 }
 
+// 订阅指定系统的实时推送（SSE）
+function startLiveStream(systemId) {
+  if (liveSource && liveSource.systemId === systemId) {
+    return;
+  }
+  stopLiveStream();
+
+  const source = new EventSource(`/measurements/stream?system_id=${encodeURIComponent(systemId)}`);
+  source.systemId = systemId;
+  source.addEventListener('measurement', (event) => {
+    appendLiveMeasurement(JSON.parse(event.data));
+  });
+  source.onerror = () => {
+    // 浏览器会自动重连；重连后重新拉取一次，补齐断线期间的数据
+    source.needsResync = true;
+  };
+  source.onopen = () => {
+    if (source.needsResync) {
+      source.needsResync = false;
+      queryData();
+    }
+  };
+  liveSource = source;
+}
+
+function stopLiveStream() {
+  if (liveSource) {
+    liveSource.close();
+    liveSource = null;
+  }
+}
+
+// 追加一条实时记录（按时间戳去重，保持最新在前）
+function appendLiveMeasurement(m) {
+  if (m.system_id !== currentSystemId || !String(m.timestamp).startsWith(selectedDateInput.value)) {
+    return;
+  }
+  const existingIndex = allMeasurements.findIndex(item => item.timestamp === m.timestamp);
+  if (existingIndex >= 0) {
+    allMeasurements[existingIndex] = m;
+  } else {
+    allMeasurements.unshift(m);
+    allMeasurements.sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
+  }
+  updateChart();
+  renderTable();
+}
+
 // 更新统计数据
 
 // 更新图表
@@ -0,0 +1,29 @@
+"""
+测试公共配置：使用临时 SQLite 数据库（需在导入 app 之前设置 DATABASE_URL）
+"""
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_DB_DIR = tempfile.mkdtemp(prefix="pv-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}")
+os.environ.setdefault("DAY_CACHE_DIR", os.path.join(_DB_DIR, "day_cache"))
+
+import pytest
+
+from app.database.database import Base, SessionLocal, engine, init_db
+
+
+@pytest.fixture
+def db():
+    """每个测试使用一个空数据库"""
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,156 @@
+"""
+数据完整性索引：分钟范围换算、缺测区间、按时段统计、位图置位 / 清除与按日期拆分的有数据系统查询
+"""
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.models.measurement import Measurement, MeasurementCoverage
+from app.services.coverage import (
+    MINUTES_PER_DAY,
+    _day_bounds,
+    _minute_range,
+    _systems_with_data,
+    find_gaps,
+    mark_coverage,
+    minute_numbers,
+    range_bitmap,
+    slot_coverage,
+    systems_with_data,
+    unmark_measurement,
+)
+from app.services.ingest import CONFLICT_IGNORE, get_dialect_insert, write_measurements
+
+D1 = datetime(2026, 10, 1)
+D1_MINUTE = int(minute_numbers([D1])[0])
+
+
+def _bits(pattern):
+    return np.array([c == "1" for c in pattern], dtype=bool)
+
+
+def _write(db, *points):
+    write_measurements(
+        db,
+        [
+            {"system_id": system_id, "timestamp": ts, "irradiance": 1.0, "temperature": 1.0, "created_at": D1}
+            for system_id, ts in points
+        ],
+        "test",
+        CONFLICT_IGNORE,
+    )
+    db.commit()
+
+
+def _coverage(db, system_id, day):
+    return db.get(MeasurementCoverage, (system_id, day))
+
+
+# ---- 纯函数 ----
+
+def test_minute_range_rounds_outward():
+    assert _minute_range(D1 + timedelta(seconds=30), D1 + timedelta(minutes=5)) == (D1_MINUTE, D1_MINUTE + 5)
+    assert _minute_range(D1, D1 + timedelta(minutes=5, microseconds=1)) == (D1_MINUTE, D1_MINUTE + 6)
+    assert _minute_range(D1, D1) == (D1_MINUTE, D1_MINUTE)
+
+
+def test_day_bounds_excludes_next_midnight():
+    assert _day_bounds(D1_MINUTE, D1_MINUTE + MINUTES_PER_DAY) == (date(2026, 10, 1), date(2026, 10, 1))
+    assert _day_bounds(D1_MINUTE + 1439, D1_MINUTE + 1441) == (date(2026, 10, 1), date(2026, 10, 2))
+
+
+def test_find_gaps():
+    gaps = find_gaps(D1_MINUTE, _bits("10010110"))
+    assert [(g["start_time"], g["end_time"], g["minutes"]) for g in gaps] == [
+        (D1 + timedelta(minutes=1), D1 + timedelta(minutes=3), 2),
+        (D1 + timedelta(minutes=4), D1 + timedelta(minutes=5), 1),
+        (D1 + timedelta(minutes=7), D1 + timedelta(minutes=8), 1),
+    ]
+    assert [g["minutes"] for g in find_gaps(D1_MINUTE, _bits("10010110"), min_gap_minutes=2)] == [2]
+    assert find_gaps(D1_MINUTE, _bits("111")) == []
+    assert find_gaps(D1_MINUTE, _bits("000")) == [{"start_time": D1, "end_time": D1 + timedelta(minutes=3), "minutes": 3}]
+    assert find_gaps(D1_MINUTE, _bits("")) == []
+
+
+def test_slot_coverage_splits_days_at_midnight():
+    # 23:30 至次日 00:30，15 分钟时段；23:35 与 00:10 有数据
+    first = D1_MINUTE + 1410
+    bits = np.zeros(60, dtype=bool)
+    bits[[5, 40]] = True
+    assert slot_coverage(first, bits, 15) == [
+        {"day": date(2026, 10, 1), "expected_slots": 2, "present_slots": 1},
+        {"day": date(2026, 10, 2), "expected_slots": 2, "present_slots": 1},
+    ]
+    assert slot_coverage(first, bits[:0], 15) == []
+
+
+# ---- 位图置位与清除 ----
+
+def test_mark_coverage_merges_bits(db):
+    insert = get_dialect_insert(db)
+    mark_coverage(db, insert, [SimpleNamespace(system_id="PV-1", timestamp=D1 + timedelta(minutes=1))])
+    mark_coverage(db, insert, [
+        SimpleNamespace(system_id="PV-1", timestamp=D1 + timedelta(minutes=1, seconds=30)),
+        SimpleNamespace(system_id="PV-1", timestamp=D1 + timedelta(minutes=2)),
+        SimpleNamespace(system_id="PV-1", timestamp=D1 + timedelta(days=1, minutes=10)),
+    ])
+    db.commit()
+
+    assert _coverage(db, "PV-1", date(2026, 10, 1)).present_minutes == 2
+    assert _coverage(db, "PV-1", date(2026, 10, 2)).present_minutes == 1
+    first, bits = range_bitmap(db, "PV-1", D1, D1 + timedelta(days=2))
+    assert first == D1_MINUTE
+    assert np.flatnonzero(bits).tolist() == [1, 2, MINUTES_PER_DAY + 10]
+
+
+def test_unmark_measurement_keeps_shared_minute(db):
+    _write(db, ("PV-1", D1 + timedelta(minutes=5)), ("PV-1", D1 + timedelta(minutes=5, seconds=30)), ("PV-1", D1 + timedelta(minutes=7)))
+
+    def delete(ts):
+        db.query(Measurement).filter(Measurement.system_id == "PV-1", Measurement.timestamp == ts).delete()
+        unmark_measurement(db, "PV-1", ts)
+        db.commit()
+
+    delete(D1 + timedelta(minutes=5))
+    assert _coverage(db, "PV-1", D1.date()).present_minutes == 2
+    delete(D1 + timedelta(minutes=5, seconds=30))
+    record = _coverage(db, "PV-1", D1.date())
+    assert record.present_minutes == 1
+    assert np.flatnonzero(range_bitmap(db, "PV-1", D1, D1 + timedelta(days=1))[1]).tolist() == [7]
+    delete(D1 + timedelta(minutes=7))
+    db.expire_all()
+    assert _coverage(db, "PV-1", D1.date()) is None
+
+
+# ---- 有数据的系统 ----
+
+@pytest.fixture
+def systems(db):
+    """10-01 12:00 至 10-03 06:00 的查询范围内外分布的数据"""
+    _write(
+        db,
+        ("FULL", D1 + timedelta(days=1, hours=3)),        # 完整覆盖的 10-02
+        ("HEAD", D1 + timedelta(hours=13)),                # 首日范围内
+        ("BEFORE", D1 + timedelta(hours=11, minutes=59)),  # 首日范围前
+        ("TAIL", D1 + timedelta(days=2, hours=5, minutes=59, seconds=59)),  # 末日范围内
+        ("AFTER", D1 + timedelta(days=2, hours=6, minutes=1)),  # 末日范围后
+    )
+    return ["FULL", "HEAD", "BEFORE", "TAIL", "AFTER", "EMPTY"]
+
+
+def test_systems_with_data_splits_full_and_partial_days(db, systems):
+    start, end = D1 + timedelta(hours=12), D1 + timedelta(days=2, hours=6)
+    assert _systems_with_data(db, systems, start, end) == {"FULL", "HEAD", "TAIL"}
+    assert systems_with_data(db, systems, start, end) == {"FULL", "HEAD", "TAIL"}
+
+
+def test_systems_with_data_aligned_and_single_day_ranges(db, systems):
+    # 整天对齐：只按 present_minutes 判断
+    assert _systems_with_data(db, systems, D1, D1 + timedelta(days=1)) == {"HEAD", "BEFORE"}
+    assert _systems_with_data(db, systems, D1 + timedelta(days=1), D1 + timedelta(days=3)) == {"FULL", "TAIL", "AFTER"}
+    # 同一天内的部分范围
+    assert _systems_with_data(db, systems, D1 + timedelta(hours=12), D1 + timedelta(hours=18)) == {"HEAD"}
+    assert _systems_with_data(db, systems, D1, D1) == set()
+    assert _systems_with_data(db, [], D1, D1 + timedelta(days=3)) == set()
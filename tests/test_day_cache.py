@@ -0,0 +1,37 @@
+"""
+日缓存：磁盘条目按文件修改时间过期
+"""
+import os
+import time
+from datetime import date
+
+from app.services.day_cache import DayResponseCache
+
+
+def test_disk_entry_expires_after_ttl(tmp_path):
+    key = ("PV-1", date(2026, 10, 1), "raw")
+    writer = DayResponseCache(ttl_seconds=60, cache_dir=str(tmp_path))
+    writer.put(key, b"[]", writer.generation("PV-1", date(2026, 10, 1)))
+
+    # 其他进程（内存层为空）在存活时间内可读到磁盘条目
+    assert DayResponseCache(ttl_seconds=60, cache_dir=str(tmp_path)).get(key) == b"[]"
+
+    path = writer._disk_path(key)
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+    reader = DayResponseCache(ttl_seconds=60, cache_dir=str(tmp_path))
+    assert reader.get(key) is None
+    assert not os.path.exists(path)
+
+
+def test_promoted_disk_entry_keeps_its_age(tmp_path):
+    key = ("PV-1", date(2026, 10, 1), "raw")
+    writer = DayResponseCache(ttl_seconds=60, cache_dir=str(tmp_path))
+    writer.put(key, b"[]", 0)
+    aged = time.time() - 50
+    os.utime(writer._disk_path(key), (aged, aged))
+
+    reader = DayResponseCache(ttl_seconds=60, cache_dir=str(tmp_path))
+    assert reader.get(key) == b"[]"
+    _, stored_at = reader._entries[key]
+    assert time.monotonic() - stored_at >= 50
@@ -0,0 +1,46 @@
+"""
+图表降采样：LTTB 与 min/max 保留首尾点、输出点数不超过上限、点数不足时原样返回
+"""
+import numpy as np
+import pytest
+
+from app.calculations.downsampling import downsample_indices, lttb_indices, minmax_indices
+
+
+def _series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype=np.float64) * 60
+    y = np.sin(np.arange(n) / 50) * 500 + rng.normal(0, 20, n)
+    y[rng.random(n) < 0.05] = np.nan
+    return x, y
+
+
+@pytest.mark.parametrize("mode", ["lttb", "minmax"])
+@pytest.mark.parametrize("n, max_points", [(10, 3), (10, 4), (1000, 7), (1000, 100), (1441, 500), (5000, 999)])
+def test_keeps_endpoints_within_budget(mode, n, max_points):
+    x, y = _series(n)
+    selected = downsample_indices(x, y, max_points, mode)
+
+    assert selected[0] == 0 and selected[-1] == n - 1
+    assert len(selected) <= max_points
+    assert np.all(np.diff(selected) > 0)
+
+
+@pytest.mark.parametrize("mode", ["lttb", "minmax"])
+@pytest.mark.parametrize("n", [0, 1, 5, 500])
+def test_short_series_unchanged(mode, n):
+    x, y = _series(n)
+    assert downsample_indices(x, y, 500, mode).tolist() == list(range(n))
+
+
+def test_lttb_returns_exactly_max_points():
+    x, y = _series(2000)
+    assert len(lttb_indices(x, y, 300)) == 300
+
+
+def test_minmax_keeps_extremes():
+    x, y = _series(3000, seed=1)
+    selected = minmax_indices(y, 60)
+    assert np.nanargmax(y) in selected
+    assert np.nanargmin(y) in selected
+    assert minmax_indices(y, 2).tolist() == [0, 2999]
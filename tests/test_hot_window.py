@@ -0,0 +1,56 @@
+"""
+热窗口：超出容量丢弃最旧数据后，更早的查询范围应回退到数据库
+"""
+from datetime import timedelta
+from types import SimpleNamespace
+
+from app.services.hot_window import HotWindowStore
+from app.utils.time_utils import get_local_now
+
+
+def _rows(end, count):
+    return [
+        SimpleNamespace(
+            id=i + 1, system_id="PV-1", timestamp=end - timedelta(minutes=count - 1 - i),
+            irradiance=float(i), temperature=20.0, created_at=end,
+        )
+        for i in range(count)
+    ]
+
+
+def _store():
+    return HotWindowStore(capacity=100, max_systems=10, resync_seconds=3600)
+
+
+def test_install_over_capacity_falls_back_for_dropped_range():
+    store = _store()
+    now = get_local_now().replace(second=0, microsecond=0)
+    with store._lock:
+        store._install("PV-1", now - timedelta(hours=48), _rows(now, 251))
+
+    # 最早的 151 条已被丢弃：查询范围超出窗口时返回 None 由调用方查询数据库
+    assert store.query(None, "PV-1", now - timedelta(minutes=250), now, 1000, 0) is None
+    rows = store.query(None, "PV-1", now - timedelta(minutes=99), now, 1000, 0)
+    assert len(rows) == 100
+
+
+def test_out_of_order_merge_over_capacity_raises_coverage():
+    store = _store()
+    now = get_local_now().replace(second=0, microsecond=0)
+    rows = _rows(now, 150)
+    with store._lock:
+        store._install("PV-1", now - timedelta(hours=48), rows[100:])
+    # 乱序写入走合并排序路径，合并后超出容量
+    store.on_ingest("test", list(reversed(rows[:100])))
+
+    assert store.query(None, "PV-1", now - timedelta(minutes=149), now, 1000, 0) is None
+    assert len(store.query(None, "PV-1", now - timedelta(minutes=99), now, 1000, 0)) == 100
+
+
+def test_historical_range_skips_loading():
+    store = _store()
+    now = get_local_now()
+    # 未加载的系统查询热窗口之前的范围：不访问数据库（db 为 None）直接回退
+    assert store.query(None, "PV-2", now - timedelta(days=30), now - timedelta(days=29), 100, 0) is None
+    assert store.query(None, "PV-2", now - timedelta(days=30), None, 100, 0) is None
+    assert store.stats()["systems"] == 0
@@ -0,0 +1,111 @@
+"""
+幂等写入：ignore / update 冲突策略、批内去重、重复计数与接口状态码
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import measurements
+from app.models.measurement import Measurement, MeasurementLatest
+from app.services.ingest import CONFLICT_IGNORE, CONFLICT_UPDATE, write_measurements
+
+T0 = datetime(2026, 10, 1, 12, 0)
+
+
+def _row(minute, irradiance, system_id="PV-1"):
+    return {
+        "system_id": system_id,
+        "timestamp": T0 + timedelta(minutes=minute),
+        "irradiance": irradiance,
+        "temperature": 20.0,
+        "created_at": T0,
+    }
+
+
+def _stored(db, minute, system_id="PV-1"):
+    db.expire_all()
+    return db.query(Measurement).filter(
+        Measurement.system_id == system_id, Measurement.timestamp == T0 + timedelta(minutes=minute)
+    ).one()
+
+
+def test_ignore_keeps_first_value_and_counts_duplicates(db):
+    first = write_measurements(db, [_row(0, 100.0), _row(1, 110.0)], "test", CONFLICT_IGNORE)
+    assert (first.received, first.written, first.duplicates) == (2, 2, 0)
+
+    again = write_measurements(db, [_row(0, 999.0), _row(2, 120.0)], "test", CONFLICT_IGNORE)
+    assert (again.received, again.written, again.duplicates) == (2, 1, 1)
+    assert [row.timestamp for row in again.rows] == [T0 + timedelta(minutes=2)]
+    assert _stored(db, 0).irradiance == 100.0
+    assert db.query(Measurement).count() == 3
+
+
+def test_update_overwrites_and_counts_existing_keys(db):
+    write_measurements(db, [_row(0, 100.0), _row(1, 110.0)], "test", CONFLICT_UPDATE)
+
+    again = write_measurements(db, [_row(0, 999.0), _row(2, 120.0)], "test", CONFLICT_UPDATE)
+    # update 策略下被覆盖的记录同样返回，已存在的键计为重复
+    assert (again.received, again.written, again.duplicates) == (2, 2, 1)
+    assert _stored(db, 0).irradiance == 999.0
+    assert db.query(Measurement).count() == 3
+
+
+@pytest.mark.parametrize("mode, kept", [(CONFLICT_IGNORE, 1.0), (CONFLICT_UPDATE, 3.0)])
+def test_in_batch_duplicates_are_merged(db, mode, kept):
+    result = write_measurements(db, [_row(0, 1.0), _row(0, 2.0), _row(0, 3.0)], "test", mode)
+    assert (result.received, result.written, result.duplicates) == (3, 1, 2)
+    assert _stored(db, 0).irradiance == kept
+
+
+def test_latest_value_follows_newest_timestamp(db):
+    write_measurements(db, [_row(5, 150.0), _row(1, 110.0)], "test", CONFLICT_IGNORE)
+    # 补传更早的数据不改变末值
+    write_measurements(db, [_row(0, 100.0)], "test", CONFLICT_IGNORE)
+    latest = db.query(MeasurementLatest).filter(MeasurementLatest.system_id == "PV-1").one()
+    assert latest.timestamp == T0 + timedelta(minutes=5)
+    assert latest.irradiance == 150.0
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(measurements.router)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _payload(irradiance):
+    return {"system_id": "PV-1", "timestamp": T0.isoformat(), "irradiance": irradiance, "temperature": 20.0}
+
+
+def test_single_create_returns_201_then_200(client):
+    created = client.post("/measurements/", json=_payload(100.0))
+    assert created.status_code == 201
+    assert created.headers["X-Ingest-Written"] == "1"
+
+    repeated = client.post("/measurements/", json=_payload(999.0))
+    assert repeated.status_code == 200
+    assert repeated.headers["X-Ingest-Duplicates"] == "1"
+    # ignore 策略返回已存储的记录
+    assert repeated.json()["id"] == created.json()["id"]
+    assert repeated.json()["irradiance"] == 100.0
+
+    updated = client.post("/measurements/", params={"on_conflict": "update"}, json=_payload(999.0))
+    assert updated.status_code == 200
+    assert updated.json()["irradiance"] == 999.0
+
+
+def test_batch_returns_only_written_rows(client):
+    client.post("/measurements/", json=_payload(100.0))
+    batch = {"measurements": [
+        _payload(100.0),
+        {**_payload(110.0), "timestamp": (T0 + timedelta(minutes=1)).isoformat()},
+    ]}
+    response = client.post("/measurements/batch", json=batch)
+    assert response.status_code == 201
+    assert len(response.json()) == 1
+    assert response.headers["X-Ingest-Received"] == "2"
+    assert response.headers["X-Ingest-Written"] == "1"
+    assert response.headers["X-Ingest-Duplicates"] == "1"
@@ -0,0 +1,47 @@
+"""
+行协议 TCP 监听：超长行计为无效并断开连接，不影响监听器继续服务
+"""
+import asyncio
+
+from app.models.measurement import Measurement
+from app.services.line_listener import BatchedMeasurementWriter, LineProtocolListener
+
+
+async def _send(port, payload):
+    """发送数据并等待服务端断开；断开时仍有未读数据则客户端收到 RST"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(payload)
+        await writer.drain()
+        writer.write_eof()
+        return await asyncio.wait_for(reader.read(), timeout=5)
+    except ConnectionResetError:
+        return b""
+    finally:
+        writer.close()
+
+
+async def _run_oversized_line():
+    listener = LineProtocolListener(
+        host="127.0.0.1", tcp_port=0, udp_port=None, writer=BatchedMeasurementWriter(flush_interval=0.01)
+    )
+    await listener.start()
+    try:
+        port = listener._tcp_server.sockets[0].getsockname()[1]
+        oversized = b"PV-1," + b"9" * (1 << 17) + b"\n"
+        assert await _send(port, b"PV-1,1759276800000,500,30\n" + oversized + b"PV-1,1759276860000,501,31\n") == b""
+        # 监听器仍可接受新连接
+        assert await _send(port, b"PV-2,1759276800000,400,25\n") == b""
+        await asyncio.sleep(0.2)
+    finally:
+        await listener.stop()
+    return listener.stats()
+
+
+def test_oversized_tcp_line_closes_connection(db):
+    stats = asyncio.run(_run_oversized_line())
+
+    assert stats["lines_received"] == 3
+    assert stats["lines_invalid"] == 1
+    assert stats["rows_written"] == 2
+    assert sorted(row.system_id for row in db.query(Measurement)) == ["PV-1", "PV-2"]
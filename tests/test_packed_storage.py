@@ -0,0 +1,132 @@
+"""
+分块压缩存储：打包 / 解包无损往返、按条数提前结束的查询、两层合并、写入吸收与按 ID 删除
+"""
+from datetime import datetime, timedelta
+
+from app.models.measurement import Measurement, MeasurementBlock
+from app.services.ingest import CONFLICT_IGNORE, write_measurements
+from app.services.packed_storage import (
+    absorb_packed_rows,
+    compact_rows,
+    delete_packed_by_id,
+    find_packed_by_id,
+    merge_tiers,
+    query_packed,
+    unpack_blocks,
+)
+
+T0 = datetime(2026, 10, 1, 0, 0)
+CUTOFF = T0 + timedelta(days=10)
+
+
+def _seed(db, count=60):
+    """3 天内不等间隔的记录，含缺失值与微秒时间"""
+    rows = []
+    for i in range(count):
+        rows.append({
+            "system_id": "PV-1",
+            "timestamp": T0 + timedelta(minutes=71 * i, microseconds=i * 37),
+            "irradiance": None if i % 7 == 0 else round(i * 12.345, 3),
+            "temperature": None if i % 11 == 0 else -5.5 + i / 3,
+            "created_at": T0 + timedelta(days=1, seconds=i, microseconds=i),
+        })
+    write_measurements(db, rows, "test", CONFLICT_IGNORE)
+
+
+def _snapshot(db):
+    return [
+        (m.id, m.system_id, m.timestamp, m.irradiance, m.temperature, m.created_at)
+        for m in db.query(Measurement).order_by(Measurement.timestamp.desc())
+    ]
+
+
+def _tuples(samples):
+    return [(s.id, s.system_id, s.timestamp, s.irradiance, s.temperature, s.created_at) for s in samples]
+
+
+def test_compact_and_unpack_round_trip(db):
+    _seed(db)
+    original = _snapshot(db)
+
+    # 小批次使同一数据块跨越多个批次，由下一批合并
+    packed, _ = compact_rows(db, "PV-1", CUTOFF, batch_rows=7)
+    assert packed == len(original)
+    assert db.query(Measurement).count() == 0
+    assert db.query(MeasurementBlock).count() == 3
+    assert sum(block.sample_count for block in db.query(MeasurementBlock)) == len(original)
+
+    assert _tuples(query_packed(db, "PV-1", None, None)) == original
+
+    restored = unpack_blocks(db, "PV-1")
+    assert restored == len(original)
+    assert db.query(MeasurementBlock).count() == 0
+    db.expire_all()
+    assert _snapshot(db) == original
+
+
+def test_query_packed_range_and_limit(db):
+    _seed(db)
+    original = _snapshot(db)
+    compact_rows(db, "PV-1", CUTOFF)
+
+    everything = query_packed(db, "PV-1", None, None)
+    for limit in (1, 5, 30):
+        assert _tuples(query_packed(db, "PV-1", None, None, limit=limit)) == original[:limit]
+
+    start, end = T0 + timedelta(hours=20), T0 + timedelta(hours=50)
+    expected = [s for s in everything if start <= s.timestamp <= end]
+    assert query_packed(db, "PV-1", start, end) == expected
+    assert query_packed(db, "PV-1", start, end, limit=3) == expected[:3]
+
+
+def test_merge_tiers_prefers_row_store(db):
+    _seed(db, count=5)
+    compact_rows(db, "PV-1", CUTOFF)
+    packed = query_packed(db, "PV-1", None, None)
+    row = packed[1]._replace(id=999, irradiance=1.0)
+
+    merged = merge_tiers([row], packed)
+    assert len(merged) == len(packed)
+    assert merged[1] is row
+    assert [m.timestamp for m in merged] == sorted((m.timestamp for m in merged), reverse=True)
+
+
+def test_absorb_packed_rows_ignore_and_update(db):
+    _seed(db, count=5)
+    compact_rows(db, "PV-1", CUTOFF)
+    target = query_packed(db, "PV-1", None, None)[-1]
+    incoming = [
+        {"system_id": "PV-1", "timestamp": target.timestamp, "irradiance": 42.0, "temperature": None,
+         "created_at": CUTOFF},
+        {"system_id": "PV-1", "timestamp": T0 + timedelta(seconds=1), "irradiance": 1.0, "temperature": 1.0,
+         "created_at": CUTOFF},
+    ]
+
+    remaining, updated = absorb_packed_rows(db, incoming, update=False)
+    assert remaining == [incoming[1]] and updated == []
+    assert find_packed_by_id(db, target.id) == target
+
+    remaining, updated = absorb_packed_rows(db, incoming, update=True)
+    db.commit()
+    assert remaining == [incoming[1]]
+    assert [(u.id, u.irradiance, u.temperature, u.created_at) for u in updated] == [(target.id, 42.0, None, CUTOFF)]
+    assert find_packed_by_id(db, target.id).irradiance == 42.0
+
+
+def test_delete_packed_by_id(db):
+    _seed(db, count=5)
+    compact_rows(db, "PV-1", CUTOFF)
+    samples = query_packed(db, "PV-1", None, None)
+
+    deleted = delete_packed_by_id(db, samples[2].id)
+    db.commit()
+    assert deleted == samples[2]
+    assert find_packed_by_id(db, samples[2].id) is None
+    assert query_packed(db, "PV-1", None, None) == samples[:2] + samples[3:]
+    assert delete_packed_by_id(db, samples[2].id) is None
+
+    # 删除块内最后一条时删除整个数据块
+    for sample in samples[:2] + samples[3:]:
+        delete_packed_by_id(db, sample.id)
+    db.commit()
+    assert db.query(MeasurementBlock).count() == 0
@@ -0,0 +1,63 @@
+"""
+发电预测：后一次预报不应以不完整的首日覆盖上一次预报算出的整日结果
+"""
+from datetime import date, datetime, timedelta
+
+from app.models.prediction import DailyProductionPrediction
+from app.models.system_config import SystemConfiguration
+from app.models.weather import WeatherForecast
+from app.services.prediction import run_predictions
+
+
+def _forecast(system_id, first_day, days=2):
+    start = datetime.combine(first_day, datetime.min.time())
+    labels = [start + timedelta(hours=h) for h in range(days * 24)]
+    ghi = [max(0.0, 800.0 * (1 - abs(t.hour - 12) / 6)) for t in labels]
+    now = datetime(2026, 10, 19)
+    return WeatherForecast(
+        system_id=system_id,
+        days=days,
+        fetched_at=now,
+        created_at=now,
+        data={
+            "timezone": "Asia/Shanghai",
+            "hourly": {
+                "time": [t.strftime("%Y-%m-%dT%H:%M") for t in labels],
+                "shortwave_radiation": ghi,
+                "temperature_2m": [20.0] * len(labels),
+                "wind_speed_10m": [2.0] * len(labels),
+            },
+        },
+    )
+
+
+def _daily(db, day):
+    db.expire_all()
+    return db.query(DailyProductionPrediction).filter(DailyProductionPrediction.day == day).one()
+
+
+def test_second_fetch_keeps_previous_full_day(db):
+    now = datetime(2026, 10, 18)
+    db.add(SystemConfiguration(
+        system_id="PV-1", name="PV-1", capacity=10.0, latitude=31.2, longitude=121.5,
+        tilt_angle=25.0, azimuth=180.0, timezone="Asia/Shanghai", created_at=now, updated_at=now,
+    ))
+    db.add(_forecast("PV-1", date(2026, 10, 18)))
+    db.commit()
+    run_predictions(db)
+
+    first = _daily(db, date(2026, 10, 18))
+    assert first.hours == 24
+    energy = first.energy_kwh
+    assert energy > 0
+    # 首个 00:00 标签只覆盖前一天最后 1 小时，不生成前一天的日预测
+    assert db.query(DailyProductionPrediction).filter(DailyProductionPrediction.day == date(2026, 10, 17)).count() == 0
+
+    db.add(_forecast("PV-1", date(2026, 10, 19)))
+    db.commit()
+    run_predictions(db)
+
+    kept = _daily(db, date(2026, 10, 18))
+    assert kept.hours == 24
+    assert kept.energy_kwh == energy
+    assert _daily(db, date(2026, 10, 19)).hours == 24
@@ -0,0 +1,157 @@
+"""
+测量数据分片：哈希稳定性、会话路由、并行扇出与分片建表（两个 SQLite 文件作为分片）
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, inspect
+
+from app.database import database
+from app.database.sharding import (
+    SHARDED_TABLES,
+    ShardRoutingError,
+    ShardRoutingSession,
+    fan_out,
+    fan_out_by_system,
+    shard_for,
+    shard_scope,
+)
+from app.models.measurement import Measurement
+from app.models.system_config import SystemConfiguration
+from app.services.ingest import CONFLICT_IGNORE, write_measurements
+
+SYSTEM_IDS = [f"PV-{i:03d}" for i in range(40)]
+
+
+@pytest.fixture
+def engines(tmp_path):
+    """主库与两个分片"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    shards = [create_engine(f"sqlite:///{tmp_path / f'shard{i}.db'}") for i in range(2)]
+    yield primary, shards
+    for item in [primary, *shards]:
+        item.dispose()
+
+
+@pytest.fixture
+def sharded_db(engines, monkeypatch):
+    primary, shards = engines
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setattr(database, "shard_engines", shards)
+    database.init_db()
+    session = ShardRoutingSession(bind=primary, shards=shards, autoflush=False)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _seed(db):
+    start = datetime(2026, 10, 1)
+    rows = [
+        {
+            "system_id": system_id,
+            "timestamp": start + timedelta(minutes=i),
+            "irradiance": float(i),
+            "temperature": 20.0,
+            "created_at": start,
+        }
+        for system_id in SYSTEM_IDS
+        for i in range(3)
+    ]
+    write_measurements(db, rows, "test", CONFLICT_IGNORE)
+
+
+def test_shard_for_is_stable():
+    # 固定值：哈希算法或参数变化会导致已有数据落在错误的分片
+    assert [shard_for(system_id, 4) for system_id in ("PV-001", "PV-002", "PV-003", "site-a")] == [3, 2, 3, 2]
+    assert [shard_for(system_id, 16) for system_id in ("PV-001", "PV-002", "PV-003", "site-a")] == [3, 2, 8, 2]
+    assert all(shard_for(system_id, 1) == 0 for system_id in SYSTEM_IDS)
+    counts = [sum(shard_for(system_id, 2) == index for system_id in SYSTEM_IDS) for index in range(2)]
+    assert min(counts) > 0
+
+    # 增加分片时只有迁往新分片的系统改变归属
+    for system_id in SYSTEM_IDS:
+        before, after = shard_for(system_id, 3), shard_for(system_id, 4)
+        assert after == before or after == 3
+
+
+def test_init_db_keeps_sharded_tables_off_primary(sharded_db, engines):
+    primary, shards = engines
+    assert SHARDED_TABLES.isdisjoint(inspect(primary).get_table_names())
+    assert "system_configurations" in inspect(primary).get_table_names()
+    for shard in shards:
+        assert set(inspect(shard).get_table_names()) == set(SHARDED_TABLES)
+
+
+def test_get_bind_routes_by_scope(sharded_db, engines):
+    primary, shards = engines
+    assert sharded_db.get_bind(SystemConfiguration) is primary
+    with pytest.raises(ShardRoutingError):
+        sharded_db.query(Measurement).count()
+    with pytest.raises(ShardRoutingError):
+        sharded_db.get_bind(Measurement)
+
+    for system_id in SYSTEM_IDS[:4]:
+        with shard_scope(sharded_db, system_id):
+            assert sharded_db.get_bind(Measurement) is shards[shard_for(system_id, 2)]
+            # 作用域内主库的表仍发往主库，跨库 JOIN 报错
+            assert sharded_db.get_bind(SystemConfiguration) is primary
+            with pytest.raises(ShardRoutingError):
+                sharded_db.query(Measurement).join(
+                    SystemConfiguration, SystemConfiguration.system_id == Measurement.system_id
+                ).all()
+    assert sharded_db.shard is None
+
+
+def test_writes_land_on_owning_shard(sharded_db, engines):
+    _, shards = engines
+    _seed(sharded_db)
+
+    for index, shard in enumerate(shards):
+        with shard.connect() as conn:
+            stored = {row[0] for row in conn.execute(Measurement.__table__.select().with_only_columns(Measurement.system_id))}
+        assert stored == {system_id for system_id in SYSTEM_IDS if shard_for(system_id, 2) == index}
+
+    with shard_scope(sharded_db, SYSTEM_IDS[0]):
+        assert sharded_db.query(Measurement).filter(Measurement.system_id == SYSTEM_IDS[0]).count() == 3
+
+
+def test_fan_out(sharded_db):
+    _seed(sharded_db)
+
+    counts = fan_out(sharded_db, lambda session: (session.shard, session.query(Measurement).count()))
+    assert [shard for shard, _ in counts] == [0, 1]
+    assert sum(count for _, count in counts) == len(SYSTEM_IDS) * 3
+
+    # 只涉及一个分片时在当前会话中执行，结束后恢复作用域
+    assert fan_out(sharded_db, lambda session: session is sharded_db, shards=[1]) == [True]
+    assert sharded_db.shard is None
+
+
+def test_fan_out_by_system(sharded_db):
+    _seed(sharded_db)
+    wanted = SYSTEM_IDS[:10]
+
+    def load(session, system_ids):
+        assert all(shard_for(system_id, 2) == session.shard for system_id in system_ids)
+        return dict(
+            session.query(Measurement.system_id, func.count())
+            .filter(Measurement.system_id.in_(system_ids))
+            .group_by(Measurement.system_id)
+            .all()
+        )
+
+    merged = {}
+    for part in fan_out_by_system(sharded_db, wanted, load):
+        merged.update(part)
+    assert merged == {system_id: 3 for system_id in wanted}
+    assert fan_out_by_system(sharded_db, [], load) == []
+
+
+def test_unsharded_session_passes_through(db):
+    assert fan_out(db, lambda session: session is db) == [True]
+    assert fan_out_by_system(db, ["PV-1", "PV-2"], lambda session, ids: (session is db, ids)) == [(True, ["PV-1", "PV-2"])]
+    with shard_scope(db, "PV-1") as scoped:
+        assert scoped is db
+        assert db.query(Measurement).count() == 0